@@ -18,14 +18,14 @@ else
     echo "未找到与neo.main dp相关的进程。"
 fi
 
-# 查找并杀死所有与scripts.huey_monitor相关的Python进程
-PIDS_MONITOR=$(pgrep -f "uv run python -m scripts.huey_monitor")
+# 查找并杀死所有与neo monitor相关的Python进程
+PIDS_MONITOR=$(pgrep -f "neo.main monitor|neo monitor")
 if [ -n "$PIDS_MONITOR" ]; then
-    echo "找到以下与scripts.huey_monitor相关的进程: $PIDS_MONITOR"
+    echo "找到以下与neo monitor相关的进程: $PIDS_MONITOR"
     kill -9 $PIDS_MONITOR
     echo "已杀死这些进程。"
 else
-    echo "未找到与scripts.huey_monitor相关的进程。"
+    echo "未找到与neo monitor相关的进程。"
 fi
 
 # 确保所有相关进程在清理前确实停止
@@ -1,7 +1,9 @@
 # scripts/init_huey_db.py
 from neo.configs.huey_config import (
     huey_fast,
+    huey_fast_shards,
     huey_slow,
+    huey_plan,
     huey_maint,
 )  # 假设这些都指向同一个sqlite文件或不同的文件但需要初始化
 
@@ -18,6 +20,14 @@ try:
 except Exception as e:
     print(f"Error initializing fast queue database: {e}")
 
+for shard in huey_fast_shards[1:]:
+    print(f"Initializing Huey fast queue shard {shard.name} database...")
+    try:
+        _ = shard.storage
+        print(f"Fast queue shard database at {shard.storage.filename} initialized.")
+    except Exception as e:
+        print(f"Error initializing fast queue shard database: {e}")
+
 print("Initializing Huey slow queue database...")
 try:
     _ = huey_slow.storage
@@ -25,6 +35,13 @@ try:
 except Exception as e:
     print(f"Error initializing slow queue database: {e}")
 
+print("Initializing Huey plan queue database...")
+try:
+    _ = huey_plan.storage
+    print(f"Plan queue database at {huey_plan.storage.filename} initialized.")
+except Exception as e:
+    print(f"Error initializing plan queue database: {e}")
+
 print("Initializing Huey maint queue database...")
 try:
     _ = huey_maint.storage
@@ -4,17 +4,38 @@
 """
 
 import os
+from pathlib import Path
+from typing import Dict, List
+
 from huey import SqliteHuey
 from . import get_config
 
 # 获取配置
 config = get_config()
 
-# 为数据库连接启用 WAL (Write-Ahead Logging) 模式以提高并发性
-pragmas = [
-    "PRAGMA journal_mode=wal",
-    "PRAGMA synchronous=normal",
-]
+
+def sqlite_storage_options(queue_config) -> dict:
+    """根据队列配置生成 SqliteStorage 的连接参数
+
+    Huey 在每个新连接上执行对应的 PRAGMA：
+    - journal_mode: 默认 WAL，读写互不阻塞，提高并发性
+    - fsync: 为 False 时 synchronous=OFF，入队不再逐条刷盘
+    - cache_mb: 页缓存大小
+    - timeout: 写锁等待时间 (秒)
+
+    Args:
+        queue_config: config.toml 中的队列配置段 (如 huey_fast)
+
+    Returns:
+        dict: 传给 SqliteHuey 的存储参数
+    """
+    return {
+        "journal_mode": queue_config.get("journal_mode", "wal"),
+        "fsync": queue_config.get("fsync", False),
+        "cache_mb": queue_config.get("cache_mb", 32),
+        "timeout": queue_config.get("busy_timeout_seconds", 30),
+    }
+
 
 # 快速队列实例
 os.makedirs(os.path.dirname(config.huey_fast.sqlite_path), exist_ok=True)
@@ -22,14 +43,57 @@ huey_fast = SqliteHuey(
     name="fast_queue",
     filename=config.huey_fast.sqlite_path,
     utc=False,
+    **sqlite_storage_options(config.huey_fast),
 )
 
+
+def fast_shard_path(index: int) -> str:
+    """快速队列第 index 个分片的 SQLite 文件路径 (分片 0 即原快速队列文件)"""
+    base = Path(config.huey_fast.sqlite_path)
+    if index == 0:
+        return str(base)
+    return str(base.with_name(f"{base.stem}.shard{index}{base.suffix}"))
+
+
+# 快速队列分片数：按股票代码一致性哈希到多个独立的 SQLite 文件，降低写锁竞争
+FAST_SHARD_COUNT = max(1, int(config.huey_fast.get("shards", 1)))
+
+# 快速队列分片实例，分片 0 即 huey_fast
+huey_fast_shards: List[SqliteHuey] = [huey_fast] + [
+    SqliteHuey(
+        name=f"fast_queue_{index}",
+        filename=fast_shard_path(index),
+        utc=False,
+        **sqlite_storage_options(config.huey_fast),
+    )
+    for index in range(1, FAST_SHARD_COUNT)
+]
+
 # 慢速队列实例
 os.makedirs(os.path.dirname(config.huey_slow.sqlite_path), exist_ok=True)
 huey_slow = SqliteHuey(
     name="slow_queue",
     filename=config.huey_slow.sqlite_path,
     utc=False,
+    **sqlite_storage_options(config.huey_slow),
+)
+
+# 规划队列实例：规划任务 (增量检查、派发下载任务) 的独立通道，不占用慢速队列的 worker
+os.makedirs(os.path.dirname(config.huey_plan.sqlite_path), exist_ok=True)
+huey_plan = SqliteHuey(
+    name="plan_queue",
+    filename=config.huey_plan.sqlite_path,
+    utc=False,
+    **sqlite_storage_options(config.huey_plan),
+)
+
+# 规划时按股票分块查询最新日期：首块较小以尽快派发，之后块大小翻倍直到上限
+PLAN_FIRST_CHUNK_SIZE = max(1, int(config.huey_plan.get("first_chunk_size", 100)))
+PLAN_MAX_CHUNK_SIZE = max(
+    PLAN_FIRST_CHUNK_SIZE, int(config.huey_plan.get("max_chunk_size", 2000))
+)
+PLAN_DISPATCH_BATCH_SIZE = max(
+    1, int(config.huey_plan.get("dispatch_batch_size", 200))
 )
 
 # 维护队列实例
@@ -38,4 +102,16 @@ huey_maint = SqliteHuey(
     name="maint_queue",
     filename=config.huey_maint.sqlite_path,
     utc=False,
+    **sqlite_storage_options(config.huey_maint),
 )
+
+
+def queue_paths() -> Dict[str, str]:
+    """所有队列 (含快速队列分片) 的名称到 SQLite 文件路径的映射"""
+    paths = {"fast": fast_shard_path(0)}
+    for index in range(1, FAST_SHARD_COUNT):
+        paths[f"fast#{index}"] = fast_shard_path(index)
+    paths["slow"] = config.huey_slow.sqlite_path
+    paths["plan"] = config.huey_plan.sqlite_path
+    paths["maint"] = config.huey_maint.sqlite_path
+    return paths
@@ -3,21 +3,45 @@ from neo.downloader.fetcher_builder import FetcherBuilder
 from neo.helpers.rate_limit_manager import RateLimitManager
 
 from neo.database.operator import ParquetDBQueryer
+from neo.database.planner_query import PlannerQueryEngine
 from neo.database.schema_loader import SchemaLoader
 from neo.helpers.task_builder import TaskBuilder
 from neo.helpers.group_handler import GroupHandler
 from neo.helpers.task_filter import TaskFilter
+from neo.helpers.task_registry import TaskRegistry
+from neo.helpers.lease_manager import LeaseManager
+from neo.helpers.fair_share_scheduler import FairShareScheduler
+from neo.helpers.backpressure import BackpressureController
+from neo.helpers.run_manifest import RunManifest
+from neo.helpers.metrics_store import MetricsStore
+from neo.helpers.memory_governor import MemoryGovernor
+from neo.helpers.watermark_index import WatermarkIndex
+from neo.helpers.coverage_engine import CoverageEngine
+from neo.helpers.symbol_universe import SymbolUniverse
+from neo.helpers.trading_calendar import TradingCalendar
+from neo.helpers.staging_merger import StagingMerger
+from neo.helpers.lake_migrator import LakeMigrator
+from neo.helpers.disclosure_calendar import DisclosureCalendar
+from neo.helpers.dry_run import DryRunEstimator
+from neo.helpers.pipeline_monitor import PipelineMonitor, QueueDepthReader
 from neo.services.consumer_runner import ConsumerRunner
 from neo.services.downloader_service import DownloaderService
+from neo.services.inline_pipeline import InlinePipelineRunner
 from neo.writers.parquet_writer import ParquetWriter
+from neo.writers.batching_parquet_writer import BatchingParquetWriter
+from neo.writers.staging_parquet_writer import StagingParquetWriter
+from neo.writers.arrow_schema import ArrowSchemaCompiler
 
 from neo.configs import get_config
+from neo.configs.huey_config import queue_paths
 
 
 class AppContainer(containers.DeclarativeContainer):
     """应用的核心服务容器"""
 
-    config = providers.Configuration()
+    # config.toml 是配置的唯一来源；这里只保留缺失时无法运行的键
+    # (写入器选择器必须有值，旧配置文件没有 [writer] 时沿用直写)
+    config = providers.Configuration(default={"writer": {"mode": "direct"}})
     config.from_dict(get_config().to_dict())
 
     # Services
@@ -31,11 +55,76 @@ class AppContainer(containers.DeclarativeContainer):
     fetcher_builder = providers.Factory(FetcherBuilder, schema_loader=schema_loader)
     rate_limit_manager = providers.Singleton(RateLimitManager.singleton)
 
+    # 写入水位索引 - 写入器落盘后更新每只股票的最新日期，规划时查索引
+    watermark_index = providers.Singleton(
+        WatermarkIndex,
+        db_path=config.watermarks.path,
+        schema_loader=schema_loader,
+        parquet_base_path=config.storage.parquet_base_path,
+        enabled=config.watermarks.enabled.as_(bool),
+    )
+
+    # 交易日历 - 压缩为 NumPy 数组并以内存映射文件保存，各组件共享
+    trading_calendar = providers.Singleton(
+        TradingCalendar,
+        parquet_base_path=config.storage.parquet_base_path,
+        cache_path=config.calendar.path,
+        exchange=config.calendar.exchange,
+    )
+
+    # 覆盖引擎 - 按交易日检测日频表的历史缺口，规划时生成补缺任务
+    coverage_engine = providers.Singleton(
+        CoverageEngine,
+        parquet_base_path=config.storage.parquet_base_path,
+        cache_path=config.coverage.path,
+        schema_loader=schema_loader,
+        tables=config.coverage.tables,
+        start_date=config.download_tasks.default_start_date,
+        merge_distance=config.coverage.merge_distance.as_(int),
+        exchange=config.coverage.exchange,
+        enabled=config.coverage.enabled.as_(bool),
+        trading_calendar=trading_calendar,
+    )
+
+    # 股票池 - 规划时跳过未上市、已退市或整段停牌的任务
+    symbol_universe = providers.Singleton(
+        SymbolUniverse,
+        parquet_base_path=config.storage.parquet_base_path,
+        tables=config.universe.tables,
+        suspend_table=config.universe.suspend_table,
+        exchange=config.universe.exchange,
+        enabled=config.universe.enabled.as_(bool),
+        trading_calendar=trading_calendar,
+    )
+
+    # 披露日历 - 财务报表只为预计或已到披露时间的股票生成任务
+    disclosure_calendar = providers.Singleton(
+        DisclosureCalendar,
+        parquet_base_path=config.storage.parquet_base_path,
+        tables=config.disclosure.tables,
+        lead_days=config.disclosure.lead_days.as_(int),
+        overdue_days=config.disclosure.overdue_days.as_(int),
+        sweep_days=config.disclosure.sweep_days.as_(int),
+        enabled=config.disclosure.enabled.as_(bool),
+    )
+
     # Database Components - 职责分离
     db_queryer = providers.Factory(
-        ParquetDBQueryer, schema_loader=schema_loader
+        ParquetDBQueryer,
+        schema_loader=schema_loader,
+        watermark_index=watermark_index,
+        trading_calendar=trading_calendar,
     )  # 专门负责查询
 
+    # 规划查询引擎 - 一次并行查询所有增量表的最新日期
+    planner_query_engine = providers.Factory(
+        PlannerQueryEngine,
+        schema_loader=schema_loader,
+        parquet_base_path=config.storage.parquet_base_path,
+        watermark_index=watermark_index,
+        max_workers=config.huey_plan.query_workers.as_(int),
+    )
+
     # 为了向后兼容，db_operator 指向 db_queryer
     db_operator = db_queryer
 
@@ -45,9 +134,153 @@ class AppContainer(containers.DeclarativeContainer):
         GroupHandler, db_operator=db_queryer, task_filter=task_filter
     )
 
-    # Writers
-    parquet_writer = providers.Factory(
-        ParquetWriter, base_path=config.storage.parquet_base_path
+    # 租约管理器 - 多台机器共享数据目录时认领任务、独占写入分区
+    lease_manager = providers.Singleton(
+        LeaseManager,
+        root=config.cluster.lease_root,
+        node_id=config.cluster.node_id,
+        ttl_seconds=config.cluster.partition_lease_ttl_seconds.as_(float),
+        wait_seconds=config.cluster.partition_lease_wait_seconds.as_(float),
+        enabled=config.cluster.enabled.as_(bool),
+    )
+
+    # 任务登记表 - 跨队列的待执行任务去重，多节点部署时同时认领任务租约
+    task_registry = providers.Singleton(
+        TaskRegistry,
+        db_path=config.task_registry.path,
+        ttl_seconds=config.task_registry.ttl_seconds.as_(float),
+        enabled=config.task_registry.enabled.as_(bool),
+        lease_manager=lease_manager,
+    )
+
+    # 运行清单 - 记录每次运行的任务状态，支持断点恢复
+    run_manifest = providers.Singleton(RunManifest, db_path=config.run_manifest.path)
+
+    # 任务指标表 - 记录每个任务的耗时、行数和限流等待，供 neo stats 使用
+    metrics_store = providers.Singleton(
+        MetricsStore,
+        db_path=config.metrics.path,
+        enabled=config.metrics.enabled.as_(bool),
+    )
+
+    # 流水线监控 - neo monitor 的数据来源，每次调用创建独立的读取游标
+    pipeline_monitor = providers.Factory(
+        PipelineMonitor,
+        metrics_store=metrics_store,
+        queue_reader=providers.Factory(
+            QueueDepthReader,
+            paths=providers.Callable(queue_paths),
+        ),
+        rate_limit_of=rate_limit_manager.provided.get_rate_limit_config,
+    )
+
+    # 加权公平调度器 - 为快速队列的下载任务分配优先级，耗时取指标表中的观测值
+    fair_share_scheduler = providers.Singleton(
+        FairShareScheduler,
+        state_path=config.scheduler.state_path,
+        default_latency_seconds=config.scheduler.default_latency_seconds.as_(float),
+        workers=config.huey_fast.max_workers.as_(int),
+        weights=config.scheduler.weights,
+        latency_provider=metrics_store.provided.mean_latency,
+    )
+
+    # 试运行估算器 - `neo dl --dry-run` 规划任务并估算调用次数、数据量和耗时
+    dry_run_estimator = providers.Factory(
+        DryRunEstimator,
+        schema_loader=schema_loader,
+        metrics_store=metrics_store,
+        scheduler=fair_share_scheduler,
+        coverage_engine=coverage_engine,
+        symbol_universe=symbol_universe,
+        disclosure_calendar=disclosure_calendar,
+        query_engine=planner_query_engine,
+    )
+
+    # 背压控制器 - 慢速队列积压时暂停快速队列的下载
+    backpressure_controller = providers.Singleton(
+        BackpressureController,
+        high_depth=config.backpressure.high_depth.as_(int),
+        low_depth=config.backpressure.low_depth.as_(int),
+        high_bytes=config.backpressure.high_mb.as_(lambda mb: int(mb) * 1024 * 1024),
+        low_bytes=config.backpressure.low_mb.as_(lambda mb: int(mb) * 1024 * 1024),
+        max_wait_seconds=config.backpressure.max_wait_seconds.as_(float),
+        poll_interval_seconds=config.backpressure.poll_interval_seconds.as_(float),
+        retry_delay_seconds=config.backpressure.retry_delay_seconds.as_(float),
+        enabled=config.backpressure.enabled.as_(bool),
+    )
+
+    # 内存管控 - 慢速消费者按负载估算内存，限制同时处理的大任务
+    memory_governor = providers.Singleton(
+        MemoryGovernor,
+        max_inflight_mb=config.memory.max_inflight_mb.as_(float),
+        large_task_mb=config.memory.large_task_mb.as_(float),
+        min_available_mb=config.memory.min_available_mb.as_(float),
+        amplification=config.memory.amplification.as_(float),
+        max_wait_seconds=config.memory.max_wait_seconds.as_(float),
+        poll_interval_seconds=config.memory.poll_interval_seconds.as_(float),
+        defer_seconds=config.memory.defer_seconds.as_(float),
+        max_deferrals=config.memory.max_deferrals.as_(int),
+        enabled=config.memory.enabled.as_(bool),
+    )
+
+    # Arrow schema 编译器 - 写入时按 schema 声明的列类型强制使用固定的 Arrow 类型
+    arrow_schema_compiler = providers.Singleton(
+        ArrowSchemaCompiler,
+        schema_loader=schema_loader,
+        dictionary_columns=config.lake.dictionary_columns,
+        downcast_float32=config.lake.downcast_float32.as_(bool),
+        date32_dates=config.lake.date32_dates.as_(bool),
+    )
+
+    # 数据湖迁移 - 把已有文件并行、可续跑地重写为固定的 Arrow 类型
+    lake_migrator = providers.Factory(
+        LakeMigrator,
+        base_path=config.storage.parquet_base_path,
+        schema_compiler=arrow_schema_compiler,
+        lease_manager=lease_manager,
+        workers=config.lake.migrate_workers.as_(int),
+    )
+
+    # 暂存合并器 - 维护队列把暂存日志合并进基础层，每个分区一个去重、排序的文件
+    staging_merger = providers.Singleton(
+        StagingMerger,
+        base_path=config.storage.parquet_base_path,
+        staging_path=config.writer.staging_path,
+        schema_loader=schema_loader,
+        lease_manager=lease_manager,
+        schema_compiler=arrow_schema_compiler,
+    )
+
+    # Writers - 根据 writer.mode 选择直写、攒批写入或追加到暂存日志
+    parquet_writer = providers.Selector(
+        config.writer.mode,
+        direct=providers.Factory(
+            ParquetWriter,
+            base_path=config.storage.parquet_base_path,
+            lease_manager=lease_manager,
+            watermark_index=watermark_index,
+            schema_compiler=arrow_schema_compiler,
+        ),
+        batched=providers.Singleton(
+            BatchingParquetWriter,
+            base_path=config.storage.parquet_base_path,
+            max_rows=config.writer.batch_max_rows.as_(int),
+            max_delay_seconds=config.writer.batch_max_delay_seconds.as_(float),
+            max_workers=config.writer.max_parallel_partitions.as_(int),
+            spool_path=config.writer.spool_path,
+            lease_manager=lease_manager,
+            watermark_index=watermark_index,
+            schema_compiler=arrow_schema_compiler,
+        ),
+        staged=providers.Singleton(
+            StagingParquetWriter,
+            base_path=config.storage.parquet_base_path,
+            staging_path=config.writer.staging_path,
+            merger=staging_merger,
+            lease_manager=lease_manager,
+            watermark_index=watermark_index,
+            schema_compiler=arrow_schema_compiler,
+        ),
     )
 
     # Core Components
@@ -62,11 +295,28 @@ class AppContainer(containers.DeclarativeContainer):
         schema_loader=schema_loader,
     )
 
+    # 单进程内联流水线
+    inline_pipeline_runner = providers.Factory(
+        InlinePipelineRunner,
+        downloader=downloader,
+        data_processor=data_processor,
+        parquet_writer=parquet_writer,
+        schema_loader=schema_loader,
+        db_queryer=db_queryer,
+        download_workers=config.inline.download_workers.as_(int),
+        queue_size=config.inline.queue_size.as_(int),
+        coverage_engine=coverage_engine,
+        symbol_universe=symbol_universe,
+        disclosure_calendar=disclosure_calendar,
+        query_engine=planner_query_engine,
+    )
+
     # Facade
     app_service = providers.Singleton(
         "neo.helpers.app_service.AppService",
         consumer_runner=consumer_runner,
         downloader_service=downloader_service,
+        inline_pipeline_runner=inline_pipeline_runner,
     )
 
 
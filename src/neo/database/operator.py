@@ -6,7 +6,7 @@
 import logging
 import duckdb
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from functools import lru_cache
 from datetime import datetime
 
@@ -14,6 +14,10 @@ from .schema_loader import SchemaLoader
 from .interfaces import IDBQueryer, ISchemaLoader
 from ..configs import get_config
 
+if TYPE_CHECKING:
+    from ..helpers.trading_calendar import TradingCalendar
+    from ..helpers.watermark_index import WatermarkIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,12 +28,20 @@ class ParquetDBQueryer(IDBQueryer):
     不支持数据写入，保持数据湖的只读特性。
     """
 
-    def __init__(self, schema_loader: ISchemaLoader, parquet_base_path: str = None):
+    def __init__(
+        self,
+        schema_loader: ISchemaLoader,
+        parquet_base_path: str = None,
+        watermark_index: Optional["WatermarkIndex"] = None,
+        trading_calendar: Optional["TradingCalendar"] = None,
+    ):
         """初始化 Parquet 数据库查询器
 
         Args:
             schema_loader: 数据库模式加载器
             parquet_base_path: Parquet 文件的基础路径
+            watermark_index: 写入水位索引，提供时 get_max_date 查索引而不扫描文件
+            trading_calendar: 共享的交易日历，提供时 get_latest_trading_day 直接查询
         """
         if parquet_base_path is None:
             config = get_config()
@@ -37,6 +49,8 @@ class ParquetDBQueryer(IDBQueryer):
 
         self.parquet_base_path = Path(parquet_base_path)
         self.schema_loader = schema_loader
+        self.watermark_index = watermark_index
+        self.trading_calendar = trading_calendar
 
     @classmethod
     def create_default(cls) -> "ParquetDBQueryer":
@@ -128,6 +142,11 @@ class ParquetDBQueryer(IDBQueryer):
             logger.debug(f"表 '{table_name}' 未定义 date_col 字段，无法查询最大日期")
             return {}
 
+        if self.watermark_index is not None and self.watermark_index.enabled:
+            max_dates = self._get_max_date_from_index(table_key, ts_codes)
+            if max_dates is not None:
+                return max_dates
+
         # 检查 Parquet 文件是否存在
         if not self._parquet_files_exist(table_name):
             logger.debug(f"表 '{table_name}' 的 Parquet 文件不存在，返回空结果")
@@ -142,8 +161,9 @@ class ParquetDBQueryer(IDBQueryer):
             # 使用 DuckDB 查询 Parquet 文件
             conn = duckdb.connect(":memory:")
 
-            # 检查表是否有 ts_code 字段（股票相关表）
-            if "ts_code" in primary_key:
+            # 检查表是否有 ts_code 字段（股票相关表）；symbol 为空的全市场任务
+            # (如 suspend_d) 按整表的最大日期处理
+            if "ts_code" in primary_key and any(ts_codes):
                 # 标准化股票代码格式（例如：600519 -> 600519.SH）
                 from ..helpers.utils import normalize_stock_code
 
@@ -202,6 +222,34 @@ class ParquetDBQueryer(IDBQueryer):
             if conn:
                 conn.close()
 
+    def _get_max_date_from_index(
+        self, table_key: str, ts_codes: List[str]
+    ) -> Optional[Dict[str, str]]:
+        """从写入水位索引查询最新日期，索引不可用时返回 None 以回退为扫描文件
+
+        表的索引尚未建立时先扫描一次 Parquet 文件建立索引。
+        """
+        from ..helpers.utils import normalize_stock_code
+
+        index = self.watermark_index
+        try:
+            if not index.is_ready(table_key):
+                index.rebuild(table_key, merge=True)
+            primary_key = self._get_table_config(table_key).primary_key
+            if "ts_code" in primary_key and any(ts_codes):
+                code_mapping = {normalize_stock_code(code): code for code in ts_codes}
+            else:
+                code_mapping = {code: code for code in ts_codes}
+            found = index.lookup(table_key, list(code_mapping))
+        except Exception as e:
+            logger.warning(f"⚠️ 写入水位索引不可用，回退为扫描 '{table_key}': {e}")
+            return None
+        max_dates = {code_mapping.get(code, code): date for code, date in found.items()}
+        logger.debug(
+            f"从写入水位索引查询表 '{table_key}' 最大日期，返回 {len(max_dates)} 条记录"
+        )
+        return max_dates
+
     @lru_cache(maxsize=1)
     def get_all_symbols(self) -> List[str]:
         """获取所有股票代码
@@ -253,11 +301,11 @@ class ParquetDBQueryer(IDBQueryer):
             logger.error(f"❌ 查询表 '{table_name}' Parquet 文件的 ts_code 失败: {e}")
             return []
 
-    @lru_cache(maxsize=1)
     def get_latest_trading_day(self, exchange: str = "SSE") -> Optional[str]:
         """获取最近的交易日
 
         如果今天是交易日，返回今天；否则返回上一个交易日。
+        配置了共享的交易日历时直接查询，否则查询 trade_cal 的 Parquet 文件，
         结果会被缓存，在单次运行中只查询一次。
 
         Args:
@@ -266,6 +314,19 @@ class ParquetDBQueryer(IDBQueryer):
         Returns:
             最近交易日的字符串 (YYYYMMDD)，如果查询失败则返回 None
         """
+        calendar = self.trading_calendar
+        if calendar is not None and calendar.exchange == exchange:
+            try:
+                calendar.refresh()
+                if len(calendar.days):
+                    return calendar.latest_trading_day()
+            except Exception as e:
+                logger.warning(f"⚠️ 交易日历不可用，回退为查询 trade_cal: {e}")
+        return self._query_latest_trading_day(exchange)
+
+    @lru_cache(maxsize=1)
+    def _query_latest_trading_day(self, exchange: str = "SSE") -> Optional[str]:
+        """查询 trade_cal 的 Parquet 文件获取最近的交易日"""
         table_key = "trade_cal"
         if not self._table_exists_in_schema(table_key):
             logger.warning(f"表配置 '{table_key}' 不存在于 schema 中")
@@ -0,0 +1,195 @@
+"""规划查询引擎
+
+`neo dl -g all` 规划时，过去对每个任务类型分别调用 `get_max_date`：每次新开一个
+DuckDB 内存连接、用 rglob 检查目录下是否有文件，并把同一份几千个股票代码拼成
+SQL 的 IN 列表。PlannerQueryEngine 一次计算所有表的最新日期：
+
+- 写入水位索引可用的表直接查索引 (索引未建立时先扫描一次建立)；
+- 其余表共用一个 DuckDB 连接：股票代码以 Arrow 表注册后物化为库内的表，
+  各表的查询与之连接而不是拼接 SQL 字面量，并在线程池中经各自的游标并行执行；
+- 目录不存在的表直接跳过，目录存在但没有文件时由 DuckDB 报错并视为没有数据。
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import duckdb
+import pyarrow as pa
+
+from ..helpers.utils import normalize_stock_code
+from .interfaces import ISchemaLoader
+
+if TYPE_CHECKING:
+    from ..helpers.watermark_index import WatermarkIndex
+
+logger = logging.getLogger(__name__)
+
+
+class PlannerQueryEngine:
+    """在一个 DuckDB 连接中并行计算多张表的最新日期"""
+
+    def __init__(
+        self,
+        schema_loader: ISchemaLoader,
+        parquet_base_path: str = "data/parquet",
+        watermark_index: Optional["WatermarkIndex"] = None,
+        max_workers: int = 4,
+    ):
+        """初始化规划查询引擎
+
+        Args:
+            schema_loader: schema 加载器，用于确定表的日期列和是否按股票存储
+            parquet_base_path: Parquet 数据根目录
+            watermark_index: 写入水位索引，可用时优先查索引
+            max_workers: 并行扫描表的线程数
+        """
+        self.schema_loader = schema_loader
+        self.parquet_base_path = Path(parquet_base_path)
+        self.watermark_index = watermark_index
+        self.max_workers = max(1, int(max_workers))
+
+    def max_dates(
+        self, task_stock_mapping: Dict[str, List[str]], indexed_only: bool = False
+    ) -> Dict[str, Dict[str, str]]:
+        """计算每张表中每只股票的最新日期
+
+        Args:
+            task_stock_mapping: 任务类型到股票代码列表的映射，代码可以未标准化；
+                代码为空字符串表示不按股票下载的全市场任务
+            indexed_only: 只查询写入水位索引已建立的表，其余表既不建立索引也不扫描，
+                不出现在结果中 (规划时由调用方分块查询，尽早派发第一批任务)
+
+        Returns:
+            Dict[str, Dict[str, str]]: 任务类型到 {原始代码: 最新日期} 的映射。
+            只包含定义了 date_col 的表；没有数据的股票不出现
+        """
+        results: Dict[str, Dict[str, str]] = {}
+        to_scan: Dict[str, List[str]] = {}
+        for task_type, symbols in task_stock_mapping.items():
+            try:
+                schema = self.schema_loader.load_schema(task_type)
+            except KeyError:
+                continue
+            if not schema.date_col:
+                continue
+            symbols = list(symbols) or [""]
+            if indexed_only and not self._index_ready(task_type):
+                continue
+            found = self._from_index(task_type, symbols)
+            if found is None:
+                if not indexed_only:
+                    to_scan[task_type] = symbols
+            else:
+                results[task_type] = found
+        if to_scan:
+            results.update(self._scan(to_scan))
+        return results
+
+    def _by_symbol(self, task_type: str, symbols: List[str]) -> bool:
+        """表按股票存储且请求的是具体股票"""
+        primary_key = self.schema_loader.load_schema(task_type).primary_key or []
+        return "ts_code" in primary_key and any(symbols)
+
+    def _index_ready(self, task_type: str) -> bool:
+        """表的写入水位索引是否已建立，可以直接查询"""
+        index = self.watermark_index
+        if index is None or not index.enabled:
+            return False
+        try:
+            return index.is_ready(task_type)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入水位索引不可用: '{task_type}': {e}")
+            return False
+
+    def _from_index(
+        self, task_type: str, symbols: List[str]
+    ) -> Optional[Dict[str, str]]:
+        """从写入水位索引查询，索引不可用时返回 None"""
+        index = self.watermark_index
+        if index is None or not index.enabled:
+            return None
+        try:
+            if not index.is_ready(task_type):
+                index.rebuild(task_type, merge=True)
+            if self._by_symbol(task_type, symbols):
+                mapping = {normalize_stock_code(s): s for s in symbols}
+            else:
+                mapping = {s: s for s in symbols}
+            found = index.lookup(task_type, list(mapping))
+        except Exception as e:
+            logger.warning(f"⚠️ 写入水位索引不可用，回退为扫描 '{task_type}': {e}")
+            return None
+        return {mapping.get(code, code): date for code, date in found.items()}
+
+    def _scan(self, to_scan: Dict[str, List[str]]) -> Dict[str, Dict[str, str]]:
+        """在一个连接中并行扫描多张表"""
+        codes = sorted(
+            {
+                (normalize_stock_code(s), s)
+                for task_type, symbols in to_scan.items()
+                if self._by_symbol(task_type, symbols)
+                for s in symbols
+            }
+        )
+        conn = duckdb.connect(":memory:")
+        try:
+            wanted = pa.table(
+                {
+                    "ts_code": pa.array([c for c, _ in codes], pa.string()),
+                    "symbol": pa.array([s for _, s in codes], pa.string()),
+                }
+            )
+            conn.register("wanted_arrow", wanted)
+            # 物化为库内的表，各线程的游标都能看到
+            conn.execute("CREATE TABLE wanted AS SELECT * FROM wanted_arrow")
+            conn.unregister("wanted_arrow")
+
+            task_types = list(to_scan)
+            workers = min(self.max_workers, len(task_types))
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="planner-query"
+            ) as pool:
+                scanned = pool.map(
+                    lambda tt: self._scan_table(conn.cursor(), tt, to_scan[tt]),
+                    task_types,
+                )
+                return dict(zip(task_types, scanned))
+        finally:
+            conn.close()
+
+    def _scan_table(
+        self, cursor: duckdb.DuckDBPyConnection, task_type: str, symbols: List[str]
+    ) -> Dict[str, str]:
+        """扫描单张表的最新日期"""
+        schema = self.schema_loader.load_schema(task_type)
+        table_path = self.parquet_base_path / schema.table_name
+        if not table_path.is_dir():
+            return {}
+        source = f"read_parquet('{table_path / '**' / '*.parquet'}')"
+        date_col = schema.date_col
+        try:
+            if self._by_symbol(task_type, symbols):
+                wanted = set(symbols)
+                rows = cursor.execute(
+                    f"SELECT w.symbol, CAST(MAX(t.{date_col}) AS VARCHAR) "
+                    f"FROM {source} t JOIN wanted w ON t.ts_code = w.ts_code "
+                    f"GROUP BY w.symbol"
+                ).fetchall()
+                return {
+                    symbol: date
+                    for symbol, date in rows
+                    if date is not None and symbol in wanted
+                }
+            row = cursor.execute(
+                f"SELECT CAST(MAX({date_col}) AS VARCHAR) FROM {source}"
+            ).fetchone()
+        except duckdb.Error as e:
+            logger.debug(f"扫描表 '{task_type}' 最新日期失败，视为没有数据: {e}")
+            return {}
+        finally:
+            cursor.close()
+        if not row or row[0] is None:
+            return {}
+        return {symbol: row[0] for symbol in symbols}
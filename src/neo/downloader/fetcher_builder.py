@@ -6,12 +6,18 @@
 """
 
 import tushare as ts
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Optional, Tuple
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from threading import Lock
 import os
 
+import requests
+from requests.adapters import HTTPAdapter
+from tushare.pro.client import DataApi
+
 from neo.helpers import normalize_stock_code
 from neo.database.interfaces import ISchemaLoader
 from neo.database.schema_loader import SchemaLoader
@@ -37,6 +43,77 @@ class TaskTemplate:
 logger = logging.getLogger(__name__)
 
 
+class PooledDataApi:
+    """复用 HTTP 连接的 Tushare Pro 客户端
+
+    tushare 的 DataApi 每次调用都通过 `requests.post` 新建一个连接；
+    这里改用带连接池的 `requests.Session`，并支持在消费者接收任务前预先建立连接。
+    token 与接口地址来自我们自己的配置，不读取 DataApi 的私有属性，
+    因此 tushare 内部实现的变化不会影响下载。
+    """
+
+    def __init__(
+        self,
+        token: str,
+        http_url: str = "http://api.waditu.com/dataapi",
+        timeout: float = 30,
+        pool_size: int = 10,
+    ):
+        self.token = token
+        self.http_url = http_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __getattr__(self, name: str) -> Callable[..., pd.DataFrame]:
+        """与 DataApi 一致，`pro.daily(...)` 等价于 `pro.query("daily", ...)`"""
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return partial(self.query, name)
+
+    def query(self, api_name: str, fields: str = "", **kwargs) -> pd.DataFrame:
+        """通过连接池会话调用 Tushare Pro 接口"""
+        # 与 tushare 自带客户端发送的参数保持一致
+        kwargs.setdefault("ts_type_name", self.http_url)
+        req_params = {
+            "api_name": api_name,
+            "token": self.token,
+            "params": kwargs,
+            "fields": fields,
+        }
+        res = self.session.post(
+            f"{self.http_url}/{api_name}", json=req_params, timeout=self.timeout
+        )
+        if not res:
+            return pd.DataFrame()
+        result = res.json()
+        if result["code"] != 0:
+            raise Exception(result["msg"])
+        data = result["data"]
+        return pd.DataFrame(data["items"], columns=data["fields"])
+
+    def prewarm(self, connections: int) -> int:
+        """并发建立 connections 个连接放入连接池
+
+        Returns:
+            int: 成功建立的连接数
+        """
+
+        def touch(_) -> bool:
+            try:
+                self.session.head(self.http_url, timeout=self.timeout)
+                return True
+            except requests.RequestException as e:
+                logger.debug(f"预建 HTTP 连接失败: {e}")
+                return False
+
+        connections = max(1, connections)
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            return sum(pool.map(touch, range(connections)))
+
+
 class TushareApiManager:
     """Tushare API 管理器（单例模式）"""
 
@@ -46,6 +123,7 @@ class TushareApiManager:
     def __init__(self):
         if TushareApiManager._instance is not None:
             raise RuntimeError("TushareApiManager 是单例类，请使用 get_instance() 方法")
+        self._functions: Dict[Tuple[str, str], Callable] = {}
         self._initialize()
 
     @classmethod
@@ -57,7 +135,14 @@ class TushareApiManager:
         return cls._instance
 
     def get_api_function(self, base_object: str, method_name: str):
-        """获取 API 函数"""
+        """获取 API 函数 (解析结果会被缓存)"""
+        key = (base_object, method_name)
+        function = self._functions.get(key)
+        if function is None:
+            function = self._functions[key] = self._resolve(base_object, method_name)
+        return function
+
+    def _resolve(self, base_object: str, method_name: str):
         if base_object not in self.api_objects:
             raise ValueError(f"不支持的 API 对象: {base_object}")
 
@@ -69,11 +154,37 @@ class TushareApiManager:
 
     def _initialize(self):
         """初始化 Tushare API"""
-        ts.set_token(os.environ.get("TUSHARE_TOKEN"))
+        token = os.environ.get("TUSHARE_TOKEN")
+        ts.set_token(token)
         self.pro = ts.pro_api()
+        if isinstance(self.pro, DataApi):
+            from neo.configs import get_config
+
+            config = get_config()
+            tushare_config = config.get("tushare", {})
+            http_url = tushare_config.get("http_url")
+            if http_url:
+                # 连接池大小与快速队列的并发下载数一致
+                pool_size = config.get("huey_fast", {}).get("max_workers", 10)
+                self.pro = PooledDataApi(
+                    token,
+                    http_url=http_url,
+                    timeout=float(tushare_config.get("timeout_seconds", 30)),
+                    pool_size=int(pool_size),
+                )
         self.ts = ts
         self.api_objects = {"pro": self.pro, "ts": self.ts}
 
+    def prewarm_connections(self, connections: int) -> int:
+        """预先建立到 Tushare Pro 的 HTTP 连接
+
+        Returns:
+            int: 成功建立的连接数，客户端不支持连接池时为 0
+        """
+        if not isinstance(self.pro, PooledDataApi):
+            return 0
+        return self.pro.prewarm(connections)
+
 
 class FetcherBuilder:
     """数据获取器构建器"""
@@ -2,11 +2,14 @@
 应用服务 - 外观模式实现
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+from .dry_run import DryRunReport
+from .metrics_store import StatsReport
 from .task_builder import DownloadTaskConfig
 from ..services.consumer_runner import ConsumerRunner
 from ..services.downloader_service import DownloaderService
+from ..services.inline_pipeline import InlinePipelineRunner, InlineRunStats
 from ..tasks.download_tasks import build_and_enqueue_downloads_task
 
 
@@ -22,18 +25,21 @@ class AppService:
         self,
         consumer_runner: ConsumerRunner,
         downloader_service: DownloaderService,
+        inline_pipeline_runner: Optional[InlinePipelineRunner] = None,
     ):
         self.consumer_runner = consumer_runner
         self.downloader_service = downloader_service
+        self.inline_pipeline_runner = inline_pipeline_runner
 
-    def run_data_processor(self, queue_name: str) -> None:
+    def run_data_processor(self, queue_name: str, shard: int = 0) -> None:
         """
         运行指定队列的数据处理器消费者。
 
         Args:
-            queue_name: 要运行的队列名称 ('fast' or 'slow')
+            queue_name: 要运行的队列名称 ('fast', 'slow', 'plan', 'maint' 或 'all')
+            shard: 快速队列的分片编号
         """
-        self.consumer_runner.run(queue_name)
+        self.consumer_runner.run(queue_name, shard=shard)
 
     def run_downloader(
         self, tasks: List[DownloadTaskConfig], dry_run: bool = False
@@ -59,6 +65,73 @@ class AppService:
         """
         build_and_enqueue_downloads_task(task_stock_mapping)
 
+    def resume_run(self, run_id: str) -> int:
+        """
+        恢复一次中断的运行，只重新派发尚未完成的任务。
+
+        Args:
+            run_id: 运行 ID (即 `neo dl` 输出的任务ID)
+
+        Returns:
+            int: 重新派发的任务数
+        """
+        from ..tasks.download_tasks import resume_run
+
+        return resume_run(run_id)
+
+    def get_stats_report(self, run_id: Optional[str] = None) -> StatsReport:
+        """
+        汇总一次运行的任务执行指标。
+
+        Args:
+            run_id: 运行 ID，为 None 时使用最近一次运行
+
+        Returns:
+            StatsReport: 按表汇总的运行报告
+        """
+        from ..app import container
+
+        metrics_store = container.metrics_store()
+        if run_id is None:
+            run_id = metrics_store.latest_run_id()
+        rate_limit_manager = container.rate_limit_manager()
+        return metrics_store.build_report(
+            run_id, rate_limit_of=rate_limit_manager.get_rate_limit_config
+        )
+
+    def estimate_downloads(
+        self, task_stock_mapping: Dict[str, List[str]]
+    ) -> DryRunReport:
+        """
+        试运行：按真实规划流程生成任务列表并估算开销，不派发任何任务。
+
+        Args:
+            task_stock_mapping: 任务类型到股票代码列表的映射
+
+        Returns:
+            DryRunReport: 任务列表、各接口调用次数、预计数据量与耗时
+        """
+        from ..app import container
+
+        estimator = container.dry_run_estimator()
+        return estimator.estimate(task_stock_mapping, container.db_queryer())
+
+    def run_inline_pipeline(
+        self, task_stock_mapping: Dict[str, List[str]]
+    ) -> InlineRunStats:
+        """
+        在当前进程内运行 规划 → 下载 → 处理 → 写入 的完整流水线，不经过 Huey 队列。
+
+        Args:
+            task_stock_mapping: 任务类型到股票代码列表的映射
+
+        Returns:
+            InlineRunStats: 运行统计
+        """
+        if self.inline_pipeline_runner is None:
+            raise RuntimeError("未配置内联流水线运行器")
+        return self.inline_pipeline_runner.run(task_stock_mapping)
+
     def build_task_stock_mapping_from_group(
         self, group_name: str, stock_codes: List[str] = None
     ) -> Dict[str, List[str]]:
@@ -0,0 +1,161 @@
+"""快速/慢速队列之间的背压控制
+
+快速队列的下载速度远高于慢速队列的写入速度，回补历史数据时慢速队列的
+SQLite 文件及其中序列化的数据会无限增长。背压控制器按水位线监控慢速队列的
+任务数和负载字节数 (包括 schedule 表中被内存调控器延迟的任务，它们仍占用内存和磁盘)：
+
+- 任一指标达到高水位时进入暂停状态，快速 worker 在下载前等待；
+- 两项指标都回落到低水位以下才解除暂停 (滞回)，避免在阈值附近频繁抖动；
+- 等待超时后由调用方延迟重试任务，释放 worker。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from huey.storage import SqliteStorage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueuePressure:
+    """慢速队列压力采样"""
+
+    depth: int
+    payload_bytes: int
+    paused: bool
+    sampled_at: float
+
+
+class BackpressureController:
+    """基于水位线和滞回的慢速队列背压控制器"""
+
+    def __init__(
+        self,
+        huey: Any = None,
+        high_depth: int = 2000,
+        low_depth: int = 1000,
+        high_bytes: int = 512 * 1024 * 1024,
+        low_bytes: int = 256 * 1024 * 1024,
+        max_wait_seconds: float = 30.0,
+        poll_interval_seconds: float = 1.0,
+        retry_delay_seconds: float = 60.0,
+        enabled: bool = True,
+    ):
+        """初始化背压控制器
+
+        Args:
+            huey: 被监控的 Huey 实例，默认为慢速队列
+            high_depth: 任务数高水位，达到后暂停
+            low_depth: 任务数低水位，回落到此以下才恢复
+            high_bytes: 负载字节数高水位
+            low_bytes: 负载字节数低水位
+            max_wait_seconds: 单个任务在暂停状态下最长等待时间
+            poll_interval_seconds: 采样间隔，间隔内多个 worker 共享同一次采样
+            retry_delay_seconds: 等待超时后任务的延迟重试时间
+            enabled: 是否启用背压
+        """
+        if low_depth > high_depth or low_bytes > high_bytes:
+            raise ValueError("背压低水位不能高于高水位")
+        self._huey = huey
+        self.high_depth = int(high_depth)
+        self.low_depth = int(low_depth)
+        self.high_bytes = int(high_bytes)
+        self.low_bytes = int(low_bytes)
+        self.max_wait_seconds = float(max_wait_seconds)
+        self.poll_interval_seconds = float(poll_interval_seconds)
+        self.retry_delay_seconds = float(retry_delay_seconds)
+        self.enabled = enabled
+        self._paused = False
+        self._last: Optional[QueuePressure] = None
+        self._lock = threading.Lock()
+
+    @property
+    def huey(self) -> Any:
+        if self._huey is None:
+            from ..configs.huey_config import huey_slow
+
+            return huey_slow
+        return self._huey
+
+    def _measure(self):
+        """读取慢速队列 (待执行 + 延迟执行) 的任务数和负载字节数"""
+        huey = self.huey
+        storage = huey.storage
+        if isinstance(storage, SqliteStorage):
+            rows = storage.sql(
+                "select count(*), coalesce(sum(length(data)), 0) from ("
+                "select data from task where queue = ? "
+                "union all select data from schedule where queue = ?)",
+                (storage.name, storage.name),
+                results=True,
+            )
+            return int(rows[0][0]), int(rows[0][1])
+        return huey.pending_count() + huey.scheduled_count(), 0
+
+    def sample(self, force: bool = False) -> QueuePressure:
+        """采样慢速队列压力并更新暂停状态
+
+        Args:
+            force: 忽略采样间隔，强制重新采样
+
+        Returns:
+            QueuePressure: 最新的压力采样
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._last is not None
+                and now - self._last.sampled_at < self.poll_interval_seconds
+            ):
+                return self._last
+
+            depth, payload_bytes = self._measure()
+            was_paused = self._paused
+            if self._paused:
+                self._paused = not (
+                    depth <= self.low_depth and payload_bytes <= self.low_bytes
+                )
+            else:
+                self._paused = (
+                    depth >= self.high_depth or payload_bytes >= self.high_bytes
+                )
+
+            if self._paused and not was_paused:
+                logger.warning(
+                    f"🚦 慢速队列达到高水位 (任务 {depth}, "
+                    f"负载 {payload_bytes / 1024 / 1024:.1f} MB)，暂停下载"
+                )
+            elif was_paused and not self._paused:
+                logger.info(
+                    f"🚦 慢速队列回落到低水位 (任务 {depth}, "
+                    f"负载 {payload_bytes / 1024 / 1024:.1f} MB)，恢复下载"
+                )
+
+            self._last = QueuePressure(depth, payload_bytes, self._paused, now)
+            return self._last
+
+    def is_paused(self) -> bool:
+        """慢速队列当前是否处于背压暂停状态"""
+        if not self.enabled:
+            return False
+        return self.sample().paused
+
+    def wait_for_capacity(self) -> bool:
+        """在背压暂停状态下阻塞等待，直到恢复或超时
+
+        Returns:
+            bool: True 表示可以继续下载，False 表示等待超时，调用方应延迟重试
+        """
+        if not self.enabled:
+            return True
+        deadline = time.monotonic() + self.max_wait_seconds
+        while self.is_paused():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval_seconds)
+        return True
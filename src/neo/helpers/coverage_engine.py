@@ -0,0 +1,407 @@
+"""交易日覆盖位图与缺口检测
+
+增量规划只看每只股票的最新日期，历史中间的缺口 (某次下载失败、接口临时缺数据)
+永远不会被修复。CoverageEngine 为日频表维护按股票的交易日覆盖位图：
+
+- 位图的列与 trade_cal 的交易日对齐，每只股票一行，按位压缩后存放在缓存目录；
+- 表的 Parquet 文件或交易日历变化时 (按文件数、大小和修改时间判断) 用一次
+  DuckDB 扫描重建位图，未变化时直接读取缓存；
+- 应有覆盖的范围为股票上市日 (stock_basic.list_date) 到该股票已有数据的最新日期，
+  最新日期之后的部分由增量规划负责；
+- 缺口在整个股票池上以矩阵运算求出，相邻缺口间隔不超过 merge_distance 个交易日时
+  合并为一个日期区间任务；
+- 补缺任务下载完成后其区间被记为已核实，停牌等确实没有数据的交易日不会被反复补下载。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import duckdb
+import numpy as np
+
+from ..database.interfaces import ISchemaLoader
+
+if TYPE_CHECKING:
+    from .trading_calendar import TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[str, str]
+
+
+@dataclass
+class CoverageBitmap:
+    """一张表的交易日覆盖位图"""
+
+    symbols: np.ndarray  # 按字典序排列的 ts_code
+    days: np.ndarray  # 交易日 (int32, YYYYMMDD)
+    bits: np.ndarray  # (股票数, ceil(交易日数 / 8)) 的按位压缩矩阵
+    fingerprint: str = ""
+
+    def rows_for(self, ts_codes: Iterable[str]) -> Tuple[List[str], np.ndarray]:
+        """位图中存在的股票及其行号"""
+        codes = np.asarray(list(ts_codes), dtype=object)
+        if not len(codes) or not len(self.symbols):
+            return [], np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.symbols, codes)
+        positions = np.minimum(positions, len(self.symbols) - 1)
+        found = self.symbols[positions] == codes
+        return list(codes[found]), positions[found]
+
+    def matrix(self, rows: np.ndarray) -> np.ndarray:
+        """解压指定行为布尔矩阵"""
+        return np.unpackbits(self.bits[rows], axis=1, count=len(self.days)).astype(
+            bool
+        )
+
+
+class CoverageEngine:
+    """按股票的交易日覆盖位图，为增量规划提供缺口区间"""
+
+    def __init__(
+        self,
+        parquet_base_path: str = "data/parquet",
+        cache_path: str = "data/coverage",
+        schema_loader: Optional[ISchemaLoader] = None,
+        tables: Iterable[str] = ("stock_daily", "stock_adj_hfq", "daily_basic"),
+        start_date: Optional[str] = "19900101",
+        merge_distance: int = 5,
+        exchange: str = "SSE",
+        enabled: bool = True,
+        trading_calendar: Optional["TradingCalendar"] = None,
+    ):
+        """初始化覆盖引擎
+
+        Args:
+            parquet_base_path: Parquet 数据根目录
+            cache_path: 位图缓存与已核实区间的存放目录
+            schema_loader: schema 加载器，用于确定表的日期列
+            tables: 按交易日检测缺口的表 (日频、按股票存储)
+            start_date: 应有覆盖的最早日期，早于上市日时以上市日为准
+            merge_distance: 相邻缺口间隔不超过该交易日数时合并为一个区间
+            exchange: 交易日历所用的交易所，未提供 trading_calendar 时使用
+            enabled: 是否启用缺口检测
+            trading_calendar: 共享的交易日历，未提供时按 exchange 单独加载
+        """
+        self.parquet_base_path = Path(parquet_base_path)
+        self.cache_path = Path(cache_path)
+        self.schema_loader = schema_loader
+        self.tables = set(tables or ())
+        self.start_date = int(start_date or 0)
+        self.merge_distance = max(0, int(merge_distance))
+        self.exchange = exchange
+        self.enabled = enabled
+        if trading_calendar is None:
+            from .trading_calendar import TradingCalendar
+
+            trading_calendar = TradingCalendar(
+                self.parquet_base_path, cache_path=None, exchange=exchange
+            )
+        self.trading_calendar = trading_calendar
+        self._bitmaps: Dict[str, CoverageBitmap] = {}
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def is_tracked(self, task_type: str) -> bool:
+        """表是否做缺口检测"""
+        return self.enabled and task_type in self.tables
+
+    # ------------------------------------------------------------------
+    # 缺口
+    # ------------------------------------------------------------------
+    def find_gaps(
+        self, task_type: str, ts_codes: Iterable[str]
+    ) -> Dict[str, List[DateRange]]:
+        """求出股票在表中缺失的交易日区间
+
+        Args:
+            task_type: 表名 (任务类型)
+            ts_codes: 标准化后的股票代码
+
+        Returns:
+            Dict[str, List[DateRange]]: 股票代码到缺口区间 (起止日期，含两端) 的映射，
+            没有缺口或表中没有数据的股票不出现
+        """
+        if not self.is_tracked(task_type):
+            return {}
+        bitmap = self.bitmap(task_type)
+        if bitmap is None:
+            return {}
+        codes, rows = bitmap.rows_for(ts_codes)
+        if not codes:
+            return {}
+
+        days = bitmap.days
+        covered = bitmap.matrix(rows)
+        missing = self._expected(codes, covered, days) & ~covered
+        missing &= ~self._verified(task_type, codes, days)
+
+        # 逐行找出连续缺失的交易日: 差分为 1 处开始，为 -1 处结束 (不含)
+        edges = np.diff(np.pad(missing.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        start_rows, start_cols = np.nonzero(edges == 1)
+        _, end_cols = np.nonzero(edges == -1)
+
+        gaps: Dict[str, List[DateRange]] = {}
+        last_row, last_end = -1, -1
+        for row, start, end in zip(start_rows, start_cols, end_cols - 1):
+            ranges = gaps.setdefault(codes[row], [])
+            if row == last_row and start - last_end - 1 <= self.merge_distance:
+                ranges[-1] = (ranges[-1][0], str(days[end]))
+            else:
+                ranges.append((str(days[start]), str(days[end])))
+            last_row, last_end = row, end
+        if gaps:
+            logger.info(
+                f"🕳️ {task_type}: {len(gaps)} 只股票存在缺口，"
+                f"共 {sum(len(r) for r in gaps.values())} 个补缺区间"
+            )
+        return gaps
+
+    def _expected(
+        self, codes: List[str], covered: np.ndarray, days: np.ndarray
+    ) -> np.ndarray:
+        """应有覆盖的交易日：上市日 (或起始日期) 到已有数据的最新交易日"""
+        listing = self._listing_dates()
+        first_dates = np.array(
+            [max(listing.get(code, 0), self.start_date) for code in codes],
+            dtype=np.int64,
+        )
+        first = np.searchsorted(days, first_dates)
+        any_covered = covered.any(axis=1)
+        # 上市日未知时从第一条已有数据开始
+        unknown = np.array([code not in listing for code in codes], dtype=bool)
+        first = np.where(unknown & any_covered, covered.argmax(axis=1), first)
+        last = np.where(
+            any_covered, covered.shape[1] - 1 - covered[:, ::-1].argmax(axis=1), -1
+        )
+        index = np.arange(covered.shape[1])
+        return (index >= first[:, None]) & (index <= last[:, None])
+
+    # ------------------------------------------------------------------
+    # 位图
+    # ------------------------------------------------------------------
+    def bitmap(self, task_type: str) -> Optional[CoverageBitmap]:
+        """表的覆盖位图，数据或交易日历变化时重建
+
+        Returns:
+            Optional[CoverageBitmap]: 交易日历或表数据不存在时为 None
+        """
+        calendar = self._trading_days()
+        if calendar is None or not len(calendar[1]):
+            return None
+        calendar_fingerprint, days = calendar
+        data_fingerprint = table_fingerprint(self.parquet_base_path / task_type)
+        if data_fingerprint is None:
+            return None
+        fingerprint = f"{calendar_fingerprint}|{data_fingerprint}"
+
+        with self._lock:
+            cached = self._bitmaps.get(task_type)
+            if cached is None:
+                cached = self._load_cached(task_type)
+            if cached is None or cached.fingerprint != fingerprint:
+                cached = self._build(task_type, days, fingerprint)
+                self._save_cached(task_type, cached)
+            self._bitmaps[task_type] = cached
+        return cached
+
+    def _build(
+        self, task_type: str, days: np.ndarray, fingerprint: str
+    ) -> CoverageBitmap:
+        """扫描表的 Parquet 文件构建位图"""
+        started = time.perf_counter()
+        date_col = self._date_col(task_type)
+        pattern = str(self.parquet_base_path / task_type / "**" / "*.parquet")
+        conn = duckdb.connect(":memory:")
+        try:
+            result = conn.execute(
+                f"SELECT DISTINCT ts_code, TRY_CAST({date_col} AS INTEGER) AS day "
+                f"FROM read_parquet('{pattern}', union_by_name = true) "
+                f"WHERE ts_code IS NOT NULL"
+            ).fetchnumpy()
+        finally:
+            conn.close()
+
+        codes = np.asarray(result["ts_code"], dtype=object)
+        dates = np.asarray(result["day"])
+        if np.ma.isMaskedArray(dates):
+            codes, dates = codes[~dates.mask], dates.compressed()
+        symbols, symbol_rows = np.unique(codes, return_inverse=True)
+        positions = np.minimum(np.searchsorted(days, dates), len(days) - 1)
+        on_calendar = days[positions] == dates
+
+        matrix = np.zeros((len(symbols), len(days)), dtype=bool)
+        matrix[symbol_rows[on_calendar], positions[on_calendar]] = True
+        bitmap = CoverageBitmap(
+            symbols=symbols.astype(object),
+            days=days,
+            bits=np.packbits(matrix, axis=1),
+            fingerprint=fingerprint,
+        )
+        logger.info(
+            f"🧮 已构建 {task_type} 覆盖位图: {len(symbols)} 只股票 × "
+            f"{len(days)} 个交易日 ({time.perf_counter() - started:.2f}s)"
+        )
+        return bitmap
+
+    def _load_cached(self, task_type: str) -> Optional[CoverageBitmap]:
+        path = self.cache_path / f"{task_type}.npz"
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return CoverageBitmap(
+                    symbols=data["symbols"].astype(object),
+                    days=data["days"],
+                    bits=data["bits"],
+                    fingerprint=str(data["fingerprint"]),
+                )
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"⚠️ 读取 {task_type} 覆盖位图缓存失败，将重建: {e}")
+            return None
+
+    def _save_cached(self, task_type: str, bitmap: CoverageBitmap) -> None:
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        path = self.cache_path / f"{task_type}.npz"
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    symbols=bitmap.symbols.astype(str),
+                    days=bitmap.days,
+                    bits=bitmap.bits,
+                    fingerprint=np.array(bitmap.fingerprint),
+                )
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"⚠️ 保存 {task_type} 覆盖位图缓存失败: {e}")
+
+    def _date_col(self, task_type: str) -> str:
+        schema = self.schema_loader.load_schema(task_type)
+        if not schema.date_col:
+            raise ValueError(f"表 '{task_type}' 未定义 date_col，无法检测缺口")
+        return schema.date_col
+
+    def _trading_days(self) -> Optional[Tuple[str, np.ndarray]]:
+        """交易日历的数据指纹与交易日 (升序)，交易日历不存在时返回 None"""
+        calendar = self.trading_calendar
+        calendar.refresh()
+        arrays = calendar.arrays
+        if arrays.fingerprint is None:
+            return None
+        return arrays.fingerprint, np.asarray(arrays.days)
+
+    def _listing_dates(self) -> Dict[str, int]:
+        """股票上市日期，stock_basic 不存在时为空"""
+        table_path = self.parquet_base_path / "stock_basic"
+        if table_fingerprint(table_path) is None:
+            return {}
+        pattern = str(table_path / "**" / "*.parquet")
+        conn = duckdb.connect(":memory:")
+        try:
+            rows = conn.execute(
+                f"SELECT ts_code, MIN(TRY_CAST(list_date AS INTEGER)) "
+                f"FROM read_parquet('{pattern}') GROUP BY ts_code"
+            ).fetchall()
+        except duckdb.Error as e:
+            logger.warning(f"⚠️ 读取上市日期失败，缺口检测从第一条数据开始: {e}")
+            return {}
+        finally:
+            conn.close()
+        return {code: int(day) for code, day in rows if day is not None}
+
+    # ------------------------------------------------------------------
+    # 已核实区间
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开已核实区间表连接，首次使用时建表"""
+        if not self._initialized:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.cache_path / "verified.db"), timeout=30, isolation_level=None
+        )
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS verified_ranges (
+                        task_type TEXT NOT NULL,
+                        ts_code TEXT NOT NULL,
+                        start_date TEXT NOT NULL,
+                        end_date TEXT NOT NULL,
+                        verified_at REAL NOT NULL,
+                        PRIMARY KEY (task_type, ts_code, start_date, end_date)
+                    )
+                    """
+                )
+                self._initialized = True
+            yield conn
+        finally:
+            conn.close()
+
+    def mark_verified(
+        self, task_type: str, ts_code: str, start_date: str, end_date: str
+    ) -> None:
+        """记录补缺区间已下载过，其中仍没有数据的交易日 (如停牌) 不再视为缺口"""
+        if not self.is_tracked(task_type):
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO verified_ranges VALUES (?, ?, ?, ?, ?)",
+                    (task_type, ts_code, start_date, end_date, time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 记录已核实区间失败: {task_type}/{ts_code}, 错误: {e}")
+
+    def _verified(
+        self, task_type: str, codes: List[str], days: np.ndarray
+    ) -> np.ndarray:
+        """已核实区间对应的布尔矩阵"""
+        mask = np.zeros((len(codes), len(days)), dtype=bool)
+        row_of = {code: row for row, code in enumerate(codes)}
+        with self._connect() as conn:
+            ranges = conn.execute(
+                "SELECT ts_code, start_date, end_date FROM verified_ranges "
+                "WHERE task_type = ?",
+                (task_type,),
+            ).fetchall()
+        ranges = [r for r in ranges if r[0] in row_of]
+        if not ranges:
+            return mask
+        # 所有区间一次展开为交易日，再按位置写入矩阵
+        owners, dates = self.trading_calendar.expand(
+            [int(r[1]) for r in ranges], [int(r[2]) for r in ranges]
+        )
+        rows = np.array([row_of[r[0]] for r in ranges], dtype=np.int64)[owners]
+        positions = np.minimum(np.searchsorted(days, dates), len(days) - 1)
+        on_calendar = days[positions] == dates
+        mask[rows[on_calendar], positions[on_calendar]] = True
+        return mask
+
+
+def table_fingerprint(table_path: Path) -> Optional[str]:
+    """目录下 Parquet 文件的数量、总大小和最新修改时间，没有文件时返回 None"""
+    count = size = latest = 0
+    for root, _, files in os.walk(table_path):
+        for name in files:
+            if not name.endswith(".parquet"):
+                continue
+            stat = os.stat(os.path.join(root, name))
+            count += 1
+            size += stat.st_size
+            latest = max(latest, stat.st_mtime_ns)
+    if not count:
+        return None
+    return f"{count}:{size}:{latest}"
+
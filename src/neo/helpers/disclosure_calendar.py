@@ -0,0 +1,197 @@
+"""财报披露日历
+
+财务报表 (资产负债表、利润表、现金流量表) 的 date_col 是报告期 end_date，本地最新报告期
+几乎总是早于最新交易日，增量规划因此每次都为每只股票调用一次接口，而绝大多数股票
+并没有新的财报。DisclosureCalendar 按披露时间表只挑出可能有新财报的股票：
+
+- 下一报告期：本地最新报告期之后的下一个季度末；
+- 预计披露日：该股票上一年同一报告期的实际公告日顺延一年，没有历史时从报告期结束起
+  即视为可能披露；均不晚于法定披露截止日 (一季报 4/30，半年报 8/31，三季报 10/31，
+  年报次年 4/30)；
+- 到达预计披露日前 lead_days 天起，每次规划都检查该股票，直到新财报落地；
+  超过法定截止日 overdue_days 天仍未披露的股票不再每天检查；
+- 周期性全量检查：每只股票按代码哈希分散到 sweep_days 天中的某一天，当天无论是否
+  到期都检查一次，用于发现更正、补充公告等重述。
+
+从未下载过的股票总是需要检查。
+"""
+
+import logging
+import threading
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import duckdb
+
+from .coverage_engine import table_fingerprint
+from .utils import normalize_stock_code
+
+logger = logging.getLogger(__name__)
+
+# 报告期 (MMDD) 到法定披露截止日 (相对报告期年份的年份偏移, MMDD)
+STATUTORY_DEADLINES = {
+    "0331": (0, "0430"),
+    "0630": (0, "0831"),
+    "0930": (0, "1031"),
+    "1231": (1, "0430"),
+}
+
+_QUARTER_ENDS = ("0331", "0630", "0930", "1231")
+
+
+def next_report_period(end_date: str) -> str:
+    """报告期之后的下一个季度末"""
+    year, mmdd = int(end_date[:4]), end_date[4:]
+    for quarter_end in _QUARTER_ENDS:
+        if quarter_end > mmdd:
+            return f"{year}{quarter_end}"
+    return f"{year + 1}0331"
+
+
+def statutory_deadline(period: str) -> str:
+    """报告期的法定披露截止日"""
+    offset, deadline = STATUTORY_DEADLINES.get(period[4:], (0, period[4:]))
+    return f"{int(period[:4]) + offset}{deadline}"
+
+
+def _to_date(value: str) -> date:
+    return datetime.strptime(value, "%Y%m%d").date()
+
+
+class DisclosureCalendar:
+    """按财报披露时间表判断股票是否可能有新的财报"""
+
+    def __init__(
+        self,
+        parquet_base_path: str = "data/parquet",
+        tables: Iterable[str] = ("balance_sheet", "income", "cash_flow"),
+        lead_days: int = 3,
+        overdue_days: int = 30,
+        sweep_days: int = 30,
+        enabled: bool = True,
+    ):
+        """初始化披露日历
+
+        Args:
+            parquet_base_path: Parquet 数据根目录
+            tables: 按披露时间表规划的财务报表
+            lead_days: 预计披露日之前提前开始检查的天数
+            overdue_days: 超过法定截止日该天数仍未披露时，只在周期性全量检查时检查
+            sweep_days: 周期性全量检查的周期 (天)，每只股票每个周期检查一次；0 表示不做
+            enabled: 是否启用，禁用时所有股票都需要检查
+        """
+        self.parquet_base_path = Path(parquet_base_path)
+        self.tables = set(tables or ())
+        self.lead_days = max(0, int(lead_days))
+        self.overdue_days = max(0, int(overdue_days))
+        self.sweep_days = max(0, int(sweep_days))
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # 表名 -> (数据指纹, {(ts_code, 报告期): 公告日})
+        self._history: Dict[str, Tuple[str, Dict[Tuple[str, str], str]]] = {}
+        # 自上次 refresh 以来已核对过数据指纹的表
+        self._checked: Set[str] = set()
+
+    def is_tracked(self, task_type: str) -> bool:
+        """表是否按披露时间表规划"""
+        return self.enabled and task_type in self.tables
+
+    def refresh(self) -> None:
+        """下次使用时重新核对各表的数据是否变化，每次规划开始时调用一次"""
+        with self._lock:
+            self._checked.clear()
+
+    def is_due(
+        self,
+        task_type: str,
+        symbol: str,
+        latest_end_date: Optional[str],
+        today: Optional[date] = None,
+    ) -> bool:
+        """股票是否需要检查新财报
+
+        Args:
+            task_type: 表名 (任务类型)
+            symbol: 股票代码，可以是未标准化的代码
+            latest_end_date: 本地最新报告期，从未下载过时为 None
+            today: 当前日期，默认为今天
+
+        Returns:
+            bool: 预计或已到披露时间，或当天轮到周期性全量检查时为 True
+        """
+        if not self.is_tracked(task_type) or not symbol or not latest_end_date:
+            return True
+        today = today or date.today()
+        ts_code = normalize_stock_code(symbol)
+        if self._in_sweep(ts_code, today):
+            return True
+
+        period = next_report_period(latest_end_date)
+        deadline = _to_date(statutory_deadline(period))
+        if today > deadline + timedelta(days=self.overdue_days):
+            return False
+        expected = self.expected_date(task_type, ts_code, period)
+        return today >= expected - timedelta(days=self.lead_days)
+
+    def expected_date(self, task_type: str, ts_code: str, period: str) -> date:
+        """报告期的预计披露日：上一年同期的公告日顺延一年，不晚于法定截止日"""
+        period_end = _to_date(period)
+        deadline = _to_date(statutory_deadline(period))
+        last_year = f"{int(period[:4]) - 1}{period[4:]}"
+        announced = self._announcements(task_type).get((ts_code, last_year))
+        if not announced:
+            return period_end + timedelta(days=1)
+        try:
+            previous = _to_date(announced)
+            expected = previous.replace(year=previous.year + 1)
+        except ValueError:  # 公告日格式异常或 2 月 29 日
+            return period_end + timedelta(days=1)
+        return min(max(expected, period_end + timedelta(days=1)), deadline)
+
+    def _in_sweep(self, ts_code: str, today: date) -> bool:
+        """当天是否轮到该股票的周期性全量检查"""
+        if not self.sweep_days:
+            return False
+        slot = zlib.crc32(ts_code.encode()) % self.sweep_days
+        return today.toordinal() % self.sweep_days == slot
+
+    def _announcements(self, task_type: str) -> Dict[Tuple[str, str], str]:
+        """表中每只股票最近报告期的公告日，数据变化时重新加载"""
+        cached = self._history.get(task_type)
+        if cached is not None and task_type in self._checked:
+            return cached[1]
+        table_path = self.parquet_base_path / task_type
+        fingerprint = table_fingerprint(table_path)
+        with self._lock:
+            self._checked.add(task_type)
+            if fingerprint is None:
+                self._history[task_type] = ("", {})
+                return {}
+            cached = self._history.get(task_type)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+            pattern = str(table_path / "**" / "*.parquet")
+            conn = duckdb.connect(":memory:")
+            try:
+                # 每只股票只保留最近 8 个报告期，足以覆盖上一年的同期
+                rows = conn.execute(
+                    f"SELECT ts_code, period, announced FROM ("
+                    f"SELECT ts_code, CAST(end_date AS VARCHAR) AS period, "
+                    f"MIN(CAST(ann_date AS VARCHAR)) AS announced "
+                    f"FROM read_parquet('{pattern}', union_by_name = true) "
+                    f"WHERE ann_date IS NOT NULL GROUP BY 1, 2) "
+                    f"QUALIFY ROW_NUMBER() OVER ("
+                    f"PARTITION BY ts_code ORDER BY period DESC) <= 8"
+                ).fetchall()
+            except duckdb.Error as e:
+                logger.warning(
+                    f"⚠️ 读取 {task_type} 公告日失败，按报告期结束日估计: {e}"
+                )
+                rows = []
+            finally:
+                conn.close()
+            announcements = {(code, end): ann for code, end, ann in rows}
+            self._history[task_type] = (fingerprint, announcements)
+        return announcements
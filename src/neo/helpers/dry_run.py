@@ -0,0 +1,174 @@
+"""下载试运行估算
+
+`neo dl --dry-run` 走与真实规划相同的流程 (增量检查、披露日历、缺口补全、股票池过滤)，
+得到确切的任务列表，但不登记、不派发任何任务。在此基础上估算：
+
+- 每个接口的调用次数：每个下载任务对应一次接口调用；
+- 预计行数与数据量：按指标表中该任务类型最近成功下载的单任务平均值推算，
+  没有历史指标的任务类型不做估算；
+- 预计耗时：与截止时间检查相同的模型，取速率配额限制所需时间与
+  快速队列 worker 并行处理所需时间中的较大值。
+
+用于在启动回补之前判断何时运行、需要多长时间。
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from ..database.interfaces import ISchemaLoader
+    from ..database.operator import ParquetDBQueryer
+    from ..database.planner_query import PlannerQueryEngine
+    from .coverage_engine import CoverageEngine
+    from .disclosure_calendar import DisclosureCalendar
+    from .fair_share_scheduler import FairShareScheduler
+    from .metrics_store import MetricsStore
+    from .symbol_universe import SymbolUniverse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DryRunTable:
+    """单个任务类型的试运行估算"""
+
+    task_type: str
+    endpoint: str
+    tasks: int
+    rate_limit_per_minute: float
+    quota_seconds: float
+    expected_rows: Optional[float] = None
+    expected_bytes: Optional[float] = None
+    samples: int = 0
+
+
+@dataclass
+class DryRunReport:
+    """一次试运行的估算结果"""
+
+    latest_trading_day: Optional[str]
+    workers: int
+    projected_seconds: float = 0.0
+    tables: List[DryRunTable] = field(default_factory=list)
+    tasks: List[Dict] = field(default_factory=list)
+
+    @property
+    def total_tasks(self) -> int:
+        return len(self.tasks)
+
+    @property
+    def api_calls_by_endpoint(self) -> Dict[str, int]:
+        """按接口汇总的调用次数"""
+        calls: Dict[str, int] = {}
+        for table in self.tables:
+            calls[table.endpoint] = calls.get(table.endpoint, 0) + table.tasks
+        return calls
+
+
+class DryRunEstimator:
+    """规划下载任务并估算接口调用、数据量和耗时，不派发任何任务"""
+
+    def __init__(
+        self,
+        schema_loader: "ISchemaLoader",
+        metrics_store: "MetricsStore",
+        scheduler: "FairShareScheduler",
+        coverage_engine: Optional["CoverageEngine"] = None,
+        symbol_universe: Optional["SymbolUniverse"] = None,
+        disclosure_calendar: Optional["DisclosureCalendar"] = None,
+        query_engine: Optional["PlannerQueryEngine"] = None,
+    ):
+        """初始化估算器
+
+        Args:
+            schema_loader: Schema 加载器，用于确定任务类型对应的接口
+            metrics_store: 指标表，提供历史的单任务平均行数、数据量和耗时
+            scheduler: 加权公平调度器，提供速率配额与 worker 数的耗时模型
+            coverage_engine: 覆盖引擎，与真实规划一致地生成补缺任务
+            symbol_universe: 股票池，与真实规划一致地跳过不可能有数据的任务
+            disclosure_calendar: 披露日历，与真实规划一致地按披露时间表规划财务报表
+            query_engine: 规划查询引擎，与真实规划一致地一次查询所有表的最新日期
+        """
+        self.schema_loader = schema_loader
+        self.metrics_store = metrics_store
+        self.scheduler = scheduler
+        self.coverage_engine = coverage_engine
+        self.symbol_universe = symbol_universe
+        self.disclosure_calendar = disclosure_calendar
+        self.query_engine = query_engine
+
+    def estimate(
+        self,
+        task_stock_mapping: Dict[str, List[str]],
+        db_queryer: "ParquetDBQueryer",
+        latest_trading_day: Optional[str] = None,
+    ) -> DryRunReport:
+        """规划并估算一次下载
+
+        Args:
+            task_stock_mapping: 任务类型到股票代码列表的映射
+            db_queryer: 用于增量检查的数据库查询器
+            latest_trading_day: 最新交易日，为 None 时从交易日历查询
+
+        Returns:
+            DryRunReport: 任务列表与按任务类型的估算
+        """
+        from ..tasks.download_tasks import DownloadTaskManager
+
+        if latest_trading_day is None:
+            latest_trading_day = db_queryer.get_latest_trading_day()
+        task_manager = DownloadTaskManager(
+            self.schema_loader,
+            coverage_engine=self.coverage_engine,
+            symbol_universe=self.symbol_universe,
+            disclosure_calendar=self.disclosure_calendar,
+            query_engine=self.query_engine,
+        )
+        tasks = list(
+            task_manager.iter_task_configs(
+                task_stock_mapping, db_queryer, latest_trading_day
+            )
+        )
+
+        counts: Dict[str, int] = {}
+        for config in tasks:
+            counts[config["task_type"]] = counts.get(config["task_type"], 0) + 1
+
+        report = DryRunReport(
+            latest_trading_day=latest_trading_day,
+            workers=self.scheduler.workers,
+            projected_seconds=self.scheduler.estimate_seconds(counts),
+            tasks=tasks,
+        )
+        for task_type in task_stock_mapping:
+            report.tables.append(
+                self._estimate_table(task_type, counts.get(task_type, 0))
+            )
+        logger.info(
+            f"🧪 试运行: {report.total_tasks} 个任务，"
+            f"预计耗时 {report.projected_seconds / 60:.1f} 分钟"
+        )
+        return report
+
+    def _estimate_table(self, task_type: str, tasks: int) -> DryRunTable:
+        """按历史指标估算单个任务类型"""
+        try:
+            schema = self.schema_loader.load_schema(task_type)
+            endpoint = schema.api_method or task_type
+        except KeyError:
+            endpoint = task_type
+        rate_limit = self.scheduler.rate_limit(task_type)
+        table = DryRunTable(
+            task_type=task_type,
+            endpoint=endpoint,
+            tasks=tasks,
+            rate_limit_per_minute=rate_limit,
+            quota_seconds=tasks * 60.0 / rate_limit if rate_limit else 0.0,
+        )
+        profile = self.metrics_store.task_profile(task_type)
+        if profile is not None:
+            table.samples = profile.samples
+            table.expected_rows = tasks * profile.rows_per_task
+            table.expected_bytes = tasks * profile.bytes_per_task
+        return table
@@ -0,0 +1,261 @@
+"""加权公平调度器
+
+Huey 按 `priority desc, id` 出队。规划阶段为每个下载任务计算优先级，
+让快速队列在出队时 (而不仅是入队时) 按任务类型公平地分配 worker：
+
+- 加权公平排队 (WFQ)：每个任务类型维护一个虚拟完成时间，每派发一个任务
+  推进 `平均耗时 / 权重`，优先级取虚拟完成时间的相反数。权重默认取该类型
+  速率配额在所有类型中的占比，耗时慢的接口因此不会独占 worker；
+- 优先级通道：interactive (如 `neo dl -s ...`) > deadline > bulk，
+  高优先级通道的任务总是排在低优先级通道之前；
+- 截止时间：deadline 通道的任务在规划完成后估算完成时间，无法按时完成时告警。
+
+虚拟完成时间按 (通道, 任务类型) 持久化到 SQLite，多次规划之间依然公平。
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+LANE_INTERACTIVE = "interactive"
+LANE_DEADLINE = "deadline"
+LANE_BULK = "bulk"
+
+# 通道之间的优先级偏移，远大于任何虚拟完成时间，保证通道之间严格有序
+LANE_PRIORITY_OFFSETS = {
+    LANE_INTERACTIVE: 2e9,
+    LANE_DEADLINE: 1e9,
+    LANE_BULK: 0.0,
+}
+
+# 虚拟时间的起点 (2024-01-01 00:00:00 UTC)，让优先级保持在较小的数值范围内
+VIRTUAL_EPOCH = 1704067200.0
+
+
+@dataclass
+class SchedulePlan:
+    """一次规划的调度统计"""
+
+    lane: str = LANE_BULK
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+class FairShareScheduler:
+    """按任务类型加权公平地为下载任务分配 Huey 优先级"""
+
+    def __init__(
+        self,
+        state_path: str = "data/scheduler.db",
+        default_latency_seconds: float = 1.0,
+        workers: int = 8,
+        weights: Optional[Dict[str, float]] = None,
+        latency_provider: Optional[Callable[[str], Optional[float]]] = None,
+    ):
+        """初始化调度器
+
+        Args:
+            state_path: 虚拟完成时间的持久化文件路径
+            default_latency_seconds: 没有观测数据时假定的单个任务耗时 (秒)
+            workers: 快速队列的 worker 数，用于估算完成时间
+            weights: 手工指定的任务类型权重，未指定的类型按速率配额占比计算
+            latency_provider: 返回任务类型观测平均耗时 (秒) 的回调，无数据时返回 None
+        """
+        self.state_path = state_path
+        self.default_latency_seconds = float(default_latency_seconds)
+        self.workers = max(1, int(workers))
+        self.weights = dict(weights or {})
+        self.latency_provider = latency_provider
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            Path(self.state_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS scheduler_state (
+                        lane TEXT NOT NULL,
+                        task_type TEXT NOT NULL,
+                        virtual_finish REAL NOT NULL,
+                        PRIMARY KEY (lane, task_type)
+                    )
+                    """
+                )
+                self._initialized = True
+            yield conn
+        finally:
+            conn.close()
+
+    def rate_limit(self, task_type: str) -> float:
+        """任务类型每分钟的速率配额"""
+        from ..configs import get_config
+
+        task_config = get_config().download_tasks.get(task_type, {})
+        return float(task_config.get("rate_limit_per_minute", 190))
+
+    def get_latency(self, task_type: str) -> float:
+        """任务类型的平均耗时 (秒)，优先使用观测值"""
+        if self.latency_provider is not None:
+            observed = self.latency_provider(task_type)
+            if observed:
+                return float(observed)
+        return self.default_latency_seconds
+
+    def get_weights(self, task_types: Iterable[str]) -> Dict[str, float]:
+        """计算任务类型的权重：手工配置优先，否则取速率配额占比"""
+        task_types = list(task_types)
+        quotas = {tt: self.rate_limit(tt) for tt in task_types}
+        total_quota = sum(quotas.values()) or 1.0
+        return {
+            tt: float(self.weights.get(tt, quotas[tt] / total_quota))
+            for tt in task_types
+        }
+
+    def assign(
+        self,
+        params_iter: Iterable[Dict[str, Any]],
+        task_types: Iterable[str],
+        lane: str = LANE_BULK,
+        plan: Optional[SchedulePlan] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """为任务参数附加优先级
+
+        产出的参数带有 `priority` 键，Huey 的 `TaskWrapper.s()` 会将其作为任务优先级。
+
+        Args:
+            params_iter: 任务参数的可迭代对象
+            task_types: 本次规划涉及的所有任务类型，用于计算配额占比
+            lane: 优先级通道
+            plan: 可选的统计对象，记录每个任务类型派发的任务数
+
+        Yields:
+            Dict[str, Any]: 附加了 priority 的任务参数
+        """
+        if lane not in LANE_PRIORITY_OFFSETS:
+            raise ValueError(
+                f"无效的优先级通道 '{lane}'，有效值为 {', '.join(LANE_PRIORITY_OFFSETS)}"
+            )
+
+        task_types = list(task_types)
+        weights = self.get_weights(task_types)
+        increments = {
+            tt: self.get_latency(tt) / max(weights[tt], 1e-6) for tt in task_types
+        }
+        offset = LANE_PRIORITY_OFFSETS[lane]
+
+        now = time.time() - VIRTUAL_EPOCH
+        finishes = {
+            tt: max(now, stored) for tt, stored in self._load_state(lane).items()
+        }
+        if plan is not None:
+            plan.lane = lane
+
+        try:
+            for params in params_iter:
+                task_type = params["task_type"]
+                if task_type not in increments:
+                    weights = self.get_weights([*increments, task_type])
+                    increments[task_type] = self.get_latency(task_type) / max(
+                        weights[task_type], 1e-6
+                    )
+                finish = finishes.get(task_type, now) + increments[task_type]
+                finishes[task_type] = finish
+                if plan is not None:
+                    plan.counts[task_type] = plan.counts.get(task_type, 0) + 1
+                yield {**params, "priority": round(offset - finish, 3)}
+        finally:
+            self._save_state(lane, finishes)
+
+    def _load_state(self, lane: str) -> Dict[str, float]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT task_type, virtual_finish FROM scheduler_state WHERE lane = ?",
+                (lane,),
+            ).fetchall()
+        return {task_type: finish for task_type, finish in rows}
+
+    def _save_state(self, lane: str, finishes: Dict[str, float]) -> None:
+        if not finishes:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scheduler_state (lane, task_type, virtual_finish) "
+                "VALUES (?, ?, ?)",
+                [(lane, tt, finish) for tt, finish in finishes.items()],
+            )
+
+    def estimate_seconds(self, counts: Dict[str, int]) -> float:
+        """估算完成一批任务所需的时间 (秒)
+
+        取两者中的较大值：各任务类型受速率配额限制所需的时间，
+        以及所有任务的总耗时平摊到全部 worker 上的时间。
+        """
+        if not counts:
+            return 0.0
+        quota_bound = max(n * 60.0 / self.rate_limit(tt) for tt, n in counts.items())
+        worker_bound = (
+            sum(n * self.get_latency(tt) for tt, n in counts.items()) / self.workers
+        )
+        return max(quota_bound, worker_bound)
+
+    def check_deadline(self, plan: SchedulePlan, deadline: datetime) -> bool:
+        """检查一次规划能否在截止时间前完成，无法完成时告警
+
+        Returns:
+            bool: 是否预计能按时完成
+        """
+        estimate = self.estimate_seconds(plan.counts)
+        remaining = (deadline - datetime.now()).total_seconds()
+        if estimate > remaining:
+            logger.warning(
+                f"⏰ ⚠️ {plan.total} 个任务预计需要 {estimate / 60:.1f} 分钟，"
+                f"无法在截止时间 {deadline:%Y-%m-%d %H:%M} 前完成 "
+                f"(剩余 {max(remaining, 0) / 60:.1f} 分钟)"
+            )
+            return False
+        logger.info(
+            f"⏰ {plan.total} 个任务预计需要 {estimate / 60:.1f} 分钟，"
+            f"可在截止时间 {deadline:%Y-%m-%d %H:%M} 前完成"
+        )
+        return True
+
+
+def parse_deadline(value: str, now: Optional[datetime] = None) -> datetime:
+    """解析截止时间
+
+    支持 "HH:MM" (今天的该时刻) 和 "YYYY-MM-DD HH:MM" 两种格式。
+
+    Raises:
+        ValueError: 格式无效或截止时间已过
+    """
+    now = now or datetime.now()
+    value = value.strip()
+    try:
+        if len(value) <= 5:
+            parsed = datetime.strptime(value, "%H:%M")
+            deadline = now.replace(
+                hour=parsed.hour, minute=parsed.minute, second=0, microsecond=0
+            )
+        else:
+            deadline = datetime.strptime(value, "%Y-%m-%d %H:%M")
+    except ValueError:
+        raise ValueError(
+            f"无效的截止时间 '{value}'，请使用 'HH:MM' 或 'YYYY-MM-DD HH:MM' 格式"
+        )
+    if deadline <= now:
+        raise ValueError(f"截止时间 {deadline:%Y-%m-%d %H:%M} 已过")
+    return deadline
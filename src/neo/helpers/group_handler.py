@@ -42,7 +42,7 @@ class GroupHandler:
         task_type_names = self.config.task_groups[group_name]
 
         # 检查是否全部都是不需要股票代码的任务
-        global_tasks = ["stock_basic", "trade_cal"]
+        global_tasks = ["stock_basic", "trade_cal", "suspend_d"]
         if all(task in global_tasks for task in task_type_names):
             # 如果组中全部都是全局任务，返回包含空字符串的列表
             # 这样任务构建器就知道需要为这些任务创建一个不需要股票代码的任务
@@ -0,0 +1,165 @@
+"""数据湖类型迁移
+
+把已有 Parquet 文件按 ArrowSchemaCompiler 编译的 schema 重写：价格、成交量等列从字符串
+或推断类型统一为数值类型，低基数字符串列改为字典编码。
+
+- 只读取文件尾部的 schema 判断是否需要迁移，已经符合 schema 的文件直接跳过，
+  因此迁移可以随时中断、重复运行，每次只处理剩余的文件；
+- 每个文件先写临时文件再原子重命名替换原文件，中断不会留下半写文件；
+- 多个文件由线程池并行重写，重写期间持有文件所在分区的租约。
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+import pyarrow.parquet as pq
+
+
+if TYPE_CHECKING:
+    from ..writers.arrow_schema import ArrowSchemaCompiler
+    from .lease_manager import LeaseManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MigrationReport:
+    """一次迁移的统计结果"""
+
+    files_total: int = 0
+    files_migrated: int = 0
+    files_skipped: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    elapsed_seconds: float = 0.0
+    failures: List[str] = field(default_factory=list)
+
+    @property
+    def files_failed(self) -> int:
+        return len(self.failures)
+
+
+class LakeMigrator:
+    """并行、可续跑地把数据湖中的 Parquet 文件重写为表的固定 Arrow 类型"""
+
+    def __init__(
+        self,
+        base_path: str,
+        schema_compiler: "ArrowSchemaCompiler",
+        lease_manager: Optional["LeaseManager"] = None,
+        workers: int = 4,
+    ):
+        """初始化迁移器
+
+        Args:
+            base_path: Parquet 数据根目录
+            schema_compiler: Arrow schema 编译器
+            lease_manager: 租约管理器，多节点共享数据目录时用于独占写入分区
+            workers: 并行重写文件的线程数
+        """
+        self.base_path = Path(base_path)
+        self.schema_compiler = schema_compiler
+        self.lease_manager = lease_manager
+        self.workers = max(1, int(workers))
+
+    def migrate(
+        self, task_types: Optional[List[str]] = None, dry_run: bool = False
+    ) -> MigrationReport:
+        """重写不符合 schema 的文件
+
+        Args:
+            task_types: 只迁移指定表，为 None 时迁移 schema 中定义的所有表
+            dry_run: 只统计需要迁移的文件，不重写
+
+        Returns:
+            MigrationReport: 迁移统计；单个文件失败不会中断迁移，失败文件保持原样
+        """
+        started = time.perf_counter()
+        report = MigrationReport()
+        jobs: List[Tuple[str, Path]] = []
+        for task_type in self._task_types(task_types):
+            for path in self._files(task_type):
+                report.files_total += 1
+                try:
+                    schema = pq.read_schema(str(path))
+                except Exception as e:
+                    report.failures.append(f"{path}: {e}")
+                    continue
+                if self.schema_compiler.conforms(schema, task_type):
+                    report.files_skipped += 1
+                else:
+                    jobs.append((task_type, path))
+
+        if dry_run:
+            report.files_migrated = len(jobs)
+            report.bytes_before = sum(path.stat().st_size for _, path in jobs)
+        elif jobs:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                futures = [
+                    (path, pool.submit(self._migrate_file, task_type, path))
+                    for task_type, path in jobs
+                ]
+                for path, future in futures:
+                    try:
+                        before, after = future.result()
+                    except Exception as e:
+                        logger.error(f"💥 迁移文件 {path} 失败，保持原样: {e}")
+                        report.failures.append(f"{path}: {e}")
+                        continue
+                    report.files_migrated += 1
+                    report.bytes_before += before
+                    report.bytes_after += after
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            f"🧬 数据湖迁移{'预演' if dry_run else ''}完成: 共 {report.files_total} 个文件，"
+            f"迁移 {report.files_migrated}，跳过 {report.files_skipped}，"
+            f"失败 {report.files_failed} ({report.elapsed_seconds:.1f}s)"
+        )
+        return report
+
+    def _migrate_file(self, task_type: str, path: Path) -> Tuple[int, int]:
+        """重写单个文件，返回 (原文件字节数, 新文件字节数)"""
+        partition = path.parent.relative_to(self.base_path / task_type).as_posix()
+        with self._hold_partition(task_type, "" if partition == "." else partition):
+            before = path.stat().st_size
+            # 不做 hive 分区推断，分区列只存在于目录名中
+            table = pq.ParquetFile(str(path)).read()
+            table = self.schema_compiler.conform(
+                table.replace_schema_metadata(None), task_type
+            )
+            tmp_file = path.parent / f".{path.name}.tmp"
+            pq.write_table(table, str(tmp_file))
+            os.replace(tmp_file, path)
+            after = path.stat().st_size
+        logger.debug(f"🧬 {path}: {before} → {after} 字节")
+        return before, after
+
+    def _task_types(self, task_types: Optional[List[str]]) -> List[str]:
+        """待迁移的表：指定的表或 schema 中定义的所有表，且数据目录存在"""
+        if not task_types:
+            task_types = self.schema_compiler.schema_loader.get_table_names()
+        return [
+            task_type
+            for task_type in task_types
+            if (self.base_path / task_type).is_dir()
+        ]
+
+    def _files(self, task_type: str) -> List[Path]:
+        """表的所有 Parquet 文件"""
+        return sorted((self.base_path / task_type).rglob("*.parquet"))
+
+    @contextmanager
+    def _hold_partition(self, task_type: str, partition: str) -> Iterator[None]:
+        """重写文件期间持有分区租约"""
+        if self.lease_manager is None:
+            yield
+            return
+        with self.lease_manager.hold_partition(task_type, partition):
+            yield
@@ -0,0 +1,396 @@
+"""共享文件系统上的租约
+
+多台机器同时向同一个 (如 NFS 挂载的) `data/parquet` 写入时，用租约协调：
+
+- 计划任务：规划时按 (task_type, symbol) 认领任务租约，其他节点跳过已被认领的任务，
+  各节点因此自动分摊工作；节点崩溃后租约过期，下次规划时由其他节点接管；
+- 分区写入：写入 Parquet 分区 (或全量替换整张表) 前持有分区租约，
+  保证同一时刻只有一个写入者修改该分区；表租约与该表的分区租约互斥，
+  全量替换删除整张表时不会与其他节点的分区写入交错。持有期间后台定期续约，
+  长时间的写入或合并不会因租约过期被其他节点接管。
+
+每个租约是租约目录下的一个 JSON 文件：
+
+- 创建时先写临时文件再 link 到租约路径 (已存在则失败)，只有一个节点能创建成功，
+  且其他节点不会读到写了一半的租约；
+- 续约和更新使用 "写临时文件 + os.replace" 原子替换；
+- 接管过期租约时先将租约文件 rename 为唯一的墓碑文件 (只有一个节点能成功)，
+  再确认墓碑中正是读到的过期租约，否则把误取的新租约放回。
+
+本地多进程测试时租约目录可以是任意本地目录。
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseTimeout(TimeoutError):
+    """在等待时间内未能获得租约"""
+
+
+@dataclass
+class Lease:
+    """租约文件内容"""
+
+    name: str
+    owner: str
+    token: str
+    expires_at: float
+    payload: Dict[str, Any]
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at < time.time()
+
+
+class LeaseManager:
+    """基于共享文件系统的租约管理器"""
+
+    def __init__(
+        self,
+        root: str = "data/leases",
+        node_id: Optional[str] = None,
+        ttl_seconds: float = 300.0,
+        wait_seconds: float = 60.0,
+        enabled: bool = True,
+    ):
+        """初始化租约管理器
+
+        Args:
+            root: 租约目录，多节点部署时应位于共享文件系统上
+            node_id: 节点标识，默认为主机名；同一节点上的进程共享任务租约
+            ttl_seconds: 默认租约有效期 (秒)
+            wait_seconds: hold 等待租约的默认最长时间 (秒)
+            enabled: 是否启用租约，关闭时所有认领都直接成功
+        """
+        self.root = Path(root)
+        self.node_id = node_id or socket.gethostname()
+        self.ttl_seconds = float(ttl_seconds)
+        self.wait_seconds = float(wait_seconds)
+        self.enabled = enabled
+        self._initialized = False
+
+    def _path(self, name: str) -> Path:
+        if not self._initialized:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._initialized = True
+        return self.root / f"{quote(name, safe='')}.lease"
+
+    def _read(self, path: Path) -> Optional[Lease]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError):
+            # 无法解析的残缺文件视为已过期
+            return Lease(path.stem, "", "", 0.0, {})
+        return Lease(
+            data["name"],
+            data["owner"],
+            data["token"],
+            data["expires_at"],
+            data.get("payload", {}),
+        )
+
+    def _encode(self, lease: Lease) -> bytes:
+        return json.dumps(
+            {
+                "name": lease.name,
+                "owner": lease.owner,
+                "token": lease.token,
+                "expires_at": lease.expires_at,
+                "payload": lease.payload,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+    def _create(self, path: Path, lease: Lease) -> bool:
+        """写好完整的临时文件后 link 到租约路径，其他节点不会读到写了一半的租约"""
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(self._encode(lease))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            return False
+        finally:
+            tmp.unlink(missing_ok=True)
+        return True
+
+    def _take_over(self, path: Path, stale: Lease) -> bool:
+        """将读到的租约移走，确认移走的正是读到的那一份"""
+        tombstone = path.with_name(f".{path.name}.{uuid.uuid4().hex}.stale")
+        try:
+            os.rename(path, tombstone)
+        except FileNotFoundError:
+            # 其他节点已经接管或释放
+            return False
+        moved = self._read(tombstone)
+        if moved is not None and moved.token != stale.token:
+            # 读取之后租约已被其他节点接管并续期，放回去 (若此时已有新租约则丢弃)
+            try:
+                os.link(tombstone, path)
+            except FileExistsError:
+                pass
+            tombstone.unlink(missing_ok=True)
+            return False
+        tombstone.unlink(missing_ok=True)
+        return True
+
+    def acquire(
+        self,
+        name: str,
+        ttl_seconds: Optional[float] = None,
+        owner: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """认领租约
+
+        租约不存在或已过期时认领成功；租约已属于同一持有者时续约并更新 payload。
+
+        Args:
+            name: 租约名称
+            ttl_seconds: 有效期 (秒)，默认使用 ttl_seconds
+            owner: 持有者，默认为节点标识
+            payload: 附加在租约上的数据
+
+        Returns:
+            bool: 是否认领成功
+        """
+        if not self.enabled:
+            return True
+        owner = owner or self.node_id
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        path = self._path(name)
+        lease = Lease(name, owner, uuid.uuid4().hex, time.time() + ttl, payload or {})
+
+        for _ in range(3):
+            if self._create(path, lease):
+                return True
+            current = self._read(path)
+            if current is None:
+                continue
+            if current.owner == owner:
+                # 续约同样走 rename + link：读到的租约若已被其他节点接管则不会覆盖
+                self._take_over(path, current)
+                continue
+            if not current.expired:
+                return False
+            logger.info(f"🔑 接管过期租约: {name} (原持有者 {current.owner})")
+            self._take_over(path, current)
+        return False
+
+    def release(
+        self,
+        name: str,
+        owner: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """释放租约，只释放属于该持有者 (且 payload 匹配) 的租约
+
+        Returns:
+            bool: 是否释放
+        """
+        if not self.enabled:
+            return True
+        owner = owner or self.node_id
+        path = self._path(name)
+        current = self._read(path)
+        if current is None or current.owner != owner:
+            return False
+        if payload and any(current.payload.get(k) != v for k, v in payload.items()):
+            return False
+        tombstone = path.with_name(f".{path.name}.{uuid.uuid4().hex}.released")
+        try:
+            os.rename(path, tombstone)
+        except FileNotFoundError:
+            return False
+        tombstone.unlink(missing_ok=True)
+        return True
+
+    def get(self, name: str) -> Optional[Lease]:
+        """读取租约，不存在时返回 None"""
+        if not self.enabled:
+            return None
+        return self._read(self._path(name))
+
+    @contextmanager
+    def hold(
+        self,
+        name: str,
+        ttl_seconds: Optional[float] = None,
+        wait_seconds: Optional[float] = None,
+        poll_interval_seconds: float = 0.2,
+    ) -> Iterator[None]:
+        """在代码块执行期间独占持有租约
+
+        持有者为当前进程的当前线程，同一节点上的其他进程/线程同样需要等待。
+        持有期间每隔三分之一有效期续约一次。
+
+        Raises:
+            LeaseTimeout: 在等待时间 (默认 wait_seconds) 内未能获得租约
+        """
+        if not self.enabled:
+            yield
+            return
+        owner = self._thread_owner()
+        deadline = self._deadline(wait_seconds)
+        self._wait_acquire(name, owner, ttl_seconds, deadline, poll_interval_seconds)
+        try:
+            with self._heartbeat(name, owner, ttl_seconds):
+                yield
+        finally:
+            self.release(name, owner=owner)
+
+    @contextmanager
+    def hold_partition(
+        self,
+        task_type: str,
+        partition: str = "",
+        ttl_seconds: Optional[float] = None,
+        wait_seconds: Optional[float] = None,
+        poll_interval_seconds: float = 0.2,
+    ) -> Iterator[None]:
+        """持有分区租约 (partition 为空时持有整张表的租约)，表租约与分区租约互斥
+
+        - 分区写入者获得分区租约后检查表租约，表被其他写入者持有时放弃分区租约并重试；
+        - 表写入者获得表租约后等待该表所有未过期的分区租约释放。
+
+        两者都是先持有自己的租约再检查对方，因此不会同时进入；表写入者持有表租约等待，
+        新的分区写入者会主动让出，表写入者不会被持续的分区写入饿死。
+
+        Raises:
+            LeaseTimeout: 在等待时间 (默认 wait_seconds) 内未能获得租约
+        """
+        if not self.enabled:
+            yield
+            return
+        name = partition_lease_name(task_type, partition)
+        table = partition_lease_name(task_type)
+        owner = self._thread_owner()
+        deadline = self._deadline(wait_seconds)
+        poll = poll_interval_seconds
+        if partition:
+            while True:
+                self._wait_acquire(name, owner, ttl_seconds, deadline, poll)
+                current = self.get(table)
+                if current is None or current.expired or current.owner == owner:
+                    break
+                self.release(name, owner=owner)
+                if time.monotonic() >= deadline:
+                    raise LeaseTimeout(
+                        f"等待租约 {name} 超时，表 {task_type} 被 {current.owner} 持有"
+                    )
+                time.sleep(poll)
+        else:
+            self._wait_acquire(name, owner, ttl_seconds, deadline, poll)
+            try:
+                while busy := self._live_leases(f"partition:{task_type}/", owner):
+                    if time.monotonic() >= deadline:
+                        raise LeaseTimeout(
+                            f"等待租约 {name} 超时，仍有分区租约: "
+                            f"{', '.join(lease.name for lease in busy)}"
+                        )
+                    time.sleep(poll)
+            except BaseException:
+                self.release(name, owner=owner)
+                raise
+        try:
+            with self._heartbeat(name, owner, ttl_seconds):
+                yield
+        finally:
+            self.release(name, owner=owner)
+
+    def _thread_owner(self) -> str:
+        """hold 的持有者：当前进程的当前线程"""
+        return f"{self.node_id}:{os.getpid()}:{threading.get_ident()}"
+
+    def _deadline(self, wait_seconds: Optional[float]) -> float:
+        wait = self.wait_seconds if wait_seconds is None else wait_seconds
+        return time.monotonic() + wait
+
+    def _wait_acquire(
+        self,
+        name: str,
+        owner: str,
+        ttl_seconds: Optional[float],
+        deadline: float,
+        poll_interval_seconds: float,
+    ) -> None:
+        """等待认领租约直到截止时间，超时抛出 LeaseTimeout"""
+        while not self.acquire(name, ttl_seconds=ttl_seconds, owner=owner):
+            if time.monotonic() >= deadline:
+                current = self.get(name)
+                holder = current.owner if current else "未知"
+                raise LeaseTimeout(f"等待租约 {name} 超时，当前持有者: {holder}")
+            time.sleep(poll_interval_seconds)
+
+    def _live_leases(self, prefix: str, owner: str) -> List[Lease]:
+        """名称以 prefix 开头、未过期且不属于 owner 的租约"""
+        if not self.root.exists():
+            return []
+        leases = []
+        for path in self.root.glob(f"{quote(prefix, safe='')}*.lease"):
+            current = self._read(path)
+            if current is not None and not current.expired and current.owner != owner:
+                leases.append(current)
+        return leases
+
+    @contextmanager
+    def _heartbeat(
+        self, name: str, owner: str, ttl_seconds: Optional[float]
+    ) -> Iterator[None]:
+        """代码块执行期间在后台线程中每隔三分之一有效期续约一次"""
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        stop = threading.Event()
+
+        def renew() -> None:
+            while not stop.wait(ttl / 3):
+                if not self.acquire(name, ttl_seconds=ttl, owner=owner):
+                    logger.warning(f"⚠️ 租约 {name} 续约失败，已被其他节点接管")
+
+        thread = threading.Thread(target=renew, name=f"lease-{name}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def purge_expired(self) -> int:
+        """删除已过期的租约文件
+
+        Returns:
+            int: 删除的租约数
+        """
+        if not self.enabled or not self.root.exists():
+            return 0
+        purged = 0
+        for path in self.root.glob("*.lease"):
+            current = self._read(path)
+            if current is not None and current.expired and self._take_over(
+                path, current
+            ):
+                purged += 1
+        return purged
+
+
+def task_lease_name(task_type: str, symbol: str) -> str:
+    """计划任务的租约名称，粒度与任务登记表一致"""
+    return f"task:{task_type}:{symbol}"
+
+
+def partition_lease_name(task_type: str, partition: str = "") -> str:
+    """分区写入的租约名称，partition 为空表示整张表"""
+    return f"partition:{task_type}/{partition}" if partition else f"table:{task_type}"
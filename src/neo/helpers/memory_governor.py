@@ -0,0 +1,204 @@
+"""慢速消费者的内存管控
+
+一个跨越数十年的负载在慢速消费者中会先后以字典列表、DataFrame、Arrow 表三种形式
+存在于内存中，几个这样的任务同时到达就可能把 RSS 推到数 GB 并触发 OOM。
+
+MemoryGovernor 在处理任务之前按负载大小估算其峰值内存：
+
+- 同一进程内并发处理的估算字节数不超过上限，超过时等待其他任务完成；
+- 大任务 (超过 large_task_mb) 在进程内独占处理，并在转换为 DataFrame 后
+  立即释放原始的字典列表；
+- 系统可用内存 (/proc/meminfo 的 MemAvailable) 不足以容纳任务时同样等待，
+  这一条对进程型 worker 之间也有效；
+- 等待超时的任务延迟重试，让出 worker 给较小的任务。
+
+每个任务结束后的进程峰值 RSS 记录到任务指标中，供 `neo stats` 与 `neo monitor` 展示。
+"""
+
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# 没有负载大小时，按每个单元格的平均字节数估算 (字典列表形式)
+_BYTES_PER_CELL = 64
+
+
+def read_rss_bytes() -> int:
+    """当前进程的常驻内存 (字节)，无法读取时返回峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return read_peak_rss_bytes()
+
+
+def read_peak_rss_bytes() -> int:
+    """当前进程的峰值常驻内存 (字节)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def read_available_bytes() -> Optional[int]:
+    """系统可用内存 (字节)，无法读取 /proc/meminfo 时返回 None"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+@dataclass
+class MemoryStats:
+    """内存管控的统计"""
+
+    inflight_bytes: int
+    admitted: int
+    deferred: int
+    rss_bytes: int
+    peak_rss_bytes: int
+
+
+class MemoryGovernor:
+    """按任务估算内存，限制同时处理的字节数"""
+
+    def __init__(
+        self,
+        max_inflight_mb: float = 1024,
+        large_task_mb: float = 256,
+        min_available_mb: float = 512,
+        amplification: float = 4.0,
+        max_wait_seconds: float = 30.0,
+        poll_interval_seconds: float = 0.5,
+        defer_seconds: float = 30.0,
+        max_deferrals: int = 10,
+        enabled: bool = True,
+        available_bytes: Callable[[], Optional[int]] = read_available_bytes,
+    ):
+        """初始化内存管控
+
+        Args:
+            max_inflight_mb: 单个进程内同时处理的任务估算内存上限 (MB)
+            large_task_mb: 大任务阈值 (MB)，大任务独占处理并尽早释放原始负载
+            min_available_mb: 处理任务后系统至少保留的可用内存 (MB)
+            amplification: 负载大小到处理峰值内存的放大系数
+                (字典列表 + DataFrame + Arrow 表)
+            max_wait_seconds: 等待内存额度的最长时间，超时后延迟重试
+            poll_interval_seconds: 等待期间重新检查系统内存的间隔
+            defer_seconds: 延迟重试的时间 (秒)
+            max_deferrals: 任务最多被延迟的次数，之后不再等待系统内存
+            enabled: 是否启用内存管控
+            available_bytes: 读取系统可用内存的函数，便于测试
+        """
+        self.max_inflight_bytes = int(max_inflight_mb * MB)
+        self.large_task_bytes = int(large_task_mb * MB)
+        self.min_available_bytes = int(min_available_mb * MB)
+        self.amplification = float(amplification)
+        self.max_wait_seconds = float(max_wait_seconds)
+        self.poll_interval_seconds = float(poll_interval_seconds)
+        self.defer_seconds = float(defer_seconds)
+        self.max_deferrals = int(max_deferrals)
+        self.enabled = enabled
+        self._available_bytes = available_bytes
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._large_inflight = 0
+        self._admitted = 0
+        self._deferred = 0
+
+    def estimate(
+        self, records: Optional[List[Any]], payload_bytes: Optional[int] = None
+    ) -> int:
+        """估算处理一个任务的峰值内存 (字节)
+
+        Args:
+            records: 字典列表形式的负载
+            payload_bytes: 下载端测得的 DataFrame 内存大小，优先使用
+        """
+        if payload_bytes:
+            base = int(payload_bytes)
+        elif records:
+            first = records[0]
+            columns = len(first) if isinstance(first, dict) else 1
+            base = len(records) * columns * _BYTES_PER_CELL
+        else:
+            base = 0
+        return int(base * self.amplification)
+
+    def is_large(self, estimate: int) -> bool:
+        """是否为需要独占处理的大任务"""
+        return self.enabled and estimate >= self.large_task_bytes
+
+    def _fits(self, estimate: int, check_system: bool) -> bool:
+        if self._inflight:
+            if self.is_large(estimate) or self._large_inflight:
+                # 大任务与其他任务互斥
+                return False
+            if self._inflight + estimate > self.max_inflight_bytes:
+                return False
+        if not check_system:
+            return True
+        available = self._available_bytes()
+        return available is None or available - estimate >= self.min_available_bytes
+
+    def acquire(self, estimate: int, attempt: int = 0) -> bool:
+        """申请处理任务所需的内存额度，最多等待 max_wait_seconds
+
+        进程内没有其他任务时总能获得进程内额度；超过单任务上限的任务也会在独占时放行。
+
+        Args:
+            estimate: 任务的估算内存
+            attempt: 任务已被延迟的次数，达到 max_deferrals 后不再等待系统内存
+
+        Returns:
+            bool: 是否获得额度，False 表示应延迟重试
+        """
+        if not self.enabled:
+            return True
+        check_system = attempt < self.max_deferrals
+        deadline = time.monotonic() + self.max_wait_seconds
+        with self._cond:
+            while not self._fits(estimate, check_system):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._deferred += 1
+                    return False
+                self._cond.wait(min(self.poll_interval_seconds, remaining))
+            self._inflight += estimate
+            self._large_inflight += int(self.is_large(estimate))
+            self._admitted += 1
+        return True
+
+    def release(self, estimate: int) -> None:
+        """归还任务的内存额度"""
+        if not self.enabled:
+            return
+        with self._cond:
+            self._inflight = max(0, self._inflight - estimate)
+            if self.is_large(estimate):
+                self._large_inflight = max(0, self._large_inflight - 1)
+            self._cond.notify_all()
+
+    def stats(self) -> MemoryStats:
+        """当前的管控统计与进程内存"""
+        with self._cond:
+            return MemoryStats(
+                inflight_bytes=self._inflight,
+                admitted=self._admitted,
+                deferred=self._deferred,
+                rss_bytes=read_rss_bytes(),
+                peak_rss_bytes=read_peak_rss_bytes(),
+            )
@@ -4,7 +4,9 @@ import re
 import time
 import json
 import tomllib
-from typing import Set, Dict, Any
+from typing import Set, Dict, Any, Optional
+
+from ..writers.staging_parquet_writer import StagingLog
 
 
 class MetadataSyncManager:
@@ -13,16 +15,23 @@ class MetadataSyncManager:
     支持混合模式：快速 mtime 检查 + 可靠的状态比较。
     """
 
-    def __init__(self, metadata_db_path: str, parquet_base_path: str):
+    def __init__(
+        self,
+        metadata_db_path: str,
+        parquet_base_path: str,
+        staging_path: Optional[str] = None,
+    ):
         """
         初始化同步管理器。
 
         Args:
             metadata_db_path (str): DuckDB 元数据文件的路径 (e.g., 'data/metadata.db').
             parquet_base_path (str): Parquet 文件存储的根目录路径 (e.g., 'data/parquet').
+            staging_path (str, optional): 暂存日志目录，提供时视图同时包含尚未合并的暂存数据
         """
         self.db_path = Path(metadata_db_path)
         self.parquet_path = Path(parquet_base_path)
+        self.staging_log = StagingLog(staging_path) if staging_path else None
         self.db_path.parent.mkdir(exist_ok=True, parents=True)
         self.parquet_path.mkdir(exist_ok=True, parents=True)
 
@@ -334,6 +343,57 @@ class MetadataSyncManager:
         except duckdb.Error:
             return stats
 
+    def _sync_staging(
+        self, con: duckdb.DuckDBPyConnection, table_name: str
+    ) -> Optional[str]:
+        """把表的暂存数据载入元数据库中的 _staged_<表名> 表
+
+        DuckDB 不能直接读取 Arrow IPC 文件，暂存数据在每次同步时物化为库内的表，
+        由视图与基础层的 Parquet 文件合并。
+
+        Returns:
+            Optional[str]: 暂存表名，表没有暂存数据时为 None (并删除旧的暂存表)
+        """
+        staged_name = f"_staged_{table_name}"
+        staged = self.staging_log.read(table_name) if self.staging_log else None
+        if staged is None:
+            con.execute(f"DROP TABLE IF EXISTS {staged_name}")
+            return None
+        con.register("staged_arrow", staged)
+        try:
+            con.execute(
+                f"CREATE OR REPLACE TABLE {staged_name} AS SELECT * FROM staged_arrow"
+            )
+        finally:
+            con.unregister("staged_arrow")
+        return staged_name
+
+    def _table_exists(self, con: duckdb.DuckDBPyConnection, table_name: str) -> bool:
+        """检查元数据库中的表是否存在。"""
+        try:
+            res = con.execute(
+                "SELECT 1 FROM duckdb_tables() WHERE table_name = ?", [table_name]
+            ).fetchone()
+            return res is not None
+        except duckdb.Error:
+            return False
+
+    @staticmethod
+    def _view_sql(
+        table_name: str, base_select: str, staged_name: Optional[str], order_by: str
+    ) -> str:
+        """生成视图 SQL，有暂存数据时与基础层按列名合并"""
+        if staged_name:
+            staged_select = f"SELECT * FROM {staged_name}"
+            source = (
+                f"{base_select} UNION ALL BY NAME {staged_select}"
+                if base_select
+                else staged_select
+            )
+        else:
+            source = base_select
+        return f"CREATE OR REPLACE VIEW {table_name} AS {source} {order_by};"
+
     def sync(self, force_full_scan: bool = False, mtime_check_minutes: int = 60):
         """
         执行混合模型的同步。
@@ -343,6 +403,8 @@ class MetadataSyncManager:
             mtime_check_minutes (int): mtime 检查窗口，0 表示禁用。
         """
         table_names = [p.name for p in self.parquet_path.iterdir() if p.is_dir()]
+        staged_tables = set(self.staging_log.tables()) if self.staging_log else set()
+        table_names += sorted(staged_tables - set(table_names))
         if not table_names:
             print(f"警告：在 '{self.parquet_path}' 目录下未找到任何数据表子目录。")
             return
@@ -365,6 +427,15 @@ class MetadataSyncManager:
                     # 获取文件信息（优化版本）
                     file_info = self._quick_table_check(table_name, mtime_check_minutes)
 
+                    # 有暂存数据 (或上次同步时有) 的表每次都重建视图
+                    staged_name = None
+                    has_staging = table_name in staged_tables or self._table_exists(
+                        con, f"_staged_{table_name}"
+                    )
+                    if has_staging:
+                        staged_name = self._sync_staging(con, table_name)
+                        file_info["has_changes"] = True
+
                     # --- 快速扫描模式 ---
                     if not force_full_scan and mtime_check_minutes > 0:
                         if not file_info["has_changes"]:
@@ -387,12 +458,20 @@ class MetadataSyncManager:
 
                     if not physical_partitions:
                         table_dir = self.parquet_path / table_name
-                        if any(table_dir.glob("*.parquet*")):
+                        has_files = any(table_dir.glob("*.parquet*"))
+                        if has_files or staged_name:
                             print(
                                 f"  -> 正在为未分区表 '{table_name}' 创建/更新视图..."
                             )
                             glob_pattern = f"{table_dir}/*.parquet"
-                            sql = f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM read_parquet('{glob_pattern}') {order_by_clause};"
+                            base_select = (
+                                f"SELECT * FROM read_parquet('{glob_pattern}')"
+                                if has_files
+                                else ""
+                            )
+                            sql = self._view_sql(
+                                table_name, base_select, staged_name, order_by_clause
+                            )
                             con.execute(sql)
 
                             # 获取同步后的统计信息
@@ -463,11 +542,13 @@ class MetadataSyncManager:
 
                         partition_paths_str = ", ".join(partition_paths)
 
-                        sql = f"""
-                        CREATE OR REPLACE VIEW {table_name} AS
-                        SELECT * FROM read_parquet([{partition_paths_str}], union_by_name=true)
-                        {order_by_clause}; 
-                        """
+                        base_select = (
+                            f"SELECT * FROM read_parquet("
+                            f"[{partition_paths_str}], union_by_name=true)"
+                        )
+                        sql = self._view_sql(
+                            table_name, base_select, staged_name, order_by_clause
+                        )
                         con.execute(sql)
 
                         # 获取同步后的统计信息
@@ -0,0 +1,330 @@
+"""任务执行指标
+
+将每个任务的下载耗时、行数、负载大小、限流等待、写入耗时、文件数和进程峰值内存记录到
+本地 SQLite 指标表，并汇总为按表统计的运行报告 (`neo stats`)。
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STAGE_DOWNLOAD = "download"
+STAGE_WRITE = "write"
+
+
+@dataclass
+class TableStats:
+    """单个表在一次统计范围内的汇总指标"""
+
+    task_type: str
+    tasks: int
+    failed: int
+    rows: int
+    payload_mb: float
+    rows_per_second: float
+    tasks_per_minute: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    rate_limit_wait_avg: float
+    quota_utilization: Optional[float]
+    write_p50: Optional[float] = None
+    write_p95: Optional[float] = None
+    files: int = 0
+    peak_rss_mb: Optional[float] = None
+
+
+@dataclass
+class TaskProfile:
+    """任务类型最近一段时间的单任务平均表现，供试运行估算使用"""
+
+    samples: int
+    rows_per_task: float
+    bytes_per_task: float
+    latency_seconds: float
+
+
+@dataclass
+class StatsReport:
+    """运行报告"""
+
+    run_id: Optional[str]
+    tables: List[TableStats] = field(default_factory=list)
+    slowest: List[Dict] = field(default_factory=list)
+
+
+class MetricsStore:
+    """基于 SQLite 的任务执行指标表"""
+
+    def __init__(self, db_path: str = "data/metrics.db", enabled: bool = True):
+        """初始化指标表
+
+        Args:
+            db_path: 指标 SQLite 文件路径
+            enabled: 是否记录指标
+        """
+        self.db_path = db_path
+        self.enabled = enabled
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开指标表连接，首次使用时建表"""
+        if not self._initialized:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS task_metrics (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        run_id TEXT,
+                        stage TEXT NOT NULL,
+                        task_type TEXT NOT NULL,
+                        symbol TEXT NOT NULL,
+                        finished_at REAL NOT NULL,
+                        duration_seconds REAL NOT NULL,
+                        rows INTEGER NOT NULL DEFAULT 0,
+                        payload_bytes INTEGER NOT NULL DEFAULT 0,
+                        rate_limit_wait_seconds REAL NOT NULL DEFAULT 0,
+                        file_count INTEGER NOT NULL DEFAULT 0,
+                        success INTEGER NOT NULL DEFAULT 1,
+                        peak_rss_bytes INTEGER NOT NULL DEFAULT 0
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_task_metrics_run
+                        ON task_metrics (run_id);
+                    CREATE INDEX IF NOT EXISTS idx_task_metrics_type
+                        ON task_metrics (stage, task_type, id);
+                    """
+                )
+                self._migrate(conn)
+                self._initialized = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """为旧版本创建的指标表补齐新增列"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(task_metrics)")}
+        if "peak_rss_bytes" not in columns:
+            conn.execute(
+                "ALTER TABLE task_metrics "
+                "ADD COLUMN peak_rss_bytes INTEGER NOT NULL DEFAULT 0"
+            )
+
+    def record(
+        self,
+        stage: str,
+        task_type: str,
+        symbol: str,
+        duration_seconds: float,
+        rows: int = 0,
+        payload_bytes: int = 0,
+        rate_limit_wait_seconds: float = 0.0,
+        file_count: int = 0,
+        success: bool = True,
+        run_id: Optional[str] = None,
+        peak_rss_bytes: int = 0,
+    ) -> None:
+        """记录一条任务指标
+
+        指标记录失败不影响任务本身，只记录警告日志。
+        """
+        if not self.enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO task_metrics (run_id, stage, task_type, symbol, "
+                    "finished_at, duration_seconds, rows, payload_bytes, "
+                    "rate_limit_wait_seconds, file_count, success, peak_rss_bytes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        stage,
+                        task_type,
+                        symbol,
+                        time.time(),
+                        float(duration_seconds),
+                        int(rows),
+                        int(payload_bytes),
+                        float(rate_limit_wait_seconds),
+                        int(file_count),
+                        int(bool(success)),
+                        int(peak_rss_bytes),
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 记录任务指标失败: {task_type}/{symbol}, 错误: {e}")
+
+    def mean_latency(self, task_type: str, window: int = 200) -> Optional[float]:
+        """任务类型最近 window 次成功下载的平均耗时 (秒)，不含限流等待
+
+        供加权公平调度器作为观测耗时使用，没有数据时返回 None。
+        """
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT AVG(duration_seconds - rate_limit_wait_seconds) FROM ("
+                "SELECT duration_seconds, rate_limit_wait_seconds FROM task_metrics "
+                "WHERE stage = ? AND task_type = ? AND success = 1 "
+                "ORDER BY id DESC LIMIT ?)",
+                (STAGE_DOWNLOAD, task_type, window),
+            ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def task_profile(self, task_type: str, window: int = 200) -> Optional[TaskProfile]:
+        """任务类型最近 window 次成功下载的平均行数、负载大小和耗时
+
+        空数据的任务也计入平均值，与实际规划中增量任务多数返回少量数据的情况一致。
+        没有数据时返回 None。
+        """
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), AVG(rows), AVG(payload_bytes), "
+                "AVG(duration_seconds - rate_limit_wait_seconds) FROM ("
+                "SELECT rows, payload_bytes, duration_seconds, rate_limit_wait_seconds "
+                "FROM task_metrics WHERE stage = ? AND task_type = ? AND success = 1 "
+                "ORDER BY id DESC LIMIT ?)",
+                (STAGE_DOWNLOAD, task_type, window),
+            ).fetchone()
+        if not row or not row[0]:
+            return None
+        return TaskProfile(
+            samples=int(row[0]),
+            rows_per_task=float(row[1] or 0),
+            bytes_per_task=float(row[2] or 0),
+            latency_seconds=float(row[3] or 0),
+        )
+
+    def latest_run_id(self) -> Optional[str]:
+        """最近一次有指标记录的运行 ID"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT run_id FROM task_metrics WHERE run_id IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def read_since(self, last_id: int = 0, limit: int = 10000) -> List[Dict]:
+        """增量读取 id 大于 last_id 的指标记录 (按 id 升序)
+
+        Args:
+            last_id: 上次读取到的最大记录 id
+            limit: 单次最多读取的记录数
+
+        Returns:
+            List[Dict]: 指标记录，调用方以最后一条的 id 作为下次读取的游标
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM task_metrics WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load(self, run_id: Optional[str] = None) -> pd.DataFrame:
+        """读取指标记录
+
+        Args:
+            run_id: 运行 ID，为 None 时读取全部记录
+        """
+        query = "SELECT * FROM task_metrics"
+        params: tuple = ()
+        if run_id is not None:
+            query += " WHERE run_id = ?"
+            params = (run_id,)
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def build_report(
+        self,
+        run_id: Optional[str] = None,
+        rate_limit_of: Optional[Callable[[str], float]] = None,
+        top_n: int = 10,
+    ) -> StatsReport:
+        """汇总运行报告
+
+        Args:
+            run_id: 运行 ID，为 None 时汇总全部记录
+            rate_limit_of: 返回任务类型每分钟配额的回调，用于计算配额利用率
+            top_n: 最慢股票的数量
+
+        Returns:
+            StatsReport: 按表汇总的指标与最慢的股票
+        """
+        report = StatsReport(run_id=run_id)
+        df = self.load(run_id)
+        if df.empty:
+            return report
+
+        downloads = df[df["stage"] == STAGE_DOWNLOAD]
+        writes = df[df["stage"] == STAGE_WRITE]
+
+        for task_type, group in downloads.groupby("task_type"):
+            ok = group[group["success"] == 1]
+            latency = ok["duration_seconds"]
+            # 墙钟时间：从第一个任务开始到最后一个任务结束
+            started = (group["finished_at"] - group["duration_seconds"]).min()
+            span = max(group["finished_at"].max() - started, 1e-9)
+            tasks_per_minute = len(group) / span * 60
+
+            quota = rate_limit_of(task_type) if rate_limit_of else None
+            table_writes = writes[writes["task_type"] == task_type]
+            write_latency = table_writes["duration_seconds"]
+            has_writes = len(table_writes) > 0
+            report.tables.append(
+                TableStats(
+                    task_type=task_type,
+                    tasks=len(group),
+                    failed=int((group["success"] == 0).sum()),
+                    rows=int(group["rows"].sum()),
+                    payload_mb=float(group["payload_bytes"].sum()) / 1024 / 1024,
+                    rows_per_second=float(group["rows"].sum()) / span,
+                    tasks_per_minute=tasks_per_minute,
+                    latency_p50=_quantile(latency, 0.50),
+                    latency_p95=_quantile(latency, 0.95),
+                    latency_p99=_quantile(latency, 0.99),
+                    rate_limit_wait_avg=float(group["rate_limit_wait_seconds"].mean()),
+                    quota_utilization=tasks_per_minute / quota if quota else None,
+                    write_p50=_quantile(write_latency, 0.50) if has_writes else None,
+                    write_p95=_quantile(write_latency, 0.95) if has_writes else None,
+                    files=int(table_writes["file_count"].sum()),
+                    peak_rss_mb=(
+                        float(table_writes["peak_rss_bytes"].max()) / 1024 / 1024
+                        if has_writes
+                        else None
+                    ),
+                )
+            )
+
+        slowest = downloads.nlargest(top_n, "duration_seconds")
+        columns = [
+            "task_type",
+            "symbol",
+            "duration_seconds",
+            "rows",
+            "rate_limit_wait_seconds",
+        ]
+        report.slowest = slowest[columns].to_dict("records")
+        return report
+
+
+def _quantile(series: pd.Series, q: float) -> float:
+    return float(series.quantile(q)) if len(series) else 0.0
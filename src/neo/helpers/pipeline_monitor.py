@@ -0,0 +1,322 @@
+"""流水线实时监控
+
+`neo monitor` 的数据来源：
+
+- 任务执行指标表 (MetricsStore) 按 id 游标增量读取，在滑动窗口内计算每个
+  任务类型的 行/秒、调用/秒、限流余量，以及写入耗时和快速→慢速的滞后；
+- 三个队列的 SQLite 文件各保持一个只读连接，每次刷新只执行计数查询，
+  不再关闭/重建 Huey 的存储连接。
+"""
+
+import sqlite3
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from rich.table import Table
+
+from .metrics_store import STAGE_DOWNLOAD, STAGE_WRITE, MetricsStore
+
+# 已下载但尚未看到写入记录的任务最多保留的数量，避免内存无限增长
+_MAX_PENDING_WRITES = 100_000
+
+
+@dataclass
+class QueueDepth:
+    """单个队列的任务数"""
+
+    pending: int = 0
+    scheduled: int = 0
+
+
+@dataclass
+class TaskTypeThroughput:
+    """单个任务类型在滑动窗口内的吞吐"""
+
+    task_type: str
+    rows_per_second: float
+    calls_per_second: float
+    calls_last_minute: int
+    quota_per_minute: Optional[float]
+
+    @property
+    def headroom(self) -> Optional[float]:
+        """当前一分钟内剩余的限流配额占比"""
+        if not self.quota_per_minute:
+            return None
+        return max(0.0, 1 - self.calls_last_minute / self.quota_per_minute)
+
+
+@dataclass
+class MonitorSnapshot:
+    """一次刷新的监控快照"""
+
+    queues: Dict[str, QueueDepth] = field(default_factory=dict)
+    throughput: List[TaskTypeThroughput] = field(default_factory=list)
+    write_p50: Optional[float] = None
+    write_p95: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    lag_seconds: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    elapsed_seconds: float = 0.0
+
+
+class QueueDepthReader:
+    """为每个队列的 SQLite 文件保持一个只读连接，读取任务数"""
+
+    def __init__(self, paths: Dict[str, str]):
+        """初始化读取器
+
+        Args:
+            paths: 队列名称到 SQLite 文件路径的映射
+        """
+        self.paths = dict(paths)
+        self._connections: Dict[str, sqlite3.Connection] = {}
+
+    def _connection(self, name: str) -> Optional[sqlite3.Connection]:
+        conn = self._connections.get(name)
+        if conn is None:
+            path = Path(self.paths[name])
+            if not path.exists():
+                return None
+            # 自动提交模式下每条查询都读取最新的 WAL 快照，无需重新打开连接
+            conn = sqlite3.connect(
+                f"{path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._connections[name] = conn
+        return conn
+
+    def read(self) -> Dict[str, QueueDepth]:
+        """读取所有队列的等待与计划任务数"""
+        depths = {}
+        for name in self.paths:
+            conn = self._connection(name)
+            if conn is None:
+                depths[name] = QueueDepth()
+                continue
+            try:
+                pending = conn.execute("SELECT COUNT(*) FROM task").fetchone()[0]
+                scheduled = conn.execute("SELECT COUNT(*) FROM schedule").fetchone()[0]
+            except sqlite3.OperationalError:
+                # 队列数据库尚未建表
+                pending, scheduled = 0, 0
+            depths[name] = QueueDepth(pending=pending, scheduled=scheduled)
+        return depths
+
+    def close(self) -> None:
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+
+class PipelineMonitor:
+    """基于指标表增量读取的流水线监控"""
+
+    def __init__(
+        self,
+        metrics_store: MetricsStore,
+        queue_reader: QueueDepthReader,
+        rate_limit_of: Optional[Callable[[str], float]] = None,
+        window_seconds: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """初始化监控
+
+        Args:
+            metrics_store: 任务执行指标表
+            queue_reader: 队列任务数读取器
+            rate_limit_of: 返回任务类型每分钟配额的回调
+            window_seconds: 计算速率的滑动窗口长度 (秒)
+            clock: 时钟函数，便于测试
+        """
+        self.metrics_store = metrics_store
+        self.queue_reader = queue_reader
+        self.rate_limit_of = rate_limit_of
+        self.window_seconds = float(window_seconds)
+        self._clock = clock
+        self._cursor = 0
+        self._window: Deque[Dict] = deque()
+        self._lags: Deque[Tuple[float, float]] = deque()
+        self._downloaded_at: Dict[Tuple, float] = {}
+        self._started = clock()
+
+    def _ingest(self, rows: List[Dict]) -> None:
+        for row in rows:
+            self._cursor = row["id"]
+            self._window.append(row)
+            key = (row["run_id"], row["task_type"], row["symbol"])
+            if row["stage"] == STAGE_DOWNLOAD and row["success"]:
+                if len(self._downloaded_at) >= _MAX_PENDING_WRITES:
+                    self._downloaded_at.pop(next(iter(self._downloaded_at)))
+                self._downloaded_at[key] = row["finished_at"]
+            elif row["stage"] == STAGE_WRITE:
+                downloaded_at = self._downloaded_at.pop(key, None)
+                if downloaded_at is not None:
+                    self._lags.append(
+                        (row["finished_at"], row["finished_at"] - downloaded_at)
+                    )
+
+    def _expire(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._window and self._window[0]["finished_at"] < horizon:
+            self._window.popleft()
+        while self._lags and self._lags[0][0] < horizon:
+            self._lags.popleft()
+
+    def poll(self) -> MonitorSnapshot:
+        """增量读取新的指标记录并生成监控快照"""
+        while True:
+            rows = self.metrics_store.read_since(self._cursor)
+            if not rows:
+                break
+            self._ingest(rows)
+
+        now = self._clock()
+        self._expire(now)
+        # 监控刚启动时窗口尚未填满，按实际覆盖的时长计算速率
+        span = max(min(self.window_seconds, now - self._started), 1.0)
+
+        downloads: Dict[str, List[Dict]] = {}
+        write_latency: List[float] = []
+        peak_rss = 0
+        for row in self._window:
+            if row["stage"] == STAGE_DOWNLOAD:
+                downloads.setdefault(row["task_type"], []).append(row)
+            elif row["stage"] == STAGE_WRITE:
+                write_latency.append(row["duration_seconds"])
+                peak_rss = max(peak_rss, row.get("peak_rss_bytes") or 0)
+
+        snapshot = MonitorSnapshot(
+            queues=self.queue_reader.read(), elapsed_seconds=now - self._started
+        )
+        for task_type in sorted(downloads):
+            rows = downloads[task_type]
+            snapshot.throughput.append(
+                TaskTypeThroughput(
+                    task_type=task_type,
+                    rows_per_second=sum(row["rows"] for row in rows) / span,
+                    calls_per_second=len(rows) / span,
+                    calls_last_minute=sum(
+                        1 for row in rows if row["finished_at"] >= now - 60
+                    ),
+                    quota_per_minute=(
+                        self.rate_limit_of(task_type) if self.rate_limit_of else None
+                    ),
+                )
+            )
+
+        if write_latency:
+            snapshot.write_p50 = _percentile(write_latency, 0.50)
+            snapshot.write_p95 = _percentile(write_latency, 0.95)
+        if peak_rss:
+            snapshot.peak_rss_mb = peak_rss / 1024 / 1024
+        if self._lags:
+            snapshot.lag_seconds = sum(lag for _, lag in self._lags) / len(self._lags)
+        download_rate = sum(len(rows) for rows in downloads.values()) / span
+        snapshot.eta_seconds = self._estimate_eta(
+            snapshot, download_rate=download_rate, write_rate=len(write_latency) / span
+        )
+        return snapshot
+
+    @staticmethod
+    def _estimate_eta(
+        snapshot: MonitorSnapshot, download_rate: float, write_rate: float
+    ) -> Optional[float]:
+        """估算剩余时间：取下载剩余任务与写入剩余任务中较慢的一方"""
+        # 快速队列可能有多个分片 ('fast', 'fast#1', ...)
+        to_download = sum(
+            depth.pending + depth.scheduled
+            for name, depth in snapshot.queues.items()
+            if name.split("#", 1)[0] == "fast"
+        )
+        slow = snapshot.queues.get("slow", QueueDepth())
+        to_write = to_download + slow.pending
+        if to_write == 0:
+            return 0.0
+        estimates = []
+        if to_download:
+            if download_rate <= 0:
+                return None
+            estimates.append(to_download / download_rate)
+        if write_rate <= 0:
+            return None
+        estimates.append(to_write / write_rate)
+        return max(estimates)
+
+    def close(self) -> None:
+        self.queue_reader.close()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """格式化时间显示"""
+    if seconds is None or seconds < 0:
+        return "未知"
+    if seconds < 60:
+        return f"{seconds:.0f}秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}分钟"
+    return f"{seconds / 3600:.1f}小时"
+
+
+def format_pressure(backpressure) -> str:
+    """格式化慢速队列的背压状态"""
+    pressure = backpressure.sample(force=True)
+    size_mb = pressure.payload_bytes / 1024 / 1024
+    high_mb = backpressure.high_bytes / 1024 / 1024
+    state = "[bold red]暂停下载[/bold red]" if pressure.paused else "[green]正常[/green]"
+    return (
+        f"{state} ({pressure.depth}/{backpressure.high_depth} 任务, "
+        f"{size_mb:.1f}/{high_mb:.0f} MB)"
+    )
+
+
+def build_monitor_table(snapshot: MonitorSnapshot, pressure: str = "") -> Table:
+    """将监控快照渲染为 Rich 表格"""
+    table = Table(title="流水线实时监控")
+    table.add_column("指标", justify="right", style="cyan", no_wrap=True)
+    names = list(snapshot.queues)
+    for name in names:
+        table.add_column(name, style="magenta")
+
+    table.add_row("等待中的任务数", *(str(snapshot.queues[n].pending) for n in names))
+    table.add_row("计划中的任务数", *(str(snapshot.queues[n].scheduled) for n in names))
+    if pressure:
+        table.add_row("背压状态", pressure)
+
+    table.add_section()
+    for item in snapshot.throughput:
+        headroom = f"{item.headroom:.0%}" if item.headroom is not None else "-"
+        table.add_row(
+            item.task_type,
+            f"{item.rows_per_second:.1f} 行/秒",
+            f"{item.calls_per_second:.2f} 调用/秒",
+            f"限流余量 {headroom}",
+        )
+
+    table.add_section()
+    write = (
+        f"p50 {snapshot.write_p50:.2f}s / p95 {snapshot.write_p95:.2f}s"
+        if snapshot.write_p50 is not None
+        else "-"
+    )
+    table.add_row("写入耗时", write)
+    peak_rss = (
+        f"{snapshot.peak_rss_mb:.0f} MB" if snapshot.peak_rss_mb is not None else "-"
+    )
+    table.add_row("写入峰值内存", peak_rss)
+    table.add_row("快速→慢速滞后", format_duration(snapshot.lag_seconds))
+    table.add_row("预计剩余时间", format_duration(snapshot.eta_seconds))
+    table.add_row("已运行时间", format_duration(snapshot.elapsed_seconds))
+    return table
@@ -3,9 +3,12 @@
 负责管理pyrate-limiter实例的生命周期。"""
 
 import logging
+import sqlite3
 import threading
+import time
+from pathlib import Path
 from typing import Dict, Optional
-from pyrate_limiter import Limiter, InMemoryBucket, Rate, Duration
+from pyrate_limiter import Limiter, InMemoryBucket, Rate, Duration, SQLiteBucket
 
 from neo.configs.app_config import get_config
 from .interfaces import IRateLimitManager
@@ -13,6 +16,42 @@ from .interfaces import IRateLimitManager
 logger = logging.getLogger(__name__)
 
 
+class SharedSQLiteBucket(SQLiteBucket):
+    """多进程共享的 SQLite 令牌桶
+
+    SQLiteBucket 先计数再插入，两步之间没有跨进程的锁。这里在
+    `BEGIN IMMEDIATE` 事务中执行整个 put，由 SQLite 的写锁保证同一主机上
+    多个消费者进程 (如快速队列的多个分片) 共享同一份配额而不会超发。
+    """
+
+    @classmethod
+    def open(cls, rates, db_path: str, table: str) -> "SharedSQLiteBucket":
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS '{table}' (name VARCHAR, item_timestamp INTEGER)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS 'idx_{table}_rate_item_timestamp' "
+            f"ON '{table}' (item_timestamp)"
+        )
+        return cls(rates, conn, table=table)
+
+    def put(self, item) -> bool:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                return super().put(item)
+            finally:
+                # put 失败时不会提交，回滚以释放写锁
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+
+
 class RateLimitManager(IRateLimitManager):
     """速率限制管理器实现
 
@@ -40,6 +79,7 @@ class RateLimitManager(IRateLimitManager):
         """初始化速率限制管理器"""
         self.config = get_config()
         self.rate_limiters: Dict[str, Limiter] = {}  # 按需创建的速率限制器缓存
+        self._wait_local = threading.local()  # 每个线程累计的限流等待时间
 
     def get_limiter(self, task_type: str) -> Limiter:
         """获取指定任务类型的速率限制器
@@ -57,7 +97,7 @@ class RateLimitManager(IRateLimitManager):
 
             # 为每个任务类型创建独立的速率限制器
             self.rate_limiters[task_key] = Limiter(
-                InMemoryBucket([Rate(rate_limit, Duration.MINUTE)]),
+                self._create_bucket(task_key, [Rate(rate_limit, Duration.MINUTE)]),
                 raise_when_fail=False,
                 max_delay=Duration.MINUTE * 2,
             )
@@ -67,6 +107,32 @@ class RateLimitManager(IRateLimitManager):
 
         return self.rate_limiters[task_key]
 
+    def get_shared_bucket_path(self) -> Optional[str]:
+        """跨进程共享配额的 SQLite 文件路径，不共享时返回 None
+
+        `rate_limit.backend` 为 "sqlite" 时共享；为 "auto" (默认) 时，
+        快速队列分片数大于 1 即共享，保证多个分片消费者进程使用同一份配额。
+        """
+        rate_limit_config = self.config.get("rate_limit", {}) or {}
+        backend = rate_limit_config.get("backend", "auto")
+        if backend == "auto":
+            from ..configs.huey_config import FAST_SHARD_COUNT
+
+            shared = FAST_SHARD_COUNT > 1
+        else:
+            shared = backend == "sqlite"
+        if not shared:
+            return None
+        return rate_limit_config.get("path", "data/rate_limit.sqlite")
+
+    def _create_bucket(self, task_key: str, rates):
+        """创建任务类型的令牌桶：进程内存或跨进程共享的 SQLite"""
+        db_path = self.get_shared_bucket_path()
+        if db_path is None:
+            return InMemoryBucket(rates)
+        logger.debug(f"Using shared SQLite bucket {db_path} for task {task_key}")
+        return SharedSQLiteBucket.open(rates, db_path, table=f"rate_{task_key}")
+
     def apply_rate_limiting(self, task_type: str) -> None:
         """对指定任务类型应用速率限制
 
@@ -75,7 +141,20 @@ class RateLimitManager(IRateLimitManager):
         """
         logger.debug(f"Rate limiting check for task: {task_type}")
         rate_limiter = self.get_limiter(task_type)
+        start = time.monotonic()
         rate_limiter.try_acquire(str(task_type), 1)
+        waited = time.monotonic() - start
+        self._wait_local.seconds = getattr(self._wait_local, "seconds", 0.0) + waited
+
+    def pop_wait_seconds(self) -> float:
+        """取出并清零当前线程累计的限流等待时间
+
+        Returns:
+            float: 自上次调用以来，当前线程在速率限制器上等待的秒数
+        """
+        waited = getattr(self._wait_local, "seconds", 0.0)
+        self._wait_local.seconds = 0.0
+        return waited
 
     def get_rate_limit_config(self, task_type: str) -> int:
         """获取指定任务类型的速率限制配置
@@ -0,0 +1,209 @@
+"""运行清单
+
+记录每次下载运行中每个计划任务的状态 (planned → downloaded → written)，
+使慢速消费者崩溃后可以通过 `neo resume <run-id>` 只继续未完成的任务，
+无需重新规划 (不再对整个数据湖执行 get_max_date 扫描)。
+"""
+
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .task_registry import make_task_key
+
+logger = logging.getLogger(__name__)
+
+STATE_PLANNED = "planned"
+STATE_DOWNLOADED = "downloaded"
+STATE_WRITTEN = "written"
+STATE_EMPTY = "empty"
+STATE_FAILED = "failed"
+# 已被合并到同一股票更早 start_date 的任务中，由那个任务完成下载
+STATE_SUPERSEDED = "superseded"
+
+# 需要在恢复运行时重新派发的状态
+UNFINISHED_STATES = (STATE_PLANNED, STATE_DOWNLOADED, STATE_FAILED)
+
+# 不属于下载参数的调度字段
+_SCHEDULING_KEYS = ("task_type", "symbol", "priority", "run_id")
+
+
+def new_run_id() -> str:
+    """生成新的运行 ID"""
+    return uuid.uuid4().hex
+
+
+class RunManifest:
+    """基于 SQLite 的运行清单"""
+
+    def __init__(self, db_path: str = "data/run_manifest.db"):
+        """初始化运行清单
+
+        Args:
+            db_path: 清单 SQLite 文件路径
+        """
+        self.db_path = db_path
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开清单连接，首次使用时建表"""
+        if not self._initialized:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS runs (
+                        run_id TEXT PRIMARY KEY,
+                        task_types TEXT NOT NULL,
+                        lane TEXT,
+                        created_at REAL NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS run_tasks (
+                        run_id TEXT NOT NULL,
+                        task_key TEXT NOT NULL,
+                        task_type TEXT NOT NULL,
+                        symbol TEXT NOT NULL,
+                        params TEXT NOT NULL,
+                        state TEXT NOT NULL,
+                        updated_at REAL NOT NULL,
+                        PRIMARY KEY (run_id, task_key)
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_run_tasks_state
+                        ON run_tasks (run_id, state);
+                    """
+                )
+                self._initialized = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def task_key_for(params: Dict[str, Any]) -> str:
+        """根据任务参数计算任务键 (与 download_task 中的计算方式一致)"""
+        extra = {k: v for k, v in params.items() if k not in _SCHEDULING_KEYS}
+        return make_task_key(params["task_type"], params["symbol"], **extra)
+
+    def create_run(
+        self, run_id: str, task_types: Iterable[str], lane: Optional[str] = None
+    ) -> str:
+        """登记一次运行 (已存在时保持不变)"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, task_types, lane, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (run_id, json.dumps(list(task_types)), lane, time.time()),
+            )
+        return run_id
+
+    def record_planned(self, run_id: str, params_list: List[Dict[str, Any]]) -> None:
+        """在单个事务中登记一批计划任务"""
+        if not params_list:
+            return
+        now = time.time()
+        rows = []
+        for params in params_list:
+            download_params = {
+                k: v for k, v in params.items() if k not in ("priority", "run_id")
+            }
+            rows.append(
+                (
+                    run_id,
+                    self.task_key_for(params),
+                    params["task_type"],
+                    params["symbol"],
+                    json.dumps(download_params, ensure_ascii=False),
+                    STATE_PLANNED,
+                    now,
+                )
+            )
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO run_tasks "
+                "(run_id, task_key, task_type, symbol, params, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+
+    def track(
+        self,
+        run_id: str,
+        params_iter: Iterable[Dict[str, Any]],
+        batch_size: int = 500,
+    ) -> Iterator[Dict[str, Any]]:
+        """流式地登记计划任务，并为每个任务附加 run_id
+
+        Yields:
+            Dict[str, Any]: 附加了 run_id 的任务参数
+        """
+        iterator = iter(params_iter)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            self.record_planned(run_id, batch)
+            for params in batch:
+                yield {**params, "run_id": run_id}
+
+    def mark(self, run_id: str, task_key: str, state: str) -> None:
+        """更新任务状态"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE run_tasks SET state = ?, updated_at = ? "
+                "WHERE run_id = ? AND task_key = ?",
+                (state, time.time(), run_id, task_key),
+            )
+
+    def mark_many(self, run_id: str, task_keys: Iterable[str], state: str) -> None:
+        """在单个事务中更新一批任务的状态"""
+        now = time.time()
+        rows = [(state, now, run_id, task_key) for task_key in task_keys]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE run_tasks SET state = ?, updated_at = ? "
+                "WHERE run_id = ? AND task_key = ?",
+                rows,
+            )
+            conn.execute("COMMIT")
+
+    def run_exists(self, run_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return row is not None
+
+    def unfinished(self, run_id: str) -> List[Dict[str, Any]]:
+        """返回运行中尚未完成 (计划/已下载未写入/失败) 的任务参数"""
+        placeholders = ", ".join("?" for _ in UNFINISHED_STATES)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT params FROM run_tasks WHERE run_id = ? "
+                f"AND state IN ({placeholders}) ORDER BY rowid",
+                (run_id, *UNFINISHED_STATES),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def summary(self, run_id: str) -> Dict[str, int]:
+        """按状态统计运行中的任务数"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT state, COUNT(*) FROM run_tasks WHERE run_id = ? GROUP BY state",
+                (run_id,),
+            ).fetchall()
+        return {state: count for state, count in rows}
@@ -0,0 +1,47 @@
+"""快速队列分片路由
+
+所有下载任务共用一个 `tasks_fast.db` 时，worker 越多 SQLite 写锁竞争越激烈。
+按股票代码一致性哈希到 N 个分片 (各自独立的 SQLite 文件)，每个分片由
+独立的消费者进程处理：
+
+- 同一只股票的任务总是落在同一个分片，分片之间没有共享的队列文件；
+- 调整分片数时只有约 1/N 的股票需要迁移到新分片；
+- 哈希使用 md5，不受 Python 进程级哈希随机化影响，规划进程和消费者进程结果一致。
+"""
+
+import bisect
+import hashlib
+from typing import List, Tuple
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """股票代码到分片编号的一致性哈希环"""
+
+    def __init__(self, shard_count: int, replicas: int = 64):
+        """初始化哈希环
+
+        Args:
+            shard_count: 分片数
+            replicas: 每个分片在环上的虚拟节点数，越多分布越均匀
+        """
+        if shard_count < 1:
+            raise ValueError("分片数必须大于 0")
+        self.shard_count = shard_count
+        points: List[Tuple[int, int]] = sorted(
+            (_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shard_count)
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, symbol: str) -> int:
+        """返回股票代码所属的分片编号"""
+        if self.shard_count == 1:
+            return 0
+        index = bisect.bisect(self._keys, _hash(symbol)) % len(self._keys)
+        return self._shards[index]
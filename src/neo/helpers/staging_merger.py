@@ -0,0 +1,208 @@
+"""暂存日志合并
+
+维护队列定期运行的合并任务：把暂存日志中的 Arrow IPC 段合并进基础层的对应分区。
+每个分区的合并步骤：
+
+1. 持有分区租约，读取分区中现有的 Parquet 文件与该分区的全部暂存段；
+2. 按主键去重 (后写入的行覆盖先写入的行，暂存段总是晚于基础层)，按主键排序；
+3. 写为一个新的 Parquet 文件 (先写临时文件再原子重命名)，随后删除旧文件和已合并的段。
+
+任一步骤中断都不会丢数据：新文件写出后、旧文件删除前中断时，下次合并会把新旧文件
+一起重新去重；旧文件删除后、段删除前中断时，这些段会被再次合并并去重掉。
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..database.interfaces import ISchemaLoader
+from ..writers.staging_parquet_writer import StagingLog
+
+if TYPE_CHECKING:
+    from ..writers.arrow_schema import ArrowSchemaCompiler
+    from .lease_manager import LeaseManager
+
+logger = logging.getLogger(__name__)
+
+_SEQ_COLUMN = "__staging_seq"
+
+
+@dataclass
+class MergeResult:
+    """一个分区的合并结果"""
+
+    task_type: str
+    partition: str
+    segments: int
+    base_files: int
+    rows: int
+    duplicates: int
+
+
+class StagingMerger:
+    """把暂存日志合并进基础层，每个分区重写为一个去重、排序的 Parquet 文件"""
+
+    def __init__(
+        self,
+        base_path: str,
+        staging_path: str = "data/staging",
+        schema_loader: Optional[ISchemaLoader] = None,
+        lease_manager: Optional["LeaseManager"] = None,
+        schema_compiler: Optional["ArrowSchemaCompiler"] = None,
+    ):
+        """初始化合并器
+
+        Args:
+            base_path: 基础层 Parquet 数据根目录
+            staging_path: 暂存日志目录
+            schema_loader: schema 加载器，用于确定去重和排序的主键
+            lease_manager: 租约管理器，多节点共享数据目录时用于独占写入分区
+            schema_compiler: Arrow schema 编译器，合并时把新旧数据统一为表的固定类型
+        """
+        self.base_path = Path(base_path)
+        self.log = StagingLog(staging_path)
+        self.schema_loader = schema_loader
+        self.lease_manager = lease_manager
+        self.schema_compiler = schema_compiler
+        self._lock = threading.Lock()
+
+    def pending(self, task_type: Optional[str] = None) -> dict:
+        """各表待合并的段文件数"""
+        counts: dict = {}
+        for (table, _), segments in self.log.segments(task_type).items():
+            counts[table] = counts.get(table, 0) + len(segments)
+        return counts
+
+    def merge(self, task_type: Optional[str] = None) -> List[MergeResult]:
+        """合并暂存段
+
+        Args:
+            task_type: 只合并指定表，为 None 时合并所有有暂存段的表
+
+        Returns:
+            List[MergeResult]: 每个合并成功的分区一条结果；合并失败的分区保留暂存段，
+            等待下次合并
+        """
+        results: List[MergeResult] = []
+        with self._lock:
+            for (table, partition), segments in sorted(
+                self.log.segments(task_type).items()
+            ):
+                try:
+                    results.append(self._merge_partition(table, partition, segments))
+                except Exception as e:
+                    logger.error(
+                        f"💥 合并暂存段到 {table}/{partition or '.'} 失败，"
+                        f"段文件保留待下次合并: {e}"
+                    )
+        if results:
+            logger.info(
+                f"🧱 已合并 {sum(r.segments for r in results)} 个暂存段到 "
+                f"{len(results)} 个分区，共 {sum(r.rows for r in results)} 行，"
+                f"去重 {sum(r.duplicates for r in results)} 行"
+            )
+        return results
+
+    def _merge_partition(
+        self, task_type: str, partition: str, segments: List[Path]
+    ) -> MergeResult:
+        """把一个分区的暂存段与现有文件合并为一个文件"""
+        started = time.perf_counter()
+        target_dir = self.base_path / task_type / partition
+        with self._hold_partition(task_type, partition):
+            base_files = (
+                sorted(target_dir.glob("*.parquet")) if target_dir.is_dir() else []
+            )
+            tables = [pq.ParquetFile(str(path)).read() for path in base_files]
+            staged = self.log.read_segments(segments)
+            if staged is not None:
+                tables.append(staged)
+            if self.schema_compiler is not None:
+                tables = [self.schema_compiler.conform(t, task_type) for t in tables]
+            combined = pa.concat_tables(
+                [table.replace_schema_metadata(None) for table in tables],
+                promote_options="permissive",
+            )
+            merged = self._dedup_and_sort(task_type, combined)
+
+            target_dir.mkdir(parents=True, exist_ok=True)
+            target_file = target_dir / f"part-0-merged-{uuid.uuid4().hex[:8]}.parquet"
+            tmp_file = target_dir / f".{target_file.name}.tmp"
+            pq.write_table(merged, str(tmp_file))
+            os.replace(tmp_file, target_file)
+            for path in base_files:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            self.log.remove(segments)
+
+        logger.debug(
+            f"🧱 {task_type}/{partition or '.'}: {len(base_files)} 个文件 + "
+            f"{len(segments)} 个暂存段合并为 {merged.num_rows} 行 "
+            f"({time.perf_counter() - started:.2f}s)"
+        )
+        return MergeResult(
+            task_type=task_type,
+            partition=partition,
+            segments=len(segments),
+            base_files=len(base_files),
+            rows=merged.num_rows,
+            duplicates=combined.num_rows - merged.num_rows,
+        )
+
+    def _dedup_and_sort(self, task_type: str, table: pa.Table) -> pa.Table:
+        """按主键去重 (保留最后写入的行) 并排序；没有主键时保持写入顺序"""
+        primary_key = self._primary_key(task_type, table.column_names)
+        table = table.append_column(
+            _SEQ_COLUMN, pa.array(np.arange(table.num_rows, dtype=np.int64))
+        )
+        conn = duckdb.connect(":memory:")
+        try:
+            conn.register("combined", table)
+            if primary_key:
+                keys = ", ".join(f'"{col}"' for col in primary_key)
+                sql = (
+                    f"SELECT * EXCLUDE ({_SEQ_COLUMN}) FROM combined "
+                    f"QUALIFY ROW_NUMBER() OVER ("
+                    f"PARTITION BY {keys} ORDER BY {_SEQ_COLUMN} DESC) = 1 "
+                    f"ORDER BY {keys}"
+                )
+            else:
+                sql = (
+                    f"SELECT * EXCLUDE ({_SEQ_COLUMN}) FROM combined "
+                    f"ORDER BY {_SEQ_COLUMN}"
+                )
+            return conn.execute(sql).fetch_arrow_table()
+        finally:
+            conn.close()
+
+    def _primary_key(self, task_type: str, columns: List[str]) -> List[str]:
+        """表的主键中存在于数据里的列 (分区列已由目录表示，不在文件中)"""
+        if self.schema_loader is None:
+            return []
+        try:
+            primary_key = self.schema_loader.load_schema(task_type).primary_key or []
+        except KeyError:
+            return []
+        return [col for col in primary_key if col in columns]
+
+    @contextmanager
+    def _hold_partition(self, task_type: str, partition: str) -> Iterator[None]:
+        """合并期间持有分区租约"""
+        if self.lease_manager is None:
+            yield
+            return
+        with self.lease_manager.hold_partition(task_type, partition):
+            yield
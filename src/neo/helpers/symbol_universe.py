@@ -0,0 +1,224 @@
+"""可交易股票池
+
+任务组的股票列表是 stock_basic 中所有通过交易所白名单的代码，规划时会为尚未上市、
+已经退市或在整个请求区间内停牌的股票生成注定返回空数据的下载任务，白白消耗接口额度。
+SymbolUniverse 结合三类信息判断某只股票在某个日期区间内能否有数据：
+
+- 上市日期：stock_basic.list_date，区间结束早于上市日的任务不可能有数据；
+- 退市日期：stock_basic.delist_date (存在该列时)，区间开始晚于退市日的任务不可能有数据；
+- 每日停复牌：suspend_d 中全天停牌 (suspend_timing 为空) 的交易日，区间内上市期间的
+  每个交易日都停牌时不可能有数据。
+
+只对按交易日产生数据的表 (日线、复权因子、每日指标) 做判断；财务报表等与交易无关的表
+不受停牌影响，不做过滤。信息缺失时一律视为可能有数据，宁可多下载也不漏下载。
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+import duckdb
+import numpy as np
+
+from .coverage_engine import table_fingerprint
+from .utils import normalize_stock_code
+
+if TYPE_CHECKING:
+    from .trading_calendar import TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+REASON_NOT_LISTED = "not_listed"
+REASON_DELISTED = "delisted"
+REASON_SUSPENDED = "suspended"
+
+REASON_LABELS = {
+    REASON_NOT_LISTED: "未上市",
+    REASON_DELISTED: "已退市",
+    REASON_SUSPENDED: "停牌",
+}
+
+# 没有退市日期时的上限
+_NEVER = 99999999
+
+
+class SymbolUniverse:
+    """按上市、退市和停牌信息判断股票在日期区间内能否有数据"""
+
+    def __init__(
+        self,
+        parquet_base_path: str = "data/parquet",
+        tables: Iterable[str] = ("stock_daily", "stock_adj_hfq", "daily_basic"),
+        suspend_table: str = "suspend_d",
+        exchange: str = "SSE",
+        enabled: bool = True,
+        trading_calendar: Optional["TradingCalendar"] = None,
+    ):
+        """初始化股票池
+
+        Args:
+            parquet_base_path: Parquet 数据根目录
+            tables: 按交易日产生数据、需要过滤的表
+            suspend_table: 每日停复牌信息表
+            exchange: 交易日历所用的交易所，未提供 trading_calendar 时使用
+            enabled: 是否启用过滤
+            trading_calendar: 共享的交易日历，未提供时按 exchange 单独加载
+        """
+        self.parquet_base_path = Path(parquet_base_path)
+        self.tables = set(tables or ())
+        self.suspend_table = suspend_table
+        self.exchange = exchange
+        self.enabled = enabled
+        if trading_calendar is None:
+            from .trading_calendar import TradingCalendar
+
+            trading_calendar = TradingCalendar(
+                self.parquet_base_path, cache_path=None, exchange=exchange
+            )
+        self.trading_calendar = trading_calendar
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self._listing: Dict[str, Tuple[int, int]] = {}
+        self._suspended: Dict[str, np.ndarray] = {}
+
+    def is_tracked(self, task_type: str) -> bool:
+        """表是否按股票池过滤"""
+        return self.enabled and task_type in self.tables
+
+    def why_impossible(
+        self,
+        task_type: str,
+        symbol: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+    ) -> Optional[str]:
+        """股票在区间内不可能有数据的原因
+
+        Args:
+            task_type: 表名 (任务类型)
+            symbol: 股票代码，可以是未标准化的代码
+            start_date: 区间开始日期 (YYYYMMDD)，为空时不限
+            end_date: 区间结束日期 (YYYYMMDD)，为空时不限
+
+        Returns:
+            Optional[str]: REASON_* 之一；可能有数据或信息不足时为 None
+        """
+        if not symbol or not self.is_tracked(task_type):
+            return None
+        if self._fingerprint is None:
+            self.refresh()
+        ts_code = normalize_stock_code(symbol)
+        start = int(start_date or 0)
+        end = int(end_date or _NEVER)
+
+        listing = self._listing.get(ts_code)
+        if listing is not None:
+            list_date, delist_date = listing
+            if end < list_date:
+                return REASON_NOT_LISTED
+            if start > delist_date:
+                return REASON_DELISTED
+            start, end = max(start, list_date), min(end, delist_date)
+
+        suspended = self._suspended.get(ts_code)
+        if suspended is None or not len(self.trading_calendar.days):
+            return None
+        trading = self.trading_calendar.trading_days_between(start, end)
+        halted = np.searchsorted(suspended, end, side="right") - np.searchsorted(
+            suspended, start
+        )
+        if trading > 0 and halted >= trading:
+            return REASON_SUSPENDED
+        return None
+
+    def can_have_data(
+        self,
+        task_type: str,
+        symbol: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+    ) -> bool:
+        """股票在区间内是否可能有数据"""
+        return self.why_impossible(task_type, symbol, start_date, end_date) is None
+
+    # ------------------------------------------------------------------
+    # 数据加载
+    # ------------------------------------------------------------------
+    def refresh(self) -> None:
+        """股票基本信息、停复牌信息或交易日历变化时重新加载
+
+        每次规划开始时调用一次，规划期间的判断都基于同一份数据。
+        """
+        fingerprint = "|".join(
+            str(table_fingerprint(self.parquet_base_path / table))
+            for table in ("stock_basic", self.suspend_table, "trade_cal")
+        )
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            self._listing = self._load_listing()
+            self._suspended = self._load_suspensions()
+            self.trading_calendar.refresh()
+            self._fingerprint = fingerprint
+        logger.debug(
+            f"股票池已加载: {len(self._listing)} 只股票的上市信息，"
+            f"{len(self._suspended)} 只股票的停牌记录"
+        )
+
+    def _query(self, table: str, build_sql) -> list:
+        """查询表的 Parquet 文件，表不存在或查询失败时返回空列表"""
+        table_path = self.parquet_base_path / table
+        if table_fingerprint(table_path) is None:
+            return []
+        pattern = str(table_path / "**" / "*.parquet")
+        conn = duckdb.connect(":memory:")
+        try:
+            source = f"read_parquet('{pattern}', union_by_name = true)"
+            described = conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+            columns = {row[0] for row in described}
+            return conn.execute(build_sql(source, columns)).fetchall()
+        except duckdb.Error as e:
+            logger.warning(f"⚠️ 读取 {table} 失败，股票池不按其过滤: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def _load_listing(self) -> Dict[str, Tuple[int, int]]:
+        """股票的上市与退市日期"""
+
+        def build_sql(source, columns):
+            delist = (
+                "MAX(TRY_CAST(NULLIF(delist_date, '') AS INTEGER))"
+                if "delist_date" in columns
+                else "NULL"
+            )
+            return (
+                f"SELECT ts_code, MIN(TRY_CAST(list_date AS INTEGER)), {delist} "
+                f"FROM {source} GROUP BY ts_code"
+            )
+
+        return {
+            code: (int(list_date or 0), int(delist_date or _NEVER))
+            for code, list_date, delist_date in self._query("stock_basic", build_sql)
+        }
+
+    def _load_suspensions(self) -> Dict[str, np.ndarray]:
+        """股票全天停牌的交易日 (升序)"""
+
+        def build_sql(source, columns):
+            # 盘中停牌 (suspend_timing 非空) 当天仍有行情
+            whole_day = (
+                "AND COALESCE(suspend_timing, '') = ''"
+                if "suspend_timing" in columns
+                else ""
+            )
+            return (
+                f"SELECT ts_code, LIST(DISTINCT TRY_CAST(trade_date AS INTEGER)) "
+                f"FROM {source} WHERE suspend_type = 'S' {whole_day} GROUP BY ts_code"
+            )
+
+        return {
+            code: np.sort(np.array([d for d in days if d is not None], dtype=np.int32))
+            for code, days in self._query(self.suspend_table, build_sql)
+        }
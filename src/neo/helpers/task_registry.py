@@ -0,0 +1,377 @@
+"""任务登记表
+
+为下载任务生成确定性的任务键，并在 SQLite 中登记待执行/执行中的任务，
+使重复提交 (如 `neo dl` 被执行两次、定时任务与补数脚本同时派发) 在入队时被去重。
+
+登记表以 (task_type, symbol) 为粒度：
+- 已有未过期登记、且其 start_date 不晚于新任务时，新任务被丢弃；
+- 新任务的 start_date 更早时，新任务覆盖旧登记 (合并)，旧任务执行时发现自己已被取代而跳过；
+- 登记在慢速队列写入完成 (或下载返回空数据) 后释放，超过 TTL 的登记视为失效；
+- 带 end_date 的补缺任务按日期区间单独登记，不参与上述合并。
+
+多台机器共享数据目录时，登记同时在共享文件系统上认领 (task_type, symbol) 租约，
+已被其他节点认领的任务直接跳过，各节点据此分摊工作。
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .lease_manager import task_lease_name
+
+if TYPE_CHECKING:
+    from .lease_manager import LeaseManager
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = "pending"
+STATE_IN_FLIGHT = "in_flight"
+
+
+def make_task_key(task_type: str, symbol: str, **kwargs: Any) -> str:
+    """生成确定性的任务键
+
+    相同的 (task_type, symbol, 下载参数) 总是得到相同的键，与参数顺序无关。
+
+    Args:
+        task_type: 任务类型
+        symbol: 股票代码
+        **kwargs: 下载参数，如 start_date
+
+    Returns:
+        str: 形如 "stock_daily:000001.SZ:start_date=20240101" 的任务键
+    """
+    parts = [task_type, symbol]
+    parts.extend(f"{k}={kwargs[k]}" for k in sorted(kwargs))
+    return ":".join(parts)
+
+
+def registry_slot(symbol: str, params: Dict[str, Any]) -> str:
+    """任务在登记表中占用的槽位
+
+    只有 start_date 的任务每只股票占一个槽位，重复任务按 start_date 合并；
+    带 end_date 的补缺任务按日期区间各占一个槽位，不与同一股票的其他任务合并。
+    """
+    end_date = params.get("end_date")
+    if not end_date:
+        return symbol
+    return f"{symbol}@{params.get('start_date') or ''}-{end_date}"
+
+
+def _slot_of_key(task_key: str) -> Tuple[str, str]:
+    """由任务键还原 (task_type, 登记槽位)"""
+    task_type, symbol, *parts = task_key.split(":")
+    params = dict(part.split("=", 1) for part in parts if "=" in part)
+    return task_type, registry_slot(symbol, params)
+
+
+class TaskRegistry:
+    """基于 SQLite 的待执行任务登记表"""
+
+    def __init__(
+        self,
+        db_path: str = "data/task_registry.db",
+        ttl_seconds: float = 6 * 3600,
+        enabled: bool = True,
+        lease_manager: Optional["LeaseManager"] = None,
+    ):
+        """初始化任务登记表
+
+        Args:
+            db_path: 登记表 SQLite 文件路径
+            ttl_seconds: 登记的有效期 (秒)，超时的登记视为失效 (如 worker 崩溃)
+            enabled: 是否启用去重，关闭时所有任务都会被派发
+            lease_manager: 租约管理器，多节点部署时用于跨机器认领任务
+        """
+        self.db_path = db_path
+        self.ttl_seconds = float(ttl_seconds)
+        self.enabled = enabled
+        self.lease_manager = lease_manager
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开登记表连接，首次使用时建表
+
+        每次操作使用独立连接，保证在多线程、多进程 worker 中都能安全使用。
+        """
+        if not self._initialized:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS task_registry (
+                        task_type TEXT NOT NULL,
+                        symbol TEXT NOT NULL,
+                        task_key TEXT NOT NULL,
+                        start_date TEXT,
+                        state TEXT NOT NULL,
+                        updated_at REAL NOT NULL,
+                        PRIMARY KEY (task_type, symbol)
+                    )
+                    """
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_task_registry_key "
+                    "ON task_registry (task_key)"
+                )
+                self._initialized = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl_seconds
+
+    def claim_batch(
+        self, params_list: List[Dict[str, Any]], force: bool = False
+    ) -> List[Dict[str, Any]]:
+        """在单个事务中登记一批任务，返回需要派发的任务
+
+        Args:
+            params_list: 任务参数列表，每项包含 task_type、symbol 及下载参数
+            force: 强制接管已有登记 (用于恢复崩溃的运行)
+
+        Returns:
+            List[Dict[str, Any]]: 未被去重的任务参数
+        """
+        if not self.enabled or not params_list:
+            return list(params_list)
+
+        accepted = []
+        leased_elsewhere = 0
+        now = time.time()
+        expired_before = self._expired_before()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for params in params_list:
+                    task_type = params["task_type"]
+                    symbol = registry_slot(params["symbol"], params)
+                    start_date = params.get("start_date")
+                    row = conn.execute(
+                        "SELECT task_key, start_date, updated_at FROM task_registry "
+                        "WHERE task_type = ? AND symbol = ?",
+                        (task_type, symbol),
+                    ).fetchone()
+
+                    if row and row[2] >= expired_before and not force:
+                        if not self._covers(row[1], start_date):
+                            logger.debug(
+                                f"⏬ 合并重复任务: {symbol} ({task_type}), "
+                                f"start_date {row[1]} -> {start_date}"
+                            )
+                        else:
+                            logger.debug(f"⏬ ⏭️ 丢弃重复任务: {row[0]}")
+                            continue
+
+                    extra = {
+                        k: v
+                        for k, v in params.items()
+                        if k not in ("task_type", "symbol")
+                    }
+                    task_key = make_task_key(task_type, params["symbol"], **extra)
+                    if not self._acquire_lease(task_type, symbol, task_key):
+                        logger.debug(f"🔑 ⏭️ 任务已由其他节点认领: {task_key}")
+                        leased_elsewhere += 1
+                        continue
+                    conn.execute(
+                        "INSERT OR REPLACE INTO task_registry "
+                        "(task_type, symbol, task_key, start_date, state, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            task_type,
+                            symbol,
+                            task_key,
+                            start_date,
+                            STATE_PENDING,
+                            now,
+                        ),
+                    )
+                    accepted.append(params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if leased_elsewhere:
+            logger.info(f"🔑 ⏭️ 跳过 {leased_elsewhere} 个已由其他节点认领的任务")
+        dropped = len(params_list) - len(accepted) - leased_elsewhere
+        if dropped:
+            logger.info(f"⏬ ⏭️ 去重: 丢弃 {dropped} 个已在队列中的重复任务")
+        return accepted
+
+    def _acquire_lease(self, task_type: str, symbol: str, task_key: str) -> bool:
+        """认领任务租约，未配置租约管理器时总是成功"""
+        if self.lease_manager is None:
+            return True
+        return self.lease_manager.acquire(
+            task_lease_name(task_type, symbol),
+            ttl_seconds=self.ttl_seconds,
+            payload={"task_key": task_key},
+        )
+
+    @staticmethod
+    def _covers(existing_start: Optional[str], new_start: Optional[str]) -> bool:
+        """已登记任务的下载范围是否覆盖新任务 (start_date 为空表示全量)"""
+        if existing_start is None:
+            return True
+        if new_start is None:
+            return False
+        return existing_start <= new_start
+
+    def filter_unclaimed(
+        self,
+        params_iter: Iterable[Dict[str, Any]],
+        batch_size: int = 500,
+        force: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """流式地登记任务，只产出需要派发的任务
+
+        Args:
+            params_iter: 任务参数的可迭代对象
+            batch_size: 每个登记事务处理的任务数
+            force: 强制接管已有登记
+
+        Yields:
+            Dict[str, Any]: 未被去重的任务参数
+        """
+        iterator = iter(params_iter)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield from self.claim_batch(batch, force)
+
+    def mark_in_flight(self, task_type: str, symbol: str, task_key: str) -> bool:
+        """任务开始执行时调用，标记为执行中
+
+        Args:
+            task_type: 任务类型
+            symbol: 股票代码
+            task_key: 任务键
+
+        Returns:
+            bool: False 表示该任务已被更早 start_date 的任务取代，应当跳过
+        """
+        if not self.enabled:
+            return True
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT task_key FROM task_registry WHERE task_type = ? AND symbol = ?",
+                (task_type, symbol),
+            ).fetchone()
+            if row and row[0] != task_key:
+                return False
+            # 没有登记 (已过期或绕过登记表派发) 的任务照常执行
+            conn.execute(
+                "UPDATE task_registry SET state = ?, updated_at = ? WHERE task_key = ?",
+                (STATE_IN_FLIGHT, time.time(), task_key),
+            )
+        return True
+
+    def in_flight(self, task_keys: Iterable[str]) -> Set[str]:
+        """返回其中仍登记为执行中且未过期的任务键 (正由某个 worker 执行)"""
+        return {
+            task_key
+            for task_key, row in self._lookup(task_keys).items()
+            if row[0] == task_key
+            and row[2] == STATE_IN_FLIGHT
+            and row[3] >= self._expired_before()
+        }
+
+    def superseded(self, task_keys: Iterable[str]) -> Set[str]:
+        """返回其中已被合并到未过期的其他登记中的任务键
+
+        同一槽位登记的是另一个任务键、且其 start_date 覆盖该任务时，
+        该任务的下载范围由登记的任务完成。
+        """
+        superseded = set()
+        for task_key, row in self._lookup(task_keys).items():
+            if row[0] == task_key or row[3] < self._expired_before():
+                continue
+            params = dict(
+                part.split("=", 1) for part in task_key.split(":")[2:] if "=" in part
+            )
+            if self._covers(row[1], params.get("start_date")):
+                superseded.add(task_key)
+        return superseded
+
+    def _lookup(
+        self, task_keys: Iterable[str]
+    ) -> Dict[str, Tuple[str, Optional[str], str, float]]:
+        """查询任务键所在槽位的登记 (task_key, start_date, state, updated_at)"""
+        if not self.enabled:
+            return {}
+        rows = {}
+        with self._connect() as conn:
+            for task_key in task_keys:
+                task_type, symbol = _slot_of_key(task_key)
+                row = conn.execute(
+                    "SELECT task_key, start_date, state, updated_at FROM task_registry "
+                    "WHERE task_type = ? AND symbol = ?",
+                    (task_type, symbol),
+                ).fetchone()
+                if row:
+                    rows[task_key] = row
+        return rows
+
+    def release(self, task_key: str) -> None:
+        """任务结束 (写入完成或无数据) 后释放登记
+
+        只释放与任务键完全匹配的登记，不会误删合并后的新登记。
+        """
+        if not self.enabled:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM task_registry WHERE task_key = ?", (task_key,))
+        if self.lease_manager is not None:
+            task_type, symbol = _slot_of_key(task_key)
+            self.lease_manager.release(
+                task_lease_name(task_type, symbol), payload={"task_key": task_key}
+            )
+
+    def pending_count(self) -> int:
+        """未过期的登记数 (待执行 + 执行中)"""
+        if not self.enabled:
+            return 0
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM task_registry WHERE updated_at >= ?",
+                (self._expired_before(),),
+            ).fetchone()
+        return row[0]
+
+    def purge_expired(self) -> int:
+        """删除已过期的登记
+
+        Returns:
+            int: 删除的登记数
+        """
+        if not self.enabled:
+            return 0
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM task_registry WHERE updated_at < ?",
+                (self._expired_before(),),
+            )
+        return cursor.rowcount
@@ -0,0 +1,297 @@
+"""交易日历服务
+
+过去各处各自读取 trade_cal：ParquetDBQueryer.get_latest_trading_day 每次新建 DuckDB
+连接查询 (缓存只在单个 Factory 实例内有效)，覆盖引擎和股票池各读一份交易日数组。
+TradingCalendar 把一个交易所的日历压缩为三组 NumPy 数组，供所有组件共享：
+
+- days：交易日 (int32, YYYYMMDD, 升序)；
+- bits：从日历第一天起逐个自然日的开市位图 (np.packbits 压缩)；
+- rank：每个自然日之前的交易日个数 (int32)，用于 O(1) 求前后交易日和区间交易日数。
+
+数组以 .npy 文件保存在缓存目录，按内存映射方式加载，多个进程共享同一份页缓存；
+trade_cal 的 Parquet 文件变化时 (按文件数、大小和修改时间判断) 重建。
+交易日历不存在时所有查询返回 None 或空结果，由调用方回退。
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import duckdb
+import numpy as np
+
+from .coverage_engine import table_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[str, int]
+
+_ARRAYS = ("days", "bits", "rank")
+
+
+def epoch_days(dates) -> np.ndarray:
+    """把 YYYYMMDD 格式的日期 (字符串或整数) 转换为 1970-01-01 起的天数"""
+    values = np.asarray(dates).astype(np.int64)
+    months = (values // 10000 - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+    months = months + (values // 100 % 100 - 1)
+    return (months.astype("datetime64[D]") + (values % 100 - 1)).astype(np.int64)
+
+
+@dataclass
+class CalendarArrays:
+    """一个交易所的压缩交易日历"""
+
+    days: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    bits: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.uint8))
+    rank: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int32))
+    origin: int = 0  # 位图第一天 (1970-01-01 起的天数)
+    fingerprint: Optional[str] = None
+
+    @property
+    def span(self) -> int:
+        """位图覆盖的自然日数"""
+        return len(self.rank) - 1
+
+    @classmethod
+    def build(
+        cls, open_days: np.ndarray, first: int, last: int, fingerprint: str
+    ) -> "CalendarArrays":
+        """由交易日和日历覆盖的首末日期 (YYYYMMDD) 构建"""
+        days = np.unique(np.asarray(open_days, dtype=np.int32))
+        origin = int(epoch_days(min(first, days[0]) if len(days) else first))
+        end = int(epoch_days(max(last, days[-1]) if len(days) else last))
+        mask = np.zeros(end - origin + 1, dtype=bool)
+        mask[epoch_days(days) - origin] = True
+        rank = np.zeros(len(mask) + 1, dtype=np.int32)
+        np.cumsum(mask, out=rank[1:])
+        return cls(
+            days=days,
+            bits=np.packbits(mask),
+            rank=rank,
+            origin=origin,
+            fingerprint=fingerprint,
+        )
+
+
+class TradingCalendar:
+    """基于压缩数组的交易日历，提供 O(1) 查询与向量化的区间展开"""
+
+    def __init__(
+        self,
+        parquet_base_path: str = "data/parquet",
+        cache_path: Optional[str] = "data/calendar",
+        exchange: str = "SSE",
+    ):
+        """初始化交易日历
+
+        Args:
+            parquet_base_path: Parquet 数据根目录
+            cache_path: 内存映射文件的存放目录，为 None 时只保存在内存中
+            exchange: 交易所代码
+        """
+        self.parquet_base_path = Path(parquet_base_path)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.exchange = exchange
+        self._lock = threading.Lock()
+        self._arrays: Optional[CalendarArrays] = None
+
+    # ------------------------------------------------------------------
+    # 加载
+    # ------------------------------------------------------------------
+    def refresh(self) -> None:
+        """trade_cal 变化时重新加载，每次规划开始时调用一次"""
+        fingerprint = table_fingerprint(self.parquet_base_path / "trade_cal")
+        with self._lock:
+            current = self._arrays
+            if current is not None and current.fingerprint == fingerprint:
+                return
+            if fingerprint is None:
+                self._arrays = CalendarArrays()
+                return
+            arrays = self._load_cached(fingerprint)
+            if arrays is None:
+                arrays = self._build(fingerprint)
+                self._save_cached(arrays)
+            self._arrays = arrays
+        logger.debug(f"交易日历已加载: {self.exchange} {len(arrays.days)} 个交易日")
+
+    @property
+    def arrays(self) -> CalendarArrays:
+        """当前的压缩日历，首次使用时加载"""
+        if self._arrays is None:
+            self.refresh()
+        return self._arrays
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """trade_cal 的数据指纹，交易日历不存在时为 None"""
+        return self.arrays.fingerprint
+
+    @property
+    def days(self) -> np.ndarray:
+        """所有交易日 (int32, YYYYMMDD, 升序)"""
+        return self.arrays.days
+
+    def _build(self, fingerprint: str) -> CalendarArrays:
+        """扫描 trade_cal 的 Parquet 文件构建"""
+        pattern = str(self.parquet_base_path / "trade_cal" / "**" / "*.parquet")
+        conn = duckdb.connect(":memory:")
+        try:
+            result = conn.execute(
+                f"SELECT TRY_CAST(cal_date AS INTEGER) AS day, is_open "
+                f"FROM read_parquet('{pattern}') "
+                f"WHERE exchange = ? AND day IS NOT NULL",
+                (self.exchange,),
+            ).fetchnumpy()
+        except duckdb.Error as e:
+            logger.warning(f"⚠️ 读取交易日历失败: {e}")
+            return CalendarArrays(fingerprint=fingerprint)
+        finally:
+            conn.close()
+        calendar_days = np.asarray(result["day"], dtype=np.int32)
+        if not len(calendar_days):
+            return CalendarArrays(fingerprint=fingerprint)
+        open_days = calendar_days[np.asarray(result["is_open"]) == 1]
+        return CalendarArrays.build(
+            open_days,
+            int(calendar_days.min()),
+            int(calendar_days.max()),
+            fingerprint,
+        )
+
+    def _files(self) -> Tuple[Path, Dict[str, Path]]:
+        """元数据文件与各数组的 .npy 文件"""
+        return self.cache_path / f"{self.exchange}.json", {
+            name: self.cache_path / f"{self.exchange}.{name}.npy" for name in _ARRAYS
+        }
+
+    def _load_cached(self, fingerprint: str) -> Optional[CalendarArrays]:
+        if self.cache_path is None:
+            return None
+        meta_path, paths = self._files()
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("fingerprint") != fingerprint:
+                return None
+            origin = int(meta["origin"])
+            loaded = {
+                name: np.load(path, mmap_mode="r", allow_pickle=False)
+                for name, path in paths.items()
+            }
+        except (OSError, ValueError, KeyError) as e:
+            if meta_path.exists():
+                logger.warning(f"⚠️ 读取交易日历缓存失败，将重建: {e}")
+            return None
+        return CalendarArrays(origin=origin, fingerprint=fingerprint, **loaded)
+
+    def _save_cached(self, arrays: CalendarArrays) -> None:
+        if self.cache_path is None:
+            return
+        meta_path, paths = self._files()
+        try:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            # 元数据最后写入：中途失败时指纹不匹配，下次重建
+            meta_path.unlink(missing_ok=True)
+            for name, path in paths.items():
+                tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+                with open(tmp, "wb") as f:
+                    np.save(f, getattr(arrays, name), allow_pickle=False)
+                os.replace(tmp, path)
+            meta = {"fingerprint": arrays.fingerprint, "origin": arrays.origin}
+            meta_path.write_text(json.dumps(meta))
+        except OSError as e:
+            logger.warning(f"⚠️ 保存交易日历缓存失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def _offsets(self, arrays: CalendarArrays, dates) -> np.ndarray:
+        """日期相对位图第一天的偏移"""
+        return epoch_days(dates) - arrays.origin
+
+    def open_mask(self, dates: Iterable[DateLike]) -> np.ndarray:
+        """一批日期是否为交易日，日历范围之外的日期视为非交易日"""
+        arrays = self.arrays
+        offsets = self._offsets(arrays, np.asarray(list(dates)))
+        inside = (offsets >= 0) & (offsets < arrays.span)
+        clipped = np.where(inside, offsets, 0)
+        if not arrays.span:
+            return np.zeros(len(offsets), dtype=bool)
+        bits = (arrays.bits[clipped >> 3] >> (7 - (clipped & 7))) & 1
+        return inside & (bits == 1)
+
+    def is_open(self, date: DateLike) -> bool:
+        """日期是否为交易日"""
+        return bool(self.open_mask([date])[0])
+
+    def _ranks(self, arrays: CalendarArrays, offsets: np.ndarray) -> np.ndarray:
+        """偏移之前 (不含) 的交易日个数，日历范围之外按两端截断"""
+        return arrays.rank[np.clip(offsets, 0, arrays.span)]
+
+    def prev_trading_day(self, date: DateLike) -> Optional[str]:
+        """日期之前 (不含) 的最近交易日"""
+        arrays = self.arrays
+        position = int(self._ranks(arrays, self._offsets(arrays, date))) - 1
+        return str(arrays.days[position]) if position >= 0 else None
+
+    def next_trading_day(self, date: DateLike) -> Optional[str]:
+        """日期之后 (不含) 的最近交易日"""
+        arrays = self.arrays
+        position = int(self._ranks(arrays, self._offsets(arrays, date) + 1))
+        return str(arrays.days[position]) if position < len(arrays.days) else None
+
+    def latest_trading_day(self, today: Optional[DateLike] = None) -> Optional[str]:
+        """最近的交易日：今天开市时为今天，否则为之前的最近交易日"""
+        today = today or datetime.now().strftime("%Y%m%d")
+        if self.is_open(today):
+            return str(today)
+        return self.prev_trading_day(today)
+
+    def count_between(self, starts, ends) -> np.ndarray:
+        """各区间 (含两端) 内的交易日个数"""
+        arrays = self.arrays
+        first = self._ranks(arrays, self._offsets(arrays, starts))
+        last = self._ranks(arrays, self._offsets(arrays, ends) + 1)
+        return np.maximum(last - first, 0)
+
+    def trading_days_between(self, start: DateLike, end: DateLike) -> int:
+        """区间 (含两端) 内的交易日个数"""
+        return int(self.count_between(start, end))
+
+    def trading_days(
+        self, start: Optional[DateLike] = None, end: Optional[DateLike] = None
+    ) -> np.ndarray:
+        """区间 (含两端) 内的交易日，未指定时不限"""
+        arrays = self.arrays
+        first = (
+            0
+            if start is None
+            else int(self._ranks(arrays, self._offsets(arrays, start)))
+        )
+        last = (
+            len(arrays.days)
+            if end is None
+            else int(self._ranks(arrays, self._offsets(arrays, end) + 1))
+        )
+        return np.asarray(arrays.days[first:max(first, last)])
+
+    def expand(self, starts, ends) -> Tuple[np.ndarray, np.ndarray]:
+        """把多个区间 (含两端) 一次展开为交易日
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 每个交易日所属区间的下标与交易日 (YYYYMMDD)
+        """
+        arrays = self.arrays
+        first = self._ranks(arrays, self._offsets(arrays, np.atleast_1d(starts)))
+        last = self._ranks(arrays, self._offsets(arrays, np.atleast_1d(ends)) + 1)
+        counts = np.maximum(last - first, 0).astype(np.int64)
+        owners = np.repeat(np.arange(len(counts)), counts)
+        # 每个交易日在所属区间内的序号，加上区间第一个交易日的位置
+        starts_at = np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(first, counts) + (np.arange(counts.sum()) - starts_at)
+        return owners, np.asarray(arrays.days)[positions]
@@ -0,0 +1,362 @@
+"""按股票维护的写入水位索引
+
+增量规划需要每只股票在每张表中的最新日期。过去 `get_max_date` 每次都用 DuckDB
+扫描整张表的全部 Parquet 文件；现在写入器在每个文件落盘后，在同一个 SQLite 事务中
+更新 `(表, ts_code) → 最新日期, 行数, 最后写入时间`，规划时只需查索引。
+
+- 水位只在文件落盘之后更新，索引可能短暂落后于数据，但不会超前
+  (最坏情况是重复下载少量数据，由去重处理)；
+- 表第一次被查询时用一次全表扫描建立索引，之后查询只读索引；
+- `neo watermarks --rebuild` 从 Parquet 文件重建索引 (如手工删除或压缩数据之后)。
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ..database.interfaces import ISchemaLoader
+
+logger = logging.getLogger(__name__)
+
+# 非股票表 (如 trade_cal) 只有一条水位，以空字符串作为 ts_code
+TABLE_WIDE = ""
+
+REPLACE_NONE = "none"
+REPLACE_SYMBOL = "symbol"
+REPLACE_TABLE = "table"
+
+Watermark = Tuple[str, Optional[str], int]
+
+
+@dataclass
+class WatermarkTableStatus:
+    """单张表的索引状态"""
+
+    task_type: str
+    symbols: int
+    rows: int
+    max_date: Optional[str]
+    rebuilt_at: Optional[float]
+
+
+class WatermarkIndex:
+    """基于 SQLite 的 (表, ts_code) 写入水位索引"""
+
+    def __init__(
+        self,
+        db_path: str = "data/watermarks.db",
+        schema_loader: Optional[ISchemaLoader] = None,
+        parquet_base_path: str = "data/parquet",
+        enabled: bool = True,
+    ):
+        """初始化水位索引
+
+        Args:
+            db_path: 索引 SQLite 文件路径
+            schema_loader: schema 加载器，用于确定表的日期列和是否按股票记录
+            parquet_base_path: Parquet 数据根目录，重建索引时扫描
+            enabled: 是否启用索引，禁用时查询回退为扫描 Parquet 文件
+        """
+        self.db_path = db_path
+        self.schema_loader = schema_loader
+        self.parquet_base_path = Path(parquet_base_path)
+        self.enabled = enabled
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开索引连接，首次使用时建表"""
+        if not self._initialized:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS watermarks (
+                        task_type TEXT NOT NULL,
+                        ts_code TEXT NOT NULL,
+                        max_date TEXT,
+                        row_count INTEGER NOT NULL DEFAULT 0,
+                        last_write_ts REAL NOT NULL,
+                        PRIMARY KEY (task_type, ts_code)
+                    );
+                    CREATE TABLE IF NOT EXISTS watermark_tables (
+                        task_type TEXT PRIMARY KEY,
+                        rebuilt_at REAL NOT NULL
+                    );
+                    """
+                )
+                self._initialized = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _layout(self, task_type: str) -> Tuple[Optional[str], bool]:
+        """表的日期列，以及是否按股票记录水位"""
+        if self.schema_loader is None:
+            return None, False
+        try:
+            schema = self.schema_loader.load_schema(task_type)
+        except KeyError:
+            return None, False
+        date_col = getattr(schema, "date_col", None) or None
+        by_symbol = "ts_code" in (getattr(schema, "primary_key", None) or [])
+        return date_col, by_symbol
+
+    # ------------------------------------------------------------------
+    # 写入端
+    # ------------------------------------------------------------------
+    def record_write(
+        self,
+        task_type: str,
+        data: Union[pd.DataFrame, pa.Table],
+        replace: str = REPLACE_NONE,
+    ) -> None:
+        """在数据落盘后更新水位
+
+        索引更新失败不影响写入本身，只记录警告日志；此时该表的索引会被标记为
+        需要重建，下次查询时重新扫描。
+
+        Args:
+            task_type: 表名 (任务类型)
+            data: 刚写出的数据
+            replace: 'none' 增量写入取较大的日期并累加行数；'symbol' 覆盖数据中
+                股票的水位；'table' 整张表被替换，清空后重新记录
+        """
+        if not self.enabled:
+            return
+        date_col, by_symbol = self._layout(task_type)
+        if date_col is None:
+            # 没有日期列的表不做增量规划，无需水位
+            return
+        try:
+            watermarks = _summarize(data, date_col, by_symbol)
+            now = time.time()
+            with self._transaction() as conn:
+                if replace == REPLACE_TABLE:
+                    conn.execute(
+                        "DELETE FROM watermarks WHERE task_type = ?", (task_type,)
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO watermark_tables VALUES (?, ?)",
+                        (task_type, now),
+                    )
+                if replace == REPLACE_NONE:
+                    upsert = (
+                        "max_date = CASE WHEN max_date IS NULL "
+                        "OR excluded.max_date > max_date "
+                        "THEN excluded.max_date ELSE max_date END, "
+                        "row_count = row_count + excluded.row_count"
+                    )
+                else:
+                    upsert = (
+                        "max_date = excluded.max_date, row_count = excluded.row_count"
+                    )
+                conn.executemany(
+                    "INSERT INTO watermarks VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (task_type, ts_code) DO UPDATE SET "
+                    f"{upsert}, last_write_ts = excluded.last_write_ts",
+                    [
+                        (task_type, ts_code, max_date, rows, now)
+                        for ts_code, max_date, rows in watermarks
+                    ],
+                )
+        except (sqlite3.Error, KeyError) as e:
+            logger.warning(f"⚠️ 更新 {task_type} 写入水位失败，该表索引将重建: {e}")
+            self.invalidate(task_type)
+
+    def invalidate(self, task_type: str) -> None:
+        """标记表的索引需要重建"""
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM watermark_tables WHERE task_type = ?", (task_type,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 标记 {task_type} 写入水位失效失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 查询端
+    # ------------------------------------------------------------------
+    def is_ready(self, task_type: str) -> bool:
+        """表的索引是否已建立 (已从 Parquet 文件重建或由全量替换写入)"""
+        if not self.enabled:
+            return False
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM watermark_tables WHERE task_type = ?", (task_type,)
+            ).fetchone()
+        return row is not None
+
+    def lookup(self, task_type: str, ts_codes: List[str]) -> Dict[str, str]:
+        """查询股票的最新日期
+
+        非股票表，以及不按股票下载的全市场任务 (代码为空，如 suspend_d)，
+        对所有请求的代码返回整表的最新日期。
+
+        Args:
+            task_type: 表名 (任务类型)
+            ts_codes: 标准化后的股票代码
+
+        Returns:
+            Dict[str, str]: 股票代码到最新日期 (YYYYMMDD) 的映射，没有数据的股票不出现
+        """
+        _, by_symbol = self._layout(task_type)
+        with self._connect() as conn:
+            if not by_symbol or not any(ts_codes):
+                row = conn.execute(
+                    "SELECT MAX(max_date) FROM watermarks WHERE task_type = ?",
+                    (task_type,),
+                ).fetchone()
+                if not row or row[0] is None:
+                    return {}
+                return {code: row[0] for code in ts_codes}
+
+            # 股票列表较长时用临时表连接，避免 SQLite 的参数个数上限
+            conn.execute("CREATE TEMP TABLE wanted (ts_code TEXT PRIMARY KEY)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO wanted VALUES (?)", [(c,) for c in ts_codes]
+            )
+            rows = conn.execute(
+                "SELECT w.ts_code, w.max_date FROM watermarks w "
+                "JOIN wanted USING (ts_code) "
+                "WHERE w.task_type = ? AND w.max_date IS NOT NULL",
+                (task_type,),
+            ).fetchall()
+        return dict(rows)
+
+    def rebuild(self, task_type: str, merge: bool = False) -> int:
+        """扫描表的 Parquet 文件重建水位
+
+        Args:
+            task_type: 表名 (任务类型)
+            merge: 为 True 时与已有水位合并 (日期取较大者)，用于首次查询时在线建立
+                索引，不会丢失扫描期间写入的水位；为 False 时完全以扫描结果为准
+
+        Returns:
+            int: 重建的水位条数
+        """
+        date_col, by_symbol = self._layout(task_type)
+        if date_col is None:
+            raise ValueError(f"表 '{task_type}' 未定义 date_col，无法建立写入水位")
+
+        table_path = self.parquet_base_path / task_type
+        watermarks: List[Watermark] = []
+        if table_path.exists() and any(table_path.rglob("*.parquet")):
+            pattern = str(table_path / "**" / "*.parquet")
+            key = "ts_code" if by_symbol else f"'{TABLE_WIDE}'"
+            conn = duckdb.connect(":memory:")
+            try:
+                watermarks = [
+                    (str(code), str(date) if date is not None else None, rows)
+                    for code, date, rows in conn.execute(
+                        f"SELECT {key}, MAX({date_col}), COUNT(*) "
+                        f"FROM read_parquet('{pattern}', union_by_name = true) "
+                        f"GROUP BY 1"
+                    ).fetchall()
+                ]
+            finally:
+                conn.close()
+
+        now = time.time()
+        values = [(task_type, code, date, rows, now) for code, date, rows in watermarks]
+        with self._transaction() as conn:
+            if merge:
+                conn.executemany(
+                    "INSERT INTO watermarks VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (task_type, ts_code) DO UPDATE SET "
+                    "max_date = CASE WHEN max_date IS NULL "
+                    "OR excluded.max_date > max_date "
+                    "THEN excluded.max_date ELSE max_date END, "
+                    "row_count = excluded.row_count",
+                    values,
+                )
+            else:
+                conn.execute("DELETE FROM watermarks WHERE task_type = ?", (task_type,))
+                conn.executemany("INSERT INTO watermarks VALUES (?, ?, ?, ?, ?)", values)
+            conn.execute(
+                "INSERT OR REPLACE INTO watermark_tables VALUES (?, ?)",
+                (task_type, now),
+            )
+        logger.info(
+            f"🔖 已从 Parquet 文件建立 {task_type} 的写入水位: {len(watermarks)} 条"
+        )
+        return len(watermarks)
+
+    def status(self) -> List[WatermarkTableStatus]:
+        """各表的索引状态"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT t.task_type, COUNT(w.ts_code), COALESCE(SUM(w.row_count), 0), "
+                "MAX(w.max_date), wt.rebuilt_at "
+                "FROM (SELECT task_type FROM watermarks "
+                "UNION SELECT task_type FROM watermark_tables) AS t "
+                "LEFT JOIN watermark_tables wt USING (task_type) "
+                "LEFT JOIN watermarks w USING (task_type) "
+                "GROUP BY t.task_type ORDER BY t.task_type"
+            ).fetchall()
+        return [WatermarkTableStatus(*row) for row in rows]
+
+
+def _summarize(
+    data: Union[pd.DataFrame, pa.Table], date_col: str, by_symbol: bool
+) -> List[Watermark]:
+    """按股票汇总一批数据的最新日期和行数"""
+    columns = [date_col] + (["ts_code"] if by_symbol else [])
+    if isinstance(data, pa.Table):
+        data = _plain_table(
+            data.select([c for c in columns if c in data.column_names])
+        ).to_pandas()
+    if data is None or data.empty:
+        return []
+    if date_col not in data.columns:
+        raise KeyError(f"数据缺少日期列 {date_col}")
+    data = data[data[date_col].notna()]
+    if data.empty:
+        return []
+    dates = data[date_col].astype(str)
+    if not by_symbol:
+        return [(TABLE_WIDE, dates.max(), len(data))]
+    if "ts_code" not in data.columns:
+        raise KeyError("数据缺少 ts_code 列")
+    grouped = dates.groupby(data["ts_code"]).agg(["max", "size"])
+    return [
+        (str(ts_code), str(row["max"]), int(row["size"]))
+        for ts_code, row in grouped.iterrows()
+    ]
+
+
+def _plain_table(table: pa.Table) -> pa.Table:
+    """字典编码列解码为普通列，date32 日期列转为 YYYYMMDD 字符串"""
+    for index, field in enumerate(table.schema):
+        column = table.column(index)
+        if pa.types.is_dictionary(field.type):
+            column = column.cast(field.type.value_type)
+        if pa.types.is_temporal(column.type):
+            column = pc.strftime(column, format="%Y%m%d")
+        if column.type != field.type:
+            table = table.set_column(index, field.name, column)
+    return table
@@ -3,6 +3,7 @@
 基于四层架构的命令行应用程序。
 """
 
+import time
 import typer
 from typing import List, Optional
 
@@ -26,7 +27,19 @@ def dl(
         help="启用调试模式，输出详细日志",
     ),
     dry_run: bool = typer.Option(
-        False, "--dry-run", help="仅显示将要执行的任务，不实际执行"
+        False,
+        "--dry-run",
+        help="按真实规划生成任务并估算接口调用、数据量和耗时，不派发任何任务",
+    ),
+    inline: bool = typer.Option(
+        False,
+        "--inline",
+        help="在当前进程内完成下载、处理和写入，不经过 Huey 队列",
+    ),
+    deadline: Optional[str] = typer.Option(
+        None,
+        "--deadline",
+        help="截止时间，如 '20:00' 或 '2024-01-15 20:00'；任务进入 deadline 优先级通道",
     ),
 ):
     """下载股票数据"""
@@ -45,6 +58,7 @@ def dl(
     """
     from neo.tasks.huey_tasks import build_and_enqueue_downloads_task
     from neo.tasks.download_tasks import detect_task_group_strategy
+    from neo.helpers.fair_share_scheduler import LANE_INTERACTIVE, parse_deadline
 
     # 检测任务组的更新策略类型
     strategy = detect_task_group_strategy(group)
@@ -67,17 +81,334 @@ def dl(
         typer.echo(f"⚠️ 任务组 '{group}' 没有找到任何任务或股票代码")
         return
 
-    # 将任务提交到 Huey 慢速队列
-    task_result = build_and_enqueue_downloads_task(task_stock_mapping)
+    if dry_run:
+        _print_dry_run_report(app_service.estimate_downloads(task_stock_mapping))
+        return
+
+    if inline:
+        typer.echo("🚀 以内联模式运行：规划 → 下载 → 处理 → 写入 均在当前进程内完成...")
+        stats = app_service.run_inline_pipeline(task_stock_mapping)
+        typer.echo(
+            f"✅ 内联运行完成：计划 {stats.planned} 个任务，写入 {stats.written} 个"
+            f"（{stats.rows} 行），空数据 {stats.empty} 个，失败 {stats.failed} 个，"
+            f"耗时 {stats.elapsed_seconds:.1f} 秒"
+        )
+        return
+
+    # 指定股票代码的临时请求进入 interactive 通道，排在批量任务之前
+    schedule_kwargs = {}
+    if stock_codes:
+        schedule_kwargs["lane"] = LANE_INTERACTIVE
+    if deadline:
+        try:
+            schedule_kwargs["deadline"] = parse_deadline(deadline).isoformat()
+        except ValueError as e:
+            typer.echo(f"❌ {e}")
+            raise typer.Exit(1)
+
+    # 将规划任务提交到 Huey 规划队列 (huey_plan)，由规划消费者生成并派发下载任务
+    task_result = build_and_enqueue_downloads_task(
+        task_stock_mapping, **schedule_kwargs
+    )
     typer.echo(
         f"✅ 任务已成功提交到后台处理，任务ID: {task_result.id}。请启动消费者来执行任务。"
     )
+    typer.echo(f"💡 运行中断后可使用 'neo resume {task_result.id}' 继续未完成的任务。")
+
+
+def _print_dry_run_report(report, max_tasks: int = 20) -> None:
+    """输出试运行的估算结果"""
+    typer.echo(
+        f"🧪 试运行 (不派发任务)，最新交易日 {report.latest_trading_day or '-'}，"
+        f"共 {report.total_tasks} 个任务:"
+    )
+    for table in report.tables:
+        if table.expected_rows is None:
+            volume = "无历史指标"
+        else:
+            volume = (
+                f"预计 {table.expected_rows:,.0f} 行 / "
+                f"{table.expected_bytes / 1024 / 1024:.1f} MB "
+                f"(基于最近 {table.samples} 个任务)"
+            )
+        typer.echo(
+            f"  {table.task_type} [{table.endpoint}]: 任务 {table.tasks}, "
+            f"配额 {table.rate_limit_per_minute:.0f}/分钟 "
+            f"(至少 {table.quota_seconds / 60:.1f} 分钟), {volume}"
+        )
+    calls = ", ".join(
+        f"{endpoint} {count}"
+        for endpoint, count in report.api_calls_by_endpoint.items()
+    )
+    typer.echo(f"📞 接口调用: {calls or '-'}")
+    typer.echo(
+        f"⏱️ 预计耗时 {report.projected_seconds / 60:.1f} 分钟 "
+        f"(快速队列 {report.workers} 个 worker)"
+    )
+    if report.tasks:
+        typer.echo(f"📋 任务列表 (前 {min(max_tasks, report.total_tasks)} 个):")
+        for config in report.tasks[:max_tasks]:
+            window = config.get("start_date") or "-"
+            if config.get("end_date"):
+                window += f" ~ {config['end_date']}"
+            typer.echo(f"  {config['task_type']} {config['symbol'] or '-'} {window}")
+
+
+@app.command()
+def resume(
+    run_id: str = typer.Argument(..., help="要恢复的运行 ID (即 dl 命令输出的任务ID)"),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="启用调试模式，输出详细日志",
+    ),
+):
+    """恢复中断的下载运行，只继续未完成的任务"""
+    from neo.helpers.utils import setup_logging
+
+    log_level = "debug" if debug else "info"
+    setup_logging("download", log_level)
+
+    app_service = container.app_service()
+    try:
+        enqueued_count = app_service.resume_run(run_id)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    if enqueued_count == 0:
+        typer.echo(f"✅ 运行 {run_id} 没有需要恢复的任务。")
+    else:
+        typer.echo(
+            f"✅ 运行 {run_id} 已恢复，重新派发 {enqueued_count} 个未完成任务。"
+            "请启动消费者来执行任务。"
+        )
+
+
+@app.command()
+def stats(
+    run_id: Optional[str] = typer.Option(
+        None, "--run", help="要统计的运行 ID，默认为最近一次运行"
+    ),
+):
+    """显示一次运行的任务执行指标 (按表统计耗时分位数、吞吐和配额利用率)"""
+    app_service = container.app_service()
+    report = app_service.get_stats_report(run_id)
+
+    if not report.tables:
+        typer.echo("📭 没有找到任务执行指标。")
+        return
+
+    typer.echo(f"📊 运行 {report.run_id or '(全部)'} 的任务执行指标:")
+    for table in report.tables:
+        quota = (
+            f"{table.quota_utilization:.0%}"
+            if table.quota_utilization is not None
+            else "-"
+        )
+        write = (
+            f"{table.write_p50:.2f}s/{table.write_p95:.2f}s"
+            if table.write_p50 is not None
+            else "-"
+        )
+        peak_rss = (
+            f"{table.peak_rss_mb:.0f} MB" if table.peak_rss_mb is not None else "-"
+        )
+        typer.echo(
+            f"  {table.task_type}: 任务 {table.tasks} (失败 {table.failed}), "
+            f"行数 {table.rows} ({table.rows_per_second:.1f} 行/秒), "
+            f"{table.tasks_per_minute:.1f} 任务/分钟, 配额利用率 {quota}, "
+            f"耗时 p50/p95/p99 {table.latency_p50:.2f}s/{table.latency_p95:.2f}s/"
+            f"{table.latency_p99:.2f}s, 平均限流等待 {table.rate_limit_wait_avg:.2f}s, "
+            f"写入 p50/p95 {write}, 文件 {table.files}, 峰值内存 {peak_rss}"
+        )
+
+    if report.slowest:
+        typer.echo("🐢 最慢的股票:")
+        for item in report.slowest:
+            typer.echo(
+                f"  {item['task_type']} {item['symbol']}: "
+                f"{item['duration_seconds']:.2f}s ({item['rows']} 行, "
+                f"限流等待 {item['rate_limit_wait_seconds']:.2f}s)"
+            )
+
+
+@app.command()
+def monitor(
+    interval: float = typer.Option(1.0, "--interval", help="刷新间隔 (秒)"),
+    once: bool = typer.Option(False, "--once", help="只输出一次快照后退出"),
+):
+    """实时监控三个队列的吞吐、限流余量、快速→慢速滞后和预计剩余时间"""
+    from rich.console import Console
+    from rich.live import Live
+
+    from neo.helpers.pipeline_monitor import build_monitor_table, format_pressure
+
+    pipeline_monitor = container.pipeline_monitor()
+    backpressure = container.backpressure_controller()
+
+    def render():
+        return build_monitor_table(
+            pipeline_monitor.poll(), pressure=format_pressure(backpressure)
+        )
+
+    try:
+        if once:
+            Console().print(render())
+            return
+        with Live(render(), screen=True, redirect_stderr=False) as live:
+            while True:
+                time.sleep(interval)
+                live.update(render())
+    except KeyboardInterrupt:
+        typer.echo("\n监控已停止。")
+    finally:
+        pipeline_monitor.close()
+
+
+@app.command()
+def watermarks(
+    tables: Optional[List[str]] = typer.Argument(
+        None, help="要处理的表，默认为所有定义了 date_col 的表"
+    ),
+    rebuild: bool = typer.Option(
+        False, "--rebuild", help="扫描 Parquet 文件重建写入水位索引"
+    ),
+):
+    """查看或重建写入水位索引 (每只股票在每张表中的最新日期)"""
+    from datetime import datetime
+
+    watermark_index = container.watermark_index()
+
+    if rebuild:
+        if not tables:
+            schemas = container.schema_loader().load_all_schemas()
+            tables = sorted(
+                name for name, schema in schemas.items() if schema.date_col
+            )
+        for table in tables:
+            count = watermark_index.rebuild(table)
+            typer.echo(f"🔖 {table}: 已重建 {count} 条水位")
+        return
+
+    statuses = watermark_index.status()
+    if tables:
+        statuses = [status for status in statuses if status.task_type in tables]
+    if not statuses:
+        typer.echo("📭 写入水位索引为空，首次增量规划时会自动建立。")
+        return
+    for status in statuses:
+        rebuilt = (
+            datetime.fromtimestamp(status.rebuilt_at).strftime("%Y-%m-%d %H:%M:%S")
+            if status.rebuilt_at
+            else "未建立"
+        )
+        typer.echo(
+            f"  {status.task_type}: 股票 {status.symbols}, 行数 {status.rows}, "
+            f"最新日期 {status.max_date or '-'}, 建立时间 {rebuilt}"
+        )
+
+
+@app.command()
+def staging(
+    tables: Optional[List[str]] = typer.Argument(
+        None, help="要处理的表，默认为所有有暂存段的表"
+    ),
+    merge: bool = typer.Option(
+        False, "--merge", help="立即把暂存段合并进基础层 (不经维护队列)"
+    ),
+):
+    """查看或合并暂存日志 (writer.mode = "staged" 时增量写入先进入暂存日志)"""
+    staging_merger = container.staging_merger()
+
+    if merge:
+        from neo.tasks.metadata_sync_tasks import sync_metadata
+
+        merged = []
+        for table in tables or [None]:
+            merged.extend(staging_merger.merge(table))
+        for result in merged:
+            typer.echo(
+                f"🧱 {result.task_type}/{result.partition or '.'}: "
+                f"{result.segments} 个暂存段 + {result.base_files} 个文件 → "
+                f"{result.rows} 行 (去重 {result.duplicates} 行)"
+            )
+        if merged:
+            sync_metadata.call_local(force_full_scan=True)
+        else:
+            typer.echo("📭 没有待合并的暂存段。")
+        return
+
+    pending = staging_merger.pending()
+    if tables:
+        pending = {table: count for table, count in pending.items() if table in tables}
+    if not pending:
+        typer.echo("📭 没有待合并的暂存段。")
+        return
+    for table, count in sorted(pending.items()):
+        typer.echo(f"  {table}: {count} 个暂存段")
+
+
+lake_app = typer.Typer(help="数据湖维护命令")
+app.add_typer(lake_app, name="lake")
+
+
+@lake_app.command("migrate")
+def lake_migrate(
+    tables: Optional[List[str]] = typer.Argument(
+        None, help="要迁移的表，默认为 schema 中定义的所有表"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="只统计需要迁移的文件，不重写"
+    ),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", help="并行重写文件的线程数，默认使用 lake.migrate_workers"
+    ),
+):
+    """把已有 Parquet 文件重写为 schema 声明的固定类型，可中断续跑"""
+    migrator = container.lake_migrator()
+    if workers:
+        migrator.workers = max(1, workers)
+
+    report = migrator.migrate(tables or None, dry_run=dry_run)
+    if dry_run:
+        typer.echo(
+            f"🧬 共 {report.files_total} 个文件，需要迁移 {report.files_migrated} 个 "
+            f"({report.bytes_before / 1024 / 1024:.1f} MB)，"
+            f"已符合 schema {report.files_skipped} 个"
+        )
+        return
+
+    saved = report.bytes_before - report.bytes_after
+    typer.echo(
+        f"🧬 共 {report.files_total} 个文件，迁移 {report.files_migrated} 个，"
+        f"跳过 {report.files_skipped} 个，失败 {report.files_failed} 个，"
+        f"耗时 {report.elapsed_seconds:.1f}s"
+    )
+    if report.files_migrated:
+        typer.echo(
+            f"📦 {report.bytes_before / 1024 / 1024:.1f} MB → "
+            f"{report.bytes_after / 1024 / 1024:.1f} MB "
+            f"(节省 {saved / max(report.bytes_before, 1):.0%})"
+        )
+        from neo.tasks.metadata_sync_tasks import sync_metadata
+
+        sync_metadata.call_local(force_full_scan=True)
+    for failure in report.failures:
+        typer.echo(f"  ❌ {failure}")
+    if report.failures:
+        typer.echo("💡 修复问题后重新运行该命令，只会处理尚未迁移的文件。")
+        raise typer.Exit(1)
 
 
 @app.command()
 def dp(
     queue_name: str = typer.Argument(
-        ..., help="要启动的队列名称 ('fast', 'slow', 或 'maint')"
+        ...,
+        help="要启动的队列名称 ('fast', 'slow', 'plan', 'maint'，或 'all' 在同一进程中监管所有队列)",
+    ),
+    shard: int = typer.Option(
+        0, "--shard", help="快速队列的分片编号，每个分片由一个独立的消费者进程处理"
     ),
     debug: bool = typer.Option(
         False,
@@ -90,13 +421,14 @@ def dp(
 
     # 初始化消费者日志配置
     log_level = "debug" if debug else "info"
-    setup_logging(f"consumer_{queue_name}", log_level)  # 为不同队列使用不同日志
+    log_name = f"consumer_{queue_name}" + (f"_shard{shard}" if shard else "")
+    setup_logging(log_name, log_level)  # 为不同队列 (及分片) 使用不同日志
 
     # 使用共享的容器实例
     app_service = container.app_service()
 
     # 启动指定队列的消费者
-    app_service.run_data_processor(queue_name)
+    app_service.run_data_processor(queue_name, shard=shard)
 
 
 def main(app_service: AppService = Provide["AppContainer.app_service"]):
@@ -2,27 +2,142 @@
 消费者运行器服务
 """
 
+import logging
+import signal
 import sys
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
 from huey.consumer import Consumer
 
 from ..configs import get_config
 
+logger = logging.getLogger(__name__)
+
+# 支持的 worker 类型：线程适合 I/O 密集的下载，进程适合 CPU 密集的处理与写入
+VALID_WORKER_TYPES = ("thread", "process")
+
+# `neo dp all` 在同一进程中监管的队列
+ALL_QUEUES = ("fast", "slow", "plan", "maint")
+
+
+def shard_queue_name(queue_name: str, shard: int) -> str:
+    """分片队列的名称，如 'fast#1'；分片 0 即队列本身"""
+    return queue_name if shard == 0 else f"{queue_name}#{shard}"
+
+
+def base_queue_name(name: str) -> str:
+    """去掉分片后缀的队列名称，用于读取队列配置"""
+    return name.split("#", 1)[0]
+
+
+def warm_up_consumers(
+    queue_names: Iterable[str], worker_type_of: Callable[[str], str]
+):
+    """预热消费者进程并打印就绪耗时
+
+    Args:
+        queue_names: 本进程要运行的队列名称
+        worker_type_of: 返回队列 worker 类型的回调
+
+    Returns:
+        WarmUpReport: 预热报告
+    """
+    from ..app import container
+    from .consumer_warmup import ConsumerWarmUp
+
+    fast_workers = get_config().get("huey_fast", {}).get("max_workers", 1)
+    report = ConsumerWarmUp(
+        container,
+        queue_names,
+        worker_type_of=worker_type_of,
+        fast_workers=int(fast_workers),
+    ).run()
+    print(f"🔥 消费者预热完成，{report.summary()}")
+    if report.failed:
+        print(
+            f"⚠️ {len(report.failed)} 个预热步骤失败，相关状态将在首个任务中初始化",
+            file=sys.stderr,
+        )
+    return report
+
 
 class ConsumerRunner:
     """数据处理器运行工具类"""
 
-    def run(self, queue_name: str) -> None:
+    def get_worker_type(self, queue_name: str) -> str:
+        """读取指定队列配置的 worker 类型
+
+        Args:
+            queue_name: 队列名称 ('fast', 'slow', 'plan' 或 'maint')
+
+        Returns:
+            str: 'thread' 或 'process'，未配置时默认为 'thread'
+
+        Raises:
+            ValueError: 配置了不支持的 worker 类型
+        """
+        queue_config = get_config().get(f"huey_{base_queue_name(queue_name)}", {})
+        worker_type = queue_config.get("worker_type", "thread")
+        if worker_type not in VALID_WORKER_TYPES:
+            raise ValueError(
+                f"队列 '{queue_name}' 的 worker_type '{worker_type}' 无效，"
+                f"有效值为 {', '.join(VALID_WORKER_TYPES)}"
+            )
+        return worker_type
+
+    def get_huey(self, queue_name: str):
+        """按队列名称返回 Huey 实例，快速队列分片使用 'fast#<分片>' 形式的名称
+
+        Raises:
+            ValueError: 无效的队列名称
+        """
+        from ..configs import huey_config
+
+        hueys = {
+            shard_queue_name("fast", index): shard
+            for index, shard in enumerate(huey_config.huey_fast_shards)
+        }
+        hueys["slow"] = huey_config.huey_slow
+        hueys["plan"] = huey_config.huey_plan
+        hueys["maint"] = huey_config.huey_maint
+        if queue_name not in hueys:
+            raise ValueError(
+                f"无效的队列名称 '{queue_name}'。"
+                "请使用 'fast', 'slow', 'plan', 'maint' 或 'all'。"
+            )
+        return hueys[queue_name]
+
+    def run(self, queue_name: str, shard: int = 0) -> None:
         """独立运行 Huey 消费者
 
-        在主线程中启动多线程 Consumer，适用于独立的消费者进程。
+        在主线程中启动 Consumer，worker 类型 (线程/进程) 由队列配置的 worker_type 决定，
+        适用于独立的消费者进程。队列名称为 'all' 时由 ConsumerSupervisor
+        在同一进程中监管所有队列。
+
+        Args:
+            queue_name: 队列名称 ('fast', 'slow', 'plan', 'maint' 或 'all')
+            shard: 快速队列的分片编号，每个分片由一个独立的消费者进程处理
         """
+        if queue_name == "all":
+            self.run_all()
+            return
+
         # 根据名字动态选择要启动的huey实例
         if queue_name == "fast":
-            from ..configs.huey_config import huey_fast as huey
+            from ..configs.huey_config import huey_fast_shards
 
+            if not 0 <= shard < len(huey_fast_shards):
+                print(
+                    f"❌ 错误：无效的分片编号 {shard}，快速队列共有 "
+                    f"{len(huey_fast_shards)} 个分片。",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+            huey = huey_fast_shards[shard]
             max_workers = get_config().huey_fast.max_workers
             print(
-                f"🚀 正在启动快速队列消费者 (fast_queue) ，配置 {max_workers} 个 workers..."
+                f"🚀 正在启动快速队列消费者 ({huey.name}) ，配置 {max_workers} 个 workers..."
             )
         elif queue_name == "slow":
             from ..configs.huey_config import huey_slow as huey
@@ -31,6 +146,13 @@ class ConsumerRunner:
             print(
                 f"🐌 正在启动慢速队列消费者 (slow_queue)，配置 {max_workers} 个 workers..."
             )
+        elif queue_name == "plan":
+            from ..configs.huey_config import huey_plan as huey
+
+            max_workers = get_config().huey_plan.max_workers
+            print(
+                f"🗺️ 正在启动规划队列消费者 (plan_queue)，配置 {max_workers} 个 workers..."
+            )
         elif queue_name == "maint":
             from ..configs.huey_config import huey_maint as huey
 
@@ -40,20 +162,33 @@ class ConsumerRunner:
             )
         else:
             print(
-                f"❌ 错误：无效的队列名称 '{queue_name}'。请使用 'fast', 'slow', 或 'maint'。",
+                f"❌ 错误：无效的队列名称 '{queue_name}'。"
+                "请使用 'fast', 'slow', 'plan', 'maint' 或 'all'。",
                 file=sys.stderr,
             )
             sys.exit(1)
 
-        # 重要：导入任务模块，让 Consumer 能够识别和执行任务
-        import neo.tasks.huey_tasks  # noqa: F401
+        try:
+            worker_type = self.get_worker_type(queue_name)
+        except ValueError as e:
+            print(f"❌ 错误：{e}", file=sys.stderr)
+            sys.exit(1)
+
+        # 接收任务之前预热热路径状态；进程型 worker 在 fork 前预热，以写时复制的方式继承
+        warm_up_consumers([queue_name], worker_type_of=lambda name: worker_type)
+
+        if worker_type == "process":
+            # 子进程由 fork 创建，先关闭主进程持有的 SQLite 连接，避免连接跨进程共享；
+            # 每个子进程会在首次访问队列时建立自己的连接
+            huey.storage.close()
+            print("⚙️ 使用进程型 worker，每个进程独立持有预热的容器状态")
 
         try:
-            # 创建 Consumer 实例，配置多线程
+            # 创建 Consumer 实例
             consumer = Consumer(
                 huey,
                 workers=max_workers,
-                worker_type="thread",
+                worker_type=worker_type,
             )
             print("数据处理器已启动，按 Ctrl+C 停止...")
             consumer.run()
@@ -62,3 +197,135 @@ class ConsumerRunner:
         except Exception as e:
             print(f"Consumer ({queue_name}) 运行异常: {e}")
             sys.exit(1)
+
+    def run_all(self) -> None:
+        """在同一进程中监管所有队列的消费者"""
+        from ..configs.huey_config import FAST_SHARD_COUNT
+
+        names = [shard_queue_name("fast", index) for index in range(FAST_SHARD_COUNT)]
+        names += [name for name in ALL_QUEUES if name != "fast"]
+        try:
+            supervisor = ConsumerSupervisor(
+                {name: self.get_huey(name) for name in names},
+                worker_type_of=self.get_worker_type,
+            )
+        except ValueError as e:
+            print(f"❌ 错误：{e}", file=sys.stderr)
+            sys.exit(1)
+        supervisor.run()
+
+
+class ConsumerSupervisor:
+    """在单个进程中监管多个队列的 Huey 消费者
+
+    所有队列共享同一个预热的进程状态 (任务注册、schema 缓存、速率限制器)：
+    线程型 worker 直接共享，进程型 worker 在预热后 fork，以写时复制的方式继承。
+    监管循环定期检查各消费者的健康状况，崩溃的 worker 和调度器会被重启。
+    """
+
+    def __init__(
+        self,
+        hueys: Dict[str, object],
+        worker_type_of: Callable[[str], str],
+        health_check_interval: float = 10.0,
+        consumer_factory: Callable[..., Consumer] = Consumer,
+    ):
+        """初始化监管器
+
+        Args:
+            hueys: 队列名称到 Huey 实例的映射
+            worker_type_of: 返回队列 worker 类型的回调
+            health_check_interval: 健康检查间隔 (秒)
+            consumer_factory: 创建消费者的工厂，便于测试
+        """
+        self.hueys = dict(hueys)
+        self.worker_type_of = worker_type_of
+        self.health_check_interval = float(health_check_interval)
+        self.consumer_factory = consumer_factory
+        self.consumers: Dict[str, Consumer] = {}
+        self._stop_event = threading.Event()
+        self._graceful = True
+
+    def warm_up(self) -> None:
+        """在启动任何 worker 之前预热所有队列的共享状态"""
+        warm_up_consumers(self.hueys, worker_type_of=self.worker_type_of)
+
+    def _build_consumers(self) -> None:
+        config = get_config()
+        for name, huey in self.hueys.items():
+            worker_type = self.worker_type_of(name)
+            queue_config = config.get(f"huey_{base_queue_name(name)}", {})
+            max_workers = queue_config.get("max_workers", 1)
+            if worker_type == "process":
+                # 子进程由 fork 创建，先关闭主进程持有的 SQLite 连接，避免连接跨进程共享
+                huey.storage.close()
+            self.consumers[name] = self.consumer_factory(
+                huey,
+                workers=max_workers,
+                worker_type=worker_type,
+                # 健康检查由监管循环统一执行
+                check_worker_health=False,
+            )
+            print(
+                f"🚀 已创建 {name} 队列消费者，{max_workers} 个 {worker_type} workers"
+            )
+
+    def _install_signal_handlers(self) -> None:
+        """覆盖各消费者注册的信号处理，统一停止所有队列"""
+        signal.signal(signal.SIGINT, self._handle_interrupt)
+        signal.signal(signal.SIGTERM, self._handle_terminate)
+
+    def _handle_interrupt(self, sig_num, frame) -> None:
+        logger.info("收到 SIGINT，正在优雅停止所有消费者...")
+        self.request_stop(graceful=True)
+
+    def _handle_terminate(self, sig_num, frame) -> None:
+        logger.info("收到 SIGTERM，正在停止所有消费者...")
+        self.request_stop(graceful=False)
+
+    def request_stop(self, graceful: bool = True) -> None:
+        """请求停止监管循环"""
+        self._graceful = graceful
+        self._stop_event.set()
+
+    def check_health(self) -> None:
+        """检查所有消费者，重启崩溃的 worker 和调度器"""
+        for name, consumer in self.consumers.items():
+            try:
+                consumer.check_worker_health()
+            except Exception as e:
+                logger.error(f"❌ {name} 队列健康检查失败: {e}", exc_info=True)
+
+    def start(self) -> None:
+        """预热共享状态并启动所有消费者"""
+        self.warm_up()
+        self._build_consumers()
+        # 进程型消费者先启动：fork 发生在任何线程型消费者创建线程之前，
+        # 避免从多线程进程 fork 子进程 (子进程可能继承被其他线程持有的锁而死锁)
+        ordered = sorted(
+            self.consumers.items(),
+            key=lambda item: self.worker_type_of(item[0]) != "process",
+        )
+        for _, consumer in ordered:
+            consumer.start()
+        self._install_signal_handlers()
+        print(f"数据处理器已启动 ({', '.join(self.consumers)})，按 Ctrl+C 停止...")
+
+    def stop(self, names: Optional[Iterable[str]] = None) -> None:
+        """停止消费者并通知被中断的任务"""
+        for name in names or list(self.consumers):
+            consumer = self.consumers[name]
+            consumer.stop(graceful=self._graceful)
+            consumer.huey.notify_interrupted_tasks()
+        print("\n所有数据处理器已停止")
+
+    def run(self) -> None:
+        """启动所有消费者并进入监管循环，直到收到停止信号"""
+        self.start()
+        try:
+            while not self._stop_event.wait(self.health_check_interval):
+                self.check_health()
+        except KeyboardInterrupt:
+            self._graceful = True
+        finally:
+            self.stop()
@@ -0,0 +1,162 @@
+"""消费者预热
+
+消费者启动后的第一批任务往往要为导入 tushare、初始化 TushareApiManager、解析
+schema TOML、构建 FetcherBuilder、创建限流器和建立首个连接买单，每次运行开始时
+任务耗时都会出现尖峰。预热在消费者开始接收任务之前完成这些工作，并报告就绪耗时。
+
+每个步骤独立计时，失败只记录警告，不阻止消费者启动 (如网络暂时不可用)。
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .consumer_runner import base_queue_name
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmUpStep:
+    """单个预热步骤的结果"""
+
+    name: str
+    seconds: float
+    ok: bool = True
+    detail: str = ""
+
+
+@dataclass
+class WarmUpReport:
+    """预热报告"""
+
+    steps: List[WarmUpStep] = field(default_factory=list)
+    total_seconds: float = 0.0
+
+    @property
+    def failed(self) -> List[WarmUpStep]:
+        return [step for step in self.steps if not step.ok]
+
+    def summary(self) -> str:
+        """一行摘要，如 '就绪耗时 1.84s (schema 0.12s, Tushare API 1.30s, ...)'"""
+        parts = ", ".join(
+            f"{step.name} {step.seconds:.2f}s" + ("" if step.ok else " ❌")
+            for step in self.steps
+        )
+        return f"就绪耗时 {self.total_seconds:.2f}s ({parts})"
+
+
+class ConsumerWarmUp:
+    """按队列预热消费者进程的热路径状态"""
+
+    def __init__(
+        self,
+        container,
+        queue_names: Iterable[str],
+        worker_type_of: Optional[Callable[[str], str]] = None,
+        fast_workers: int = 1,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """初始化预热
+
+        Args:
+            container: 应用容器
+            queue_names: 本进程要运行的队列名称 (可含 'fast#1' 形式的分片名称)
+            worker_type_of: 返回队列 worker 类型的回调，进程型 worker 不预建 HTTP 连接
+            fast_workers: 快速队列的 worker 数，即预建的 HTTP 连接数
+            clock: 计时函数，便于测试
+        """
+        self.container = container
+        self.queues = {base_queue_name(name) for name in queue_names}
+        self.worker_type_of = worker_type_of or (lambda name: "thread")
+        self.fast_workers = fast_workers
+        self._clock = clock
+
+    def _steps(self) -> List[Tuple[str, Callable[[], str]]]:
+        steps = [("任务模块", self._import_tasks), ("schema", self._load_schemas)]
+        if "fast" in self.queues:
+            steps += [
+                ("Tushare API", self._resolve_api_functions),
+                ("限流器", self._create_limiters),
+            ]
+            # fork 出的子进程不能共享父进程的 socket，进程型 worker 首次调用时再建立连接
+            if self.worker_type_of("fast") == "thread":
+                steps.append(("HTTP 连接", self._open_connections))
+        if "plan" in self.queues:
+            steps.append(("交易日历", self._load_trading_calendar))
+        if "slow" in self.queues:
+            steps.append(("数据处理器", self._build_data_processor))
+        if self.queues & {"fast", "slow", "plan"}:
+            steps.append(("状态库", self._open_state_stores))
+        return steps
+
+    def run(self) -> WarmUpReport:
+        """依次执行预热步骤并返回报告"""
+        report = WarmUpReport()
+        started = self._clock()
+        for name, step in self._steps():
+            step_started = self._clock()
+            try:
+                detail = step() or ""
+                ok = True
+            except Exception as e:
+                logger.warning(f"⚠️ 预热步骤 '{name}' 失败: {e}")
+                detail, ok = str(e), False
+            seconds = self._clock() - step_started
+            report.steps.append(WarmUpStep(name, seconds, ok, detail))
+            logger.info(f"🔥 预热 {name}: {seconds:.2f}s {detail}".rstrip())
+        report.total_seconds = self._clock() - started
+        return report
+
+    def _import_tasks(self) -> str:
+        # 重要：导入任务模块，让 Consumer 能够识别和执行任务
+        import neo.tasks.huey_tasks  # noqa: F401
+
+        return ""
+
+    def _load_schemas(self) -> str:
+        schemas = self.container.schema_loader().load_all_schemas()
+        return f"{len(schemas)} 张表"
+
+    def _api_targets(self) -> Dict[str, Tuple[str, str]]:
+        schemas = self.container.schema_loader().load_all_schemas()
+        return {
+            name: (schema.base_object, schema.api_method)
+            for name, schema in schemas.items()
+            if getattr(schema, "api_method", None)
+        }
+
+    def _resolve_api_functions(self) -> str:
+        # 下载器单例持有 FetcherBuilder，首次创建时导入 tushare 并初始化 API 管理器
+        api_manager = self.container.downloader().fetcher_builder.api_manager
+        targets = self._api_targets()
+        for base_object, api_method in targets.values():
+            api_manager.get_api_function(base_object, api_method)
+        return f"{len(targets)} 个接口"
+
+    def _create_limiters(self) -> str:
+        rate_limit_manager = self.container.rate_limit_manager()
+        task_types = list(self._api_targets())
+        for task_type in task_types:
+            rate_limit_manager.get_limiter(task_type)
+        return f"{len(task_types)} 个任务类型"
+
+    def _open_connections(self) -> str:
+        api_manager = self.container.downloader().fetcher_builder.api_manager
+        opened = api_manager.prewarm_connections(self.fast_workers)
+        return f"{opened}/{self.fast_workers} 个连接"
+
+    def _load_trading_calendar(self) -> str:
+        latest = self.container.db_queryer().get_latest_trading_day()
+        return f"最新交易日 {latest}" if latest else "交易日历不可用"
+
+    def _build_data_processor(self) -> str:
+        self.container.data_processor()
+        return ""
+
+    def _open_state_stores(self) -> str:
+        # 首次连接时建表并设置 WAL，之后的任务直接复用
+        self.container.task_registry().pending_count()
+        self.container.metrics_store().latest_run_id()
+        return ""
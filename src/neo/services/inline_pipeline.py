@@ -0,0 +1,224 @@
+"""
+内联流水线服务
+
+在单个进程内完成 规划 → 下载 → 处理 → 写入，不经过 Huey 的 SQLite 队列，
+适用于笔记本上的临时运行或一次性的历史回补。
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ..data_processor.interfaces import IDataProcessor
+from ..database.interfaces import ISchemaLoader
+from ..downloader.interfaces import IDownloader
+from ..writers.interfaces import IParquetWriter
+
+if TYPE_CHECKING:
+    from ..database.planner_query import PlannerQueryEngine
+    from ..helpers.coverage_engine import CoverageEngine
+    from ..helpers.disclosure_calendar import DisclosureCalendar
+    from ..helpers.symbol_universe import SymbolUniverse
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_SENTINEL = object()
+
+
+@dataclass
+class InlineRunStats:
+    """内联流水线运行统计"""
+
+    planned: int = 0
+    downloaded: int = 0
+    empty: int = 0
+    failed: int = 0
+    written: int = 0
+    rows: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+
+class InlinePipelineRunner:
+    """单进程内联流水线运行器
+
+    各阶段之间通过有界内存队列连接：
+    - 规划线程 (调用方线程) 产出任务配置，放入任务队列；
+    - 多个下载线程并发下载，结果放入结果队列；
+    - 一个独立的写入线程负责数据处理和写入。
+    有界队列天然提供背压：写入跟不上时下载线程阻塞，下载跟不上时规划阻塞。
+    """
+
+    def __init__(
+        self,
+        downloader: IDownloader,
+        data_processor: IDataProcessor,
+        parquet_writer: IParquetWriter,
+        schema_loader: ISchemaLoader,
+        db_queryer: Any,
+        download_workers: int = 4,
+        queue_size: int = 64,
+        coverage_engine: Optional["CoverageEngine"] = None,
+        symbol_universe: Optional["SymbolUniverse"] = None,
+        disclosure_calendar: Optional["DisclosureCalendar"] = None,
+        query_engine: Optional["PlannerQueryEngine"] = None,
+    ):
+        """初始化内联流水线
+
+        Args:
+            downloader: 下载器
+            data_processor: 数据处理器
+            parquet_writer: Parquet 写入器，运行结束时负责刷出缓冲
+            schema_loader: Schema 加载器，用于增量规划
+            db_queryer: 数据库查询器，用于增量规划
+            download_workers: 并发下载线程数
+            queue_size: 阶段之间有界队列的容量
+            coverage_engine: 覆盖引擎，与队列规划一致地生成补缺任务
+            symbol_universe: 股票池，与队列规划一致地跳过不可能有数据的任务
+            disclosure_calendar: 披露日历，与队列规划一致地按披露时间表规划财务报表
+            query_engine: 规划查询引擎，与队列规划一致地一次查询所有表的最新日期
+        """
+        self.downloader = downloader
+        self.data_processor = data_processor
+        self.parquet_writer = parquet_writer
+        self.schema_loader = schema_loader
+        self.db_queryer = db_queryer
+        self.download_workers = max(1, int(download_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.coverage_engine = coverage_engine
+        self.symbol_universe = symbol_universe
+        self.disclosure_calendar = disclosure_calendar
+        self.query_engine = query_engine
+
+    def run(self, task_stock_mapping: Dict[str, List[str]]) -> InlineRunStats:
+        """运行内联流水线，阻塞直到所有任务完成
+
+        Args:
+            task_stock_mapping: 任务类型到股票代码列表的映射
+
+        Returns:
+            InlineRunStats: 运行统计
+        """
+        from ..tasks.download_tasks import DownloadTaskManager
+
+        stats = InlineRunStats()
+        start = time.monotonic()
+
+        task_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        result_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+
+        downloaders = [
+            threading.Thread(
+                target=self._download_loop,
+                args=(task_queue, result_queue, stats),
+                name=f"inline-downloader-{i + 1}",
+                daemon=True,
+            )
+            for i in range(self.download_workers)
+        ]
+        writer = threading.Thread(
+            target=self._write_loop,
+            args=(result_queue, stats),
+            name="inline-writer",
+            daemon=True,
+        )
+        writer.start()
+        for thread in downloaders:
+            thread.start()
+
+        try:
+            task_manager = DownloadTaskManager(
+                self.schema_loader,
+                coverage_engine=self.coverage_engine,
+                symbol_universe=self.symbol_universe,
+                disclosure_calendar=self.disclosure_calendar,
+                query_engine=self.query_engine,
+            )
+            latest_trading_day = self.db_queryer.get_latest_trading_day()
+            for task_params in task_manager.iter_task_configs(
+                task_stock_mapping, self.db_queryer, latest_trading_day
+            ):
+                task_queue.put(task_params)
+                stats.incr("planned")
+        finally:
+            # 通知所有下载线程结束，待其全部退出后再通知写入线程
+            for _ in downloaders:
+                task_queue.put(_SENTINEL)
+            for thread in downloaders:
+                thread.join()
+            result_queue.put(_SENTINEL)
+            writer.join()
+            self.parquet_writer.flush()
+
+        stats.elapsed_seconds = time.monotonic() - start
+        logger.info(
+            f"🏁 内联流水线完成: 计划 {stats.planned}, 下载 {stats.downloaded}, "
+            f"空数据 {stats.empty}, 失败 {stats.failed}, 写入 {stats.written} "
+            f"({stats.rows} 行), 耗时 {stats.elapsed_seconds:.1f} 秒"
+        )
+        return stats
+
+    def _download_loop(
+        self,
+        task_queue: "queue.Queue[Any]",
+        result_queue: "queue.Queue[Any]",
+        stats: InlineRunStats,
+    ) -> None:
+        """下载线程：从任务队列取任务，下载后放入结果队列"""
+        while True:
+            task_params = task_queue.get()
+            if task_params is _SENTINEL:
+                return
+
+            params = dict(task_params)
+            task_type = params.pop("task_type")
+            symbol = params.pop("symbol")
+            try:
+                result = self.downloader.download(task_type, symbol, **params)
+            except Exception as e:
+                result = None
+                stats.errors.append(f"{task_type}/{symbol}: {e}")
+
+            if result is None:
+                stats.incr("failed")
+                logger.warning(f"⏬ ⚠️ [INLINE] 下载失败: {symbol} ({task_type})")
+            elif result.empty:
+                stats.incr("empty")
+                logger.debug(f"[INLINE] 下载返回空数据: {symbol} ({task_type})")
+            else:
+                stats.incr("downloaded")
+                result_queue.put((task_type, symbol, result))
+
+    def _write_loop(
+        self, result_queue: "queue.Queue[Any]", stats: InlineRunStats
+    ) -> None:
+        """写入线程：串行处理下载结果并写入数据湖"""
+        while True:
+            item = result_queue.get()
+            if item is _SENTINEL:
+                return
+
+            task_type, symbol, data = item
+            rows = len(data)
+            try:
+                success = self.data_processor.process(task_type, symbol, data)
+            except Exception as e:
+                success = False
+                stats.errors.append(f"{task_type}/{symbol}: {e}")
+
+            if success:
+                stats.incr("written")
+                stats.incr("rows", rows)
+            else:
+                stats.incr("failed")
+                logger.warning(f"⚠️ [INLINE] 数据处理失败: {symbol} ({task_type})")
+
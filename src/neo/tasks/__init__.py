@@ -4,5 +4,6 @@
 - download_tasks: 下载相关任务
 - data_processing_tasks: 数据处理相关任务
 - metadata_sync_tasks: 元数据同步相关任务
+- staging_tasks: 暂存日志合并相关任务
 - huey_tasks: 兼容性模块，重新导出所有任务
 """
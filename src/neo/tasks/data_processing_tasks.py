@@ -4,10 +4,16 @@
 """
 
 import logging
-from typing import List, Dict, Any
+import time
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
+
 from ..configs.huey_config import huey_slow
+from ..helpers.memory_governor import read_peak_rss_bytes
+from ..helpers.metrics_store import STAGE_WRITE
+from ..helpers.run_manifest import STATE_FAILED, STATE_WRITTEN
+from ..writers.batching_parquet_writer import BatchingParquetWriter
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +21,15 @@ logger = logging.getLogger(__name__)
 class DataProcessor:
     """数据处理器，负责处理和验证数据"""
 
-    def __init__(self):
-        pass
+    def __init__(self, release_payload: bool = False):
+        """初始化数据处理器
+
+        Args:
+            release_payload: 转换为 DataFrame 后立即清空原始的字典列表 (大任务降低峰值内存)
+        """
+        self.release_payload = release_payload
+        # 最近一次处理写出的 Parquet 文件数
+        self.last_file_count = 0
 
     def _validate_data_frame(
         self, data_frame: List[Dict[str, Any]], task_type: str, symbol: str
@@ -63,6 +76,8 @@ class DataProcessor:
 
         # 直接使用SimpleDataProcessor，它内部会根据配置选择更新策略
         data_processor = container.data_processor()
+        writer = getattr(data_processor, "parquet_writer", None)
+        files_before = _files_written(writer)
 
         try:
             process_success = data_processor.process(task_type, symbol, df_data)
@@ -71,6 +86,7 @@ class DataProcessor:
         finally:
             # 确保数据处理器正确关闭，刷新所有缓冲区数据
             data_processor.shutdown()
+            self.last_file_count = max(0, _files_written(writer) - files_before)
 
     def process_data(
         self, task_type: str, symbol: str, data_frame: List[Dict[str, Any]]
@@ -88,6 +104,9 @@ class DataProcessor:
         try:
             # 验证和转换数据
             df_data = self._validate_data_frame(data_frame, task_type, symbol)
+            if self.release_payload:
+                # 原始字典列表远大于 DataFrame，转换后即可释放
+                data_frame.clear()
 
             # 处理数据
             logger.debug(
@@ -106,6 +125,12 @@ class DataProcessor:
             raise e
 
 
+def _files_written(writer: Any) -> int:
+    """写入器累计写出的文件数，不支持统计的写入器返回 0"""
+    count = getattr(writer, "files_written", 0)
+    return count if isinstance(count, int) else 0
+
+
 def _process_data_sync(task_type: str, data: pd.DataFrame) -> bool:
     """异步处理数据的公共函数（保持向后兼容）
 
@@ -122,22 +147,64 @@ def _process_data_sync(task_type: str, data: pd.DataFrame) -> bool:
     return processor.process_data(task_type, "", data_records)
 
 
-@huey_slow.task()
+@huey_slow.task(context=True)
 def process_data_task(
-    task_type: str, symbol: str, data_frame: List[Dict[str, Any]]
+    task_type: str,
+    symbol: str,
+    data_frame: List[Dict[str, Any]],
+    task_key: Optional[str] = None,
+    run_id: Optional[str] = None,
+    payload_bytes: Optional[int] = None,
+    deferrals: int = 0,
+    task=None,
 ) -> bool:
     """数据处理任务 (慢速队列)
 
+    处理前向内存管控申请额度，额度不足时带着递增的延迟次数重新入队，
+    避免多个大负载同时处理导致 OOM。Huey 重新入队 RetryTask 时不会改变任务的
+    retries，因此延迟次数通过参数显式传递，达到上限后任务不再等待系统内存。
+
     Args:
         task_type: 任务类型字符串
         symbol: 股票代码
         data_frame: DataFrame 数据 (字典列表形式)
+        task_key: 下载任务的任务键，处理结束后释放其登记
+        run_id: 所属运行的 ID，处理结束后更新运行清单中的任务状态
+        payload_bytes: 下载端测得的负载大小，用于估算处理时的内存
+        deferrals: 任务已因内存不足被延迟的次数
+        task: 当前 Huey 任务 (由 Huey 注入)，重新入队时沿用其优先级
 
     Returns:
-        bool: 处理是否成功
+        bool: 处理是否成功，被延迟时返回 False
     """
+    from ..app import container
+
+    governor = container.memory_governor()
+    estimate = governor.estimate(data_frame, payload_bytes)
+    if not governor.acquire(estimate, attempt=deferrals):
+        logger.info(
+            f"🐌 🧠 [HUEY_SLOW] 内存额度不足，任务延迟 {governor.defer_seconds:.0f} "
+            f"秒后重试 (第 {deferrals + 1} 次): {symbol}_{task_type} "
+            f"(估算 {estimate / 1024 / 1024:.0f} MB)"
+        )
+        process_data_task.schedule(
+            args=(task_type, symbol, data_frame),
+            kwargs={
+                "task_key": task_key,
+                "run_id": run_id,
+                "payload_bytes": payload_bytes,
+                "deferrals": deferrals + 1,
+            },
+            delay=governor.defer_seconds,
+            priority=getattr(task, "priority", None),
+        )
+        return False
+
+    result = False
+    rows = len(data_frame or [])
+    processor = DataProcessor(release_payload=governor.is_large(estimate))
+    started = time.perf_counter()
     try:
-        processor = DataProcessor()
         result = processor.process_data(task_type, symbol, data_frame)
 
         logger.info(f"🏆 [HUEY_SLOW] 最终结果: {symbol}_{task_type}, 成功: {result}")
@@ -146,3 +213,65 @@ def process_data_task(
     except Exception as e:
         logger.error(f"❌ [HUEY_SLOW] 数据处理任务执行失败: {symbol}, 错误: {e}")
         raise e
+    finally:
+        governor.release(estimate)
+        if task_key:
+            container.metrics_store().record(
+                STAGE_WRITE,
+                task_type,
+                symbol,
+                duration_seconds=time.perf_counter() - started,
+                rows=rows,
+                payload_bytes=payload_bytes or 0,
+                file_count=processor.last_file_count,
+                success=result,
+                run_id=run_id,
+                peak_rss_bytes=read_peak_rss_bytes(),
+            )
+            _finish_task(task_type, task_key, run_id, result)
+
+
+def _finish_task(
+    task_type: str, task_key: str, run_id: Optional[str], result: bool
+) -> None:
+    """释放任务登记并更新运行清单
+
+    攒批写入器中的数据在刷盘后才落盘、水位才前移。成功的任务等到该表的缓冲区刷出后
+    再释放登记并标记为已写入，否则期间规划的任务会看到旧水位而重复下载同一段数据。
+    """
+    from ..app import container
+
+    def finish() -> None:
+        container.task_registry().release(task_key)
+        if run_id:
+            state = STATE_WRITTEN if result else STATE_FAILED
+            container.run_manifest().mark(run_id, task_key, state)
+
+    writer = container.parquet_writer()
+    if result and isinstance(writer, BatchingParquetWriter):
+        writer.on_flushed(task_type, finish)
+    else:
+        finish()
+
+
+@huey_slow.on_startup()
+def warm_up_worker_state():
+    """worker 启动时预热容器状态
+
+    进程型 worker 中每个进程都会执行一次，使 schema 缓存、写入器等在处理第一个任务前就绪。
+    """
+    from ..app import container
+
+    container.schema_loader().load_all_schemas()
+    container.data_processor()
+    logger.debug("🐌 [HUEY_SLOW] worker 容器状态已预热")
+
+
+@huey_slow.on_shutdown()
+def flush_parquet_writer():
+    """消费者关闭时刷出写入器中尚未落盘的缓冲数据"""
+    from ..app import container
+
+    writer = container.parquet_writer()
+    flushed = writer.flush()
+    logger.info(f"🐌 [HUEY_SLOW] 消费者关闭，已刷出 {flushed} 个缓冲分区")
@@ -2,19 +2,49 @@
 
 包含股票数据下载相关的 Huey 任务。
 V3版本采用交叉生成和随机优先级策略，以优化任务队列的均匀性、解决“车队效应”并减少内存占用。
+规划任务运行在独立的规划队列上，按股票分块查询最新日期，每块解析完成即派发，
+`neo dl` 之后几秒内下载即可开始。
 """
 
 import logging
+import time as time_module
 from datetime import datetime, time, timedelta
-from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+from huey.exceptions import RetryTask
 
 from ..configs.app_config import get_config
-from ..configs.huey_config import huey_fast, huey_slow
-from ..helpers.utils import get_next_day_str
+from ..configs.huey_config import (
+    PLAN_DISPATCH_BATCH_SIZE,
+    PLAN_FIRST_CHUNK_SIZE,
+    PLAN_MAX_CHUNK_SIZE,
+    huey_fast,
+    huey_fast_shards,
+    huey_plan,
+    huey_slow,
+)
+from ..helpers.fair_share_scheduler import LANE_BULK, LANE_DEADLINE, SchedulePlan
+from ..helpers.metrics_store import STAGE_DOWNLOAD
+from ..helpers.run_manifest import (
+    STATE_DOWNLOADED,
+    STATE_EMPTY,
+    STATE_FAILED,
+    STATE_SUPERSEDED,
+    new_run_id,
+)
+from ..helpers.shard_router import ConsistentHashRing
+from ..helpers.task_registry import make_task_key, registry_slot
+from ..helpers.utils import get_next_day_str, normalize_stock_code
+from .bulk_enqueue import bulk_enqueue, bulk_enqueue_sharded
 
 if TYPE_CHECKING:
     from ..database.operator import ParquetDBQueryer
     from ..database.interfaces import ISchemaLoader
+    from ..database.planner_query import PlannerQueryEngine
+    from ..helpers.coverage_engine import CoverageEngine
+    from ..helpers.disclosure_calendar import DisclosureCalendar
+    from ..helpers.symbol_universe import SymbolUniverse
 
 logger = logging.getLogger(__name__)
 
@@ -65,9 +95,35 @@ def detect_task_group_strategy(group_name: str) -> str:
 class DownloadTaskManager:
     """下载任务管理器，负责构建和管理下载任务 (无状态)"""
 
-    def __init__(self, schema_loader: "ISchemaLoader"):
+    def __init__(
+        self,
+        schema_loader: "ISchemaLoader",
+        first_chunk_size: int = PLAN_FIRST_CHUNK_SIZE,
+        max_chunk_size: int = PLAN_MAX_CHUNK_SIZE,
+        coverage_engine: Optional["CoverageEngine"] = None,
+        symbol_universe: Optional["SymbolUniverse"] = None,
+        disclosure_calendar: Optional["DisclosureCalendar"] = None,
+        query_engine: Optional["PlannerQueryEngine"] = None,
+    ):
+        """初始化任务管理器
+
+        Args:
+            schema_loader: Schema 加载器
+            first_chunk_size: 首批查询最新日期的股票数
+            max_chunk_size: 每批查询最新日期的最大股票数
+            coverage_engine: 覆盖引擎，提供时为历史数据中的缺口生成补缺任务
+            symbol_universe: 股票池，提供时跳过未上市、已退市或整段停牌的任务
+            disclosure_calendar: 披露日历，提供时财务报表只为可能有新财报的股票生成任务
+            query_engine: 规划查询引擎，提供时一次查询所有增量表的最新日期
+        """
         self.config = get_config()
         self.schema_loader = schema_loader
+        self.first_chunk_size = max(1, first_chunk_size)
+        self.max_chunk_size = max(self.first_chunk_size, max_chunk_size)
+        self.coverage_engine = coverage_engine
+        self.symbol_universe = symbol_universe
+        self.disclosure_calendar = disclosure_calendar
+        self.query_engine = query_engine
 
     def _get_task_types_and_symbols(
         self, group_name: str, stock_codes: Optional[List[str]]
@@ -97,57 +153,56 @@ class DownloadTaskManager:
 
         return task_types, symbols
 
+    def _skip_mask(
+        self, latest_dates: List[Optional[str]], latest_trading_day: Optional[str]
+    ) -> np.ndarray:
+        """对一批股票的最新日期一次性判断是否跳过，规则与 _should_skip_task 相同
+
+        Args:
+            latest_dates: 各股票本地的最新日期，没有数据时为 None
+            latest_trading_day: 最新交易日
+
+        Returns:
+            np.ndarray: 与 latest_dates 等长的布尔数组，True 表示跳过
+        """
+        latest = np.array([d or "" for d in latest_dates], dtype=str)
+        has_data = latest != ""
+        now = datetime.now()
+        today_str = now.strftime("%Y%m%d")
+        before_close = now.time() < time(18, 0)
+
+        if not latest_trading_day:
+            logger.warning("⏬ ⚠️ 无法获取最新交易日，使用旧逻辑进行判断。")
+            yesterday_str = (now - timedelta(days=1)).strftime("%Y%m%d")
+            return has_data & (
+                (latest == today_str) | ((latest == yesterday_str) & before_close)
+            )
+
+        # 本地数据晚于最新交易日 (异常) 时跳过；等于最新交易日时，
+        # 只有今天即最新交易日且已收盘才重新下载今日数据
+        current = latest == latest_trading_day
+        if today_str == latest_trading_day and not before_close:
+            current = np.zeros_like(current)
+        return has_data & ((latest > latest_trading_day) | current)
+
     def _should_skip_task(
         self, latest_date: Optional[str], latest_trading_day: Optional[str]
     ) -> bool:
         """检查是否应该跳过当前任务"""
-        if not latest_date:
-            return False
+        return bool(self._skip_mask([latest_date], latest_trading_day)[0])
 
-        if not latest_trading_day:
-            logger.warning("⏬ ⚠️ 无法获取最新交易日，使用旧逻辑进行判断。")
-            today_str = datetime.now().strftime("%Y%m%d")
-            yesterday_str = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
-            current_time = datetime.now().time()
-            market_close_time = time(18, 0)
-
-            if latest_date == today_str:
-                return True
-            if latest_date == yesterday_str and current_time < market_close_time:
-                return True
-            return False
-
-        if latest_date < latest_trading_day:
-            logger.info(
-                f"⏬ 执行任务：本地数据落后 (本地: {latest_date}, 最新交易日: {latest_trading_day})"
-            )
-            return False
+    def _iter_symbol_chunks(self, symbols: List[str]) -> Iterator[List[str]]:
+        """将股票代码切分为逐步增大的块
 
-        if latest_date > latest_trading_day:
-            logger.info(
-                f"⏬ ⏭️ 跳过任务：数据已是最新 (本地: {latest_date}, 最新交易日: {latest_trading_day})"
-            )
-            return True
-
-        today_str = datetime.now().strftime("%Y%m%d")
-        if today_str == latest_trading_day:
-            current_time = datetime.now().time()
-            market_close_time = time(18, 0)
-            if current_time < market_close_time:
-                logger.info(
-                    f"⏬ ⏭️ 跳过任务：等待 {latest_trading_day} 收盘数据 (本地: {latest_date}, 当前时间: {current_time.strftime('%H:%M')})"
-                )
-                return True
-            else:
-                logger.info(
-                    f"⏬ 执行任务：{latest_trading_day} 已收盘，下载今日数据 (本地: {latest_date})"
-                )
-                return False
-        else:
-            logger.info(
-                f"⏬ ⏭️ 跳过任务：数据已是最新 (本地: {latest_date}, 最新交易日: {latest_trading_day})"
-            )
-            return True
+        首块很小，第一批任务在一次小查询后即可派发；之后块大小翻倍直到上限，
+        控制整体的查询次数。
+        """
+        size = self.first_chunk_size
+        start = 0
+        while start < len(symbols):
+            yield symbols[start : start + size]
+            start += size
+            size = min(size * 2, self.max_chunk_size)
 
     def _generate_task_configs_for_type(
         self,
@@ -155,8 +210,12 @@ class DownloadTaskManager:
         symbols: Optional[List[str]],
         db_queryer: "ParquetDBQueryer",
         latest_trading_day: Optional[str],
+        prefetched_max_dates: Optional[Dict[str, str]] = None,
     ) -> Iterator[Dict]:
-        """为一个任务类型创建所有任务配置的生成器"""
+        """为一个任务类型创建所有任务配置的生成器
+
+        prefetched_max_dates 为规划查询引擎预先算好的最新日期，提供时不再分块查询。
+        """
         logger.debug(f"为任务类型 '{task_type}' 创建任务生成器...")
         default_start_date = self.config.download_tasks.default_start_date
 
@@ -198,21 +257,48 @@ class DownloadTaskManager:
                 has_date_col = False
 
             if has_date_col:
-                max_dates = db_queryer.get_max_date(task_type, task_symbols)
-                for symbol in task_symbols:
-                    latest_date = max_dates.get(symbol)
-                    if self._should_skip_task(latest_date, latest_trading_day):
-                        continue
-                    start_date = (
-                        get_next_day_str(latest_date)
-                        if latest_date
-                        else default_start_date
+                # 财务报表的最新报告期总是落后于最新交易日，改按披露时间表判断
+                calendar = self.disclosure_calendar
+                by_disclosure = calendar is not None and calendar.is_tracked(task_type)
+                if by_disclosure:
+                    calendar.refresh()
+                if prefetched_max_dates is not None:
+                    chunks = iter([(task_symbols, prefetched_max_dates)])
+                else:
+                    # 分块查询最新日期，每块解析完成即产出任务，不等待整张表扫描结束
+                    chunks = (
+                        (chunk, db_queryer.get_max_date(task_type, chunk))
+                        for chunk in self._iter_symbol_chunks(task_symbols)
                     )
-                    yield {
-                        "task_type": task_type,
-                        "symbol": symbol,
-                        "start_date": start_date,
-                    }
+                skipped = 0
+                for chunk, max_dates in chunks:
+                    latest_dates = [max_dates.get(symbol) for symbol in chunk]
+                    if by_disclosure:
+                        keep = [
+                            calendar.is_due(task_type, symbol, latest_date)
+                            for symbol, latest_date in zip(chunk, latest_dates)
+                        ]
+                    else:
+                        keep = ~self._skip_mask(latest_dates, latest_trading_day)
+                    for symbol, latest_date, needed in zip(chunk, latest_dates, keep):
+                        if not needed:
+                            skipped += 1
+                            continue
+                        start_date = (
+                            get_next_day_str(latest_date)
+                            if latest_date
+                            else default_start_date
+                        )
+                        yield {
+                            "task_type": task_type,
+                            "symbol": symbol,
+                            "start_date": start_date,
+                        }
+                if skipped:
+                    reason = "未到财报披露时间" if by_disclosure else "数据已是最新"
+                    logger.info(f"⏬ ⏭️ {task_type}: {skipped} 只股票{reason}，跳过")
+                # 最新数据的任务派发之后，再补历史缺口
+                yield from self._gap_task_configs(task_type, task_symbols)
             else:  # 没有日期列的任务，按全量处理
                 logger.info(f"⏬ 任务 {task_type} 没有日期列，执行全量下载。")
                 for symbol in task_symbols:
@@ -227,98 +313,399 @@ class DownloadTaskManager:
             )
 
 
-@huey_slow.task()
-def build_and_enqueue_downloads_task(task_stock_mapping: Dict[str, List[str]]):
-    """
-    构建并派发增量下载任务 (慢速队列, V3 - 随机优先级)
+    def _gap_task_configs(self, task_type: str, symbols: List[str]) -> Iterator[Dict]:
+        """为股票历史数据中缺失的交易日区间生成补缺任务"""
+        coverage = self.coverage_engine
+        if coverage is None or not coverage.is_tracked(task_type):
+            return
+        code_mapping = {normalize_stock_code(s): s for s in symbols if s}
+        try:
+            gaps = coverage.find_gaps(task_type, code_mapping)
+        except Exception as e:
+            logger.warning(f"⏬ ⚠️ {task_type} 缺口检测失败，跳过补缺: {e}")
+            return
+        for ts_code, ranges in gaps.items():
+            for start_date, end_date in ranges:
+                yield {
+                    "task_type": task_type,
+                    "symbol": code_mapping[ts_code],
+                    "start_date": start_date,
+                    "end_date": end_date,
+                }
 
-    这是智能增量下载的第一步。它会为每个业务类型创建独立的任务生成器，
-    然后通过轮询、交叉生成的方式，为每个任务附加一个随机优先级后再派发。
-    这能确保队列任务的高度多样性，解决"车队效应"导致的 worker 阻塞。
+    def _skip_impossible(
+        self, task_configs: Iterator[Dict], latest_trading_day: Optional[str]
+    ) -> Iterator[Dict]:
+        """跳过股票在任务区间内不可能有数据的任务，不为其消耗接口额度
 
-    Args:
-        task_stock_mapping: 任务类型到股票代码列表的映射，如 {'stock_basic': ['000001.SZ', '000002.SZ'], 'daily': ['000001.SZ']}
-    """
-    logger.debug(
-        f"[HUEY_SLOW] V3 开始构建增量下载任务, 任务映射: {list(task_stock_mapping.keys())}"
-    )
-    try:
-        from ..app import container
+        任务区间为 start_date 到 end_date，没有 end_date 时到最新交易日。
+        """
+        universe = self.symbol_universe
+        if universe is None:
+            yield from task_configs
+            return
+        try:
+            universe.refresh()
+        except Exception as e:
+            logger.warning(f"⏬ ⚠️ 股票池加载失败，不过滤任务: {e}")
+            yield from task_configs
+            return
 
-        db_queryer = container.db_queryer()
-        schema_loader = container.schema_loader()
-        task_manager = DownloadTaskManager(schema_loader)
+        from ..helpers.symbol_universe import REASON_LABELS
 
-        latest_trading_day = db_queryer.get_latest_trading_day()
-        if latest_trading_day:
-            logger.debug(f"获取到最新交易日: {latest_trading_day}")
-        else:
-            logger.warning("⏬ ⚠️ 未能获取到最新交易日，部分任务可能不会执行增量检查。")
+        skipped: Dict[str, int] = {}
+        for config in task_configs:
+            reason = universe.why_impossible(
+                config["task_type"],
+                config["symbol"],
+                config.get("start_date"),
+                config.get("end_date") or latest_trading_day,
+            )
+            if reason in REASON_LABELS:
+                skipped[reason] = skipped.get(reason, 0) + 1
+            else:
+                yield config
+        if skipped:
+            details = ", ".join(
+                f"{REASON_LABELS[reason]} {count}"
+                for reason, count in skipped.items()
+            )
+            logger.info(
+                f"⏬ ⏭️ 跳过 {sum(skipped.values())} 个不可能有数据的任务 ({details})"
+            )
+
+    def iter_task_configs(
+        self,
+        task_stock_mapping: Dict[str, List[str]],
+        db_queryer: "ParquetDBQueryer",
+        latest_trading_day: Optional[str],
+    ) -> Iterator[Dict]:
+        """为每个业务类型创建独立的任务生成器，并轮询、交叉地产出任务配置
 
+        交叉产出能确保下游队列中任务类型的多样性，避免"车队效应"导致的 worker 阻塞。
+        配置了股票池时，不可能有数据的任务在产出前即被跳过；配置了规划查询引擎时，
+        写入水位索引已建立的增量表的最新日期在开始产出前一次查询完成，
+        其余表仍分块查询，不会在首次运行时为建立索引阻塞派发。
+
+        Args:
+            task_stock_mapping: 任务类型到股票代码列表的映射
+            db_queryer: 用于增量检查的数据库查询器
+            latest_trading_day: 最新交易日
+
+        Yields:
+            Dict: 包含 task_type、symbol、start_date 的任务配置
+        """
         task_types = list(task_stock_mapping.keys())
         if not task_types:
             return
 
+        prefetched = self._prefetch_max_dates(task_stock_mapping)
+
         # 1. 为每个业务类型创建独立的"任务生成器"
         logger.debug(f"为 {len(task_types)} 个任务类型创建生成器: {task_types}")
-        generators = [
-            task_manager._generate_task_configs_for_type(
-                tt, task_stock_mapping[tt], db_queryer, latest_trading_day
+        active_generators = [
+            iter(
+                self._generate_task_configs_for_type(
+                    tt,
+                    task_stock_mapping[tt],
+                    db_queryer,
+                    latest_trading_day,
+                    prefetched.get(tt),
+                )
             )
             for tt in task_types
         ]
 
-        # 2. 轮询、交叉生成并派发带有随机优先级的任务
-        enqueued_count = 0
-        active_generators = [iter(g) for g in generators]
-        logger.debug(f"开始从 {len(active_generators)} 个生成器中轮询并派发任务...")
+        # 2. 轮询、交叉生成任务
+        logger.debug(f"开始从 {len(active_generators)} 个生成器中轮询产出任务...")
+        yield from self._skip_impossible(
+            self._interleave(active_generators), latest_trading_day
+        )
 
+    def _prefetch_max_dates(
+        self, task_stock_mapping: Dict[str, List[str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """用规划查询引擎一次查询索引已就绪的增量表的最新日期
+
+        索引未就绪的表 (如首次运行) 建立索引需要扫描整张表，不在这里预取，
+        由逐表分块查询处理；查询失败时全部回退为逐表分块查询。
+        """
+        if self.query_engine is None:
+            return {}
+        incremental = {
+            task_type: symbols
+            for task_type, symbols in task_stock_mapping.items()
+            if getattr(
+                getattr(self.config.download_tasks, task_type, None),
+                "update_strategy",
+                None,
+            )
+            == "incremental"
+        }
+        if not incremental:
+            return {}
+        started = time_module.monotonic()
+        try:
+            prefetched = self.query_engine.max_dates(incremental, indexed_only=True)
+        except Exception as e:
+            logger.warning(f"⏬ ⚠️ 规划查询失败，回退为逐表查询最新日期: {e}")
+            return {}
+        if not isinstance(prefetched, dict):
+            return {}
+        logger.debug(
+            f"规划查询完成: {len(prefetched)} 张表，"
+            f"耗时 {time_module.monotonic() - started:.2f} 秒"
+        )
+        return prefetched
+
+    @staticmethod
+    def _interleave(active_generators: List[Iterator[Dict]]) -> Iterator[Dict]:
+        """轮询各任务类型的生成器，交叉产出任务配置"""
         while active_generators:
             # 倒序遍历，方便安全地移除耗尽的生成器
             for i in range(len(active_generators) - 1, -1, -1):
-                gen_iter = active_generators[i]
                 try:
-                    task_params = next(gen_iter)
-                    # 派发任务，不再附加随机优先级
-                    download_task(**task_params)
-                    logger.info(f"⏬ 已派发任务: {task_params}")
-                    enqueued_count += 1
+                    yield next(active_generators[i])
                 except StopIteration:
                     # 这个生成器已经耗尽，将它从活跃列表中移除
                     active_generators.pop(i)
 
-        logger.debug(f"[HUEY_SLOW] V3 成功派发 {enqueued_count} 个增量下载任务。")
+
+@huey_plan.task(context=True)
+def build_and_enqueue_downloads_task(
+    task_stock_mapping: Dict[str, List[str]],
+    lane: str = LANE_BULK,
+    deadline: Optional[str] = None,
+    task=None,
+):
+    """
+    构建并派发增量下载任务 (规划队列, V3 - 加权公平优先级)
+
+    这是智能增量下载的第一步。它会为每个业务类型创建独立的任务生成器，
+    然后通过轮询、交叉生成的方式产出任务，由加权公平调度器为每个任务分配优先级后再派发。
+    这能确保快速队列出队时任务类型的多样性，解决"车队效应"导致的 worker 阻塞。
+    规划是流式的：每个股票块的最新日期解析完成后，其任务即按小批次登记并派发。
+
+    Args:
+        task_stock_mapping: 任务类型到股票代码列表的映射，如 {'stock_basic': ['000001.SZ', '000002.SZ'], 'daily': ['000001.SZ']}
+        lane: 优先级通道 ('interactive', 'deadline' 或 'bulk')
+        deadline: 截止时间 (ISO 格式)，指定时任务进入 deadline 通道并估算能否按时完成
+        task: 当前 Huey 任务 (由 Huey 注入)，其 ID 作为本次运行的 run_id
+    """
+    logger.debug(
+        f"[HUEY_PLAN] V3 开始构建增量下载任务, 任务映射: {list(task_stock_mapping.keys())}"
+    )
+    try:
+        from ..app import container
+
+        db_queryer = container.db_queryer()
+        schema_loader = container.schema_loader()
+        task_manager = DownloadTaskManager(
+            schema_loader,
+            coverage_engine=container.coverage_engine(),
+            symbol_universe=container.symbol_universe(),
+            disclosure_calendar=container.disclosure_calendar(),
+            query_engine=container.planner_query_engine(),
+        )
+
+        latest_trading_day = db_queryer.get_latest_trading_day()
+        if latest_trading_day:
+            logger.debug(f"获取到最新交易日: {latest_trading_day}")
+        else:
+            logger.warning("⏬ ⚠️ 未能获取到最新交易日，部分任务可能不会执行增量检查。")
+
+        if deadline and lane == LANE_BULK:
+            lane = LANE_DEADLINE
+
+        # 运行清单：记录每个计划任务的状态，供 `neo resume <run-id>` 恢复
+        run_id = task.id if task is not None else new_run_id()
+        run_manifest = container.run_manifest()
+        run_manifest.create_run(run_id, task_stock_mapping.keys(), lane)
+
+        # 轮询、交叉生成任务，经登记表去重、登记到运行清单、调度器分配优先级后按批次派发；
+        # 各环节使用较小的批次，第一块股票解析完成后其任务即可进入快速队列
+        batch_size = PLAN_DISPATCH_BATCH_SIZE
+        task_configs = task_manager.iter_task_configs(
+            task_stock_mapping, db_queryer, latest_trading_day
+        )
+        task_registry = container.task_registry()
+        scheduler = container.fair_share_scheduler()
+        plan = SchedulePlan()
+        claimed = task_registry.filter_unclaimed(task_configs, batch_size=batch_size)
+        scheduled = scheduler.assign(
+            run_manifest.track(run_id, claimed, batch_size=batch_size),
+            task_stock_mapping.keys(),
+            lane=lane,
+            plan=plan,
+        )
+        enqueued_count = enqueue_download_tasks(scheduled, batch_size=batch_size)
+
+        logger.info(
+            f"⏬ [HUEY_PLAN] 运行 {run_id} 成功派发 {enqueued_count} 个增量下载任务 "
+            f"(通道: {lane})。"
+        )
+        if deadline:
+            scheduler.check_deadline(plan, datetime.fromisoformat(deadline))
 
     except Exception as e:
-        logger.error(f"⏬ ❌ [HUEY_SLOW] V3 构建下载任务失败: {e}", exc_info=True)
+        logger.error(f"⏬ ❌ [HUEY_PLAN] V3 构建下载任务失败: {e}", exc_info=True)
         raise e
 
 
-@huey_fast.task(retries=2, retry_delay=60)
-def download_task(task_type: str, symbol: str, **kwargs):
+def _live_task_keys() -> set:
+    """收集仍在快速 (含所有分片)/慢速队列中 (待执行或延迟重试) 的任务键"""
+    from ..helpers.run_manifest import RunManifest
+
+    live = set()
+    fast_queued = [
+        queued
+        for shard in huey_fast_shards
+        for queued in [*shard.pending(), *shard.scheduled()]
+    ]
+    for queued in fast_queued:
+        if queued.name == download_task.task_class.__name__:
+            params = dict(zip(("task_type", "symbol"), queued.args))
+            params.update(queued.kwargs)
+            live.add(RunManifest.task_key_for(params))
+    for queued in [*huey_slow.pending(), *huey_slow.scheduled()]:
+        task_key = queued.kwargs.get("task_key")
+        if task_key:
+            live.add(task_key)
+    return live
+
+
+def resume_run(run_id: str) -> int:
+    """恢复一次运行：只重新派发清单中尚未完成、且不在队列中的任务
+
+    不重新规划，因此不会对数据湖执行 get_max_date 扫描。已下载但未写入的任务
+    (慢速消费者崩溃时丢失的数据) 会按原参数重新下载。仍由其他 worker 执行中的任务
+    不重新派发；已被合并到其他任务中的任务标记为 superseded。
+
+    Args:
+        run_id: 运行 ID
+
+    Returns:
+        int: 重新派发的任务数
+
+    Raises:
+        ValueError: 运行不存在
+    """
+    from ..app import container
+
+    run_manifest = container.run_manifest()
+    if not run_manifest.run_exists(run_id):
+        raise ValueError(f"运行 '{run_id}' 不存在")
+
+    live = _live_task_keys()
+    candidates = {}
+    for params in run_manifest.unfinished(run_id):
+        task_key = run_manifest.task_key_for(params)
+        if task_key not in live:
+            candidates[task_key] = params
+
+    # 已被合并到其他任务中的任务不再需要下载，标记为终态
+    task_registry = container.task_registry()
+    superseded = task_registry.superseded(candidates)
+    if superseded:
+        run_manifest.mark_many(run_id, superseded, STATE_SUPERSEDED)
+        logger.info(f"⏬ ⏭️ 运行 {run_id} 中 {len(superseded)} 个任务已被合并，不再派发")
+    # 其他 worker 仍在执行的任务不能强制接管，否则会被重复下载
+    in_flight = task_registry.in_flight(candidates)
+    unfinished = [
+        params
+        for task_key, params in candidates.items()
+        if task_key not in superseded and task_key not in in_flight
+    ]
+    if not unfinished:
+        return 0
+
+    # 崩溃的任务仍持有登记，恢复时强制接管
+    scheduler = container.fair_share_scheduler()
+    claimed = task_registry.filter_unclaimed(unfinished, force=True)
+    scheduled = scheduler.assign(
+        run_manifest.track(run_id, claimed),
+        {params["task_type"] for params in unfinished},
+    )
+    enqueued_count = enqueue_download_tasks(scheduled)
+    logger.info(f"⏬ 运行 {run_id} 已恢复，重新派发 {enqueued_count} 个未完成任务")
+    return enqueued_count
+
+
+@huey_fast.task(retries=2, retry_delay=60, context=True)
+def download_task(task_type: str, symbol: str, task=None, **kwargs):
     """
     下载股票数据的 Huey 任务 (快速队列)
 
-    下载完成后，直接调用慢速队列的数据处理任务。
+    下载完成后，直接调用慢速队列的数据处理任务。重试次数用尽后释放任务登记，
+    避免失败的任务在登记过期前一直阻塞同一股票的重新规划。
 
     Args:
         task_type: 任务类型字符串
         symbol: 股票代码
+        task: 当前 Huey 任务 (由 Huey 注入)，用于判断重试次数是否用尽
         **kwargs: 额外的下载参数，如 start_date, end_date
     """
+    task_key = None
+    run_id = kwargs.get("run_id")
     try:
         logger.debug(f"[HUEY_FAST] 开始执行下载任务: {symbol} ({task_type})")
 
         from ..app import container
         from .data_processing_tasks import process_data_task
 
+        kwargs.pop("run_id", None)
+        task_registry = container.task_registry()
+        task_key = make_task_key(task_type, symbol, **kwargs)
+        slot = registry_slot(symbol, kwargs)
+        if not task_registry.mark_in_flight(task_type, slot, task_key):
+            logger.info(f"⏬ ⏭️ [HUEY_FAST] 任务已被合并到更早的任务中，跳过: {task_key}")
+            if run_id:
+                container.run_manifest().mark(run_id, task_key, STATE_SUPERSEDED)
+            return
+
+        # 背压：慢速队列积压时先等待，超时则延迟重试，释放当前 worker
+        backpressure = container.backpressure_controller()
+        if not backpressure.wait_for_capacity():
+            logger.info(
+                f"⏬ 🚦 [HUEY_FAST] 慢速队列积压，任务延迟 "
+                f"{backpressure.retry_delay_seconds:.0f} 秒后重试: {task_key}"
+            )
+            raise RetryTask(delay=backpressure.retry_delay_seconds)
+
         downloader = container.downloader()
+        rate_limit_manager = container.rate_limit_manager()
+        rate_limit_manager.pop_wait_seconds()
+        download_start = time_module.monotonic()
         result = downloader.download(task_type, symbol, **kwargs)
+        payload_bytes = (
+            int(result.memory_usage(deep=True).sum()) if result is not None else 0
+        )
+        container.metrics_store().record(
+            STAGE_DOWNLOAD,
+            task_type,
+            symbol,
+            duration_seconds=time_module.monotonic() - download_start,
+            rows=len(result) if result is not None else 0,
+            payload_bytes=payload_bytes,
+            rate_limit_wait_seconds=rate_limit_manager.pop_wait_seconds(),
+            success=result is not None,
+            run_id=run_id,
+        )
+        if result is not None and kwargs.get("end_date"):
+            # 补缺区间已下载过，其中仍没有数据的交易日 (如停牌) 不再视为缺口
+            container.coverage_engine().mark_verified(
+                task_type,
+                normalize_stock_code(symbol),
+                kwargs.get("start_date") or "",
+                kwargs["end_date"],
+            )
 
         if result is not None and not result.empty:
             logger.info(
                 f"⏬ [HUEY_FAST] 下载完成: {symbol}, 准备转换数据并提交到慢速队列..."
             )
+            if run_id:
+                container.run_manifest().mark(run_id, task_key, STATE_DOWNLOADED)
 
             # --- 开始计时 ---
             start_dt = datetime.now()
@@ -328,6 +715,9 @@ def download_task(task_type: str, symbol: str, **kwargs):
                 task_type=task_type,
                 symbol=symbol,
                 data_frame=data_as_dict,
+                task_key=task_key,
+                run_id=run_id,
+                payload_bytes=payload_bytes,
             )
 
             end_dt = datetime.now()
@@ -337,18 +727,75 @@ def download_task(task_type: str, symbol: str, **kwargs):
             )
             # --- 计时结束 ---
         else:
+            task_registry.release(task_key)
+            if run_id:
+                container.run_manifest().mark(run_id, task_key, STATE_EMPTY)
             logger.warning(
                 f"⏬ ⚠️ [HUEY_FAST] 下载任务完成: {symbol}, 但返回空数据，不提交后续任务"
             )
 
+    except RetryTask:
+        raise
     except Exception as e:
-        logger.error(
-            f"⏬ ❌ [HUEY_FAST] 下载任务执行失败，将在60秒后重试。任务: {task_type}, 代码: {symbol}, 错误: {e}",
-            exc_info=True,
-        )
+        if task is not None and task.retries > 0:
+            logger.error(
+                f"⏬ ❌ [HUEY_FAST] 下载任务执行失败，将在60秒后重试。任务: {task_type}, 代码: {symbol}, 错误: {e}",
+                exc_info=True,
+            )
+        else:
+            logger.error(
+                f"⏬ ❌ [HUEY_FAST] 下载任务重试次数已用尽，释放任务登记。"
+                f"任务: {task_type}, 代码: {symbol}, 错误: {e}",
+                exc_info=True,
+            )
+            _release_failed_task(task_key, run_id)
         raise e
 
 
+def _release_failed_task(task_key: Optional[str], run_id: Optional[str]) -> None:
+    """最终失败的下载任务释放登记，并在运行清单中标记为失败 (可被 resume 重新派发)"""
+    if task_key is None:
+        return
+    try:
+        from ..app import container
+
+        container.task_registry().release(task_key)
+        if run_id:
+            container.run_manifest().mark(run_id, task_key, STATE_FAILED)
+    except Exception as e:
+        logger.warning(f"⚠️ 释放失败任务的登记失败: {task_key}, 错误: {e}")
+
+
+# 每个快速队列分片都注册同一个下载任务 (任务名称一致)，分片 0 即 download_task
+download_task_shards = [download_task] + [
+    shard.task(retries=2, retry_delay=60, context=True)(download_task.func)
+    for shard in huey_fast_shards[1:]
+]
+_shard_ring = ConsistentHashRing(len(download_task_shards))
+
+
+def enqueue_download_tasks(
+    params_iter: Iterable[Dict], batch_size: Optional[int] = None
+) -> int:
+    """批量派发下载任务，多分片时按股票代码一致性哈希路由到对应分片
+
+    Args:
+        params_iter: 下载任务参数的可迭代对象
+        batch_size: 每个事务写入的任务数，为 None 时读取配置
+
+    Returns:
+        int: 派发的任务数
+    """
+    if len(download_task_shards) == 1:
+        return bulk_enqueue(download_task, params_iter, batch_size=batch_size)
+    return bulk_enqueue_sharded(
+        download_task_shards,
+        lambda params: _shard_ring.shard_for(params["symbol"]),
+        params_iter,
+        batch_size=batch_size,
+    )
+
+
 @huey_slow.task()
 def cleanup_downloader_task():
     """清理下载器资源"""
@@ -4,6 +4,7 @@
 - download_tasks.py: 下载相关任务
 - data_processing_tasks.py: 数据处理相关任务
 - metadata_sync_tasks.py: 元数据同步相关任务
+- staging_tasks.py: 暂存日志合并相关任务
 """
 
 # 导入所有任务以保持向后兼容性
@@ -19,6 +20,7 @@ from .metadata_sync_tasks import (
     sync_metadata,
     get_sync_metadata_crontab,
 )
+from .staging_tasks import merge_staging
 
 # 重新导出所有任务函数，保持原有的导入路径可用
 __all__ = [
@@ -28,6 +30,7 @@ __all__ = [
     "_process_data_sync",
     "sync_metadata",
     "get_sync_metadata_crontab",
+    "merge_staging",
 ]
 
 
@@ -24,8 +24,11 @@ def sync_metadata(force_full_scan: bool = False, mtime_check_minutes: int = 60):
         config = get_config()
         metadata_db_path = config.database.metadata_path
         parquet_base_path = config.storage.parquet_base_path
+        staging_path = config.writer.get("staging_path", "data/staging")
 
-        sync_manager = MetadataSyncManager(metadata_db_path, parquet_base_path)
+        sync_manager = MetadataSyncManager(
+            metadata_db_path, parquet_base_path, staging_path=staging_path
+        )
         sync_manager.sync(
             force_full_scan=force_full_scan, mtime_check_minutes=mtime_check_minutes
         )
@@ -44,8 +47,18 @@ def get_sync_metadata_crontab():
         huey.crontab: 根据配置文件中的调度配置
     """
     config = get_config()
-    schedule = config.cron_tasks.sync_metadata_schedule
+    return parse_minute_crontab(config.cron_tasks.sync_metadata_schedule)
+
 
+def parse_minute_crontab(schedule: str):
+    """把 cron 表达式解析为 huey crontab (简化版，仅支持分钟字段)
+
+    Args:
+        schedule: cron 表达式，如 "*/10 * * * *"
+
+    Returns:
+        huey.crontab: 对应的调度配置，无法解析时为每小时执行
+    """
     # 解析 cron 表达式 (简化版，仅支持分钟)
     # 例如："*/10 * * * *" 表示每10分钟执行
     # "0 * * * *" 表示每小时的第0分钟执行
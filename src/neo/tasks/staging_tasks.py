@@ -0,0 +1,52 @@
+"""暂存日志合并相关任务
+
+维护队列定期把暂存日志 (Arrow IPC 段) 合并进基础层的 Parquet 分区，
+合并后刷新元数据视图。
+"""
+
+import logging
+from typing import Optional
+
+from ..configs.app_config import get_config
+from ..configs.huey_config import huey_maint
+from .metadata_sync_tasks import parse_minute_crontab, sync_metadata
+
+logger = logging.getLogger(__name__)
+
+
+@huey_maint.task()
+def merge_staging(task_type: Optional[str] = None) -> int:
+    """合并暂存段到基础层
+
+    Args:
+        task_type: 只合并指定表，为 None 时合并所有有暂存段的表
+
+    Returns:
+        int: 合并的分区数
+    """
+    try:
+        from ..app import container
+
+        results = container.staging_merger().merge(task_type)
+    except Exception as e:
+        logger.error(f"🧱 ❌ 暂存段合并任务失败: {e}", exc_info=True)
+        raise
+
+    if results:
+        # 暂存数据已进入基础层，刷新视图使其指向合并后的文件
+        sync_metadata(force_full_scan=True)
+    return len(results)
+
+
+def get_merge_staging_crontab():
+    """获取暂存段合并的 crontab 调度配置"""
+    config = get_config()
+    return parse_minute_crontab(
+        config.cron_tasks.get("merge_staging_schedule", "*/15 * * * *")
+    )
+
+
+@huey_maint.periodic_task(get_merge_staging_crontab())
+def periodic_merge_staging():
+    """定期合并暂存段的周期性任务"""
+    return merge_staging()
@@ -0,0 +1,179 @@
+"""按 schema 编译 Arrow 类型
+
+写入器过去让 PyArrow 从每批 DataFrame 推断类型，同一列在不同文件中可能是字符串也可能是
+double，读取时只能依赖 ``union_by_name``。这里把 stock_schema.toml 中声明的列类型编译为
+每张表一个固定的 Arrow schema，并在每次写入时强制转换：
+
+- INTEGER / REAL / BOOLEAN → int64 / float64 (可选降为 float32) / bool；
+- DATE → 默认保持 ``YYYYMMDD`` 字符串 (规划器、水位索引和 SQL 都按字符串比较日期)，
+  开启 ``date32_dates`` 后存为 date32；
+- TEXT → string，低基数列 (如 ts_code) 可配置为字典编码。
+
+schema 中没有声明的列 (例如分区列 year) 保持 PyArrow 推断的类型。
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ..database.interfaces import ISchemaLoader
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y%m%d"
+
+
+class ArrowSchemaCompiler:
+    """把 schema 配置编译为 Arrow schema，并把待写数据转换为该 schema"""
+
+    def __init__(
+        self,
+        schema_loader: ISchemaLoader,
+        dictionary_columns: Optional[Iterable[str]] = None,
+        downcast_float32: bool = False,
+        date32_dates: bool = False,
+    ):
+        """初始化编译器
+
+        Args:
+            schema_loader: schema 加载器
+            dictionary_columns: 字典编码的低基数字符串列
+            downcast_float32: 是否把 REAL 列存为 float32
+            date32_dates: 是否把 DATE 列存为 date32，默认保持 YYYYMMDD 字符串
+        """
+        self.schema_loader = schema_loader
+        self.dictionary_columns = set(dictionary_columns or [])
+        self.downcast_float32 = bool(downcast_float32)
+        self.date32_dates = bool(date32_dates)
+        self._compiled: Dict[str, Optional[pa.Schema]] = {}
+
+    def compile(self, task_type: str) -> Optional[pa.Schema]:
+        """编译表的 Arrow schema，schema 配置中没有该表或没有列定义时返回 None"""
+        if task_type not in self._compiled:
+            try:
+                columns = self.schema_loader.load_schema(task_type).columns or []
+            except KeyError:
+                columns = []
+            fields = [
+                pa.field(column["name"], self._arrow_type(column))
+                for column in columns
+                if column.get("name")
+            ]
+            self._compiled[task_type] = pa.schema(fields) if fields else None
+        return self._compiled[task_type]
+
+    def to_table(self, data: pd.DataFrame, task_type: str) -> pa.Table:
+        """把 DataFrame 转换为符合表 schema 的 Arrow 表
+
+        schema 中声明的列按 schema 顺序排在前面并转换为声明的类型，其余列保持推断类型。
+        """
+        schema = self.compile(task_type)
+        if schema is None:
+            return pa.Table.from_pandas(data, preserve_index=False)
+
+        declared = [name for name in schema.names if name in data.columns]
+        extras = [name for name in data.columns if name not in schema.names]
+        arrays, fields = [], []
+        for name in declared:
+            field = schema.field(name)
+            array = _series_to_arrow(data[name], field.type)
+            arrays.append(self._convert(array, field))
+            fields.append(field)
+        if extras:
+            inferred = pa.Table.from_pandas(data[extras], preserve_index=False)
+            arrays.extend(inferred.columns)
+            fields.extend(inferred.schema)
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def conform(self, table: pa.Table, task_type: str) -> pa.Table:
+        """把已有的 Arrow 表转换为表 schema，已经符合时原样返回"""
+        schema = self.compile(task_type)
+        if schema is None or self.conforms(table.schema, task_type):
+            return table
+
+        declared = [name for name in schema.names if name in table.column_names]
+        extras = [name for name in table.column_names if name not in schema.names]
+        arrays, fields = [], []
+        for name in declared:
+            field = schema.field(name)
+            arrays.append(self._convert(table.column(name), field))
+            fields.append(field)
+        for name in extras:
+            arrays.append(table.column(name))
+            fields.append(table.schema.field(name))
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def conforms(self, schema: pa.Schema, task_type: str) -> bool:
+        """文件 schema 中声明过的列是否都已是目标类型且按 schema 顺序排列"""
+        target = self.compile(task_type)
+        if target is None:
+            return True
+        declared = [name for name in schema.names if name in target.names]
+        if declared != [name for name in target.names if name in declared]:
+            return False
+        return all(
+            schema.field(name).type == target.field(name).type for name in declared
+        )
+
+    def _arrow_type(self, column: dict) -> pa.DataType:
+        """schema 列类型到 Arrow 类型的映射"""
+        declared = str(column.get("type", "TEXT")).upper()
+        if declared == "INTEGER":
+            return pa.int64()
+        if declared == "REAL":
+            return pa.float32() if self.downcast_float32 else pa.float64()
+        if declared == "BOOLEAN":
+            return pa.bool_()
+        if declared == "DATE":
+            return pa.date32() if self.date32_dates else pa.string()
+        if column["name"] in self.dictionary_columns:
+            return pa.dictionary(pa.int32(), pa.string())
+        return pa.string()
+
+    @staticmethod
+    def _convert(
+        column: Union[pa.Array, pa.ChunkedArray], field: pa.Field
+    ) -> Union[pa.Array, pa.ChunkedArray]:
+        """把一列转换为目标类型，无法解析的值转为 null"""
+        target = field.type
+        if column.type == target:
+            return column
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        if pa.types.is_dictionary(target):
+            column = ArrowSchemaCompiler._convert(
+                column, pa.field(field.name, target.value_type)
+            )
+            return column.cast(target)
+
+        source = column.type
+        if pa.types.is_string(target) or pa.types.is_large_string(target):
+            if pa.types.is_temporal(source):
+                return pc.strftime(column, format=DATE_FORMAT).cast(target)
+            return column.cast(target)
+        if pa.types.is_date32(target) and (
+            pa.types.is_string(source) or pa.types.is_large_string(source)
+        ):
+            parsed = pc.strptime(
+                column, format=DATE_FORMAT, unit="s", error_is_null=True
+            )
+            return parsed.cast(target)
+        if pa.types.is_string(source) or pa.types.is_large_string(source):
+            numeric = pd.to_numeric(column.to_pandas(), errors="coerce")
+            column = pa.array(numeric, from_pandas=True)
+        return column.cast(target, safe=False)
+
+
+def _series_to_arrow(series: pd.Series, target: pa.DataType) -> pa.Array:
+    """把一列 DataFrame 数据转为 Arrow 数组，混合类型的字符串列先统一为字符串"""
+    if series.dtype == object and not pa.types.is_floating(target):
+        try:
+            return pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            series = series.astype("string")
+    elif series.dtype == object:
+        series = pd.to_numeric(series, errors="coerce")
+    return pa.array(series, from_pandas=True)
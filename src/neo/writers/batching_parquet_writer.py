@@ -0,0 +1,496 @@
+"""攒批 (Group-Commit) Parquet 写入器实现
+
+将增量写入按 (表, 分区) 在内存中攒批，达到行数或时间阈值后合并为一个文件写出，
+避免每个 symbol 每年每次运行都产生一个只有几行的小文件。
+"""
+
+import atexit
+import functools
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from ..helpers.watermark_index import REPLACE_NONE
+from .interfaces import IParquetWriter
+from .parquet_writer import ParquetWriter
+
+if TYPE_CHECKING:
+    from ..helpers.lease_manager import LeaseManager
+    from ..helpers.watermark_index import WatermarkIndex
+    from .arrow_schema import ArrowSchemaCompiler
+
+logger = logging.getLogger(__name__)
+
+BufferKey = Tuple[str, str]
+
+
+class _FlushWaiter:
+    """等待一组缓冲区全部落盘后调用一次回调"""
+
+    def __init__(self, callback: Callable[[], None], remaining: int):
+        self.callback = callback
+        self.remaining = remaining
+        self._lock = threading.Lock()
+
+    def done(self) -> None:
+        with self._lock:
+            self.remaining -= 1
+            if self.remaining != 0:
+                return
+        try:
+            self.callback()
+        except Exception as e:
+            logger.error(f"💥 刷盘回调执行失败: {e}", exc_info=True)
+
+
+@dataclass
+class _PartitionBuffer:
+    """单个 (表, 分区) 的待写缓冲区"""
+
+    tables: List[pa.Table] = field(default_factory=list)
+    spool_files: List[Path] = field(default_factory=list)
+    rows: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    waiters: List[_FlushWaiter] = field(default_factory=list)
+
+    def append(self, table: pa.Table, spool_file: Optional[Path]) -> None:
+        self.tables.append(table)
+        self.rows += table.num_rows
+        if spool_file is not None:
+            self.spool_files.append(spool_file)
+
+    def merge(self, other: "_PartitionBuffer") -> None:
+        self.tables.extend(other.tables)
+        self.spool_files.extend(other.spool_files)
+        self.waiters.extend(other.waiters)
+        self.rows += other.rows
+        self.created_at = min(self.created_at, other.created_at)
+
+
+class BatchingParquetWriter(IParquetWriter):
+    """按 (表, 分区) 攒批写入的 Parquet 写入器
+
+    - 增量写入先进入内存缓冲区，同时落一份 Arrow 预写文件 (spool) 保证崩溃可恢复；
+    - 缓冲区行数超过 ``max_rows`` 或存在时间超过 ``max_delay_seconds`` 时触发刷盘；
+    - 刷盘时每个分区合并为一个 Parquet 文件，多个分区并行写出；
+    - 最终文件先写入 ``.parquet.tmp`` 再原子重命名，读者不会看到半写文件；
+    - 全量替换类写入直接委托给 ``ParquetWriter``；
+    - 数据落盘后才更新写入水位，需要在落盘后执行的动作 (如释放任务登记) 通过
+      ``on_flushed`` 注册。
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        max_rows: int = 50000,
+        max_delay_seconds: float = 30.0,
+        max_workers: int = 4,
+        spool_path: Optional[str] = None,
+        lease_manager: Optional["LeaseManager"] = None,
+        watermark_index: Optional["WatermarkIndex"] = None,
+        schema_compiler: Optional["ArrowSchemaCompiler"] = None,
+    ):
+        """初始化写入器
+
+        Args:
+            base_path: 所有 Parquet 数据的根存储路径
+            max_rows: 单个分区缓冲区的行数阈值
+            max_delay_seconds: 单个分区缓冲区的最长停留时间 (秒)
+            max_workers: 并行写出分区的线程数
+            spool_path: 预写文件目录，为 None 时不落预写文件 (进程崩溃会丢失缓冲数据)
+            lease_manager: 租约管理器，多节点共享数据目录时用于独占写入分区
+            watermark_index: 写入水位索引，分区文件落盘后更新每只股票的最新日期
+            schema_compiler: Arrow schema 编译器，进入缓冲区前把数据转换为表的固定类型
+        """
+        self.base_path = Path(base_path)
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay_seconds = float(max_delay_seconds)
+        self.max_workers = max(1, int(max_workers))
+        self.spool_root = Path(spool_path) if spool_path else None
+
+        self.lease_manager = lease_manager
+        self.watermark_index = watermark_index
+        self.schema_compiler = schema_compiler
+        self._direct_writer = ParquetWriter(
+            base_path=base_path,
+            lease_manager=lease_manager,
+            watermark_index=watermark_index,
+            schema_compiler=schema_compiler,
+        )
+        self._buffers: Dict[BufferKey, _PartitionBuffer] = {}
+        self._flushing: Dict[BufferKey, _PartitionBuffer] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        self._spool_dir: Optional[Path] = None
+        self._batch_files_written = 0
+
+        atexit.register(self.shutdown)
+
+    @property
+    def files_written(self) -> int:
+        """累计写入的 Parquet 文件数 (含合并写入与直写)"""
+        return self._batch_files_written + self._direct_writer.files_written
+
+    # ------------------------------------------------------------------
+    # IParquetWriter
+    # ------------------------------------------------------------------
+    def write(
+        self,
+        data: pd.DataFrame,
+        task_type: str,
+        partition_cols: List[str],
+        symbol: str = None,
+    ) -> None:
+        """将数据放入对应分区的缓冲区，必要时触发刷盘"""
+        if data is None or data.empty:
+            logger.debug("数据为空，跳过写入 Parquet 文件")
+            return
+
+        self._ensure_started()
+
+        full_keys: List[BufferKey] = []
+        to_table = None
+        if self.schema_compiler is not None:
+            to_table = functools.partial(
+                self.schema_compiler.to_table, task_type=task_type
+            )
+        for partition, table in split_by_partition(data, partition_cols, to_table):
+            key = (task_type, partition)
+            spool_file = self._spool(key, table)
+            with self._lock:
+                buffer = self._buffers.setdefault(key, _PartitionBuffer())
+                buffer.append(table, spool_file)
+                if buffer.rows >= self.max_rows:
+                    full_keys.append(key)
+
+        logger.debug(
+            f"📥 [{symbol or task_type}] {len(data)} 条数据已进入 {task_type} 写入缓冲区"
+        )
+
+        if full_keys:
+            self._flush_keys(full_keys)
+
+    def write_full_replace(
+        self, data: pd.DataFrame, task_type: str, partition_cols: List[str]
+    ) -> None:
+        """全量替换写入，先丢弃该表的待写缓冲区，再委托给直写写入器"""
+        self._discard(task_type)
+        self._direct_writer.write_full_replace(data, task_type, partition_cols)
+
+    def write_full_replace_by_symbol(
+        self, data: pd.DataFrame, task_type: str, partition_cols: List[str], symbol: str
+    ) -> None:
+        """按 symbol 全量替换写入，先刷出该表的缓冲区以保证写入顺序"""
+        self.flush(task_type)
+        self._direct_writer.write_full_replace_by_symbol(
+            data, task_type, partition_cols, symbol
+        )
+
+    def flush(self, task_type: Optional[str] = None) -> int:
+        """刷出缓冲区
+
+        Args:
+            task_type: 只刷出指定表的缓冲区，为 None 时刷出全部
+
+        Returns:
+            int: 本次写出的文件数
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._buffers
+                if task_type is None or key[0] == task_type
+            ]
+        return self._flush_keys(keys)
+
+    def on_flushed(self, task_type: str, callback: Callable[[], None]) -> None:
+        """该表当前缓冲 (含正在刷出) 的数据全部落盘后调用 callback
+
+        调用方刚写入的数据要么仍在这些缓冲区中，要么已经落盘，因此回调执行时
+        这些数据及其水位都已可见。表没有待写数据时立即调用；写入失败的缓冲区
+        放回后回调随之保留，直到重试成功。
+        """
+        with self._lock:
+            buffers = [
+                buffer
+                for buffers in (self._buffers, self._flushing)
+                for key, buffer in buffers.items()
+                if key[0] == task_type
+            ]
+            if buffers:
+                waiter = _FlushWaiter(callback, len(buffers))
+                for buffer in buffers:
+                    buffer.waiters.append(waiter)
+        if not buffers:
+            callback()
+
+    def shutdown(self) -> None:
+        """停止后台定时刷盘线程并刷出所有缓冲区"""
+        self._stop_event.set()
+        timer = self._timer
+        if timer is not None and timer.is_alive() and timer is not threading.current_thread():
+            timer.join(timeout=self.max_delay_seconds + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"💥 关闭写入器时刷盘失败，数据保留在预写目录中: {e}")
+
+    def pending_rows(self) -> int:
+        """当前缓冲区中尚未写出的总行数"""
+        with self._lock:
+            return sum(buffer.rows for buffer in self._buffers.values())
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _ensure_started(self) -> None:
+        """在当前进程中惰性初始化预写目录与定时线程
+
+        采用惰性初始化，使写入器在 fork 出的子进程中也能拥有自己的线程与预写目录。
+        """
+        pid = os.getpid()
+        if self._owner_pid == pid:
+            return
+        with self._lock:
+            if self._owner_pid == pid:
+                return
+            self._owner_pid = pid
+            self._buffers = {}
+            self._flushing = {}
+            self._stop_event = threading.Event()
+            if self.spool_root is not None:
+                self._spool_dir = self.spool_root / f"{socket.gethostname()}-{pid}"
+                self._spool_dir.mkdir(parents=True, exist_ok=True)
+                self._recover_orphaned_spools()
+            if self.max_delay_seconds > 0:
+                self._timer = threading.Thread(
+                    target=self._timer_loop,
+                    name="parquet-batch-flusher",
+                    daemon=True,
+                )
+                self._timer.start()
+
+    def _timer_loop(self) -> None:
+        """定时检查并刷出超时的缓冲区"""
+        interval = min(max(self.max_delay_seconds / 2, 0.1), 5.0)
+        while not self._stop_event.wait(interval):
+            now = time.monotonic()
+            with self._lock:
+                expired = [
+                    key
+                    for key, buffer in self._buffers.items()
+                    if now - buffer.created_at >= self.max_delay_seconds
+                ]
+            if expired:
+                try:
+                    self._flush_keys(expired)
+                except Exception as e:
+                    logger.error(f"💥 定时刷盘失败，将在下次重试: {e}")
+
+    def _spool(self, key: BufferKey, table: pa.Table) -> Optional[Path]:
+        """将一份待写数据落入预写目录，返回预写文件路径"""
+        if self._spool_dir is None:
+            return None
+
+        task_type, partition = key
+        spool_dir = self._spool_dir / task_type / partition
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        spool_file = spool_dir / f"{uuid.uuid4().hex}.arrow"
+        tmp_file = spool_file.with_suffix(".arrow.tmp")
+        feather.write_feather(table, str(tmp_file), compression="uncompressed")
+        os.replace(tmp_file, spool_file)
+        return spool_file
+
+    def _recover_orphaned_spools(self) -> None:
+        """接管已退出进程遗留的预写文件，重新放入缓冲区"""
+        host_prefix = f"{socket.gethostname()}-"
+        for owner_dir in self.spool_root.iterdir():
+            if not owner_dir.is_dir() or owner_dir == self._spool_dir:
+                continue
+            if not owner_dir.name.startswith(host_prefix):
+                continue
+            owner_pid = owner_dir.name[len(host_prefix):]
+            if owner_pid.isdigit() and _pid_alive(int(owner_pid)):
+                continue
+
+            recovered = 0
+            for spool_file in sorted(owner_dir.rglob("*.arrow")):
+                relative = spool_file.parent.relative_to(owner_dir)
+                task_type = relative.parts[0]
+                partition = "/".join(relative.parts[1:])
+                target = self._spool_dir / relative / spool_file.name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(spool_file, target)
+                table = feather.read_table(str(target))
+                buffer = self._buffers.setdefault(
+                    (task_type, partition), _PartitionBuffer()
+                )
+                buffer.append(table, target)
+                recovered += table.num_rows
+            shutil.rmtree(owner_dir, ignore_errors=True)
+            if recovered:
+                logger.warning(
+                    f"♻️ 从预写目录 {owner_dir} 恢复了 {recovered} 条未落盘数据"
+                )
+
+    def _flush_keys(self, keys: List[BufferKey]) -> int:
+        """并行刷出指定的缓冲区"""
+        with self._flush_lock:
+            with self._lock:
+                batches = [
+                    (key, self._buffers.pop(key)) for key in keys if key in self._buffers
+                ]
+                self._flushing = dict(batches)
+            if not batches:
+                return 0
+
+            failed: List[Tuple[BufferKey, _PartitionBuffer]] = []
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    (key, buffer, executor.submit(self._write_partition, key, buffer))
+                    for key, buffer in batches
+                ]
+                for key, buffer, future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"💥 写入分区 {key[0]}/{key[1]} 失败: {e}")
+                        failed.append((key, buffer))
+
+            # 写入失败的数据放回缓冲区，预写文件仍然保留，等待下次刷盘
+            with self._lock:
+                for key, buffer in failed:
+                    existing = self._buffers.get(key)
+                    if existing is not None:
+                        buffer.merge(existing)
+                    self._buffers[key] = buffer
+                self._flushing = {}
+            failed_keys = {key for key, _ in failed}
+            for key, buffer in batches:
+                if key not in failed_keys:
+                    for waiter in buffer.waiters:
+                        waiter.done()
+            if failed:
+                raise RuntimeError(f"{len(failed)} 个分区写入失败")
+
+            return len(batches)
+
+    def _write_partition(self, key: BufferKey, buffer: _PartitionBuffer) -> Path:
+        """将一个缓冲区合并写为一个 Parquet 文件"""
+        task_type, partition = key
+        tables = buffer.tables
+        if self.schema_compiler is not None:
+            # 从预写目录恢复的旧数据可能是推断类型，合并前统一为表的固定类型
+            tables = [self.schema_compiler.conform(t, task_type) for t in tables]
+        table = pa.concat_tables(tables, promote_options="permissive")
+
+        target_dir = self.base_path / task_type
+        if partition:
+            target_dir = target_dir / partition
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        unique_id = str(uuid.uuid4())[:8]
+        target_file = target_dir / f"part-0-batch-{unique_id}.parquet"
+        tmp_file = target_dir / f".{target_file.name}.tmp"
+        with self._hold_partition(task_type, partition):
+            pq.write_table(table, str(tmp_file))
+            os.replace(tmp_file, target_file)
+        with self._lock:
+            self._batch_files_written += 1
+        if self.watermark_index is not None:
+            # 缓冲区中的数据此时才真正落盘，水位不会超前于文件
+            self.watermark_index.record_write(task_type, table, replace=REPLACE_NONE)
+
+        for spool_file in buffer.spool_files:
+            try:
+                spool_file.unlink()
+            except FileNotFoundError:
+                pass
+
+        logger.info(
+            f"✅ 成功将 {table.num_rows} 条数据 ({len(buffer.tables)} 批) 合并写入到 {target_file}"
+        )
+        return target_file
+
+    @contextmanager
+    def _hold_partition(self, task_type: str, partition: str) -> Iterator[None]:
+        """写出分区文件时持有分区租约"""
+        if self.lease_manager is None:
+            yield
+            return
+        with self.lease_manager.hold_partition(task_type, partition):
+            yield
+
+    def _discard(self, task_type: str) -> None:
+        """丢弃指定表的缓冲区及其预写文件"""
+        with self._lock:
+            keys = [key for key in self._buffers if key[0] == task_type]
+            buffers = [self._buffers.pop(key) for key in keys]
+        for buffer in buffers:
+            for spool_file in buffer.spool_files:
+                try:
+                    spool_file.unlink()
+                except FileNotFoundError:
+                    pass
+            # 丢弃的数据由随后的全量替换取代，等待它们的调用方不再需要等待
+            for waiter in buffer.waiters:
+                waiter.done()
+
+
+def split_by_partition(
+    data: pd.DataFrame,
+    partition_cols: List[str],
+    to_table: Optional[Callable[[pd.DataFrame], pa.Table]] = None,
+) -> List[Tuple[str, pa.Table]]:
+    """按分区列拆分数据，返回 (分区目录, 去掉分区列的 Arrow 表) 列表
+
+    Args:
+        data: 待写数据
+        partition_cols: 分区列
+        to_table: DataFrame 到 Arrow 表的转换函数，为 None 时由 PyArrow 推断类型
+    """
+    if to_table is None:
+        to_table = functools.partial(pa.Table.from_pandas, preserve_index=False)
+    partition_cols = [col for col in partition_cols or [] if col in data.columns]
+    if not partition_cols:
+        return [("", to_table(data))]
+
+    parts = []
+    for values, group in data.groupby(partition_cols, sort=False, dropna=False):
+        if not isinstance(values, tuple):
+            values = (values,)
+        partition = "/".join(
+            f"{col}={value}" for col, value in zip(partition_cols, values)
+        )
+        table = to_table(group.drop(columns=partition_cols))
+        parts.append((partition, table))
+    return parts
+
+
+def _pid_alive(pid: int) -> bool:
+    """检查本机上的进程是否仍然存活"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
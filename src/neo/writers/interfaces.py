@@ -48,3 +48,14 @@ class IParquetWriter(Protocol):
             symbol (str): 股票代码，用于精确定位要替换的数据
         """
         pass
+
+    def flush(self, task_type: str = None) -> int:
+        """将尚未落盘的缓冲数据写出 (直写实现为空操作)
+
+        Args:
+            task_type (str, optional): 只刷出指定表的缓冲数据，为 None 时刷出全部
+
+        Returns:
+            int: 本次写出的文件数
+        """
+        pass
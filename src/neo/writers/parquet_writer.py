@@ -1,15 +1,22 @@
 """Parquet 写入器实现"""
 
 import logging
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 import shutil
-from typing import List, Optional
+from typing import Iterator, List, Optional, TYPE_CHECKING
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 import uuid
 
 from .interfaces import IParquetWriter
+from ..helpers.watermark_index import REPLACE_NONE, REPLACE_SYMBOL, REPLACE_TABLE
+
+if TYPE_CHECKING:
+    from ..helpers.lease_manager import LeaseManager
+    from ..helpers.watermark_index import WatermarkIndex
+    from .arrow_schema import ArrowSchemaCompiler
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +24,28 @@ logger = logging.getLogger(__name__)
 class ParquetWriter(IParquetWriter):
     """使用 PyArrow 将 DataFrame 写入分区的 Parquet 文件"""
 
-    def __init__(self, base_path: str):
+    def __init__(
+        self,
+        base_path: str,
+        lease_manager: Optional["LeaseManager"] = None,
+        watermark_index: Optional["WatermarkIndex"] = None,
+        schema_compiler: Optional["ArrowSchemaCompiler"] = None,
+    ):
         """初始化写入器
 
         Args:
             base_path (str): 所有 Parquet 数据的根存储路径
+            lease_manager: 租约管理器，多节点共享数据目录时用于独占写入分区
+            watermark_index: 写入水位索引，文件落盘后更新每只股票的最新日期
+            schema_compiler: Arrow schema 编译器，写入前把数据转换为表的固定类型；
+                为 None 时由 PyArrow 推断类型
         """
         self.base_path = Path(base_path)
+        self.lease_manager = lease_manager
+        self.watermark_index = watermark_index
+        self.schema_compiler = schema_compiler
+        # 累计写入的 Parquet 文件数，供任务指标统计使用
+        self.files_written = 0
 
     def write(
         self,
@@ -37,9 +59,7 @@ class ParquetWriter(IParquetWriter):
             logger.debug("数据为空，跳过写入 Parquet 文件")
             return
 
-        # 让 PyArrow 自己处理类型推断，移除强制字符串转换
-
-        table = pa.Table.from_pandas(data)
+        table = self._to_table(data, task_type)
         target_path = self.base_path / task_type
 
         # 生成包含ts_code的文件名，如果没有symbol则尝试从数据中提取
@@ -59,14 +79,17 @@ class ParquetWriter(IParquetWriter):
             basename_template = f"part-{{i}}-{unique_id}.parquet"
 
         try:
-            pq.write_to_dataset(
-                table,
-                root_path=str(target_path),
-                partition_cols=partition_cols,
-                existing_data_behavior="overwrite_or_ignore",
-                basename_template=basename_template,
-            )
+            with self._hold_partitions(task_type, partition_cols, data):
+                pq.write_to_dataset(
+                    table,
+                    root_path=str(target_path),
+                    partition_cols=partition_cols,
+                    existing_data_behavior="overwrite_or_ignore",
+                    basename_template=basename_template,
+                )
             logger.info(f"✅ 成功将 {len(data)} 条数据写入到 {target_path}")
+            self.files_written += self._count_files(partition_cols, data)
+            self._record_watermarks(task_type, data, REPLACE_NONE)
 
             # 记录实际创建的文件路径（debug级别）
             self._log_created_files(target_path, partition_cols, data, symbol)
@@ -85,29 +108,32 @@ class ParquetWriter(IParquetWriter):
         target_path = self.base_path / task_type
 
         try:
-            # 删除现有数据（支持文件和目录两种情况）
-            if target_path.exists():
-                if target_path.is_file():
-                    target_path.unlink()
-                    logger.info(f"🗑️ 已删除现有数据文件: {target_path}")
-                else:
-                    shutil.rmtree(target_path)
-                    logger.info(f"🗑️ 已删除现有数据目录: {target_path}")
-
-            # 写入新数据
-            table = pa.Table.from_pandas(data)
-
-            # 使用简洁的UUID方案保证文件名唯一性
-            unique_id = str(uuid.uuid4())[:8]
-            basename_template = f"part-{{i}}-{unique_id}.parquet"
-
-            pq.write_to_dataset(
-                table,
-                root_path=str(target_path),
-                partition_cols=partition_cols,
-                basename_template=basename_template,
-            )
+            with self._hold_table(task_type):
+                # 删除现有数据（支持文件和目录两种情况）
+                if target_path.exists():
+                    if target_path.is_file():
+                        target_path.unlink()
+                        logger.info(f"🗑️ 已删除现有数据文件: {target_path}")
+                    else:
+                        shutil.rmtree(target_path)
+                        logger.info(f"🗑️ 已删除现有数据目录: {target_path}")
+
+                # 写入新数据
+                table = self._to_table(data, task_type)
+
+                # 使用简洁的UUID方案保证文件名唯一性
+                unique_id = str(uuid.uuid4())[:8]
+                basename_template = f"part-{{i}}-{unique_id}.parquet"
+
+                pq.write_to_dataset(
+                    table,
+                    root_path=str(target_path),
+                    partition_cols=partition_cols,
+                    basename_template=basename_template,
+                )
             logger.debug(f"✅ 全量替换成功写入 {len(data)} 条数据到 {target_path}")
+            self.files_written += self._count_files(partition_cols, data)
+            self._record_watermarks(task_type, data, REPLACE_TABLE)
 
             # 记录实际创建的文件路径（debug级别）
             self._log_created_files(target_path, partition_cols, data)
@@ -131,23 +157,26 @@ class ParquetWriter(IParquetWriter):
                 data["ts_code"] = symbol
 
             # 写入新数据
-            table = pa.Table.from_pandas(data)
+            table = self._to_table(data, task_type)
 
             # 使用简洁的symbol+UUID方案保证文件名唯一性
             unique_id = str(uuid.uuid4())[:8]
             clean_symbol = symbol.replace(".", "_").replace("-", "_")
             basename_template = f"part-{{i}}-{clean_symbol}-{unique_id}.parquet"
 
-            pq.write_to_dataset(
-                table,
-                root_path=str(target_path),
-                partition_cols=partition_cols,
-                existing_data_behavior="delete_matching",
-                basename_template=basename_template,
-            )
+            with self._hold_partitions(task_type, partition_cols, data):
+                pq.write_to_dataset(
+                    table,
+                    root_path=str(target_path),
+                    partition_cols=partition_cols,
+                    existing_data_behavior="delete_matching",
+                    basename_template=basename_template,
+                )
             logger.debug(
                 f"✅ 全量替换成功写入 {len(data)} 条数据到 {target_path} for symbol {symbol}"
             )
+            self.files_written += self._count_files(partition_cols, data)
+            self._record_watermarks(task_type, data, REPLACE_SYMBOL)
 
             # 记录实际创建的文件路径（debug级别）
             self._log_created_files(target_path, partition_cols, data, symbol)
@@ -157,6 +186,63 @@ class ParquetWriter(IParquetWriter):
             )
             raise
 
+    def flush(self, task_type: Optional[str] = None) -> int:
+        """直写模式下数据在 write 时已落盘，无需刷出"""
+        return 0
+
+    def _to_table(self, data: pd.DataFrame, task_type: str) -> pa.Table:
+        """把 DataFrame 转换为 Arrow 表，配置了 schema 编译器时使用表的固定类型"""
+        if self.schema_compiler is None:
+            return pa.Table.from_pandas(data)
+        return self.schema_compiler.to_table(data, task_type)
+
+    def _record_watermarks(
+        self, task_type: str, data: pd.DataFrame, replace: str
+    ) -> None:
+        """文件落盘后更新写入水位"""
+        if self.watermark_index is not None:
+            self.watermark_index.record_write(task_type, data, replace=replace)
+
+    @contextmanager
+    def _hold_table(self, task_type: str) -> Iterator[None]:
+        """全量替换整张表时持有表租约 (等待其他节点的分区写入结束)"""
+        if self.lease_manager is None:
+            yield
+            return
+        with self.lease_manager.hold_partition(task_type):
+            yield
+
+    @contextmanager
+    def _hold_partitions(
+        self, task_type: str, partition_cols: List[str], data: pd.DataFrame
+    ) -> Iterator[None]:
+        """写入期间持有数据涉及的所有分区的租约 (按名称排序获取，避免死锁)"""
+        if self.lease_manager is None:
+            yield
+            return
+        cols = [col for col in partition_cols or [] if col in data.columns]
+        if cols:
+            partitions = sorted(
+                "/".join(f"{col}={value}" for col, value in zip(cols, values))
+                for values in data[cols].drop_duplicates().itertuples(index=False)
+            )
+        else:
+            partitions = [""]
+        with ExitStack() as stack:
+            for partition in partitions:
+                stack.enter_context(
+                    self.lease_manager.hold_partition(task_type, partition)
+                )
+            yield
+
+    @staticmethod
+    def _count_files(partition_cols: List[str], data: pd.DataFrame) -> int:
+        """估算一次写入产生的文件数 (每个分区组合一个文件)"""
+        cols = [col for col in partition_cols or [] if col in data.columns]
+        if not cols:
+            return 1
+        return int(len(data[cols].drop_duplicates()))
+
     def _log_created_files(
         self,
         target_path: Path,
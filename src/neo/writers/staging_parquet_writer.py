@@ -0,0 +1,237 @@
+"""两层 (LSM 式) Parquet 写入器实现
+
+直写和攒批写入都把新数据作为新的 Parquet 文件放进 year= 分区，分区中的小文件越积越多，
+读者要为成千上万个文件付出代价，直到有人手动运行 compact_and_sort.py。两层布局中：
+
+- 写入层：每张表一个只追加的 Arrow IPC 暂存日志，按分区分段存放在暂存目录，
+  每次写入追加一个段文件 (先写临时文件再原子重命名)，追加代价很低；
+- 基础层：维护队列的合并任务 (StagingMerger) 把暂存段合并进对应分区，
+  去重、排序后每个分区重写为一个 Parquet 文件，基础层不会碎片化；
+- 读者通过元数据视图同时看到暂存层和基础层。
+"""
+
+import functools
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from ..helpers.watermark_index import REPLACE_NONE
+from .batching_parquet_writer import split_by_partition
+from .interfaces import IParquetWriter
+from .parquet_writer import ParquetWriter
+
+if TYPE_CHECKING:
+    from ..helpers.lease_manager import LeaseManager
+    from ..helpers.staging_merger import StagingMerger
+    from ..helpers.watermark_index import WatermarkIndex
+    from .arrow_schema import ArrowSchemaCompiler
+
+logger = logging.getLogger(__name__)
+
+SegmentKey = Tuple[str, str]
+
+SEGMENT_SUFFIX = ".arrow"
+
+
+class StagingLog:
+    """按 (表, 分区) 分段存放的只追加 Arrow IPC 暂存日志"""
+
+    def __init__(self, staging_path: str = "data/staging"):
+        """初始化暂存日志
+
+        Args:
+            staging_path: 暂存目录，每张表一个子目录，其下按分区目录存放段文件
+        """
+        self.root = Path(staging_path)
+
+    def append(self, task_type: str, partition: str, table: pa.Table) -> Path:
+        """追加一个段文件，文件名以纳秒时间戳开头，按名称排序即为写入顺序"""
+        segment_dir = self.root / task_type / partition
+        segment_dir.mkdir(parents=True, exist_ok=True)
+        segment = segment_dir / (
+            f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+        )
+        tmp_file = segment_dir / f".{segment.name}.tmp"
+        with pa.OSFile(str(tmp_file), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_file, segment)
+        return segment
+
+    def tables(self) -> List[str]:
+        """有暂存段的表"""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path.name
+            for path in self.root.iterdir()
+            if path.is_dir() and any(path.rglob(f"*{SEGMENT_SUFFIX}"))
+        )
+
+    def segments(
+        self, task_type: Optional[str] = None
+    ) -> Dict[SegmentKey, List[Path]]:
+        """按 (表, 分区) 分组的段文件，组内按写入顺序排列
+
+        Args:
+            task_type: 只列出指定表的段文件，为 None 时列出全部
+        """
+        tables = [task_type] if task_type else self.tables()
+        grouped: Dict[SegmentKey, List[Path]] = {}
+        for table in tables:
+            table_dir = self.root / table
+            if not table_dir.is_dir():
+                continue
+            for segment in table_dir.rglob(f"*{SEGMENT_SUFFIX}"):
+                partition = segment.parent.relative_to(table_dir).as_posix()
+                key = (table, "" if partition == "." else partition)
+                grouped.setdefault(key, []).append(segment)
+        for paths in grouped.values():
+            paths.sort(key=lambda path: path.name)
+        return grouped
+
+    @staticmethod
+    def read_segments(segments: List[Path]) -> Optional[pa.Table]:
+        """按写入顺序读取并拼接段文件，没有段文件时返回 None"""
+        tables = []
+        for segment in segments:
+            with pa.memory_map(str(segment), "r") as source:
+                tables.append(pa.ipc.open_file(source).read_all())
+        if not tables:
+            return None
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    def read(self, task_type: str) -> Optional[pa.Table]:
+        """读取表的全部暂存数据，分区列按目录名补回 (与 hive 分区的读取结果一致)"""
+        tables = []
+        for (_, partition), segments in sorted(self.segments(task_type).items()):
+            table = self.read_segments(segments)
+            if table is None:
+                continue
+            for part in filter(None, partition.split("/")):
+                column, _, value = part.partition("=")
+                typed = int(value) if value.lstrip("-").isdigit() else value
+                table = table.append_column(column, pa.array([typed] * len(table)))
+            tables.append(table)
+        if not tables:
+            return None
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    @staticmethod
+    def remove(segments: List[Path]) -> None:
+        """删除已合并的段文件"""
+        for segment in segments:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+    def drop(self, task_type: str) -> None:
+        """丢弃表的全部暂存段"""
+        shutil.rmtree(self.root / task_type, ignore_errors=True)
+
+
+class StagingParquetWriter(IParquetWriter):
+    """增量写入追加到暂存日志、由后台任务合并进基础层的 Parquet 写入器
+
+    - 增量写入按分区追加为 Arrow IPC 段文件，并立即更新写入水位；
+    - 全量替换整张表时丢弃该表的暂存段，再委托给直写写入器；
+    - 按 symbol 全量替换前先合并该表的暂存段，保证替换不会被更早的暂存数据覆盖。
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        staging_path: str = "data/staging",
+        merger: Optional["StagingMerger"] = None,
+        lease_manager: Optional["LeaseManager"] = None,
+        watermark_index: Optional["WatermarkIndex"] = None,
+        schema_compiler: Optional["ArrowSchemaCompiler"] = None,
+    ):
+        """初始化写入器
+
+        Args:
+            base_path: 所有 Parquet 数据的根存储路径 (基础层)
+            staging_path: 暂存日志目录
+            merger: 暂存合并器，按 symbol 全量替换前用于合并暂存段
+            lease_manager: 租约管理器，多节点共享数据目录时用于独占写入分区
+            watermark_index: 写入水位索引，段文件落盘后更新每只股票的最新日期
+            schema_compiler: Arrow schema 编译器，追加前把数据转换为表的固定类型
+        """
+        self.base_path = Path(base_path)
+        self.log = StagingLog(staging_path)
+        self.merger = merger
+        self.watermark_index = watermark_index
+        self.schema_compiler = schema_compiler
+        self._direct_writer = ParquetWriter(
+            base_path=base_path,
+            lease_manager=lease_manager,
+            watermark_index=watermark_index,
+            schema_compiler=schema_compiler,
+        )
+        self._segments_written = 0
+
+    @property
+    def files_written(self) -> int:
+        """累计写入的文件数 (含暂存段与直写)"""
+        return self._segments_written + self._direct_writer.files_written
+
+    def write(
+        self,
+        data: pd.DataFrame,
+        task_type: str,
+        partition_cols: List[str],
+        symbol: str = None,
+    ) -> None:
+        """将数据按分区追加到暂存日志"""
+        if data is None or data.empty:
+            logger.debug("数据为空，跳过写入暂存日志")
+            return
+
+        to_table = None
+        if self.schema_compiler is not None:
+            to_table = functools.partial(
+                self.schema_compiler.to_table, task_type=task_type
+            )
+        try:
+            parts = split_by_partition(data, partition_cols, to_table)
+            for partition, table in parts:
+                self.log.append(task_type, partition, table)
+            self._segments_written += len(parts)
+        except Exception as e:
+            logger.error(f"💥 追加 {task_type} 暂存数据失败: {e}")
+            raise
+        if self.watermark_index is not None:
+            # 暂存段已持久化且对读者可见，水位可以立即前进
+            self.watermark_index.record_write(task_type, data, replace=REPLACE_NONE)
+        logger.info(
+            f"✅ [{symbol or task_type}] {len(data)} 条数据已追加到 {task_type} 暂存日志"
+        )
+
+    def write_full_replace(
+        self, data: pd.DataFrame, task_type: str, partition_cols: List[str]
+    ) -> None:
+        """全量替换写入，先丢弃该表的暂存段，再委托给直写写入器"""
+        self.log.drop(task_type)
+        self._direct_writer.write_full_replace(data, task_type, partition_cols)
+
+    def write_full_replace_by_symbol(
+        self, data: pd.DataFrame, task_type: str, partition_cols: List[str], symbol: str
+    ) -> None:
+        """按 symbol 全量替换写入，先合并该表的暂存段以保证写入顺序"""
+        if self.merger is not None:
+            self.merger.merge(task_type)
+        self._direct_writer.write_full_replace_by_symbol(
+            data, task_type, partition_cols, symbol
+        )
+
+    def flush(self, task_type: Optional[str] = None) -> int:
+        """暂存段在 write 时已持久化，合并由维护队列负责，无需刷出"""
+        return 0
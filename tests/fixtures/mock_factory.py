@@ -486,6 +486,8 @@ class CliRunnerWrapper:
         symbols: Optional[List[str]] = None,
         debug: bool = False,
         dry_run: bool = False,
+        inline: bool = False,
+        deadline: Optional[str] = None,
     ):
         """调用 dl 命令的辅助方法
 
@@ -494,6 +496,8 @@ class CliRunnerWrapper:
             symbols: 股票代码列表
             debug: 调试模式
             dry_run: 干运行模式
+            inline: 内联模式
+            deadline: 截止时间
 
         Returns:
             CLI 执行结果
@@ -515,6 +519,12 @@ class CliRunnerWrapper:
         if dry_run:
             args.append("--dry-run")
 
+        if inline:
+            args.append("--inline")
+
+        if deadline is not None:
+            args.extend(["--deadline", deadline])
+
         return self.runner.invoke(app, args)
 
     def invoke_dp_command(self, queue_name: str, debug: bool = False):
@@ -33,7 +33,7 @@ class TestAppServiceFacade:
         app_service.run_data_processor("fast")
 
         # 4. 断言 Mock 对象的方法被正确调用
-        mock_consumer_runner.run.assert_called_once_with("fast")
+        mock_consumer_runner.run.assert_called_once_with("fast", shard=0)
 
     @patch("neo.tasks.huey_tasks.download_task")
     @patch("neo.configs.huey_config.huey_fast")
@@ -0,0 +1,107 @@
+"""
+测试 BackpressureController 背压控制器
+"""
+
+import pytest
+from huey import SqliteHuey
+
+from neo.helpers.backpressure import BackpressureController
+
+
+@pytest.fixture
+def slow_huey(tmp_path):
+    huey = SqliteHuey(name="bp_slow", filename=str(tmp_path / "slow.db"))
+
+    @huey.task()
+    def write_task(payload):
+        return len(payload)
+
+    huey.write_task = write_task
+    yield huey
+    huey.storage.close()
+
+
+def _controller(huey, **kwargs):
+    options = dict(
+        high_depth=5,
+        low_depth=2,
+        high_bytes=10**9,
+        low_bytes=10**9,
+        poll_interval_seconds=0,
+        max_wait_seconds=0,
+    )
+    options.update(kwargs)
+    return BackpressureController(huey=huey, **options)
+
+
+def _fill(huey, n, payload="x"):
+    for _ in range(n):
+        huey.write_task(payload)
+
+
+def _drain(huey, n):
+    for _ in range(n):
+        huey.execute(huey.dequeue())
+
+
+class TestBackpressureController:
+    def test_pauses_at_high_depth_and_resumes_below_low(self, slow_huey):
+        """任务数达到高水位暂停，回落到低水位以下才恢复 (滞回)"""
+        controller = _controller(slow_huey)
+
+        _fill(slow_huey, 4)
+        assert controller.is_paused() is False
+
+        _fill(slow_huey, 1)
+        assert controller.is_paused() is True
+
+        # 回落到高低水位之间仍保持暂停
+        _drain(slow_huey, 2)
+        assert controller.is_paused() is True
+
+        _drain(slow_huey, 1)
+        assert controller.is_paused() is False
+
+    def test_pauses_on_payload_bytes(self, slow_huey):
+        """负载字节数达到高水位时暂停"""
+        controller = _controller(
+            slow_huey, high_depth=1000, low_depth=500, high_bytes=20000, low_bytes=1000
+        )
+        _fill(slow_huey, 2, payload="x" * 12000)
+
+        pressure = controller.sample(force=True)
+        assert pressure.depth == 2
+        assert pressure.payload_bytes > 20000
+        assert pressure.paused is True
+
+    def test_counts_scheduled_tasks(self, slow_huey):
+        """被内存调控器延迟的任务在 schedule 表中，同样计入积压"""
+        controller = _controller(slow_huey)
+        for _ in range(5):
+            slow_huey.write_task.schedule(args=("x",), delay=3600)
+        # 消费者取出未到期的任务后将其移入 schedule 表
+        _drain(slow_huey, 5)
+
+        pressure = controller.sample()
+
+        assert slow_huey.pending_count() == 0
+        assert slow_huey.scheduled_count() == 5
+        assert pressure.depth == 5
+        assert pressure.paused
+
+    def test_wait_for_capacity_times_out(self, slow_huey):
+        """暂停状态下等待超时返回 False，由调用方延迟重试"""
+        controller = _controller(slow_huey)
+        _fill(slow_huey, 5)
+
+        assert controller.wait_for_capacity() is False
+
+    def test_disabled_never_pauses(self, slow_huey):
+        controller = _controller(slow_huey, enabled=False)
+        _fill(slow_huey, 10)
+
+        assert controller.wait_for_capacity() is True
+
+    def test_invalid_watermarks(self, slow_huey):
+        with pytest.raises(ValueError, match="低水位"):
+            _controller(slow_huey, high_depth=1, low_depth=2)
@@ -0,0 +1,168 @@
+"""
+测试 CoverageEngine 交易日覆盖位图与缺口检测
+"""
+
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.coverage_engine import CoverageEngine
+from neo.helpers.task_registry import TaskRegistry, registry_slot
+from neo.writers.parquet_writer import ParquetWriter
+
+# 2024 年 1 月的前 10 个交易日
+TRADING_DAYS = [
+    "20240102",
+    "20240103",
+    "20240104",
+    "20240105",
+    "20240108",
+    "20240109",
+    "20240110",
+    "20240111",
+    "20240112",
+    "20240115",
+]
+
+
+@pytest.fixture
+def lake(tmp_path):
+    root = tmp_path / "parquet"
+    writer = ParquetWriter(base_path=str(root))
+    calendar = pd.DataFrame(
+        {
+            "exchange": "SSE",
+            "cal_date": TRADING_DAYS + ["20240106", "20240107"],
+            "is_open": [1] * len(TRADING_DAYS) + [0, 0],
+        }
+    )
+    writer.write_full_replace(calendar, "trade_cal", [])
+    basic = pd.DataFrame(
+        {"ts_code": ["000001.SZ", "600519.SH"], "list_date": ["19910403", "20240104"]}
+    )
+    writer.write_full_replace(basic, "stock_basic", [])
+    return root
+
+
+def _write_daily(root, code, days):
+    ParquetWriter(base_path=str(root)).write(
+        pd.DataFrame({"ts_code": code, "trade_date": days, "close": 1.0}),
+        "stock_daily",
+        [],
+    )
+
+
+def _engine(root, tmp_path, **kwargs):
+    return CoverageEngine(
+        parquet_base_path=str(root),
+        cache_path=str(tmp_path / "coverage"),
+        schema_loader=SchemaLoader(),
+        tables=["stock_daily"],
+        start_date="20240101",
+        **kwargs,
+    )
+
+
+class TestCoverageEngine:
+    def test_gaps_aligned_to_calendar_and_listing(self, lake, tmp_path):
+        """缺口按交易日计算，不早于上市日，不晚于已有数据的最新日期"""
+        days = TRADING_DAYS
+        _write_daily(lake, "000001.SZ", days[:2] + days[4:6] + days[9:])
+        # 600519.SH 于 20240104 上市，之前没有数据不算缺口
+        _write_daily(lake, "600519.SH", days[2:8])
+        engine = _engine(lake, tmp_path, merge_distance=0)
+
+        gaps = engine.find_gaps("stock_daily", ["000001.SZ", "600519.SH", "000002.SZ"])
+
+        assert gaps == {
+            "000001.SZ": [("20240104", "20240105"), ("20240110", "20240112")]
+        }
+
+    def test_nearby_gaps_are_merged(self, lake, tmp_path):
+        """间隔不超过 merge_distance 个交易日的缺口合并为一个区间"""
+        days = TRADING_DAYS
+        _write_daily(lake, "000001.SZ", days[:2] + days[4:6] + days[9:])
+        engine = _engine(lake, tmp_path, merge_distance=2)
+
+        assert engine.find_gaps("stock_daily", ["000001.SZ"]) == {
+            "000001.SZ": [("20240104", "20240112")]
+        }
+
+    def test_verified_ranges_are_not_gaps(self, lake, tmp_path):
+        """已核实的区间 (如停牌) 不再视为缺口"""
+        _write_daily(lake, "000001.SZ", TRADING_DAYS[:3] + TRADING_DAYS[5:])
+        engine = _engine(lake, tmp_path)
+        assert engine.find_gaps("stock_daily", ["000001.SZ"])
+
+        engine.mark_verified("stock_daily", "000001.SZ", "20240105", "20240108")
+
+        assert engine.find_gaps("stock_daily", ["000001.SZ"]) == {}
+
+    def test_bitmap_cached_until_data_changes(self, lake, tmp_path):
+        """数据未变化时读取缓存的位图，写入新文件后重建"""
+        _write_daily(lake, "000001.SZ", TRADING_DAYS[:3] + TRADING_DAYS[5:])
+        engine = _engine(lake, tmp_path)
+        first = engine.bitmap("stock_daily")
+
+        reloaded = _engine(lake, tmp_path)
+        with patch.object(reloaded, "_build") as build:
+            assert reloaded.bitmap("stock_daily").fingerprint == first.fingerprint
+        build.assert_not_called()
+
+        _write_daily(lake, "000001.SZ", TRADING_DAYS[3:5])
+        assert engine.bitmap("stock_daily").fingerprint != first.fingerprint
+        assert engine.find_gaps("stock_daily", ["000001.SZ"]) == {}
+
+    def test_untracked_or_missing_tables(self, lake, tmp_path):
+        """未配置的表、没有数据或交易日历的表没有缺口"""
+        engine = _engine(lake, tmp_path)
+
+        assert engine.find_gaps("income", ["000001.SZ"]) == {}
+        assert engine.find_gaps("stock_daily", ["000001.SZ"]) == {}
+        assert not _engine(lake, tmp_path, enabled=False).is_tracked("stock_daily")
+
+
+class TestGapRepairPlanning:
+    def test_planner_emits_gap_tasks_after_tail_tasks(self):
+        """规划在最新数据任务之后为缺口生成带 end_date 的补缺任务"""
+        from neo.tasks.download_tasks import DownloadTaskManager
+
+        coverage = Mock()
+        coverage.is_tracked.return_value = True
+        coverage.find_gaps.return_value = {"000001.SZ": [("20240104", "20240105")]}
+        db_queryer = Mock()
+        db_queryer.get_max_date.return_value = {"000001.SZ": "20240110"}
+        manager = DownloadTaskManager(SchemaLoader(), coverage_engine=coverage)
+
+        configs = list(
+            manager._generate_task_configs_for_type(
+                "stock_daily", ["000001.SZ"], db_queryer, "20240115"
+            )
+        )
+
+        assert configs[-1] == {
+            "task_type": "stock_daily",
+            "symbol": "000001.SZ",
+            "start_date": "20240104",
+            "end_date": "20240105",
+        }
+        assert configs[0]["start_date"] == "20240111"
+
+    def test_gap_tasks_get_their_own_registry_slot(self, tmp_path):
+        """补缺任务按区间单独登记，不与同一股票的增量任务或其他缺口合并"""
+        registry = TaskRegistry(db_path=str(tmp_path / "registry.db"))
+        tail = {
+            "task_type": "stock_daily",
+            "symbol": "000001.SZ",
+            "start_date": "20240111",
+        }
+        gap_a = dict(tail, start_date="20240104", end_date="20240105")
+        gap_b = dict(tail, start_date="20230104", end_date="20230105")
+
+        accepted = registry.claim_batch([tail, gap_a, gap_b])
+
+        assert accepted == [tail, gap_a, gap_b]
+        assert registry_slot("000001.SZ", gap_a) == "000001.SZ@20240104-20240105"
+        assert registry.claim_batch([gap_a]) == []
@@ -0,0 +1,122 @@
+"""
+测试 DisclosureCalendar 按财报披露时间表规划财务报表
+"""
+
+from datetime import date, timedelta
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.disclosure_calendar import (
+    DisclosureCalendar,
+    next_report_period,
+    statutory_deadline,
+)
+from neo.writers.parquet_writer import ParquetWriter
+
+
+@pytest.fixture
+def lake(tmp_path):
+    root = tmp_path / "parquet"
+    income = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ", "000001.SZ"],
+            "ann_date": ["20230425", "20240315"],
+            "end_date": ["20230331", "20231231"],
+        }
+    )
+    ParquetWriter(base_path=str(root)).write(income, "income", [])
+    return root
+
+
+def _calendar(root, **kwargs):
+    options = dict(parquet_base_path=str(root), sweep_days=0)
+    options.update(kwargs)
+    return DisclosureCalendar(**options)
+
+
+def test_report_periods_and_deadlines():
+    """下一报告期为下一个季度末，年报的法定截止日在次年 4 月底"""
+    assert next_report_period("20231231") == "20240331"
+    assert next_report_period("20240331") == "20240630"
+    assert next_report_period("20240930") == "20241231"
+    assert statutory_deadline("20240630") == "20240831"
+    assert statutory_deadline("20241231") == "20250430"
+
+
+class TestDisclosureCalendar:
+    def test_expected_date_follows_last_year(self, lake):
+        """上一年同期有公告时，预计披露日前 lead_days 天起才检查"""
+        calendar = _calendar(lake, lead_days=3)
+
+        assert calendar.expected_date("income", "000001.SZ", "20240331") == date(
+            2024, 4, 25
+        )
+        assert not calendar.is_due("income", "000001", "20231231", date(2024, 4, 10))
+        assert calendar.is_due("income", "000001", "20231231", date(2024, 4, 22))
+
+    def test_unknown_history_is_due_after_period_end(self, lake):
+        """没有上一年同期公告的股票在报告期结束后即检查"""
+        calendar = _calendar(lake)
+
+        assert not calendar.is_due("income", "600519.SH", "20231231", date(2024, 3, 20))
+        assert calendar.is_due("income", "600519.SH", "20231231", date(2024, 4, 1))
+
+    def test_overdue_filings_wait_for_sweep(self, lake):
+        """超过法定截止日 overdue_days 天仍未披露的股票不再每天检查"""
+        calendar = _calendar(lake, overdue_days=30)
+
+        assert calendar.is_due("income", "600519.SH", "20231231", date(2024, 5, 30))
+        assert not calendar.is_due("income", "600519.SH", "20231231", date(2024, 6, 1))
+
+    def test_sweep_checks_each_symbol_once_per_cycle(self, lake):
+        """周期性全量检查让未到期的股票在每个周期中恰好检查一天"""
+        calendar = _calendar(lake, sweep_days=7)
+        start = date(2024, 4, 1)
+
+        due_days = [
+            day
+            for day in (start + timedelta(days=n) for n in range(7))
+            if calendar.is_due("income", "000001.SZ", "20240331", day)
+        ]
+
+        assert len(due_days) == 1
+
+    def test_untracked_or_never_downloaded_is_due(self, lake):
+        """未跟踪的表、从未下载过的股票以及禁用时总是需要检查"""
+        calendar = _calendar(lake)
+        today = date(2024, 4, 10)
+
+        assert calendar.is_due("stock_daily", "000001.SZ", "20231231", today)
+        assert calendar.is_due("income", "000001.SZ", None, today)
+        assert _calendar(lake, enabled=False).is_due(
+            "income", "000001.SZ", "20231231", today
+        )
+
+
+def test_planner_only_emits_due_symbols():
+    """财务报表按披露日历规划，不再按最新交易日判断"""
+    from neo.tasks.download_tasks import DownloadTaskManager
+
+    calendar = Mock()
+    calendar.is_tracked.return_value = True
+    calendar.is_due.side_effect = lambda task_type, symbol, latest: symbol == "000002.SZ"
+    db_queryer = Mock()
+    db_queryer.get_max_date.return_value = {
+        "000001.SZ": "20231231",
+        "000002.SZ": "20231231",
+    }
+    manager = DownloadTaskManager(SchemaLoader(), disclosure_calendar=calendar)
+
+    configs = list(
+        manager._generate_task_configs_for_type(
+            "income", ["000001.SZ", "000002.SZ"], db_queryer, "20240425"
+        )
+    )
+
+    assert configs == [
+        {"task_type": "income", "symbol": "000002.SZ", "start_date": "20240101"}
+    ]
+    calendar.refresh.assert_called_once()
@@ -0,0 +1,78 @@
+"""
+测试 DryRunEstimator 下载试运行估算
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.dry_run import DryRunEstimator
+from neo.helpers.fair_share_scheduler import FairShareScheduler
+from neo.helpers.metrics_store import STAGE_DOWNLOAD, MetricsStore
+
+
+@pytest.fixture
+def metrics_store(tmp_path):
+    return MetricsStore(db_path=str(tmp_path / "metrics.db"))
+
+
+@pytest.fixture
+def estimator(tmp_path, metrics_store):
+    scheduler = FairShareScheduler(
+        state_path=str(tmp_path / "scheduler.db"),
+        workers=4,
+        latency_provider=metrics_store.mean_latency,
+    )
+    return DryRunEstimator(SchemaLoader(), metrics_store, scheduler)
+
+
+def _db_queryer(max_dates):
+    db_queryer = Mock()
+    db_queryer.get_max_date.side_effect = lambda task_type, codes: {
+        code: max_dates[code] for code in codes if code in max_dates
+    }
+    return db_queryer
+
+
+class TestDryRunEstimator:
+    def test_plans_with_incremental_skips_and_estimates(self, estimator, metrics_store):
+        """按增量规划得到确切任务，行数、数据量和耗时按历史指标估算"""
+        metrics_store.record(
+            STAGE_DOWNLOAD, "stock_daily", "a", 2.0, rows=10, payload_bytes=1000
+        )
+        metrics_store.record(
+            STAGE_DOWNLOAD, "stock_daily", "b", 2.0, rows=30, payload_bytes=3000
+        )
+        db_queryer = _db_queryer({"000001.SZ": "20240110", "000002.SZ": "20240105"})
+
+        with patch("neo.tasks.download_tasks.enqueue_download_tasks") as enqueue:
+            report = estimator.estimate(
+                {"stock_daily": ["000001.SZ", "000002.SZ", "000003.SZ"]},
+                db_queryer,
+                latest_trading_day="20240110",
+            )
+        enqueue.assert_not_called()
+
+        assert [(t["symbol"], t["start_date"]) for t in report.tasks] == [
+            ("000002.SZ", "20240106"),
+            ("000003.SZ", "19900101"),
+        ]
+        assert report.api_calls_by_endpoint == {"daily": 2}
+        table = report.tables[0]
+        assert table.samples == 2
+        assert table.expected_rows == pytest.approx(40)
+        assert table.expected_bytes == pytest.approx(4000)
+        # 2 个任务 × 平均 2 秒 / 4 个 worker，大于配额所需的时间
+        assert report.projected_seconds == pytest.approx(1.0)
+
+    def test_tables_without_history_have_no_volume(self, estimator):
+        """没有历史指标的任务类型只估算调用次数和配额耗时"""
+        report = estimator.estimate(
+            {"stock_daily": ["000001.SZ"]}, _db_queryer({}), latest_trading_day="20240110"
+        )
+
+        table = report.tables[0]
+        assert table.tasks == 1
+        assert table.expected_rows is None
+        assert table.quota_seconds == pytest.approx(60.0 / table.rate_limit_per_minute)
@@ -0,0 +1,124 @@
+"""
+测试 FairShareScheduler 加权公平调度器
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from box import Box
+
+from neo.helpers.fair_share_scheduler import (
+    LANE_BULK,
+    LANE_INTERACTIVE,
+    FairShareScheduler,
+    SchedulePlan,
+    parse_deadline,
+)
+
+
+@pytest.fixture(autouse=True)
+def rate_limit_config():
+    config = Box(
+        {
+            "download_tasks": {
+                "stock_daily": {"rate_limit_per_minute": 200},
+                "income": {"rate_limit_per_minute": 200},
+                "daily_basic": {"rate_limit_per_minute": 100},
+            }
+        }
+    )
+    with patch("neo.configs.get_config", return_value=config):
+        yield
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return FairShareScheduler(state_path=str(tmp_path / "scheduler.db"), workers=4)
+
+
+def _tasks(task_type, n):
+    return [{"task_type": task_type, "symbol": f"{i:06d}.SZ"} for i in range(n)]
+
+
+def _dequeue_order(scheduled):
+    """按 Huey 的出队规则 (priority desc, 入队顺序) 排序"""
+    indexed = list(enumerate(scheduled))
+    indexed.sort(key=lambda item: (-item[1]["priority"], item[0]))
+    return [params for _, params in indexed]
+
+
+class TestFairShareScheduler:
+    def test_slow_type_does_not_dominate(self, scheduler):
+        """耗时慢的任务类型按耗时比例获得更少的出队份额"""
+        latencies = {"stock_daily": 1.0, "income": 4.0}
+        scheduler.latency_provider = latencies.get
+
+        # 慢接口的任务先全部入队，按 FIFO 会独占 worker
+        params = _tasks("income", 20) + _tasks("stock_daily", 80)
+        scheduled = list(scheduler.assign(params, ["stock_daily", "income"]))
+
+        head = _dequeue_order(scheduled)[:25]
+        counts = {tt: sum(p["task_type"] == tt for p in head) for tt in latencies}
+        assert counts == {"stock_daily": 20, "income": 5}
+
+    def test_weights_follow_quota_share(self, scheduler):
+        """相同耗时下，配额多的任务类型出队份额更多"""
+        params = _tasks("daily_basic", 30) + _tasks("stock_daily", 30)
+        scheduled = list(scheduler.assign(params, ["daily_basic", "stock_daily"]))
+
+        head = _dequeue_order(scheduled)[:30]
+        assert sum(p["task_type"] == "stock_daily" for p in head) == 20
+
+    def test_interactive_lane_jumps_bulk_queue(self, scheduler):
+        """interactive 通道的任务排在所有 bulk 任务之前"""
+        bulk = list(scheduler.assign(_tasks("stock_daily", 50), ["stock_daily"]))
+        interactive = list(
+            scheduler.assign(
+                _tasks("stock_daily", 2), ["stock_daily"], lane=LANE_INTERACTIVE
+            )
+        )
+        assert min(p["priority"] for p in interactive) > max(
+            p["priority"] for p in bulk
+        )
+
+    def test_virtual_time_persists_between_runs(self, scheduler, tmp_path):
+        """第二次规划的同类任务排在第一次规划剩余任务之后"""
+        first = list(scheduler.assign(_tasks("stock_daily", 10), ["stock_daily"]))
+        other = FairShareScheduler(state_path=str(tmp_path / "scheduler.db"))
+        second = list(other.assign(_tasks("stock_daily", 10), ["stock_daily"]))
+
+        assert max(p["priority"] for p in second) < min(p["priority"] for p in first)
+
+    def test_plan_counts_and_deadline_check(self, scheduler):
+        """规划统计用于截止时间估算"""
+        plan = SchedulePlan()
+        list(scheduler.assign(_tasks("stock_daily", 400), ["stock_daily"], plan=plan))
+
+        assert plan.lane == LANE_BULK
+        assert plan.counts == {"stock_daily": 400}
+        # 200 次/分钟的配额下，400 个任务至少需要 2 分钟
+        assert scheduler.estimate_seconds(plan.counts) == pytest.approx(120.0)
+        assert scheduler.check_deadline(plan, datetime.now() + timedelta(hours=1))
+        assert not scheduler.check_deadline(plan, datetime.now() + timedelta(minutes=1))
+
+    def test_invalid_lane(self, scheduler):
+        with pytest.raises(ValueError, match="无效的优先级通道"):
+            list(scheduler.assign(_tasks("stock_daily", 1), ["stock_daily"], "vip"))
+
+
+class TestParseDeadline:
+    def test_time_of_day(self):
+        now = datetime(2024, 1, 15, 9, 30)
+        assert parse_deadline("20:00", now) == datetime(2024, 1, 15, 20, 0)
+
+    def test_full_datetime(self):
+        now = datetime(2024, 1, 15, 9, 30)
+        assert parse_deadline("2024-01-16 08:00", now) == datetime(2024, 1, 16, 8, 0)
+
+    def test_past_or_invalid_deadline(self):
+        now = datetime(2024, 1, 15, 21, 0)
+        with pytest.raises(ValueError, match="已过"):
+            parse_deadline("20:00", now)
+        with pytest.raises(ValueError, match="无效的截止时间"):
+            parse_deadline("tonight", now)
@@ -0,0 +1,87 @@
+"""LakeMigrator 数据湖类型迁移的单元测试"""
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.lake_migrator import LakeMigrator
+from neo.writers.arrow_schema import ArrowSchemaCompiler
+
+SCHEMA_TOML = """
+[stock_daily]
+table_name = "stock_daily"
+primary_key = ["ts_code", "trade_date"]
+date_col = "trade_date"
+api_method = "daily"
+columns = [
+    { name = "ts_code", type = "TEXT" },
+    { name = "trade_date", type = "DATE" },
+    { name = "close", type = "REAL" },
+]
+"""
+
+
+def _legacy_lake(base: Path) -> list:
+    """按推断类型写出的旧文件：close 列有的是字符串，有的是 double"""
+    files = []
+    for year, close in (("2023", ["10.5", "11.0"]), ("2024", [12.0, 13.5])):
+        partition = base / "stock_daily" / f"year={year}"
+        partition.mkdir(parents=True)
+        path = partition / "part-0-legacy.parquet"
+        pq.write_table(
+            pa.table(
+                {
+                    "ts_code": ["000001.SZ", "600519.SH"],
+                    "trade_date": [f"{year}0102", f"{year}0102"],
+                    "close": close,
+                }
+            ),
+            str(path),
+        )
+        files.append(path)
+    return files
+
+
+def _migrator(tmp_path: Path, base: Path) -> LakeMigrator:
+    schema_file = tmp_path / "schema.toml"
+    schema_file.write_text(SCHEMA_TOML, encoding="utf-8")
+    compiler = ArrowSchemaCompiler(
+        SchemaLoader(schema_file), dictionary_columns=["ts_code"]
+    )
+    return LakeMigrator(str(base), compiler, workers=2)
+
+
+def test_migrate_rewrites_files_to_compiled_schema(tmp_path: Path):
+    """迁移后所有文件的类型一致，数据保持不变"""
+    base = tmp_path / "parquet"
+    files = _legacy_lake(base)
+    migrator = _migrator(tmp_path, base)
+
+    preview = migrator.migrate(dry_run=True)
+    report = migrator.migrate()
+
+    assert (preview.files_migrated, preview.bytes_after) == (2, 0)
+    assert (report.files_total, report.files_migrated, report.files_failed) == (2, 2, 0)
+    for path in files:
+        schema = pq.read_schema(str(path))
+        assert schema.field("close").type == pa.float64()
+        assert schema.field("ts_code").type == pa.dictionary(pa.int32(), pa.string())
+    closes = pq.ParquetFile(str(files[0])).read().column("close").to_pylist()
+    assert closes == [10.5, 11.0]
+    assert not list(base.rglob("*.tmp"))
+
+
+def test_migrate_is_resumable(tmp_path: Path):
+    """重复运行时跳过已经符合 schema 的文件"""
+    base = tmp_path / "parquet"
+    files = _legacy_lake(base)
+    migrator = _migrator(tmp_path, base)
+    migrator._migrate_file("stock_daily", files[0])
+
+    report = migrator.migrate(["stock_daily"])
+    again = migrator.migrate(["stock_daily"])
+
+    assert (report.files_migrated, report.files_skipped) == (1, 1)
+    assert (again.files_migrated, again.files_skipped) == (0, 2)
@@ -0,0 +1,236 @@
+"""
+测试 LeaseManager 共享文件系统租约
+"""
+
+import multiprocessing
+import time
+
+import pandas as pd
+import pytest
+
+from neo.helpers.lease_manager import (
+    LeaseManager,
+    LeaseTimeout,
+    partition_lease_name,
+    task_lease_name,
+)
+from neo.helpers.task_registry import TaskRegistry, make_task_key
+from neo.writers.parquet_writer import ParquetWriter
+
+
+@pytest.fixture
+def lease_root(tmp_path):
+    return str(tmp_path / "leases")
+
+
+class TestLeaseManager:
+    def test_acquire_is_exclusive_between_nodes(self, lease_root):
+        """租约被一个节点持有时，其他节点认领失败"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+
+        assert node_a.acquire("task:stock_daily:000001.SZ")
+        assert not node_b.acquire("task:stock_daily:000001.SZ")
+        # 同一节点再次认领视为续约
+        assert node_a.acquire("task:stock_daily:000001.SZ")
+        assert node_a.get("task:stock_daily:000001.SZ").owner == "a"
+
+    def test_release_allows_other_node(self, lease_root):
+        """释放后其他节点可以认领"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+        node_a.acquire("x")
+
+        assert not node_b.release("x")
+        assert node_a.release("x")
+        assert node_b.acquire("x")
+
+    def test_expired_lease_is_taken_over(self, lease_root):
+        """持有者崩溃后租约过期，其他节点接管"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+        node_a.acquire("x", ttl_seconds=0.01)
+        time.sleep(0.05)
+
+        assert node_b.acquire("x")
+        assert node_b.get("x").owner == "b"
+        assert not node_a.acquire("x")
+
+    def test_renew_does_not_overwrite_lease_taken_over_meanwhile(
+        self, lease_root, monkeypatch
+    ):
+        """续约读到自己的租约后、写入前被其他节点接管，续约失败且不覆盖新租约"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+        node_a.acquire("x", ttl_seconds=0.01)
+        own = node_a.get("x")
+        time.sleep(0.05)
+        assert node_b.acquire("x")
+
+        # 第一次读取返回 a 过期前读到的租约，模拟读取与写入之间 b 完成接管
+        real_read = node_a._read
+        reads = iter([own])
+        monkeypatch.setattr(
+            node_a, "_read", lambda path: next(reads, None) or real_read(path)
+        )
+
+        assert not node_a.acquire("x")
+        assert node_b.get("x").owner == "b"
+        assert node_b.release("x")
+
+    def test_release_checks_payload(self, lease_root):
+        """payload 不匹配时不释放 (租约已被同一节点的新任务续约)"""
+        node = LeaseManager(lease_root, node_id="a")
+        node.acquire("x", payload={"task_key": "new"})
+
+        assert not node.release("x", payload={"task_key": "old"})
+        assert node.release("x", payload={"task_key": "new"})
+
+    def test_hold_times_out(self, lease_root):
+        """等待超时抛出 LeaseTimeout"""
+        LeaseManager(lease_root, node_id="a").acquire("partition:t/p")
+        node_b = LeaseManager(lease_root, node_id="b")
+
+        with pytest.raises(LeaseTimeout):
+            with node_b.hold("partition:t/p", wait_seconds=0.05):
+                pass
+
+    def test_disabled_manager_always_succeeds(self, lease_root):
+        """未启用时认领总是成功，也不创建租约目录"""
+        node_a = LeaseManager(lease_root, node_id="a", enabled=False)
+        node_b = LeaseManager(lease_root, node_id="b", enabled=False)
+
+        assert node_a.acquire("x") and node_b.acquire("x")
+        with node_b.hold("x"):
+            pass
+
+    def test_purge_expired(self, lease_root):
+        """清理过期租约文件"""
+        node = LeaseManager(lease_root, node_id="a")
+        node.acquire("old", ttl_seconds=0.01)
+        node.acquire("live")
+        time.sleep(0.05)
+
+        assert node.purge_expired() == 1
+        assert node.get("old") is None
+        assert node.get("live") is not None
+
+    def test_hold_renews_lease_while_held(self, lease_root):
+        """持有期间后台续约，超过有效期的长时间写入不会被其他节点接管"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+
+        with node_a.hold("partition:t/p", ttl_seconds=0.15):
+            time.sleep(0.4)
+            assert not node_b.acquire("partition:t/p")
+        assert node_a.get("partition:t/p") is None
+
+    def test_table_lease_waits_for_partition_leases(self, lease_root):
+        """其他节点持有分区租约时，整表租约等待超时且不保留表租约"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+        node_a.acquire(partition_lease_name("stock_basic", "year=2024"))
+
+        with pytest.raises(LeaseTimeout):
+            with node_b.hold_partition("stock_basic", wait_seconds=0.05):
+                pass
+        assert node_b.get(partition_lease_name("stock_basic")) is None
+
+        node_a.release(partition_lease_name("stock_basic", "year=2024"))
+        with node_b.hold_partition("stock_basic", wait_seconds=0.05):
+            assert node_b.get(partition_lease_name("stock_basic")) is not None
+
+    def test_partition_lease_yields_to_table_lease(self, lease_root):
+        """整表租约被其他节点持有时，分区写入者让出分区租约并等待"""
+        node_a = LeaseManager(lease_root, node_id="a")
+        node_b = LeaseManager(lease_root, node_id="b")
+        node_a.acquire(partition_lease_name("stock_basic"))
+
+        with pytest.raises(LeaseTimeout):
+            with node_b.hold_partition("stock_basic", "year=2024", wait_seconds=0.05):
+                pass
+        assert node_b.get(partition_lease_name("stock_basic", "year=2024")) is None
+        # 其他表的分区不受影响
+        with node_b.hold_partition("stock_daily", "year=2024", wait_seconds=0.05):
+            pass
+
+    def test_lease_names(self):
+        assert task_lease_name("stock_daily", "000001.SZ") == (
+            "task:stock_daily:000001.SZ"
+        )
+        assert partition_lease_name("stock_daily", "year=2024") == (
+            "partition:stock_daily/year=2024"
+        )
+        assert partition_lease_name("stock_basic") == "table:stock_basic"
+
+
+def _race(lease_root, node_id, names, results):
+    manager = LeaseManager(lease_root, node_id=node_id)
+    won = [name for name in names if manager.acquire(name)]
+    results.put((node_id, won))
+
+
+class TestMultiProcess:
+    def test_each_task_is_claimed_by_exactly_one_process(self, lease_root):
+        """多个进程 (模拟多台机器) 竞争同一批租约，每个租约只被认领一次"""
+        names = [f"task:stock_daily:{i:06d}.SZ" for i in range(200)]
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=_race, args=(lease_root, f"node-{i}", names, results))
+            for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        won = dict(results.get(timeout=30) for _ in processes)
+        for process in processes:
+            process.join(timeout=30)
+
+        claimed = [name for names_won in won.values() for name in names_won]
+        assert sorted(claimed) == sorted(names)
+
+
+class TestClusterIntegration:
+    def test_registry_skips_tasks_claimed_by_other_node(self, tmp_path, lease_root):
+        """两个节点各自的登记表通过共享租约分摊任务"""
+        params = [
+            {"task_type": "stock_daily", "symbol": f"00000{i}.SZ", "start_date": "1"}
+            for i in range(4)
+        ]
+        node_a = TaskRegistry(
+            db_path=str(tmp_path / "a.db"),
+            lease_manager=LeaseManager(lease_root, node_id="a"),
+        )
+        node_b = TaskRegistry(
+            db_path=str(tmp_path / "b.db"),
+            lease_manager=LeaseManager(lease_root, node_id="b"),
+        )
+
+        accepted_a = node_a.claim_batch(params[:3])
+        accepted_b = node_b.claim_batch(params)
+
+        assert accepted_a == params[:3]
+        assert accepted_b == params[3:]
+
+        # 节点 a 完成任务后释放租约，节点 b 可以再次认领
+        node_a.release(make_task_key("stock_daily", "000000.SZ", start_date="1"))
+        assert node_b.claim_batch(params[:1]) == params[:1]
+
+    def test_writer_waits_for_partition_lease(self, tmp_path, lease_root):
+        """分区租约被其他节点持有时，写入器等待超时而不写入"""
+        LeaseManager(lease_root, node_id="other").acquire(
+            partition_lease_name("stock_daily", "year=2024")
+        )
+        writer = ParquetWriter(
+            str(tmp_path / "parquet"),
+            lease_manager=LeaseManager(lease_root, node_id="me", wait_seconds=0.05),
+        )
+        data = pd.DataFrame({"ts_code": ["000001.SZ"], "year": [2024], "close": [1.0]})
+
+        with pytest.raises(LeaseTimeout):
+            writer.write(data, "stock_daily", ["year"])
+        assert not (tmp_path / "parquet" / "stock_daily").exists()
+
+        # 不涉及被占用分区的写入照常进行
+        writer.write(data.assign(year=2023), "stock_daily", ["year"])
+        assert (tmp_path / "parquet" / "stock_daily" / "year=2023").exists()
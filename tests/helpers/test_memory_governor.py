@@ -0,0 +1,211 @@
+"""
+测试 MemoryGovernor 慢速消费者内存管控
+"""
+
+import sqlite3
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from neo.helpers.memory_governor import MB, MemoryGovernor
+from neo.helpers.metrics_store import STAGE_WRITE, MetricsStore
+
+
+def _governor(**kwargs):
+    options = dict(
+        max_inflight_mb=100,
+        large_task_mb=60,
+        min_available_mb=0,
+        amplification=1.0,
+        max_wait_seconds=0,
+        poll_interval_seconds=0.01,
+        available_bytes=lambda: None,
+    )
+    options.update(kwargs)
+    return MemoryGovernor(**options)
+
+
+class TestMemoryGovernor:
+    def test_estimate_prefers_payload_bytes(self):
+        """有负载大小时按其放大，否则按行数 × 列数估算"""
+        governor = _governor(amplification=4.0)
+        records = [{"a": 1, "b": 2}] * 10
+
+        assert governor.estimate(records, payload_bytes=1000) == 4000
+        assert governor.estimate(records) == 10 * 2 * 64 * 4
+        assert governor.estimate([]) == 0
+        assert governor.estimate(None) == 0
+
+    def test_inflight_cap_defers_when_wait_times_out(self):
+        """超过进程内上限且等待超时时返回 False 并计入延迟次数"""
+        governor = _governor()
+
+        assert governor.acquire(50 * MB)
+        assert not governor.acquire(55 * MB)
+        assert governor.stats().deferred == 1
+
+        governor.release(50 * MB)
+        assert governor.acquire(55 * MB)
+        assert governor.stats().admitted == 2
+
+    def test_waiting_task_admitted_after_release(self):
+        """等待中的任务在其他任务归还额度后获得额度"""
+        governor = _governor(max_wait_seconds=5)
+        governor.acquire(50 * MB)
+        admitted = []
+        waiter = threading.Thread(
+            target=lambda: admitted.append(governor.acquire(55 * MB))
+        )
+        waiter.start()
+
+        governor.release(50 * MB)
+        waiter.join(timeout=5)
+
+        assert admitted == [True]
+
+    def test_large_task_is_exclusive(self):
+        """大任务不与其他任务同时处理，超过上限的任务独占时也放行"""
+        governor = _governor()
+
+        assert governor.acquire(10 * MB)
+        assert not governor.acquire(60 * MB)
+        governor.release(10 * MB)
+
+        assert governor.acquire(500 * MB)
+        assert governor.is_large(500 * MB)
+        assert not governor.acquire(1 * MB)
+        governor.release(500 * MB)
+        assert governor.acquire(1 * MB)
+
+    def test_system_memory_check_and_deferral_limit(self):
+        """系统可用内存不足时延迟，达到最多延迟次数后不再等待系统内存"""
+        governor = _governor(
+            min_available_mb=100, max_deferrals=3, available_bytes=lambda: 120 * MB
+        )
+
+        assert governor.acquire(10 * MB)
+        governor.release(10 * MB)
+        assert not governor.acquire(30 * MB, attempt=2)
+        assert governor.acquire(30 * MB, attempt=3)
+
+    def test_disabled_governor_admits_everything(self):
+        """禁用时不限制，也不视为大任务"""
+        governor = _governor(enabled=False)
+
+        assert governor.acquire(10**12)
+        assert governor.acquire(10**12)
+        assert not governor.is_large(10**12)
+        assert governor.stats().inflight_bytes == 0
+
+
+class TestProcessDataTaskMemory:
+    def test_task_deferred_when_memory_unavailable(self):
+        """内存额度不足时数据处理任务带着延迟次数重新入队，且不处理数据"""
+        from neo.tasks.data_processing_tasks import process_data_task
+
+        governor = _governor(defer_seconds=5)
+        governor.acquire(100 * MB)
+        with (
+            patch("neo.tasks.data_processing_tasks.DataProcessor") as processor_class,
+            patch("neo.app.container") as mock_container,
+            patch.object(process_data_task, "schedule") as schedule,
+        ):
+            mock_container.memory_governor.return_value = governor
+            result = process_data_task.func(
+                "stock_daily",
+                "000001.SZ",
+                [{"a": 1}],
+                task_key="k",
+                payload_bytes=10 * MB,
+                task=Mock(priority=7),
+            )
+
+        assert result is False
+        processor_class.assert_not_called()
+        schedule.assert_called_once()
+        assert schedule.call_args.kwargs["kwargs"]["deferrals"] == 1
+        assert schedule.call_args.kwargs["kwargs"]["task_key"] == "k"
+        assert schedule.call_args.kwargs["delay"] == 5
+        assert schedule.call_args.kwargs["priority"] == 7
+        assert governor.stats().inflight_bytes == 100 * MB
+
+    def test_task_stops_waiting_for_system_memory_after_max_deferrals(self):
+        """系统内存一直不足时，任务最多被延迟 max_deferrals 次，之后照常处理"""
+        from neo.tasks.data_processing_tasks import process_data_task
+
+        governor = _governor(
+            min_available_mb=100, max_deferrals=3, available_bytes=lambda: 50 * MB
+        )
+        scheduled = []
+        kwargs = {"payload_bytes": 10 * MB}
+        with (
+            patch(
+                "neo.tasks.data_processing_tasks.DataProcessor._process_with_container",
+                return_value=True,
+            ),
+            patch("neo.app.container") as mock_container,
+            patch.object(
+                process_data_task,
+                "schedule",
+                side_effect=lambda **call: scheduled.append(call),
+            ),
+        ):
+            mock_container.memory_governor.return_value = governor
+            for _ in range(10):
+                result = process_data_task.func(
+                    "stock_daily", "000001.SZ", [{"a": 1}], task=None, **kwargs
+                )
+                if result:
+                    break
+                kwargs = scheduled[-1]["kwargs"]
+
+        assert result is True
+        assert [call["kwargs"]["deferrals"] for call in scheduled] == [1, 2, 3]
+        assert governor.stats().inflight_bytes == 0
+
+    def test_large_task_releases_payload_and_quota(self):
+        """大任务处理时清空原始负载，结束后归还额度"""
+        from neo.tasks.data_processing_tasks import process_data_task
+
+        governor = _governor()
+        records = [{"a": 1}, {"a": 2}]
+        with (
+            patch(
+                "neo.tasks.data_processing_tasks.DataProcessor._process_with_container",
+                return_value=True,
+            ),
+            patch("neo.app.container") as mock_container,
+        ):
+            mock_container.memory_governor.return_value = governor
+            result = process_data_task.func(
+                "stock_daily", "000001.SZ", records, payload_bytes=80 * MB
+            )
+
+        assert result is True
+        assert records == []
+        assert governor.stats().inflight_bytes == 0
+
+
+def test_metrics_store_records_peak_rss(tmp_path):
+    """写入指标记录进程峰值内存，并兼容没有该列的旧指标表"""
+    db_path = tmp_path / "metrics.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE task_metrics (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "run_id TEXT, stage TEXT NOT NULL, task_type TEXT NOT NULL, "
+            "symbol TEXT NOT NULL, finished_at REAL NOT NULL, "
+            "duration_seconds REAL NOT NULL, rows INTEGER NOT NULL DEFAULT 0, "
+            "payload_bytes INTEGER NOT NULL DEFAULT 0, "
+            "rate_limit_wait_seconds REAL NOT NULL DEFAULT 0, "
+            "file_count INTEGER NOT NULL DEFAULT 0, "
+            "success INTEGER NOT NULL DEFAULT 1)"
+        )
+    store = MetricsStore(db_path=str(db_path))
+
+    store.record("download", "stock_daily", "000001.SZ", 1.0)
+    store.record(STAGE_WRITE, "stock_daily", "000001.SZ", 0.1, peak_rss_bytes=64 * MB)
+    store.record(STAGE_WRITE, "stock_daily", "000002.SZ", 0.1, peak_rss_bytes=96 * MB)
+
+    daily = store.build_report().tables[0]
+    assert daily.peak_rss_mb == pytest.approx(96)
@@ -0,0 +1,110 @@
+"""
+测试 MetricsStore 任务执行指标表
+"""
+
+import pandas as pd
+import pytest
+
+from neo.helpers.metrics_store import STAGE_DOWNLOAD, STAGE_WRITE, MetricsStore
+from neo.writers.parquet_writer import ParquetWriter
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(db_path=str(tmp_path / "metrics.db"))
+
+
+class TestMetricsStore:
+    def test_mean_latency_excludes_rate_limit_wait(self, store):
+        """平均耗时只统计成功的下载，并扣除限流等待"""
+        store.record(
+            STAGE_DOWNLOAD, "stock_daily", "000001.SZ", 3.0, rate_limit_wait_seconds=2.0
+        )
+        store.record(STAGE_DOWNLOAD, "stock_daily", "000002.SZ", 2.0)
+        store.record(STAGE_DOWNLOAD, "stock_daily", "000003.SZ", 9.0, success=False)
+        store.record(STAGE_WRITE, "stock_daily", "000001.SZ", 5.0)
+
+        assert store.mean_latency("stock_daily") == pytest.approx(1.5)
+        assert store.mean_latency("stock_basic") is None
+
+    def test_disabled_store_records_nothing(self, tmp_path):
+        """禁用时不记录指标"""
+        store = MetricsStore(db_path=str(tmp_path / "metrics.db"), enabled=False)
+        store.record(STAGE_DOWNLOAD, "stock_daily", "000001.SZ", 1.0)
+
+        assert store.mean_latency("stock_daily") is None
+        assert not (tmp_path / "metrics.db").exists()
+
+    def test_latest_run_id(self, store):
+        """最近一次运行取最后写入的带 run_id 的记录"""
+        assert store.latest_run_id() is None
+        store.record(STAGE_DOWNLOAD, "stock_daily", "000001.SZ", 1.0, run_id="run-1")
+        store.record(STAGE_DOWNLOAD, "stock_daily", "000002.SZ", 1.0, run_id="run-2")
+        store.record(STAGE_DOWNLOAD, "stock_daily", "000003.SZ", 1.0)
+
+        assert store.latest_run_id() == "run-2"
+
+    def test_build_report_per_table(self, store):
+        """按表汇总分位数、行数、配额利用率和写入指标"""
+        for i, duration in enumerate([1.0, 2.0, 3.0, 4.0]):
+            store.record(
+                STAGE_DOWNLOAD,
+                "stock_daily",
+                f"00000{i}.SZ",
+                duration,
+                rows=100,
+                payload_bytes=1024,
+                run_id="run-1",
+            )
+        store.record(
+            STAGE_DOWNLOAD, "stock_basic", "000001.SZ", 0.5, rows=10, run_id="run-1"
+        )
+        store.record(
+            STAGE_WRITE,
+            "stock_daily",
+            "000000.SZ",
+            0.2,
+            rows=100,
+            file_count=2,
+            run_id="run-1",
+        )
+        store.record(STAGE_DOWNLOAD, "stock_daily", "999999.SZ", 60.0, run_id="run-2")
+
+        report = store.build_report(
+            "run-1", rate_limit_of=lambda task_type: 100, top_n=2
+        )
+
+        tables = {table.task_type: table for table in report.tables}
+        assert set(tables) == {"stock_daily", "stock_basic"}
+        daily = tables["stock_daily"]
+        assert daily.tasks == 4
+        assert daily.rows == 400
+        assert daily.latency_p50 == pytest.approx(2.5)
+        assert daily.files == 2
+        assert daily.write_p50 == pytest.approx(0.2)
+        assert daily.quota_utilization is not None
+        assert tables["stock_basic"].write_p50 is None
+        assert [item["symbol"] for item in report.slowest] == ["000003.SZ", "000002.SZ"]
+
+    def test_build_report_empty(self, store):
+        """没有指标时返回空报告"""
+        report = store.build_report("missing")
+
+        assert report.tables == []
+        assert report.slowest == []
+
+
+def test_parquet_writer_counts_files_per_partition(tmp_path):
+    """写入器按分区组合累计写出的文件数"""
+    writer = ParquetWriter(base_path=str(tmp_path))
+    data = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ"] * 3,
+            "year": [2023, 2024, 2024],
+            "close": [1.0, 2.0, 3.0],
+        }
+    )
+
+    writer.write(data, "stock_daily", ["year"], "000001.SZ")
+
+    assert writer.files_written == 2
@@ -0,0 +1,119 @@
+"""
+测试 PipelineMonitor 流水线监控
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from neo.helpers.metrics_store import STAGE_DOWNLOAD, STAGE_WRITE, MetricsStore
+from neo.helpers.pipeline_monitor import (
+    MonitorSnapshot,
+    PipelineMonitor,
+    QueueDepth,
+    QueueDepthReader,
+    build_monitor_table,
+)
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _create_queue_db(path, pending=0, scheduled=0):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE task (id INTEGER PRIMARY KEY, queue TEXT, data BLOB)")
+    conn.execute("CREATE TABLE schedule (id INTEGER PRIMARY KEY, queue TEXT)")
+    conn.executemany("INSERT INTO task (queue) VALUES (?)", [("q",)] * pending)
+    conn.executemany("INSERT INTO schedule (queue) VALUES (?)", [("q",)] * scheduled)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(db_path=str(tmp_path / "metrics.db"))
+
+
+class TestQueueDepthReader:
+    def test_reads_depths_with_persistent_connection(self, tmp_path):
+        """复用同一个只读连接读取最新的任务数"""
+        fast = tmp_path / "fast.db"
+        _create_queue_db(fast, pending=3, scheduled=1)
+        reader = QueueDepthReader({"fast": str(fast), "slow": str(tmp_path / "x.db")})
+
+        depths = reader.read()
+        assert depths["fast"] == QueueDepth(pending=3, scheduled=1)
+        assert depths["slow"] == QueueDepth()
+
+        conn = sqlite3.connect(fast)
+        conn.execute("INSERT INTO task (queue) VALUES ('q')")
+        conn.commit()
+        conn.close()
+
+        assert reader.read()["fast"].pending == 4
+        reader.close()
+
+
+class TestPipelineMonitor:
+    def test_poll_reads_incrementally_and_computes_rates(self, store, tmp_path):
+        """按游标增量读取指标，计算吞吐、限流余量、写入耗时和滞后"""
+        clock = _Clock(time.time())
+        monitor = PipelineMonitor(
+            store,
+            QueueDepthReader({}),
+            rate_limit_of=lambda task_type: 10,
+            window_seconds=60,
+            clock=clock,
+        )
+        for symbol in ["000001.SZ", "000002.SZ"]:
+            store.record(
+                STAGE_DOWNLOAD, "stock_daily", symbol, 1.0, rows=50, run_id="r"
+            )
+        store.record(STAGE_WRITE, "stock_daily", "000001.SZ", 0.4, run_id="r")
+        clock.now += 10
+
+        snapshot = monitor.poll()
+
+        (daily,) = snapshot.throughput
+        assert daily.calls_last_minute == 2
+        assert daily.headroom == pytest.approx(0.8)
+        assert daily.rows_per_second == pytest.approx(100 / 10)
+        assert snapshot.write_p50 == pytest.approx(0.4)
+        assert snapshot.lag_seconds is not None
+        assert monitor._cursor == 3
+
+        # 没有新记录时不会重复计数
+        clock.now += 1
+        assert monitor.poll().throughput[0].calls_last_minute == 2
+
+    def test_eta_uses_slowest_stage(self):
+        """预计剩余时间取下载和写入中较慢的一方"""
+        snapshot = MonitorSnapshot(
+            queues={"fast": QueueDepth(pending=10), "slow": QueueDepth(pending=10)}
+        )
+
+        eta = PipelineMonitor._estimate_eta(snapshot, download_rate=2, write_rate=1)
+
+        assert eta == pytest.approx(20)
+        assert PipelineMonitor._estimate_eta(snapshot, 0, 1) is None
+        assert PipelineMonitor._estimate_eta(MonitorSnapshot(), 0, 0) == 0.0
+
+    def test_build_monitor_table(self):
+        """监控表格包含所有队列列"""
+        snapshot = MonitorSnapshot(
+            queues={"fast": QueueDepth(1), "slow": QueueDepth(2), "maint": QueueDepth()}
+        )
+
+        table = build_monitor_table(snapshot)
+
+        assert [column.header for column in table.columns][1:] == [
+            "fast",
+            "slow",
+            "maint",
+        ]
@@ -0,0 +1,220 @@
+"""
+测试 RunManifest 运行清单与运行恢复
+"""
+
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from neo.helpers.run_manifest import (
+    STATE_DOWNLOADED,
+    STATE_EMPTY,
+    STATE_FAILED,
+    STATE_PLANNED,
+    STATE_SUPERSEDED,
+    STATE_WRITTEN,
+    RunManifest,
+)
+from neo.helpers.task_registry import TaskRegistry, make_task_key
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return RunManifest(db_path=str(tmp_path / "run_manifest.db"))
+
+
+def _params(symbol, start_date="20240101"):
+    return {"task_type": "stock_daily", "symbol": symbol, "start_date": start_date}
+
+
+def _key(symbol, start_date="20240101"):
+    return make_task_key("stock_daily", symbol, start_date=start_date)
+
+
+class TestRunManifest:
+    def test_track_records_planned_tasks_and_tags_run_id(self, manifest):
+        """流式登记计划任务，并为每个任务附加 run_id"""
+        manifest.create_run("run-1", ["stock_daily"])
+        tracked = list(
+            manifest.track("run-1", [_params("000001.SZ"), _params("000002.SZ")], 1)
+        )
+
+        assert [p["run_id"] for p in tracked] == ["run-1", "run-1"]
+        assert manifest.summary("run-1") == {STATE_PLANNED: 2}
+
+    def test_task_key_matches_download_task(self):
+        """清单中的任务键与 download_task 计算的任务键一致"""
+        params = {**_params("000001.SZ"), "priority": -1.0, "run_id": "run-1"}
+        assert RunManifest.task_key_for(params) == _key("000001.SZ")
+
+    def test_unfinished_excludes_written_and_empty(self, manifest):
+        """已写入和空数据的任务视为完成，其余都需要恢复"""
+        manifest.create_run("run-1", ["stock_daily"])
+        symbols = [f"00000{i}.SZ" for i in range(1, 6)]
+        manifest.record_planned("run-1", [_params(s) for s in symbols])
+        manifest.mark("run-1", _key(symbols[0]), STATE_WRITTEN)
+        manifest.mark("run-1", _key(symbols[1]), STATE_EMPTY)
+        manifest.mark("run-1", _key(symbols[2]), STATE_DOWNLOADED)
+        manifest.mark("run-1", _key(symbols[3]), STATE_FAILED)
+
+        unfinished = manifest.unfinished("run-1")
+
+        assert [p["symbol"] for p in unfinished] == symbols[2:]
+        assert unfinished[0] == _params(symbols[2])
+
+    def test_run_exists(self, manifest):
+        manifest.create_run("run-1", ["stock_daily"])
+        assert manifest.run_exists("run-1")
+        assert not manifest.run_exists("run-2")
+
+
+class TestResumeRun:
+    def test_live_task_keys_scans_all_fast_shards(self):
+        """仍在快速队列任一分片或慢速队列中的任务被视为在途"""
+        from huey import MemoryHuey
+
+        from neo.tasks.download_tasks import _live_task_keys, download_task
+
+        shards = [MemoryHuey(f"fast_{i}") for i in range(2)]
+        slow = MemoryHuey("slow")
+        wrappers = [huey.task()(download_task.func) for huey in shards]
+        wrappers[0](**_params("000001.SZ"))
+        wrappers[1](**_params("000002.SZ"))
+        slow.enqueue(slow.task()(lambda **kw: None).s(task_key="slow-key"))
+
+        with (
+            patch("neo.tasks.download_tasks.huey_fast_shards", shards),
+            patch("neo.tasks.download_tasks.huey_slow", slow),
+        ):
+            live = _live_task_keys()
+
+        assert live == {_key("000001.SZ"), _key("000002.SZ"), "slow-key"}
+
+    @patch("neo.tasks.download_tasks._live_task_keys")
+    @patch("neo.tasks.download_tasks.bulk_enqueue")
+    @patch("neo.app.container")
+    def test_resume_reenqueues_only_unfinished_tasks(
+        self, mock_container, mock_bulk_enqueue, mock_live_keys, manifest, tmp_path
+    ):
+        """恢复只派发未完成且不在队列中的任务，并接管崩溃任务的登记"""
+        from neo.tasks.download_tasks import resume_run
+
+        registry = TaskRegistry(db_path=str(tmp_path / "registry.db"))
+        symbols = ["000001.SZ", "000002.SZ", "000003.SZ"]
+        registry.claim_batch([_params(s) for s in symbols])
+        manifest.create_run("run-1", ["stock_daily"])
+        manifest.record_planned("run-1", [_params(s) for s in symbols])
+        manifest.mark("run-1", _key("000001.SZ"), STATE_WRITTEN)
+
+        mock_container.run_manifest.return_value = manifest
+        mock_container.task_registry.return_value = registry
+        mock_container.fair_share_scheduler.return_value.assign.side_effect = (
+            lambda params, task_types: params
+        )
+        # 000003.SZ 仍在快速队列中等待
+        mock_live_keys.return_value = {_key("000003.SZ")}
+        enqueued = []
+
+        def collect(task, params, **kwargs):
+            enqueued.extend(params)
+            return len(enqueued)
+
+        mock_bulk_enqueue.side_effect = collect
+
+        assert resume_run("run-1") == 1
+        assert enqueued == [{**_params("000002.SZ"), "run_id": "run-1"}]
+
+    @patch("neo.tasks.download_tasks._live_task_keys")
+    @patch("neo.tasks.download_tasks.bulk_enqueue")
+    @patch("neo.app.container")
+    def test_resume_skips_in_flight_and_superseded_tasks(
+        self, mock_container, mock_bulk_enqueue, mock_live_keys, manifest, tmp_path
+    ):
+        """其他 worker 仍在执行的任务不重新派发，已被合并的任务标记为终态"""
+        from neo.tasks.download_tasks import resume_run
+
+        registry = TaskRegistry(db_path=str(tmp_path / "registry.db"))
+        planned = [_params("000001.SZ"), _params("000002.SZ", "20240201")]
+        registry.claim_batch(planned)
+        registry.mark_in_flight("stock_daily", "000001.SZ", _key("000001.SZ"))
+        # 000002.SZ 被另一次运行中更早 start_date 的任务合并
+        registry.claim_batch([_params("000002.SZ", "20240101")])
+        manifest.create_run("run-1", ["stock_daily"])
+        manifest.record_planned("run-1", planned)
+
+        mock_container.run_manifest.return_value = manifest
+        mock_container.task_registry.return_value = registry
+        mock_live_keys.return_value = set()
+
+        assert resume_run("run-1") == 0
+        mock_bulk_enqueue.assert_not_called()
+        assert manifest.summary("run-1") == {STATE_PLANNED: 1, STATE_SUPERSEDED: 1}
+        assert manifest.unfinished("run-1") == [_params("000001.SZ")]
+
+    @patch("neo.app.container")
+    def test_resume_unknown_run(self, mock_container, manifest):
+        from neo.tasks.download_tasks import resume_run
+
+        mock_container.run_manifest.return_value = manifest
+        with pytest.raises(ValueError, match="不存在"):
+            resume_run("missing")
+
+
+def test_process_data_task_marks_manifest():
+    """数据处理任务结束后更新运行清单并释放登记"""
+    from neo.tasks.data_processing_tasks import process_data_task
+
+    with (
+        patch("neo.tasks.data_processing_tasks.DataProcessor") as processor_class,
+        patch("neo.app.container") as mock_container,
+    ):
+        processor_class.return_value = Mock(process_data=Mock(return_value=True))
+        process_data_task.func(
+            "stock_daily", "000001.SZ", [{"a": 1}], task_key="k", run_id="run-1"
+        )
+
+    mock_container.task_registry.return_value.release.assert_called_once_with("k")
+    mock_container.run_manifest.return_value.mark.assert_called_once_with(
+        "run-1", "k", STATE_WRITTEN
+    )
+
+
+def test_batched_write_keeps_task_claimed_until_flush(manifest, tmp_path):
+    """攒批写入的数据刷盘前任务保持登记，期间规划的同一任务被去重"""
+    from neo.tasks.data_processing_tasks import process_data_task
+    from neo.writers.batching_parquet_writer import BatchingParquetWriter
+
+    registry = TaskRegistry(db_path=str(tmp_path / "registry.db"))
+    writer = BatchingParquetWriter(str(tmp_path / "parquet"), max_delay_seconds=0)
+    params = _params("000001.SZ")
+    registry.claim_batch([params])
+    manifest.create_run("run-1", ["stock_daily"])
+    manifest.record_planned("run-1", [params])
+    rows = [{"ts_code": "000001.SZ", "trade_date": "20240102", "year": "2024"}]
+
+    def write(task_type, symbol, data_frame):
+        writer.write(pd.DataFrame(data_frame), task_type, ["year"], symbol)
+        return True
+
+    with (
+        patch("neo.tasks.data_processing_tasks.DataProcessor") as processor_class,
+        patch("neo.app.container") as mock_container,
+    ):
+        processor_class.return_value = Mock(process_data=Mock(side_effect=write))
+        mock_container.parquet_writer.return_value = writer
+        mock_container.task_registry.return_value = registry
+        mock_container.run_manifest.return_value = manifest
+        mock_container.memory_governor.return_value.acquire.return_value = True
+        process_data_task.func(
+            "stock_daily", "000001.SZ", rows, task_key=_key("000001.SZ"), run_id="run-1"
+        )
+
+        # 写入后、刷盘前规划：数据尚未落盘，同一任务仍被登记去重
+        assert registry.claim_batch([params]) == []
+        assert manifest.summary("run-1") == {STATE_PLANNED: 1}
+
+        writer.flush()
+
+    assert manifest.summary("run-1") == {STATE_WRITTEN: 1}
+    assert registry.claim_batch([params]) == [params]
@@ -0,0 +1,45 @@
+"""
+测试 ConsistentHashRing 快速队列分片路由
+"""
+
+import pytest
+
+from neo.helpers.shard_router import ConsistentHashRing
+
+SYMBOLS = [f"{i:06d}.SZ" for i in range(2000)]
+
+
+class TestConsistentHashRing:
+    def test_single_shard(self):
+        """只有一个分片时所有股票都路由到分片 0"""
+        ring = ConsistentHashRing(1)
+
+        assert {ring.shard_for(symbol) for symbol in SYMBOLS} == {0}
+
+    def test_deterministic_across_instances(self):
+        """不同实例 (不同进程) 的路由结果一致"""
+        first, second = ConsistentHashRing(4), ConsistentHashRing(4)
+
+        assert [first.shard_for(s) for s in SYMBOLS] == [
+            second.shard_for(s) for s in SYMBOLS
+        ]
+
+    def test_balanced_distribution(self):
+        """股票在分片之间大致均匀分布"""
+        ring = ConsistentHashRing(4)
+        counts = [0] * 4
+        for symbol in SYMBOLS:
+            counts[ring.shard_for(symbol)] += 1
+
+        assert min(counts) > len(SYMBOLS) / 4 * 0.6
+
+    def test_adding_shard_moves_few_symbols(self):
+        """增加一个分片时只有少量股票迁移"""
+        before, after = ConsistentHashRing(4), ConsistentHashRing(5)
+        moved = sum(before.shard_for(s) != after.shard_for(s) for s in SYMBOLS)
+
+        assert moved < len(SYMBOLS) * 0.35
+
+    def test_rejects_zero_shards(self):
+        with pytest.raises(ValueError):
+            ConsistentHashRing(0)
@@ -0,0 +1,143 @@
+"""
+测试 SymbolUniverse 按上市、退市和停牌信息过滤任务
+"""
+
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.symbol_universe import (
+    REASON_DELISTED,
+    REASON_NOT_LISTED,
+    REASON_SUSPENDED,
+    SymbolUniverse,
+)
+from neo.writers.parquet_writer import ParquetWriter
+
+TRADING_DAYS = ["20240102", "20240103", "20240104", "20240105", "20240108"]
+
+
+@pytest.fixture
+def lake(tmp_path):
+    root = tmp_path / "parquet"
+    writer = ParquetWriter(base_path=str(root))
+    calendar = pd.DataFrame(
+        {
+            "exchange": "SSE",
+            "cal_date": TRADING_DAYS + ["20240106", "20240107"],
+            "is_open": [1] * len(TRADING_DAYS) + [0, 0],
+        }
+    )
+    writer.write_full_replace(calendar, "trade_cal", [])
+    basic = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ", "600519.SH", "000003.SZ"],
+            "list_date": ["19910403", "20240104", "19910114"],
+            "delist_date": [None, None, "20020614"],
+        }
+    )
+    writer.write_full_replace(basic, "stock_basic", [])
+    suspensions = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ"] * 4 + ["600519.SH"],
+            "trade_date": ["20240103", "20240104", "20240105", "20240108", "20240105"],
+            "suspend_timing": [None, None, None, None, "09:30-10:30"],
+            "suspend_type": ["S", "S", "S", "S", "S"],
+        }
+    )
+    writer.write(suspensions, "suspend_d", [])
+    return root
+
+
+def _universe(root, **kwargs):
+    return SymbolUniverse(parquet_base_path=str(root), tables=["stock_daily"], **kwargs)
+
+
+class TestSymbolUniverse:
+    def test_listing_and_delisting_windows(self, lake):
+        """区间结束早于上市日或开始晚于退市日时不可能有数据"""
+        universe = _universe(lake)
+
+        assert (
+            universe.why_impossible("stock_daily", "600519", "20240102", "20240103")
+            == REASON_NOT_LISTED
+        )
+        assert universe.can_have_data("stock_daily", "600519.SH", "20240102", None)
+        assert (
+            universe.why_impossible("stock_daily", "000003.SZ", "20240102", None)
+            == REASON_DELISTED
+        )
+        assert universe.can_have_data("stock_daily", "000003.SZ", "20020101", None)
+
+    def test_whole_window_suspension(self, lake):
+        """上市期间每个交易日都全天停牌时不可能有数据，盘中停牌不算"""
+        universe = _universe(lake)
+
+        assert (
+            universe.why_impossible("stock_daily", "000001.SZ", "20240103", "20240108")
+            == REASON_SUSPENDED
+        )
+        # 周末不是交易日，不影响判断
+        assert not universe.can_have_data(
+            "stock_daily", "000001.SZ", "20240105", "20240107"
+        )
+        assert universe.can_have_data("stock_daily", "000001.SZ", "20240102", None)
+        assert universe.can_have_data("stock_daily", "600519.SH", "20240105", "20240105")
+
+    def test_unknown_information_keeps_tasks(self, tmp_path, lake):
+        """未跟踪的表、未知的股票、缺少数据或禁用时一律视为可能有数据"""
+        universe = _universe(lake)
+
+        assert universe.can_have_data("income", "600519.SH", "20200101", "20201231")
+        assert universe.can_have_data("stock_daily", "000002.SZ", "20240103", None)
+        assert _universe(tmp_path / "empty").can_have_data(
+            "stock_daily", "000001.SZ", "20240103", "20240108"
+        )
+        assert _universe(lake, enabled=False).can_have_data(
+            "stock_daily", "600519.SH", "20200101", "20201231"
+        )
+
+    def test_refresh_picks_up_new_data(self, lake):
+        """停复牌数据更新后重新加载"""
+        universe = _universe(lake)
+        assert universe.can_have_data("stock_daily", "000001.SZ", "20240102", None)
+
+        ParquetWriter(base_path=str(lake)).write(
+            pd.DataFrame(
+                {
+                    "ts_code": ["000001.SZ"],
+                    "trade_date": ["20240102"],
+                    "suspend_timing": [None],
+                    "suspend_type": ["S"],
+                }
+            ),
+            "suspend_d",
+            [],
+        )
+        universe.refresh()
+
+        assert not universe.can_have_data("stock_daily", "000001.SZ", "20240102", None)
+
+
+def test_planner_skips_impossible_tasks():
+    """规划在产出任务前跳过不可能有数据的任务，区间结束默认为最新交易日"""
+    from neo.tasks.download_tasks import DownloadTaskManager
+
+    universe = Mock()
+    universe.why_impossible.side_effect = lambda task_type, symbol, start, end: (
+        REASON_SUSPENDED if symbol == "000002.SZ" and end == "20240110" else None
+    )
+    db_queryer = Mock()
+    db_queryer.get_max_date.return_value = {}
+    manager = DownloadTaskManager(SchemaLoader(), symbol_universe=universe)
+
+    configs = list(
+        manager.iter_task_configs(
+            {"stock_daily": ["000001.SZ", "000002.SZ"]}, db_queryer, "20240110"
+        )
+    )
+
+    assert [c["symbol"] for c in configs] == ["000001.SZ"]
+    universe.refresh.assert_called_once()
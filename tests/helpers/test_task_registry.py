@@ -0,0 +1,99 @@
+"""
+测试 TaskRegistry 任务登记表
+"""
+
+import time
+
+import pytest
+
+from neo.helpers.task_registry import TaskRegistry, make_task_key
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return TaskRegistry(db_path=str(tmp_path / "task_registry.db"))
+
+
+def _params(symbol, start_date="20240101", task_type="stock_daily"):
+    return {"task_type": task_type, "symbol": symbol, "start_date": start_date}
+
+
+class TestMakeTaskKey:
+    def test_key_is_deterministic(self):
+        """任务键与参数顺序无关"""
+        a = make_task_key("stock_daily", "000001.SZ", start_date="1", end_date="2")
+        b = make_task_key("stock_daily", "000001.SZ", end_date="2", start_date="1")
+        assert a == b == "stock_daily:000001.SZ:end_date=2:start_date=1"
+
+
+class TestTaskRegistry:
+    def test_duplicate_submission_is_dropped(self, registry):
+        """重复提交的相同任务被丢弃"""
+        first = registry.claim_batch([_params("000001.SZ"), _params("000002.SZ")])
+        second = registry.claim_batch([_params("000001.SZ"), _params("000003.SZ")])
+
+        assert len(first) == 2
+        assert second == [_params("000003.SZ")]
+        assert registry.pending_count() == 3
+
+    def test_later_start_date_is_dropped(self, registry):
+        """已登记任务覆盖了新任务的下载范围时丢弃新任务"""
+        registry.claim_batch([_params("000001.SZ", "20240101")])
+        assert registry.claim_batch([_params("000001.SZ", "20240201")]) == []
+
+    def test_earlier_start_date_supersedes_pending_task(self, registry):
+        """更早 start_date 的任务取代旧登记，旧任务执行时被跳过"""
+        registry.claim_batch([_params("000001.SZ", "20240201")])
+        accepted = registry.claim_batch([_params("000001.SZ", "20240101")])
+        assert accepted == [_params("000001.SZ", "20240101")]
+
+        old_key = make_task_key("stock_daily", "000001.SZ", start_date="20240201")
+        new_key = make_task_key("stock_daily", "000001.SZ", start_date="20240101")
+        assert registry.mark_in_flight("stock_daily", "000001.SZ", old_key) is False
+        assert registry.mark_in_flight("stock_daily", "000001.SZ", new_key) is True
+
+    def test_in_flight_and_superseded_lookup(self, registry):
+        """查询执行中的任务键与已被合并的任务键"""
+        registry.claim_batch([_params("000001.SZ", "20240201")])
+        registry.claim_batch([_params("000001.SZ", "20240101")])
+        registry.claim_batch([_params("000002.SZ", "20240101")])
+        old_key = make_task_key("stock_daily", "000001.SZ", start_date="20240201")
+        new_key = make_task_key("stock_daily", "000001.SZ", start_date="20240101")
+        other_key = make_task_key("stock_daily", "000002.SZ", start_date="20240101")
+        registry.mark_in_flight("stock_daily", "000001.SZ", new_key)
+
+        keys = [old_key, new_key, other_key]
+        assert registry.in_flight(keys) == {new_key}
+        assert registry.superseded(keys) == {old_key}
+
+    def test_release_allows_resubmission(self, registry):
+        """释放登记后同一任务可以再次派发"""
+        registry.claim_batch([_params("000001.SZ")])
+        registry.release(make_task_key("stock_daily", "000001.SZ", start_date="20240101"))
+
+        assert registry.pending_count() == 0
+        assert len(registry.claim_batch([_params("000001.SZ")])) == 1
+
+    def test_expired_claims_are_ignored(self, tmp_path):
+        """超过 TTL 的登记不再阻止派发，并可被清理"""
+        registry = TaskRegistry(db_path=str(tmp_path / "r.db"), ttl_seconds=0.05)
+        registry.claim_batch([_params("000001.SZ")])
+        time.sleep(0.1)
+
+        assert len(registry.claim_batch([_params("000002.SZ")])) == 1
+        time.sleep(0.1)
+        assert registry.purge_expired() == 2
+        assert len(registry.claim_batch([_params("000001.SZ")])) == 1
+
+    def test_filter_unclaimed_streams_in_batches(self, registry):
+        """流式去重跨批次生效"""
+        params = [_params(f"{i:06d}.SZ") for i in range(5)] * 2
+        accepted = list(registry.filter_unclaimed(iter(params), batch_size=3))
+        assert [p["symbol"] for p in accepted] == [f"{i:06d}.SZ" for i in range(5)]
+
+    def test_disabled_registry_passes_everything(self, tmp_path):
+        """关闭去重时所有任务都会被派发"""
+        registry = TaskRegistry(db_path=str(tmp_path / "r.db"), enabled=False)
+        params = [_params("000001.SZ")] * 2
+        assert registry.claim_batch(params) == params
+        assert not (tmp_path / "r.db").exists()
@@ -0,0 +1,93 @@
+"""
+测试 TradingCalendar 压缩交易日历
+"""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from neo.database.operator import ParquetDBQueryer
+from neo.helpers.trading_calendar import TradingCalendar
+from neo.writers.parquet_writer import ParquetWriter
+
+TRADING_DAYS = ["20240102", "20240103", "20240104", "20240105", "20240108"]
+
+
+@pytest.fixture
+def lake(tmp_path):
+    root = tmp_path / "parquet"
+    calendar = pd.DataFrame(
+        {
+            "exchange": "SSE",
+            "cal_date": ["20240101"] + TRADING_DAYS + ["20240106", "20240107"],
+            "is_open": [0] + [1] * len(TRADING_DAYS) + [0, 0],
+        }
+    )
+    ParquetWriter(base_path=str(root)).write_full_replace(calendar, "trade_cal", [])
+    return root
+
+
+@pytest.fixture
+def calendar(lake, tmp_path):
+    return TradingCalendar(str(lake), cache_path=str(tmp_path / "calendar"))
+
+
+class TestTradingCalendar:
+    def test_point_lookups(self, calendar):
+        """开市判断与前后交易日，跨越周末和日历两端"""
+        assert calendar.is_open("20240105")
+        assert not calendar.is_open("20240106")
+        assert not calendar.is_open("20231229")
+        assert calendar.prev_trading_day("20240108") == "20240105"
+        assert calendar.next_trading_day("20240105") == "20240108"
+        assert calendar.prev_trading_day("20240102") is None
+        assert calendar.next_trading_day("20240108") is None
+        assert calendar.next_trading_day("20231201") == "20240102"
+        assert calendar.latest_trading_day("20240107") == "20240105"
+        assert calendar.latest_trading_day("20240103") == "20240103"
+        assert calendar.latest_trading_day("20240301") == "20240108"
+
+    def test_range_counts_and_expansion(self, calendar):
+        """区间交易日数与多个区间的一次展开"""
+        assert calendar.trading_days_between("20240104", "20240107") == 2
+        assert calendar.trading_days_between("20240107", "20240104") == 0
+        assert calendar.trading_days_between(0, 99999999) == len(TRADING_DAYS)
+        assert calendar.open_mask(["20240101", "20240102"]).tolist() == [False, True]
+
+        owners, days = calendar.expand([20240103, 20240106], [20240104, 20240110])
+
+        assert owners.tolist() == [0, 0, 1]
+        assert days.tolist() == [20240103, 20240104, 20240108]
+        assert calendar.trading_days("20240105").tolist() == [20240105, 20240108]
+
+    def test_persisted_as_memory_mapped_arrays(self, calendar, lake, tmp_path):
+        """第二个实例直接以内存映射方式加载缓存，不再扫描 trade_cal"""
+        calendar.refresh()
+        reloaded = TradingCalendar(str(lake), cache_path=str(tmp_path / "calendar"))
+        reloaded._build = Mock(side_effect=AssertionError("should use cache"))
+
+        reloaded.refresh()
+
+        assert isinstance(reloaded.days, np.memmap)
+        assert reloaded.days.tolist() == calendar.days.tolist()
+        assert reloaded.is_open("20240108")
+
+    def test_missing_calendar_returns_nothing(self, tmp_path):
+        """交易日历不存在时查询返回空结果"""
+        calendar = TradingCalendar(str(tmp_path / "empty"), cache_path=None)
+
+        assert calendar.fingerprint is None
+        assert not calendar.is_open("20240102")
+        assert calendar.latest_trading_day("20240102") is None
+        assert calendar.trading_days_between("20240101", "20240110") == 0
+
+
+def test_db_queryer_uses_shared_calendar(calendar):
+    """查询器配置了共享的交易日历时不再查询 trade_cal 的 Parquet 文件"""
+    db_queryer = ParquetDBQueryer(Mock(), trading_calendar=calendar)
+    calendar.latest_trading_day = Mock(return_value="20240108")
+
+    assert db_queryer.get_latest_trading_day() == "20240108"
+    db_queryer.schema_loader.load_schema.assert_not_called()
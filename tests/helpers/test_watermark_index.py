@@ -0,0 +1,170 @@
+"""
+测试 WatermarkIndex 写入水位索引
+"""
+
+import pandas as pd
+import pytest
+
+from neo.database.operator import ParquetDBQueryer
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.watermark_index import (
+    REPLACE_SYMBOL,
+    REPLACE_TABLE,
+    WatermarkIndex,
+)
+from neo.writers.batching_parquet_writer import BatchingParquetWriter
+from neo.writers.parquet_writer import ParquetWriter
+
+
+@pytest.fixture
+def parquet_root(tmp_path):
+    return tmp_path / "parquet"
+
+
+@pytest.fixture
+def index(tmp_path, parquet_root):
+    return WatermarkIndex(
+        db_path=str(tmp_path / "watermarks.db"),
+        schema_loader=SchemaLoader(),
+        parquet_base_path=str(parquet_root),
+    )
+
+
+def _daily(code, dates):
+    return pd.DataFrame(
+        {
+            "ts_code": [code] * len(dates),
+            "trade_date": dates,
+            "year": [d[:4] for d in dates],
+            "close": [1.0] * len(dates),
+        }
+    )
+
+
+class TestWatermarkIndex:
+    def test_incremental_writes_keep_max_date_and_count_rows(self, index):
+        """增量写入取较大的日期并累加行数"""
+        index.record_write("stock_daily", _daily("000001.SZ", ["20240102", "20240103"]))
+        index.record_write("stock_daily", _daily("000001.SZ", ["20231229"]))
+        index.record_write("stock_daily", _daily("600519.SH", ["20240105"]))
+
+        found = index.lookup("stock_daily", ["000001.SZ", "600519.SH", "000002.SZ"])
+
+        assert found == {"000001.SZ": "20240103", "600519.SH": "20240105"}
+        status = {s.task_type: s for s in index.status()}["stock_daily"]
+        assert status.symbols == 2
+        assert status.rows == 4
+        assert status.rebuilt_at is None
+
+    def test_replace_modes(self, index):
+        """按 symbol 替换覆盖该股票的水位，整表替换清空后重新记录并视为已建立"""
+        index.record_write("stock_daily", _daily("000001.SZ", ["20240110"]))
+        index.record_write("stock_daily", _daily("000002.SZ", ["20240110"]))
+
+        index.record_write(
+            "stock_daily", _daily("000001.SZ", ["20240103"]), replace=REPLACE_SYMBOL
+        )
+        assert index.lookup("stock_daily", ["000001.SZ"]) == {"000001.SZ": "20240103"}
+
+        index.record_write(
+            "stock_daily", _daily("000003.SZ", ["20240105"]), replace=REPLACE_TABLE
+        )
+        assert index.is_ready("stock_daily")
+        assert index.lookup("stock_daily", ["000001.SZ", "000003.SZ"]) == {
+            "000003.SZ": "20240105"
+        }
+
+    def test_table_wide_watermark_for_non_stock_tables(self, index):
+        """非股票表对所有请求的代码返回同一个最新日期"""
+        calendar = pd.DataFrame(
+            {"exchange": ["SSE", "SSE"], "cal_date": ["20240101", "20240102"]}
+        )
+        index.record_write("trade_cal", calendar)
+
+        assert index.lookup("trade_cal", ["a", "b"]) == {
+            "a": "20240102",
+            "b": "20240102",
+        }
+
+    def test_market_wide_task_gets_table_max(self, index):
+        """按股票存储但不按股票下载的表 (symbol 为空) 返回整表的最新日期"""
+        index.record_write("suspend_d", _daily("000001.SZ", ["20240103"]))
+        index.record_write("suspend_d", _daily("600519.SH", ["20240105"]))
+
+        assert index.lookup("suspend_d", [""]) == {"": "20240105"}
+
+    def test_tables_without_date_col_are_ignored(self, index):
+        """没有日期列的表不记录水位"""
+        index.record_write("stock_basic", pd.DataFrame({"ts_code": ["000001.SZ"]}))
+
+        assert index.status() == []
+
+    def test_rebuild_from_parquet_files(self, index, parquet_root):
+        """重建以 Parquet 文件为准，合并模式不降低已有的水位"""
+        writer = ParquetWriter(base_path=str(parquet_root))
+        writer.write(
+            _daily("000001.SZ", ["20240102", "20240103"]), "stock_daily", ["year"]
+        )
+        writer.write(_daily("000002.SZ", ["20231229"]), "stock_daily", ["year"])
+        index.record_write("stock_daily", _daily("000002.SZ", ["20240201"]))
+
+        assert index.rebuild("stock_daily", merge=True) == 2
+        assert index.lookup("stock_daily", ["000002.SZ"]) == {"000002.SZ": "20240201"}
+
+        index.rebuild("stock_daily")
+        assert index.is_ready("stock_daily")
+        assert index.lookup("stock_daily", ["000001.SZ", "000002.SZ"]) == {
+            "000001.SZ": "20240103",
+            "000002.SZ": "20231229",
+        }
+        status = {s.task_type: s for s in index.status()}["stock_daily"]
+        assert status.rows == 3
+
+
+class TestWritersMaintainWatermarks:
+    def test_direct_writer_updates_index(self, index, parquet_root):
+        """直写写入器在文件落盘后更新水位"""
+        writer = ParquetWriter(base_path=str(parquet_root), watermark_index=index)
+
+        writer.write(_daily("000001.SZ", ["20240102"]), "stock_daily", ["year"])
+        writer.write_full_replace_by_symbol(
+            _daily("000002.SZ", ["20240105"]), "stock_daily", ["year"], "000002.SZ"
+        )
+
+        assert index.lookup("stock_daily", ["000001.SZ", "000002.SZ"]) == {
+            "000001.SZ": "20240102",
+            "000002.SZ": "20240105",
+        }
+
+    def test_batching_writer_updates_index_on_flush(self, index, parquet_root):
+        """攒批写入器只在缓冲区刷盘后更新水位"""
+        writer = BatchingParquetWriter(
+            base_path=str(parquet_root), max_rows=1000, watermark_index=index
+        )
+        writer.write(_daily("000001.SZ", ["20240102"]), "stock_daily", ["year"])
+
+        assert index.lookup("stock_daily", ["000001.SZ"]) == {}
+        writer.flush()
+        assert index.lookup("stock_daily", ["000001.SZ"]) == {"000001.SZ": "20240102"}
+        writer.shutdown()
+
+
+def test_get_max_date_uses_index(index, parquet_root):
+    """get_max_date 首次查询时建立索引，之后只查索引并映射回原始代码"""
+    ParquetWriter(base_path=str(parquet_root)).write(
+        _daily("600519.SH", ["20240102"]), "stock_daily", ["year"]
+    )
+    queryer = ParquetDBQueryer(
+        schema_loader=SchemaLoader(),
+        parquet_base_path=str(parquet_root),
+        watermark_index=index,
+    )
+
+    assert queryer.get_max_date("stock_daily", ["600519"]) == {"600519": "20240102"}
+    assert index.is_ready("stock_daily")
+
+    # 索引建立后新写入的水位直接可见，无需再扫描文件
+    index.record_write("stock_daily", _daily("600519.SH", ["20240110"]))
+    assert queryer.get_max_date("stock_daily", ["600519.SH"]) == {
+        "600519.SH": "20240110"
+    }
@@ -0,0 +1,178 @@
+"""
+测试 ConsumerRunner 类 (纯单元测试)
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from box import Box
+
+from neo.services.consumer_runner import ConsumerRunner, ConsumerSupervisor
+
+
+class TestConsumerRunnerWorkerType:
+    """ConsumerRunner.get_worker_type - 纯单元测试"""
+
+    @patch("neo.services.consumer_runner.get_config")
+    def test_defaults_to_thread(self, mock_get_config):
+        """未配置 worker_type 时默认使用线程"""
+        mock_get_config.return_value = Box({"huey_fast": {"max_workers": 8}})
+
+        assert ConsumerRunner().get_worker_type("fast") == "thread"
+
+    @patch("neo.services.consumer_runner.get_config")
+    def test_reads_process_worker_type(self, mock_get_config):
+        """读取配置的进程型 worker"""
+        mock_get_config.return_value = Box(
+            {"huey_slow": {"max_workers": 2, "worker_type": "process"}}
+        )
+
+        assert ConsumerRunner().get_worker_type("slow") == "process"
+
+    @patch("neo.services.consumer_runner.get_config")
+    def test_rejects_unknown_worker_type(self, mock_get_config):
+        """不支持的 worker 类型会报错"""
+        mock_get_config.return_value = Box({"huey_maint": {"worker_type": "fiber"}})
+
+        with pytest.raises(ValueError):
+            ConsumerRunner().get_worker_type("maint")
+
+
+class _FakeHuey:
+    def __init__(self, name):
+        self.name = name
+        self.storage = Mock()
+        self.notify_interrupted_tasks = Mock()
+
+
+class _FakeConsumer:
+    def __init__(self, huey, workers, worker_type, check_worker_health):
+        self.huey = huey
+        self.workers = workers
+        self.worker_type = worker_type
+        self.check_worker_health_flag = check_worker_health
+        self.start = Mock()
+        self.stop = Mock()
+        self.check_worker_health = Mock()
+
+
+class TestConsumerSupervisor:
+    """ConsumerSupervisor - 在单进程中监管多个队列"""
+
+    def _supervisor(self):
+        hueys = {name: _FakeHuey(name) for name in ("fast", "slow")}
+        worker_types = {"fast": "thread", "slow": "process"}
+        supervisor = ConsumerSupervisor(
+            hueys,
+            worker_type_of=worker_types.get,
+            health_check_interval=0.01,
+            consumer_factory=_FakeConsumer,
+        )
+        supervisor.warm_up = Mock()
+        supervisor._install_signal_handlers = Mock()
+        return supervisor, hueys
+
+    @patch("neo.services.consumer_runner.get_config")
+    def test_start_warms_up_once_and_starts_all_consumers(self, mock_get_config):
+        """只预热一次共享状态，然后启动所有队列的消费者"""
+        mock_get_config.return_value = Box(
+            {"huey_fast": {"max_workers": 8}, "huey_slow": {"max_workers": 2}}
+        )
+        supervisor, hueys = self._supervisor()
+
+        supervisor.start()
+
+        supervisor.warm_up.assert_called_once()
+        assert set(supervisor.consumers) == {"fast", "slow"}
+        fast, slow = supervisor.consumers["fast"], supervisor.consumers["slow"]
+        assert (fast.workers, fast.worker_type) == (8, "thread")
+        assert (slow.workers, slow.worker_type) == (2, "process")
+        assert not fast.check_worker_health_flag
+        fast.start.assert_called_once()
+        slow.start.assert_called_once()
+        # 进程型 worker fork 前关闭主进程的 SQLite 连接
+        hueys["slow"].storage.close.assert_called_once()
+        hueys["fast"].storage.close.assert_not_called()
+
+    @patch("neo.services.consumer_runner.get_config")
+    def test_start_forks_process_consumers_before_thread_consumers(
+        self, mock_get_config
+    ):
+        """进程型消费者在线程型消费者之前启动，fork 时进程中还没有 worker 线程"""
+        mock_get_config.return_value = Box({})
+        supervisor, _ = self._supervisor()
+        started = []
+        original_build = supervisor._build_consumers
+
+        def build():
+            original_build()
+            for name, consumer in supervisor.consumers.items():
+                consumer.start.side_effect = lambda name=name: started.append(name)
+
+        supervisor._build_consumers = build
+
+        supervisor.start()
+
+        assert list(supervisor.consumers) == ["fast", "slow"]
+        assert started == ["slow", "fast"]
+
+    @patch("neo.services.consumer_runner.get_config")
+    def test_run_checks_health_until_stopped(self, mock_get_config):
+        """监管循环定期检查健康状况，停止时优雅关闭所有消费者"""
+        mock_get_config.return_value = Box({})
+        supervisor, hueys = self._supervisor()
+
+        def stop_after_check():
+            supervisor.request_stop(graceful=True)
+
+        with patch.object(
+            ConsumerSupervisor, "check_health", side_effect=stop_after_check
+        ):
+            supervisor.run()
+
+        for name, consumer in supervisor.consumers.items():
+            consumer.stop.assert_called_once_with(graceful=True)
+            hueys[name].notify_interrupted_tasks.assert_called_once()
+
+    def test_check_health_isolates_failures(self):
+        """单个队列健康检查失败不影响其他队列"""
+        supervisor, hueys = self._supervisor()
+        broken = _FakeConsumer(hueys["fast"], 1, "thread", False)
+        broken.check_worker_health.side_effect = RuntimeError("boom")
+        healthy = _FakeConsumer(hueys["slow"], 1, "thread", False)
+        supervisor.consumers = {"fast": broken, "slow": healthy}
+
+        supervisor.check_health()
+
+        healthy.check_worker_health.assert_called_once()
+
+
+class TestRunAll:
+    @patch("neo.services.consumer_runner.ConsumerSupervisor")
+    def test_run_all_queue_name_uses_supervisor(self, mock_supervisor):
+        """队列名称 'all' 交给监管器在同一进程中运行"""
+        ConsumerRunner().run("all")
+
+        hueys = mock_supervisor.call_args[0][0]
+        assert set(hueys) == {"fast", "slow", "plan", "maint"}
+        mock_supervisor.return_value.run.assert_called_once()
+
+
+class TestShardQueues:
+    def test_shard_queue_names(self):
+        """分片队列名称与基础队列名称互相转换"""
+        from neo.services.consumer_runner import base_queue_name, shard_queue_name
+
+        assert shard_queue_name("fast", 0) == "fast"
+        assert shard_queue_name("fast", 2) == "fast#2"
+        assert base_queue_name("fast#2") == "fast"
+
+    def test_get_huey_rejects_unknown_shard(self):
+        """不存在的分片名称会报错"""
+        with pytest.raises(ValueError):
+            ConsumerRunner().get_huey("fast#99")
+
+    def test_run_rejects_unknown_shard(self):
+        """启动不存在的分片时退出"""
+        with pytest.raises(SystemExit):
+            ConsumerRunner().run("fast", shard=99)
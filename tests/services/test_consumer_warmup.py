@@ -0,0 +1,90 @@
+"""
+测试 ConsumerWarmUp 消费者预热
+"""
+
+from itertools import count
+from unittest.mock import Mock
+
+from neo.services.consumer_warmup import ConsumerWarmUp
+
+
+def _container():
+    container = Mock()
+    schemas = {
+        "stock_daily": Mock(base_object="pro", api_method="daily"),
+        "trade_cal": Mock(base_object="pro", api_method="trade_cal"),
+    }
+    container.schema_loader.return_value.load_all_schemas.return_value = schemas
+    api_manager = container.downloader.return_value.fetcher_builder.api_manager
+    api_manager.prewarm_connections.return_value = 4
+    container.db_queryer.return_value.get_latest_trading_day.return_value = "20240115"
+    return container
+
+
+def _clock():
+    ticks = count()
+    return lambda: float(next(ticks))
+
+
+class TestConsumerWarmUp:
+    def test_fast_queue_preloads_download_hot_path(self):
+        """快速队列预热 API 函数、限流器和 HTTP 连接"""
+        container = _container()
+        api_manager = container.downloader.return_value.fetcher_builder.api_manager
+
+        report = ConsumerWarmUp(
+            container, ["fast#1"], fast_workers=4, clock=_clock()
+        ).run()
+
+        names = [step.name for step in report.steps]
+        assert names == [
+            "任务模块",
+            "schema",
+            "Tushare API",
+            "限流器",
+            "HTTP 连接",
+            "状态库",
+        ]
+        api_manager.get_api_function.assert_any_call("pro", "daily")
+        container.rate_limit_manager.return_value.get_limiter.assert_any_call(
+            "trade_cal"
+        )
+        api_manager.prewarm_connections.assert_called_once_with(4)
+        assert not report.failed
+        # 每个步骤计时 1 秒，总耗时包含所有步骤
+        assert report.total_seconds == 2 * len(names) + 1
+        assert report.summary().startswith(f"就绪耗时 {report.total_seconds:.2f}s")
+
+    def test_process_workers_skip_connection_prewarm(self):
+        """进程型 worker 不在父进程中预建 HTTP 连接"""
+        container = _container()
+
+        report = ConsumerWarmUp(
+            container, ["fast"], worker_type_of=lambda name: "process"
+        ).run()
+
+        assert "HTTP 连接" not in [step.name for step in report.steps]
+
+    def test_queue_specific_steps(self):
+        """规划队列预热交易日历，慢速队列预热数据处理器，维护队列只做通用步骤"""
+        container = _container()
+
+        plan = ConsumerWarmUp(container, ["plan"]).run()
+        slow = ConsumerWarmUp(container, ["slow"]).run()
+        maint = ConsumerWarmUp(container, ["maint"]).run()
+
+        assert "交易日历" in [step.name for step in plan.steps]
+        assert "数据处理器" in [step.name for step in slow.steps]
+        assert [step.name for step in maint.steps] == ["任务模块", "schema"]
+        container.downloader.assert_not_called()
+
+    def test_failed_step_does_not_abort(self):
+        """单个步骤失败只记录在报告中，后续步骤照常执行"""
+        container = _container()
+        container.rate_limit_manager.side_effect = RuntimeError("bucket locked")
+
+        report = ConsumerWarmUp(container, ["fast"]).run()
+
+        assert [step.name for step in report.failed] == ["限流器"]
+        assert report.failed[0].detail == "bucket locked"
+        assert report.steps[-1].name == "状态库" and report.steps[-1].ok
@@ -0,0 +1,129 @@
+"""
+测试 InlinePipelineRunner 类 (纯单元测试)
+"""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pandas as pd
+
+from neo.services.inline_pipeline import InlinePipelineRunner
+
+
+def _make_runner(downloader, data_processor, max_dates=None, workers=3):
+    schema_loader = Mock()
+    schema_loader.get_table_config.return_value = Mock(date_col="trade_date")
+    db_queryer = Mock()
+    db_queryer.get_latest_trading_day.return_value = "20240115"
+    db_queryer.get_max_date.return_value = max_dates or {}
+    parquet_writer = Mock()
+    runner = InlinePipelineRunner(
+        downloader=downloader,
+        data_processor=data_processor,
+        parquet_writer=parquet_writer,
+        schema_loader=schema_loader,
+        db_queryer=db_queryer,
+        download_workers=workers,
+        queue_size=2,
+    )
+    return runner, parquet_writer
+
+
+class TestInlinePipelineRunner:
+    """InlinePipelineRunner - 纯单元测试"""
+
+    def test_runs_all_planned_tasks_through_processor(self):
+        """所有计划任务都被下载并由处理器写入，结束时刷出写入器"""
+        downloader = Mock()
+        downloader.download.side_effect = lambda task_type, symbol, **kw: pd.DataFrame(
+            {"ts_code": [symbol], "trade_date": ["20240115"]}
+        )
+        data_processor = Mock()
+        data_processor.process.return_value = True
+        runner, parquet_writer = _make_runner(downloader, data_processor)
+
+        symbols = [f"{i:06d}.SZ" for i in range(10)]
+        stats = runner.run({"stock_daily": symbols})
+
+        assert stats.planned == 10
+        assert stats.downloaded == 10
+        assert stats.written == 10
+        assert stats.rows == 10
+        assert stats.failed == 0
+        processed = {call.args[1] for call in data_processor.process.call_args_list}
+        assert processed == set(symbols)
+        parquet_writer.flush.assert_called_once()
+
+    def test_passes_incremental_start_date_to_downloader(self):
+        """增量规划得到的 start_date 会传给下载器"""
+        downloader = Mock()
+        downloader.download.return_value = pd.DataFrame({"ts_code": ["000001.SZ"]})
+        data_processor = Mock()
+        data_processor.process.return_value = True
+        runner, _ = _make_runner(
+            downloader, data_processor, max_dates={"000001.SZ": "20240110"}
+        )
+
+        runner.run({"stock_daily": ["000001.SZ"]})
+
+        downloader.download.assert_called_once_with(
+            "stock_daily", "000001.SZ", start_date="20240111"
+        )
+
+    def test_counts_empty_and_failed_downloads(self):
+        """空数据与失败的下载不会进入写入阶段"""
+        results = {
+            "000001.SZ": pd.DataFrame({"ts_code": ["000001.SZ"]}),
+            "000002.SZ": pd.DataFrame(),
+            "000003.SZ": None,
+        }
+        downloader = Mock()
+        downloader.download.side_effect = lambda task_type, symbol, **kw: results[symbol]
+        data_processor = Mock()
+        data_processor.process.return_value = True
+        runner, _ = _make_runner(downloader, data_processor)
+
+        stats = runner.run({"stock_daily": list(results)})
+
+        assert stats.written == 1
+        assert stats.empty == 1
+        assert stats.failed == 1
+        data_processor.process.assert_called_once()
+
+    def test_writes_happen_on_single_writer_thread(self):
+        """所有写入都在同一个专用写入线程中执行"""
+        downloader = Mock()
+        downloader.download.return_value = pd.DataFrame({"ts_code": ["000001.SZ"]})
+        writer_threads = set()
+
+        def process(task_type, symbol, data):
+            writer_threads.add(threading.current_thread().name)
+            return True
+
+        data_processor = Mock()
+        data_processor.process.side_effect = process
+        runner, _ = _make_runner(downloader, data_processor, workers=4)
+
+        runner.run({"stock_daily": [f"{i:06d}.SZ" for i in range(20)]})
+
+        assert writer_threads == {"inline-writer"}
+
+    def test_plans_with_the_same_dependencies_as_queued_path(self):
+        """规划时使用与队列规划相同的覆盖引擎、股票池、披露日历与查询引擎"""
+        runner, _ = _make_runner(Mock(), Mock())
+        runner.coverage_engine = Mock()
+        runner.symbol_universe = Mock()
+        runner.disclosure_calendar = Mock()
+        runner.query_engine = Mock()
+
+        with patch("neo.tasks.download_tasks.DownloadTaskManager") as manager_cls:
+            manager_cls.return_value.iter_task_configs.return_value = iter([])
+            runner.run({"stock_daily": ["000001.SZ"]})
+
+        manager_cls.assert_called_once_with(
+            runner.schema_loader,
+            coverage_engine=runner.coverage_engine,
+            symbol_universe=runner.symbol_universe,
+            disclosure_calendar=runner.disclosure_calendar,
+            query_engine=runner.query_engine,
+        )
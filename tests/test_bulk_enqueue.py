@@ -0,0 +1,148 @@
+"""
+测试批量入队 (bulk_enqueue)
+"""
+
+from unittest.mock import Mock
+
+import pytest
+from huey import MemoryHuey, SqliteHuey
+
+from neo.tasks.bulk_enqueue import bulk_enqueue, bulk_enqueue_sharded, enqueue_batch
+
+
+@pytest.fixture
+def sqlite_huey(tmp_path):
+    """基于临时文件的 SqliteHuey 实例"""
+    huey = SqliteHuey(
+        name="bulk_test", filename=str(tmp_path / "tasks.db"), fsync=False
+    )
+    yield huey
+    huey.storage.close()
+
+
+class TestBulkEnqueue:
+    """bulk_enqueue - 使用真实的 SQLite 队列"""
+
+    def test_enqueues_all_tasks_in_order(self, sqlite_huey):
+        """所有任务被写入队列，出队顺序与参数顺序一致"""
+        received = []
+
+        @sqlite_huey.task()
+        def sample_task(task_type, symbol):
+            received.append((task_type, symbol))
+
+        params = [
+            {"task_type": "stock_daily", "symbol": f"{i:06d}.SZ"} for i in range(25)
+        ]
+        count = bulk_enqueue(sample_task, iter(params), batch_size=10)
+
+        assert count == 25
+        assert sqlite_huey.pending_count() == 25
+        while sqlite_huey.pending_count():
+            sqlite_huey.execute(sqlite_huey.dequeue())
+        assert received == [(p["task_type"], p["symbol"]) for p in params]
+
+    def test_one_transaction_per_batch(self, sqlite_huey):
+        """每个批次只开启一个写事务"""
+
+        @sqlite_huey.task()
+        def sample_task(symbol):
+            pass
+
+        original_db = sqlite_huey.storage.db
+        sqlite_huey.storage.db = Mock(side_effect=original_db)
+
+        bulk_enqueue(sample_task, ({"symbol": str(i)} for i in range(25)), 10)
+
+        assert sqlite_huey.storage.db.call_count == 3
+
+    def test_emits_enqueued_signal_after_commit(self, sqlite_huey):
+        """每个任务在事务提交后发出 SIGNAL_ENQUEUED，与 huey.enqueue 一致"""
+        from huey.signals import SIGNAL_ENQUEUED
+
+        @sqlite_huey.task(expires=60)
+        def sample_task(symbol):
+            pass
+
+        seen = []
+
+        @sqlite_huey.signal(SIGNAL_ENQUEUED)
+        def on_enqueued(signal, task):
+            # 信号发出时任务已经在队列中，过期时间已解析
+            seen.append(
+                (
+                    task.kwargs["symbol"],
+                    sqlite_huey.pending_count(),
+                    task.expires_resolved is not None,
+                )
+            )
+
+        bulk_enqueue(sample_task, ({"symbol": str(i)} for i in range(3)), 10)
+
+        assert seen == [("0", 3, True), ("1", 3, True), ("2", 3, True)]
+
+    def test_priority_is_applied(self, sqlite_huey):
+        """指定优先级的任务优先出队"""
+
+        @sqlite_huey.task()
+        def sample_task(symbol):
+            return symbol
+
+        enqueue_batch(sample_task, [{"symbol": "low"}])
+        enqueue_batch(sample_task, [{"symbol": "high"}], priority=10)
+
+        task = sqlite_huey.dequeue()
+        assert task.kwargs == {"symbol": "high"}
+        assert task.priority == 10
+
+    def test_immediate_mode_falls_back_to_enqueue(self):
+        """立即模式下逐条入队并直接执行"""
+        huey = MemoryHuey("bulk_memory", immediate=True)
+        received = []
+
+        @huey.task()
+        def sample_task(symbol):
+            received.append(symbol)
+
+        count = bulk_enqueue(sample_task, [{"symbol": "a"}, {"symbol": "b"}], 1)
+
+        assert count == 2
+        assert received == ["a", "b"]
+
+    def test_empty_input(self, sqlite_huey):
+        """空输入不写入任何任务"""
+
+        @sqlite_huey.task()
+        def sample_task(symbol):
+            pass
+
+        assert bulk_enqueue(sample_task, [], batch_size=10) == 0
+        assert sqlite_huey.pending_count() == 0
+
+
+class TestBulkEnqueueSharded:
+    """bulk_enqueue_sharded - 按分片路由到独立的 SQLite 队列"""
+
+    def test_routes_tasks_to_shards(self, tmp_path):
+        """每个任务写入其分片的队列，同一函数在各分片上注册"""
+        shards = [
+            SqliteHuey(name=f"shard_{i}", filename=str(tmp_path / f"s{i}.db"))
+            for i in range(2)
+        ]
+
+        def sample_task(symbol):
+            pass
+
+        wrappers = [huey.task()(sample_task) for huey in shards]
+        params = [{"symbol": str(i)} for i in range(7)]
+
+        count = bulk_enqueue_sharded(
+            wrappers, lambda p: int(p["symbol"]) % 2, iter(params), batch_size=2
+        )
+
+        assert count == 7
+        assert shards[0].pending_count() == 4
+        assert shards[1].pending_count() == 3
+        assert {t.kwargs["symbol"] for t in shards[1].pending()} == {"1", "3", "5"}
+        for huey in shards:
+            huey.storage.close()
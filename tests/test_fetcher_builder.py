@@ -367,3 +367,87 @@ class TestFetcherBuilderContainer:
 
         # API 管理器应该是同一个单例实例
         assert fetcher_builder1.api_manager is fetcher_builder2.api_manager
+
+
+class TestPooledDataApi:
+    """测试复用 HTTP 连接的 Tushare Pro 客户端"""
+
+    def test_query_uses_pooled_session(self):
+        """查询通过连接池会话发送到配置的地址，结果转换为 DataFrame"""
+        from neo.downloader.fetcher_builder import PooledDataApi
+
+        client = PooledDataApi("test_token", http_url="http://api.test/", timeout=5)
+        response = Mock()
+        response.json.return_value = {
+            "code": 0,
+            "data": {"fields": ["ts_code", "close"], "items": [["000001.SZ", 1.0]]},
+        }
+        client.session = Mock()
+        client.session.post.return_value = response
+
+        df = client.daily(ts_code="000001.SZ")
+
+        url = client.session.post.call_args[0][0]
+        body = client.session.post.call_args[1]["json"]
+        assert url == "http://api.test/daily"
+        assert body["token"] == "test_token"
+        assert body["params"]["ts_code"] == "000001.SZ"
+        assert client.session.post.call_args[1]["timeout"] == 5
+        assert df.to_dict("records") == [{"ts_code": "000001.SZ", "close": 1.0}]
+
+    def test_query_raises_api_error(self):
+        """接口返回错误码时抛出异常"""
+        from neo.downloader.fetcher_builder import PooledDataApi
+
+        client = PooledDataApi("test_token")
+        client.session = Mock()
+        client.session.post.return_value.json.return_value = {
+            "code": 40203,
+            "msg": "抱歉，您每分钟最多访问该接口200次",
+        }
+
+        with pytest.raises(Exception, match="每分钟最多访问"):
+            client.query("daily")
+
+    @pytest.mark.parametrize(
+        "tushare_config, pooled",
+        [({"http_url": "http://api.test"}, True), ({}, False)],
+    )
+    def test_manager_uses_pooled_client_only_when_configured(
+        self, tushare_config, pooled
+    ):
+        """配置了接口地址时使用连接池客户端，否则保留 tushare 自带的 DataApi"""
+        from box import Box
+        from tushare.pro.client import DataApi
+
+        from neo.downloader.fetcher_builder import PooledDataApi
+
+        config = Box({"tushare": tushare_config, "huey_fast": {"max_workers": 2}})
+        with (
+            patch("neo.configs.get_config", return_value=config),
+            patch("neo.downloader.fetcher_builder.ts") as mock_ts,
+            patch.dict("os.environ", {"TUSHARE_TOKEN": "test_token"}),
+        ):
+            mock_ts.pro_api.return_value = DataApi("test_token")
+            TushareApiManager._instance = None
+            try:
+                manager = TushareApiManager.get_instance()
+            finally:
+                TushareApiManager._instance = None
+
+        assert isinstance(manager.pro, PooledDataApi) is pooled
+        if pooled:
+            assert manager.pro.token == "test_token"
+            assert manager.pro.http_url == "http://api.test"
+
+    def test_prewarm_counts_opened_connections(self):
+        """预建连接失败时不抛出异常，只返回成功数"""
+        import requests
+
+        from neo.downloader.fetcher_builder import PooledDataApi
+
+        client = PooledDataApi("test_token")
+        client.session = Mock()
+        client.session.head.side_effect = [None, requests.ConnectionError("down")]
+
+        assert client.prewarm(2) == 1
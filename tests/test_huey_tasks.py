@@ -212,6 +212,60 @@ class TestDownloadTask:
         # 验证没有调用后续处理任务
         mock_process_task.assert_not_called()
 
+    @patch("neo.app.container")
+    @patch("neo.tasks.data_processing_tasks.process_data_task")
+    def test_download_task_superseded_is_skipped(
+        self, mock_process_task, mock_container
+    ):
+        """测试任务已被登记表中更早的任务取代时，跳过下载"""
+        from neo.tasks.huey_tasks import download_task
+
+        downloader_mock = self.mock_factory.create_downloader_mock(
+            pd.DataFrame({"test": [1]})
+        )
+        mock_container.reset_mock()
+        mock_container.downloader.return_value = downloader_mock
+        mock_container.task_registry.return_value.mark_in_flight.return_value = False
+
+        download_task.func(
+            "stock_daily", "000001.SZ", start_date="20240201", run_id="run-1"
+        )
+
+        mock_container.task_registry.return_value.mark_in_flight.assert_called_once_with(
+            "stock_daily", "000001.SZ", "stock_daily:000001.SZ:start_date=20240201"
+        )
+        downloader_mock.download.assert_not_called()
+        mock_process_task.assert_not_called()
+        # 被取代的任务在运行清单中标记为终态，不会一直停留在 planned
+        mock_container.run_manifest.return_value.mark.assert_called_once_with(
+            "run-1", "stock_daily:000001.SZ:start_date=20240201", "superseded"
+        )
+
+    @patch("neo.app.container")
+    @patch("neo.tasks.data_processing_tasks.process_data_task")
+    def test_download_task_deferred_under_backpressure(
+        self, mock_process_task, mock_container
+    ):
+        """测试慢速队列积压时，下载任务不下载并延迟重试"""
+        from huey.exceptions import RetryTask
+        from neo.tasks.huey_tasks import download_task
+
+        downloader_mock = self.mock_factory.create_downloader_mock(
+            pd.DataFrame({"test": [1]})
+        )
+        mock_container.reset_mock()
+        mock_container.downloader.return_value = downloader_mock
+        backpressure = mock_container.backpressure_controller.return_value
+        backpressure.wait_for_capacity.return_value = False
+        backpressure.retry_delay_seconds = 60
+
+        with pytest.raises(RetryTask) as exc_info:
+            download_task.func("stock_daily", "000001.SZ")
+
+        assert exc_info.value.delay == 60
+        downloader_mock.download.assert_not_called()
+        mock_process_task.assert_not_called()
+
     @patch("neo.app.container")
     @patch("neo.tasks.data_processing_tasks.process_data_task")
     @patch("neo.tasks.download_tasks.logger")
@@ -237,6 +291,48 @@ class TestDownloadTask:
         mock_logger.error.assert_called_once()
         mock_process_task.assert_not_called()
 
+    @patch("neo.app.container")
+    @patch("neo.tasks.data_processing_tasks.process_data_task")
+    def test_download_task_releases_registry_when_retries_exhausted(
+        self, mock_process_task, mock_container
+    ):
+        """测试下载失败时，还有重试机会则保留登记，重试用尽后释放登记并标记失败"""
+        from unittest.mock import Mock
+
+        from neo.helpers.run_manifest import STATE_FAILED
+        from neo.tasks.huey_tasks import download_task
+
+        downloader_mock = self.mock_factory.create_downloader_mock()
+        downloader_mock.download.side_effect = Exception("Download failed")
+        mock_container.reset_mock()
+        mock_container.downloader.return_value = downloader_mock
+        registry = mock_container.task_registry.return_value
+        task_key = "stock_daily:000001.SZ:start_date=20240201"
+
+        with pytest.raises(Exception, match="Download failed"):
+            download_task.func(
+                "stock_daily",
+                "000001.SZ",
+                task=Mock(retries=1),
+                start_date="20240201",
+                run_id="run-1",
+            )
+        registry.release.assert_not_called()
+
+        with pytest.raises(Exception, match="Download failed"):
+            download_task.func(
+                "stock_daily",
+                "000001.SZ",
+                task=Mock(retries=0),
+                start_date="20240201",
+                run_id="run-1",
+            )
+        registry.release.assert_called_once_with(task_key)
+        mock_container.run_manifest.return_value.mark.assert_called_once_with(
+            "run-1", task_key, STATE_FAILED
+        )
+        mock_process_task.assert_not_called()
+
 
 class TestProcessDataTask:
     """测试 process_data_task 函数"""
@@ -471,7 +567,7 @@ class TestBuildAndEnqueueTask:
 
         self.mock_factory = MockFactory()
 
-    @patch("neo.tasks.download_tasks.download_task")
+    @patch("neo.tasks.download_tasks.bulk_enqueue")
     @patch("neo.database.operator.ParquetDBQueryer.create_default")
     @patch("neo.tasks.download_tasks.get_config")
     @patch("neo.app.container")
@@ -480,10 +576,13 @@ class TestBuildAndEnqueueTask:
         mock_container,
         mock_get_config,
         mock_parquet_db_create_default,
-        mock_download_task,
+        mock_bulk_enqueue,
     ):
         """测试构建和派发任务的核心逻辑"""
-        from neo.tasks.download_tasks import build_and_enqueue_downloads_task
+        from neo.tasks.download_tasks import (
+            build_and_enqueue_downloads_task,
+            download_task,
+        )
         from neo.helpers.utils import get_next_day_str
 
         # 使用 MockFactory 创建完整的容器 mock
@@ -494,6 +593,15 @@ class TestBuildAndEnqueueTask:
         # 设置 container mock
         mock_container.db_queryer.return_value = huey_mocks["db_queryer"]
         mock_container.schema_loader.return_value = huey_mocks["schema_loader"]
+        mock_container.task_registry.return_value.filter_unclaimed.side_effect = (
+            lambda params, **kwargs: params
+        )
+        mock_container.fair_share_scheduler.return_value.assign.side_effect = (
+            lambda params, *args, **kwargs: params
+        )
+        mock_container.run_manifest.return_value.track.side_effect = (
+            lambda run_id, params, **kwargs: params
+        )
 
         # 使用 MockFactory 创建配置 mock
         config_mock = self.mock_factory.create_config_mock()
@@ -502,18 +610,25 @@ class TestBuildAndEnqueueTask:
         # 准备任务映射
         task_stock_mapping = {"stock_daily": ["000001.SZ", "000002.SZ"]}
 
+        # 收集批量派发的任务参数
+        enqueued = []
+        mock_bulk_enqueue.side_effect = lambda task, params, **kwargs: enqueued.extend(
+            params
+        )
+
         # 执行任务
         build_and_enqueue_downloads_task.func(task_stock_mapping)
 
         # 验证container.db_queryer被正确调用
         mock_container.db_queryer.assert_called_once()
 
-        # 验证download_task的派发
-        assert mock_download_task.call_count == 2
-        calls = mock_download_task.call_args_list
+        # 验证download_task的批量派发
+        mock_bulk_enqueue.assert_called_once()
+        assert mock_bulk_enqueue.call_args[0][0] is download_task
+        assert len(enqueued) == 2
 
         # 根据symbol排序调用，确保测试的稳定性
-        calls_by_symbol = {call[1]["symbol"]: call[1] for call in calls}
+        calls_by_symbol = {params["symbol"]: params for params in enqueued}
 
         # 验证000001.SZ任务（已有数据）
         call_000001 = calls_by_symbol["000001.SZ"]
@@ -525,7 +640,7 @@ class TestBuildAndEnqueueTask:
         assert call_000002["task_type"] == "stock_daily"
         assert call_000002["start_date"] == "19900101"
 
-    @patch("neo.tasks.download_tasks.download_task")
+    @patch("neo.tasks.download_tasks.bulk_enqueue")
     @patch("neo.database.operator.ParquetDBQueryer.create_default")
     @patch("neo.tasks.download_tasks.get_config")
     @patch("neo.app.container")
@@ -534,7 +649,7 @@ class TestBuildAndEnqueueTask:
         mock_container,
         mock_get_config,
         mock_parquet_db_create_default,
-        mock_download_task,
+        mock_bulk_enqueue,
     ):
         """测试使用指定股票代码的构建和派发任务逻辑"""
         from neo.tasks.download_tasks import build_and_enqueue_downloads_task
@@ -548,6 +663,15 @@ class TestBuildAndEnqueueTask:
         # 设置 container mock
         mock_container.db_queryer.return_value = huey_mocks["db_queryer"]
         mock_container.schema_loader.return_value = huey_mocks["schema_loader"]
+        mock_container.task_registry.return_value.filter_unclaimed.side_effect = (
+            lambda params, **kwargs: params
+        )
+        mock_container.fair_share_scheduler.return_value.assign.side_effect = (
+            lambda params, *args, **kwargs: params
+        )
+        mock_container.run_manifest.return_value.track.side_effect = (
+            lambda run_id, params, **kwargs: params
+        )
 
         # 使用 MockFactory 创建配置 mock
         config_mock = self.mock_factory.create_config_mock()
@@ -556,25 +680,31 @@ class TestBuildAndEnqueueTask:
         # 准备任务映射，指定特定股票代码
         task_stock_mapping = {"stock_daily": ["600519.SH"]}
 
+        # 收集批量派发的任务参数
+        enqueued = []
+        mock_bulk_enqueue.side_effect = lambda task, params, **kwargs: enqueued.extend(
+            params
+        )
+
         # 执行任务
         build_and_enqueue_downloads_task.func(task_stock_mapping)
 
         # 验证container.db_queryer被正确调用
         mock_container.db_queryer.assert_called_once()
 
-        # 验证download_task的派发
-        assert mock_download_task.call_count == 1
-        call_args = mock_download_task.call_args_list[0][1]
+        # 验证download_task的批量派发
+        assert len(enqueued) == 1
+        call_args = enqueued[0]
         assert call_args["task_type"] == "stock_daily"
         assert call_args["symbol"] == "600519.SH"
         assert call_args["start_date"] == get_next_day_str("20240110")
 
     @patch("neo.tasks.download_tasks.logger")
-    @patch("neo.tasks.download_tasks.download_task")
+    @patch("neo.tasks.download_tasks.bulk_enqueue")
     @patch("neo.tasks.download_tasks.get_config")
     @patch("neo.app.container")
     def test_build_and_enqueue_exception_handling(
-        self, mock_container, mock_get_config, mock_download_task, mock_logger
+        self, mock_container, mock_get_config, mock_bulk_enqueue, mock_logger
     ):
         """测试构建和派发任务的异常处理"""
         from neo.tasks.download_tasks import build_and_enqueue_downloads_task
@@ -595,4 +725,38 @@ class TestBuildAndEnqueueTask:
         mock_container.db_queryer.assert_called_once()
         mock_logger.error.assert_called_once()
         assert "构建下载任务失败" in mock_logger.error.call_args[0][0]
-        mock_download_task.assert_not_called()
+        mock_bulk_enqueue.assert_not_called()
+
+
+class TestStreamingPlanner:
+    """测试按股票分块的流式规划"""
+
+    @patch("neo.tasks.download_tasks.get_config")
+    def test_max_dates_are_queried_in_growing_chunks(self, mock_get_config):
+        """最新日期按逐步增大的块查询，首块解析完成即产出任务"""
+        from tests.fixtures.mock_factory import MockFactory
+        from neo.tasks.download_tasks import DownloadTaskManager
+
+        mock_get_config.return_value = MockFactory.create_config_mock()
+        schema_loader = Mock()
+        schema_loader.get_table_config.return_value = Mock(date_col="trade_date")
+        db_queryer = Mock()
+        db_queryer.get_max_date.return_value = {}
+
+        manager = DownloadTaskManager(
+            schema_loader, first_chunk_size=2, max_chunk_size=4
+        )
+        symbols = [f"{i:06d}.SZ" for i in range(11)]
+        configs = manager.iter_task_configs(
+            {"stock_daily": symbols}, db_queryer, "20240115"
+        )
+
+        first = next(configs)
+        assert first["symbol"] == symbols[0]
+        # 产出第一个任务时只查询了首块
+        assert db_queryer.get_max_date.call_count == 1
+
+        rest = list(configs)
+        chunk_sizes = [len(c.args[1]) for c in db_queryer.get_max_date.call_args_list]
+        assert chunk_sizes == [2, 4, 4, 1]
+        assert [first["symbol"]] + [c["symbol"] for c in rest] == symbols
@@ -4,6 +4,7 @@ from unittest.mock import Mock, patch
 from typer.testing import CliRunner
 from neo.main import app, main
 from neo.helpers.app_service import AppService
+from neo.helpers.dry_run import DryRunReport, DryRunTable
 from tests.fixtures.mock_factory import MockFactory, CliRunnerWrapper
 
 
@@ -100,7 +101,9 @@ class TestDlCommand:
         ].build_task_stock_mapping_from_group.assert_called_once_with(
             "test_group", ["000001.SZ", "000002.SZ"]
         )
-        mock_task.assert_called_once_with({"stock_daily": ["000001.SZ", "000002.SZ"]})
+        mock_task.assert_called_once_with(
+            {"stock_daily": ["000001.SZ", "000002.SZ"]}, lane="interactive"
+        )
 
     @patch("neo.helpers.utils.setup_logging")
     @patch("neo.main.container")
@@ -116,18 +119,221 @@ class TestDlCommand:
         mock_container.app_service.return_value = mocks["app_service"]
         mock_logging.return_value = mocks["logging"]
         mock_task.return_value = mocks["task_result"]
+        mocks["app_service"].estimate_downloads.return_value = DryRunReport(
+            latest_trading_day="20240110",
+            workers=8,
+            projected_seconds=120.0,
+            tables=[
+                DryRunTable(
+                    task_type="stock_daily",
+                    endpoint="daily",
+                    tasks=2,
+                    rate_limit_per_minute=195,
+                    quota_seconds=0.6,
+                    expected_rows=10,
+                    expected_bytes=2048,
+                    samples=50,
+                )
+            ],
+            tasks=[
+                {"task_type": "stock_daily", "symbol": s, "start_date": "20240105"}
+                for s in ("000001.SZ", "000002.SZ")
+            ],
+        )
 
         # 执行命令
         result = self.runner.invoke_dl_command(group="test_group", dry_run=True)
 
-        # 验证结果
+        # 验证结果：按真实规划估算，不派发任何任务
         assert result.exit_code == 0
         mocks[
             "app_service"
         ].build_task_stock_mapping_from_group.assert_called_once_with(
             "test_group", None
         )
-        mock_task.assert_called_once_with({"stock_daily": ["000001.SZ", "000002.SZ"]})
+        mocks["app_service"].estimate_downloads.assert_called_once_with(
+            {"stock_daily": ["000001.SZ", "000002.SZ"]}
+        )
+        mock_task.assert_not_called()
+        assert "共 2 个任务" in result.stdout
+        assert "daily 2" in result.stdout
+        assert "预计耗时 2.0 分钟" in result.stdout
+
+    @patch("neo.helpers.utils.setup_logging")
+    @patch("neo.main.container")
+    @patch("neo.tasks.huey_tasks.build_and_enqueue_downloads_task")
+    def test_dl_with_inline_flag(self, mock_task, mock_container, mock_logging):
+        """测试带有 inline 标志的 dl 命令在进程内运行且不提交 Huey 任务"""
+        mocks = self.mock_factory.create_complete_dl_mocks()
+
+        mock_container.task_builder.return_value = Mock()
+        mock_container.group_handler.return_value = Mock()
+        mock_container.app_service.return_value = mocks["app_service"]
+        mock_logging.return_value = mocks["logging"]
+        mocks["app_service"].run_inline_pipeline.return_value = Mock(
+            planned=2, written=2, rows=20, empty=0, failed=0, elapsed_seconds=1.5
+        )
+
+        result = self.runner.invoke_dl_command(group="test_group", inline=True)
+
+        assert result.exit_code == 0
+        mocks["app_service"].run_inline_pipeline.assert_called_once_with(
+            {"stock_daily": ["000001.SZ", "000002.SZ"]}
+        )
+        mock_task.assert_not_called()
+        assert "内联运行完成" in result.stdout
+
+    @patch("neo.helpers.utils.setup_logging")
+    @patch("neo.main.container")
+    @patch("neo.tasks.huey_tasks.build_and_enqueue_downloads_task")
+    def test_dl_with_deadline_flag(self, mock_task, mock_container, mock_logging):
+        """测试带有 deadline 参数的 dl 命令将截止时间传给构建任务"""
+        mocks = self.mock_factory.create_complete_dl_mocks()
+
+        mock_container.task_builder.return_value = Mock()
+        mock_container.group_handler.return_value = Mock()
+        mock_container.app_service.return_value = mocks["app_service"]
+        mock_logging.return_value = mocks["logging"]
+        mock_task.return_value = mocks["task_result"]
+
+        result = self.runner.invoke_dl_command(
+            group="test_group", deadline="2999-01-01 20:00"
+        )
+
+        assert result.exit_code == 0
+        mock_task.assert_called_once_with(
+            {"stock_daily": ["000001.SZ", "000002.SZ"]},
+            deadline="2999-01-01T20:00:00",
+        )
+
+    @patch("neo.helpers.utils.setup_logging")
+    @patch("neo.main.container")
+    def test_resume_command(self, mock_container, mock_logging):
+        """测试 resume 命令委托给 AppService 恢复运行"""
+        mock_app_service = Mock()
+        mock_app_service.resume_run.return_value = 3
+        mock_container.app_service.return_value = mock_app_service
+
+        result = self.runner.runner.invoke(app, ["resume", "run-1"])
+
+        assert result.exit_code == 0
+        mock_app_service.resume_run.assert_called_once_with("run-1")
+        assert "重新派发 3 个未完成任务" in result.stdout
+
+    @patch("neo.helpers.utils.setup_logging")
+    @patch("neo.main.container")
+    def test_resume_unknown_run(self, mock_container, mock_logging):
+        """测试恢复不存在的运行时返回错误"""
+        mock_app_service = Mock()
+        mock_app_service.resume_run.side_effect = ValueError("运行 'x' 不存在")
+        mock_container.app_service.return_value = mock_app_service
+
+        result = self.runner.runner.invoke(app, ["resume", "x"])
+
+        assert result.exit_code == 1
+        assert "不存在" in result.stdout
+
+    @patch("neo.main.container")
+    def test_stats_command(self, mock_container):
+        """测试 stats 命令输出按表统计与最慢的股票"""
+        from neo.helpers.metrics_store import StatsReport, TableStats
+
+        report = StatsReport(
+            run_id="run-1",
+            tables=[
+                TableStats(
+                    task_type="stock_daily",
+                    tasks=10,
+                    failed=1,
+                    rows=1000,
+                    payload_mb=0.5,
+                    rows_per_second=50.0,
+                    tasks_per_minute=30.0,
+                    latency_p50=1.0,
+                    latency_p95=2.0,
+                    latency_p99=3.0,
+                    rate_limit_wait_avg=0.1,
+                    quota_utilization=0.5,
+                )
+            ],
+            slowest=[
+                {
+                    "task_type": "stock_daily",
+                    "symbol": "000001.SZ",
+                    "duration_seconds": 3.0,
+                    "rows": 100,
+                    "rate_limit_wait_seconds": 0.0,
+                }
+            ],
+        )
+        mock_app_service = Mock()
+        mock_app_service.get_stats_report.return_value = report
+        mock_container.app_service.return_value = mock_app_service
+
+        result = self.runner.runner.invoke(app, ["stats", "--run", "run-1"])
+
+        assert result.exit_code == 0
+        mock_app_service.get_stats_report.assert_called_once_with("run-1")
+        assert "stock_daily" in result.stdout
+        assert "配额利用率 50%" in result.stdout
+        assert "000001.SZ" in result.stdout
+
+    @patch("neo.main.container")
+    def test_monitor_once(self, mock_container):
+        """测试 monitor --once 输出一次快照后退出并关闭连接"""
+        from neo.helpers.pipeline_monitor import MonitorSnapshot, QueueDepth
+
+        mock_monitor = Mock()
+        mock_monitor.poll.return_value = MonitorSnapshot(
+            queues={"fast": QueueDepth(5), "slow": QueueDepth(2), "maint": QueueDepth()}
+        )
+        mock_container.pipeline_monitor.return_value = mock_monitor
+        mock_container.backpressure_controller.return_value.sample.return_value = Mock(
+            depth=2, payload_bytes=0, paused=False
+        )
+        mock_container.backpressure_controller.return_value.high_bytes = 1024
+        mock_container.backpressure_controller.return_value.high_depth = 10
+
+        result = self.runner.runner.invoke(app, ["monitor", "--once"])
+
+        assert result.exit_code == 0
+        assert "流水线实时监控" in result.stdout
+        mock_monitor.poll.assert_called_once()
+        mock_monitor.close.assert_called_once()
+
+    @patch("neo.main.container")
+    def test_stats_command_without_metrics(self, mock_container):
+        """测试没有指标时 stats 命令给出提示"""
+        from neo.helpers.metrics_store import StatsReport
+
+        mock_app_service = Mock()
+        mock_app_service.get_stats_report.return_value = StatsReport(run_id=None)
+        mock_container.app_service.return_value = mock_app_service
+
+        result = self.runner.runner.invoke(app, ["stats"])
+
+        assert result.exit_code == 0
+        mock_app_service.get_stats_report.assert_called_once_with(None)
+        assert "没有找到任务执行指标" in result.stdout
+
+    @patch("neo.helpers.utils.setup_logging")
+    @patch("neo.main.container")
+    @patch("neo.tasks.huey_tasks.build_and_enqueue_downloads_task")
+    def test_dl_with_past_deadline(self, mock_task, mock_container, mock_logging):
+        """测试已过的截止时间被拒绝且不提交任务"""
+        mocks = self.mock_factory.create_complete_dl_mocks()
+
+        mock_container.task_builder.return_value = Mock()
+        mock_container.group_handler.return_value = Mock()
+        mock_container.app_service.return_value = mocks["app_service"]
+        mock_logging.return_value = mocks["logging"]
+
+        result = self.runner.invoke_dl_command(
+            group="test_group", deadline="2000-01-01 20:00"
+        )
+
+        assert result.exit_code == 1
+        mock_task.assert_not_called()
 
     @patch("neo.helpers.utils.setup_logging")
     @patch("neo.main.container")
@@ -201,7 +407,7 @@ class TestDpCommand:
         # 验证结果
         assert result.exit_code == 0
         mock_logging.assert_called_once_with("consumer_fast", "info")
-        mocks["app_service"].run_data_processor.assert_called_once_with("fast")
+        mocks["app_service"].run_data_processor.assert_called_once_with("fast", shard=0)
 
     @patch("neo.helpers.utils.setup_logging")
     @patch("neo.main.container")
@@ -220,7 +426,7 @@ class TestDpCommand:
         # 验证结果
         assert result.exit_code == 0
         mock_logging.assert_called_once_with("consumer_slow", "info")
-        mocks["app_service"].run_data_processor.assert_called_once_with("slow")
+        mocks["app_service"].run_data_processor.assert_called_once_with("slow", shard=0)
 
     @patch("neo.helpers.utils.setup_logging")
     @patch("neo.main.container")
@@ -239,7 +445,7 @@ class TestDpCommand:
         # 验证结果
         assert result.exit_code == 0
         mock_logging.assert_called_once_with("consumer_maint", "info")
-        mocks["app_service"].run_data_processor.assert_called_once_with("maint")
+        mocks["app_service"].run_data_processor.assert_called_once_with("maint", shard=0)
 
     @patch("neo.helpers.utils.setup_logging")
     @patch("neo.main.container")
@@ -424,6 +630,9 @@ class TestEdgeCases:
         mock_app_service.build_task_stock_mapping_from_group.return_value = (
             mock_task_mapping
         )
+        mock_app_service.estimate_downloads.return_value = DryRunReport(
+            latest_trading_day=None, workers=8
+        )
         mock_container.app_service.return_value = mock_app_service
 
         # 设置 task 返回值
@@ -453,7 +662,8 @@ class TestEdgeCases:
         mock_app_service.build_task_stock_mapping_from_group.assert_called_once_with(
             "test_group", ["000001.SZ", "000002.SZ"]
         )
-        mock_task.assert_called_once_with(mock_task_mapping)
+        mock_app_service.estimate_downloads.assert_called_once_with(mock_task_mapping)
+        mock_task.assert_not_called()
 
     def test_dp_with_invalid_queue_name(self):
         """测试无效的队列名称"""
@@ -471,7 +681,7 @@ class TestEdgeCases:
             result = runner.invoke(app, ["dp", "invalid_queue"])
 
             assert result.exit_code == 0
-            mock_app_service.run_data_processor.assert_called_once_with("invalid_queue")
+            mock_app_service.run_data_processor.assert_called_once_with("invalid_queue", shard=0)
 
 
 class TestAppConfiguration:
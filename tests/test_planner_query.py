@@ -0,0 +1,170 @@
+"""
+测试 PlannerQueryEngine 一次查询多张表的最新日期
+"""
+
+from datetime import time
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from neo.database.planner_query import PlannerQueryEngine
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.watermark_index import WatermarkIndex
+from neo.tasks.download_tasks import DownloadTaskManager
+from neo.writers.parquet_writer import ParquetWriter
+
+
+@pytest.fixture
+def lake(tmp_path):
+    root = tmp_path / "parquet"
+    writer = ParquetWriter(base_path=str(root))
+    daily = pd.DataFrame(
+        {
+            "ts_code": ["000001.SZ", "000001.SZ", "600519.SH"],
+            "trade_date": ["20240109", "20240110", "20240105"],
+            "close": [10.0, 10.5, 1700.0],
+        }
+    )
+    writer.write(daily, "stock_daily", [])
+    calendar = pd.DataFrame(
+        {
+            "exchange": ["SSE", "SSE"],
+            "cal_date": ["20240109", "20240110"],
+            "is_open": [1, 1],
+        }
+    )
+    writer.write(calendar, "trade_cal", [])
+    return root
+
+
+class TestPlannerQueryEngine:
+    def test_scans_all_tables_in_one_pass(self, lake):
+        """按股票存储的表按原始代码返回，全市场表返回表内最新日期"""
+        engine = PlannerQueryEngine(SchemaLoader(), parquet_base_path=str(lake))
+
+        result = engine.max_dates(
+            {
+                "stock_daily": ["000001", "600519.SH", "000002.SZ"],
+                "trade_cal": [],
+                "daily_basic": ["000001.SZ"],
+            }
+        )
+
+        assert result["stock_daily"] == {"000001": "20240110", "600519.SH": "20240105"}
+        assert result["trade_cal"] == {"": "20240110"}
+        assert result["daily_basic"] == {}
+
+    def test_uses_watermark_index_when_available(self, lake, tmp_path):
+        """水位索引可用时直接查索引，未建立时先扫描建立"""
+        index = WatermarkIndex(
+            db_path=str(tmp_path / "watermarks.db"),
+            schema_loader=SchemaLoader(),
+            parquet_base_path=str(lake),
+        )
+        engine = PlannerQueryEngine(
+            SchemaLoader(), parquet_base_path=str(lake), watermark_index=index
+        )
+
+        result = engine.max_dates({"stock_daily": ["000001", "600519.SH"]})
+
+        assert result["stock_daily"] == {"000001": "20240110", "600519.SH": "20240105"}
+        assert index.is_ready("stock_daily")
+
+    def test_indexed_only_skips_tables_without_ready_index(self, lake, tmp_path):
+        """只查询索引已建立的表，未建立索引的表既不扫描也不建立索引"""
+        index = WatermarkIndex(
+            db_path=str(tmp_path / "watermarks.db"),
+            schema_loader=SchemaLoader(),
+            parquet_base_path=str(lake),
+        )
+        index.rebuild("stock_daily")
+        engine = PlannerQueryEngine(
+            SchemaLoader(), parquet_base_path=str(lake), watermark_index=index
+        )
+
+        result = engine.max_dates(
+            {"stock_daily": ["000001"], "trade_cal": []}, indexed_only=True
+        )
+
+        assert result == {"stock_daily": {"000001": "20240110"}}
+        assert not index.is_ready("trade_cal")
+
+
+class TestVectorizedPlanning:
+    def test_skip_mask_matches_per_symbol_rules(self):
+        """批量判断与逐只判断的结果一致"""
+        manager = DownloadTaskManager(SchemaLoader())
+        latest_dates = [None, "20240110", "20240115", "20240120", "invalid_date"]
+
+        with patch("neo.tasks.download_tasks.datetime") as mock_datetime:
+            mock_now = Mock()
+            mock_now.strftime.return_value = "20240115"
+            mock_now.time.return_value = time(17, 0)
+            mock_datetime.now.return_value = mock_now
+
+            mask = manager._skip_mask(latest_dates, "20240115")
+            expected = [manager._should_skip_task(d, "20240115") for d in latest_dates]
+
+        assert mask.tolist() == expected == [False, False, True, True, True]
+
+    def test_planner_uses_prefetched_dates(self):
+        """配置了规划查询引擎时只查询一次，不再逐表分块查询"""
+        engine = Mock()
+        engine.max_dates.return_value = {
+            "stock_daily": {"000001.SZ": "20240110", "000002.SZ": "20240105"}
+        }
+        db_queryer = Mock()
+        manager = DownloadTaskManager(SchemaLoader(), query_engine=engine)
+
+        configs = list(
+            manager.iter_task_configs(
+                {"stock_daily": ["000001.SZ", "000002.SZ", "000003.SZ"]},
+                db_queryer,
+                "20240110",
+            )
+        )
+
+        assert [(c["symbol"], c["start_date"]) for c in configs] == [
+            ("000002.SZ", "20240106"),
+            ("000003.SZ", "19900101"),
+        ]
+        engine.max_dates.assert_called_once()
+        db_queryer.get_max_date.assert_not_called()
+
+    def test_planner_falls_back_when_query_fails(self):
+        """规划查询失败时回退为逐表分块查询"""
+        engine = Mock()
+        engine.max_dates.side_effect = RuntimeError("boom")
+        db_queryer = Mock()
+        db_queryer.get_max_date.return_value = {"000001.SZ": "20240110"}
+        manager = DownloadTaskManager(SchemaLoader(), query_engine=engine)
+
+        configs = list(
+            manager.iter_task_configs(
+                {"stock_daily": ["000001.SZ"]}, db_queryer, "20240110"
+            )
+        )
+
+        assert configs == []
+        db_queryer.get_max_date.assert_called_once()
+
+    def test_planner_chunks_tables_missing_from_prefetch(self):
+        """索引未就绪、未被预取的表仍逐表分块查询"""
+        engine = Mock()
+        engine.max_dates.return_value = {"stock_daily": {"000001.SZ": "20240110"}}
+        db_queryer = Mock()
+        db_queryer.get_max_date.return_value = {}
+        manager = DownloadTaskManager(SchemaLoader(), query_engine=engine)
+
+        configs = list(
+            manager.iter_task_configs(
+                {"stock_daily": ["000001.SZ"], "daily_basic": ["000001.SZ"]},
+                db_queryer,
+                "20240110",
+            )
+        )
+
+        assert [c["task_type"] for c in configs] == ["daily_basic"]
+        assert engine.max_dates.call_args.kwargs == {"indexed_only": True}
+        db_queryer.get_max_date.assert_called_once_with("daily_basic", ["000001.SZ"])
@@ -366,3 +366,49 @@ class TestRateLimitManagerContainer:
 
         # downloader 应该使用容器中的 rate_limit_manager
         assert downloader.rate_limit_manager is rate_limit_manager
+
+
+class TestSharedSQLiteBucket:
+    """跨进程共享的 SQLite 令牌桶"""
+
+    def test_two_buckets_share_one_quota(self, tmp_path):
+        """同一文件上的两个令牌桶 (模拟两个消费者进程) 共享配额"""
+        from pyrate_limiter import Duration, Rate
+
+        from neo.helpers.rate_limit_manager import SharedSQLiteBucket
+
+        db_path = str(tmp_path / "rate_limit.sqlite")
+        rates = [Rate(3, Duration.MINUTE)]
+        limiters = [
+            Limiter(
+                SharedSQLiteBucket.open(rates, db_path, "rate_x"),
+                raise_when_fail=False,
+            )
+            for _ in range(2)
+        ]
+
+        results = [limiters[i % 2].try_acquire("x") for i in range(4)]
+
+        assert results == [True, True, True, False]
+
+    @patch("neo.helpers.rate_limit_manager.get_config")
+    def test_sqlite_backend_uses_shared_bucket(self, mock_get_config, tmp_path):
+        """配置 sqlite 后端时使用共享令牌桶"""
+        from box import Box
+
+        from neo.helpers.rate_limit_manager import SharedSQLiteBucket
+
+        mock_get_config.return_value = Box(
+            {
+                "download_tasks": {},
+                "rate_limit": {
+                    "backend": "sqlite",
+                    "path": str(tmp_path / "rate_limit.sqlite"),
+                },
+            }
+        )
+
+        manager = RateLimitManager()
+        limiter = manager.get_limiter("stock_basic")
+
+        assert isinstance(limiter.bucket_factory.bucket, SharedSQLiteBucket)
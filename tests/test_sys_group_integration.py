@@ -83,7 +83,11 @@ class TestSysGroupIntegration:
                     result = app_service.build_task_stock_mapping_from_group("sys")
 
                     # Assert
-                    expected = {"stock_basic": [""], "trade_cal": [""]}
+                    expected = {
+                        "stock_basic": [""],
+                        "trade_cal": [""],
+                        "suspend_d": [""],
+                    }
                     assert result == expected
                     assert result  # 确保不为空
 
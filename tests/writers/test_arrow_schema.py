@@ -0,0 +1,133 @@
+"""ArrowSchemaCompiler 与写入器强制类型的单元测试"""
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from neo.database.schema_loader import SchemaLoader
+from neo.writers.arrow_schema import ArrowSchemaCompiler
+from neo.writers.parquet_writer import ParquetWriter
+
+SCHEMA_TOML = """
+[stock_daily]
+table_name = "stock_daily"
+primary_key = ["ts_code", "trade_date"]
+date_col = "trade_date"
+api_method = "daily"
+columns = [
+    { name = "ts_code", type = "TEXT" },
+    { name = "trade_date", type = "DATE" },
+    { name = "close", type = "REAL" },
+    { name = "vol", type = "REAL" },
+]
+
+[trade_cal]
+table_name = "trade_cal"
+primary_key = ["exchange", "cal_date"]
+api_method = "trade_cal"
+columns = [
+    { name = "exchange", type = "TEXT" },
+    { name = "cal_date", type = "DATE" },
+    { name = "is_open", type = "INTEGER" },
+]
+"""
+
+
+def _compiler(tmp_path: Path, **kwargs) -> ArrowSchemaCompiler:
+    schema_file = tmp_path / "schema.toml"
+    schema_file.write_text(SCHEMA_TOML, encoding="utf-8")
+    kwargs.setdefault("dictionary_columns", ["ts_code"])
+    return ArrowSchemaCompiler(SchemaLoader(schema_file), **kwargs)
+
+
+def _mixed_daily() -> pd.DataFrame:
+    """同一列中混有字符串、数值和空值，模拟接口返回的不一致类型"""
+    return pd.DataFrame(
+        {
+            "vol": pd.Series(["100", 200.0, None], dtype=object),
+            "ts_code": ["000001.SZ", "000001.SZ", "600519.SH"],
+            "trade_date": ["20240102", "20240103", "20240102"],
+            "close": pd.Series(["10.5", "", 11], dtype=object),
+            "year": ["2024", "2024", "2024"],
+        }
+    )
+
+
+def test_compile_maps_declared_types(tmp_path: Path):
+    """schema 声明的列类型编译为固定的 Arrow 类型"""
+    compiler = _compiler(tmp_path, downcast_float32=True, date32_dates=True)
+
+    schema = compiler.compile("stock_daily")
+
+    assert schema.field("ts_code").type == pa.dictionary(pa.int32(), pa.string())
+    assert schema.field("trade_date").type == pa.date32()
+    assert schema.field("close").type == pa.float32()
+    assert compiler.compile("trade_cal").field("is_open").type == pa.int64()
+    assert compiler.compile("unknown_table") is None
+
+
+def test_to_table_coerces_mixed_values(tmp_path: Path):
+    """混合类型的列被统一转换，无法解析的值变为 null，未声明的列保持推断类型"""
+    compiler = _compiler(tmp_path)
+
+    table = compiler.to_table(_mixed_daily(), "stock_daily")
+
+    assert table.column_names == ["ts_code", "trade_date", "close", "vol", "year"]
+    assert table.schema.field("trade_date").type == pa.string()
+    assert table.schema.field("close").type == pa.float64()
+    assert table.column("close").to_pylist() == [10.5, None, 11.0]
+    assert table.column("vol").to_pylist() == [100.0, 200.0, None]
+    assert table.schema.field("year").type == pa.string()
+    assert compiler.conforms(table.schema, "stock_daily")
+
+
+def test_conform_converts_inferred_table(tmp_path: Path):
+    """按推断类型写出的旧数据可以转换为固定类型，日期可在字符串与 date32 间转换"""
+    compiler = _compiler(tmp_path, date32_dates=True)
+    legacy = pa.table(
+        {
+            "ts_code": ["000001.SZ"],
+            "trade_date": ["20240102"],
+            "close": ["10.5"],
+        }
+    )
+
+    assert not compiler.conforms(legacy.schema, "stock_daily")
+    table = compiler.conform(legacy, "stock_daily")
+
+    assert compiler.conforms(table.schema, "stock_daily")
+    assert str(table.column("trade_date")[0]) == "2024-01-02"
+    plain = ArrowSchemaCompiler(compiler.schema_loader, dictionary_columns=["ts_code"])
+    back = plain.conform(table, "stock_daily")
+    assert back.column("trade_date").to_pylist() == ["20240102"]
+
+
+def test_writer_enforces_schema_on_every_write(tmp_path: Path):
+    """配置了编译器后，不同批次写出的文件类型一致"""
+    compiler = _compiler(tmp_path)
+    writer = ParquetWriter(str(tmp_path / "parquet"), schema_compiler=compiler)
+
+    writer.write(_mixed_daily(), "stock_daily", ["year"])
+    writer.write(
+        pd.DataFrame(
+            {
+                "ts_code": ["000002.SZ"],
+                "trade_date": ["20240104"],
+                "close": [9.0],
+                "vol": [None],
+                "year": ["2024"],
+            }
+        ),
+        "stock_daily",
+        ["year"],
+    )
+
+    schemas = [
+        pq.read_schema(str(path))
+        for path in (tmp_path / "parquet" / "stock_daily").rglob("*.parquet")
+    ]
+    assert len(schemas) == 2
+    assert schemas[0].remove_metadata().equals(schemas[1].remove_metadata())
+    assert all(compiler.conforms(schema, "stock_daily") for schema in schemas)
@@ -0,0 +1,148 @@
+"""BatchingParquetWriter 单元测试"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+from neo.writers.batching_parquet_writer import BatchingParquetWriter
+
+
+def _daily_rows(symbol: str, dates: list) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ts_code": [symbol] * len(dates),
+            "trade_date": dates,
+            "close": [10.0 + i for i in range(len(dates))],
+            "year": [d[:4] for d in dates],
+        }
+    )
+
+
+def test_batches_multiple_symbols_into_one_file_per_partition(tmp_path: Path):
+    """多个 symbol 的写入在刷盘后每个分区只产生一个文件"""
+    writer = BatchingParquetWriter(
+        base_path=str(tmp_path / "parquet"), max_rows=1000, max_delay_seconds=0
+    )
+
+    writer.write(_daily_rows("000001.SZ", ["20230103", "20240102"]), "stock_daily", ["year"])
+    writer.write(_daily_rows("600519.SH", ["20230104", "20240103"]), "stock_daily", ["year"])
+
+    # 达到阈值前不落盘
+    assert not list((tmp_path / "parquet").rglob("*.parquet"))
+    assert writer.pending_rows() == 4
+
+    assert writer.flush() == 2
+
+    files_2023 = list((tmp_path / "parquet/stock_daily/year=2023").glob("*.parquet"))
+    files_2024 = list((tmp_path / "parquet/stock_daily/year=2024").glob("*.parquet"))
+    assert len(files_2023) == 1
+    assert len(files_2024) == 1
+
+    df_2023 = pd.read_parquet(files_2023[0])
+    assert sorted(df_2023["ts_code"]) == ["000001.SZ", "600519.SH"]
+    assert "year" not in df_2023.columns
+    assert writer.pending_rows() == 0
+
+
+def test_flushes_when_row_threshold_reached(tmp_path: Path):
+    """单个分区缓冲区达到行数阈值时立即写出"""
+    writer = BatchingParquetWriter(
+        base_path=str(tmp_path / "parquet"), max_rows=3, max_delay_seconds=0
+    )
+
+    writer.write(_daily_rows("000001.SZ", ["20230103", "20230104"]), "stock_daily", ["year"])
+    assert not list((tmp_path / "parquet").rglob("*.parquet"))
+
+    writer.write(_daily_rows("600519.SH", ["20230105"]), "stock_daily", ["year"])
+    files = list((tmp_path / "parquet").rglob("*.parquet"))
+    assert len(files) == 1
+    assert len(pd.read_parquet(files[0])) == 3
+
+
+def test_spool_files_removed_after_flush(tmp_path: Path):
+    """刷盘成功后预写文件被清理"""
+    spool = tmp_path / "spool"
+    writer = BatchingParquetWriter(
+        base_path=str(tmp_path / "parquet"),
+        max_rows=1000,
+        max_delay_seconds=0,
+        spool_path=str(spool),
+    )
+
+    writer.write(_daily_rows("000001.SZ", ["20230103"]), "stock_daily", ["year"])
+    assert len(list(spool.rglob("*.arrow"))) == 1
+
+    writer.flush()
+    assert not list(spool.rglob("*.arrow"))
+
+
+def test_recovers_spool_left_by_crashed_process(tmp_path: Path):
+    """已退出进程遗留的预写文件会被新写入器接管并写出"""
+    spool = tmp_path / "spool"
+    # 模拟一个已经崩溃的进程留下的预写文件 (pid 不存在)
+    orphan_dir = spool / f"{os.uname().nodename}-999999999" / "stock_daily" / "year=2023"
+    orphan_dir.mkdir(parents=True)
+    orphan = _daily_rows("000001.SZ", ["20230103"]).drop(columns=["year"])
+    feather.write_feather(orphan, str(orphan_dir / "lost.arrow"))
+
+    writer = BatchingParquetWriter(
+        base_path=str(tmp_path / "parquet"),
+        max_rows=1000,
+        max_delay_seconds=0,
+        spool_path=str(spool),
+    )
+    writer.write(_daily_rows("600519.SH", ["20230104"]), "stock_daily", ["year"])
+    writer.flush()
+
+    files = list((tmp_path / "parquet/stock_daily/year=2023").glob("*.parquet"))
+    assert len(files) == 1
+    assert sorted(pd.read_parquet(files[0])["ts_code"]) == ["000001.SZ", "600519.SH"]
+    assert not (spool / f"{os.uname().nodename}-999999999").exists()
+
+
+def test_full_replace_discards_pending_rows(tmp_path: Path):
+    """全量替换写入会丢弃同一张表尚未写出的缓冲数据"""
+    writer = BatchingParquetWriter(
+        base_path=str(tmp_path / "parquet"), max_rows=1000, max_delay_seconds=0
+    )
+    basic = pd.DataFrame({"ts_code": ["000001.SZ"], "name": ["平安银行"]})
+
+    writer.write(basic, "stock_basic", [])
+    writer.write_full_replace(basic, "stock_basic", [])
+
+    assert writer.pending_rows() == 0
+    assert len(list((tmp_path / "parquet/stock_basic").glob("*.parquet"))) == 1
+
+
+def test_on_flushed_waits_for_pending_partitions(tmp_path: Path, monkeypatch):
+    """回调在该表所有待写分区落盘后才执行，失败的分区重试成功后才执行"""
+    writer = BatchingParquetWriter(
+        base_path=str(tmp_path / "parquet"), max_rows=1000, max_delay_seconds=0
+    )
+    calls = []
+
+    writer.on_flushed("stock_daily", lambda: calls.append("empty"))
+    assert calls == ["empty"]
+
+    rows = _daily_rows("000001.SZ", ["20230103", "20240102"])
+    writer.write(rows, "stock_daily", ["year"])
+    writer.on_flushed("stock_daily", lambda: calls.append("written"))
+    assert calls == ["empty"]
+
+    writer.flush("stock_basic")
+    assert calls == ["empty"]
+
+    def fail(key, buffer):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(writer, "_write_partition", fail)
+        with pytest.raises(RuntimeError):
+            writer.flush()
+    assert calls == ["empty"]
+
+    writer.flush()
+    assert calls == ["empty", "written"]
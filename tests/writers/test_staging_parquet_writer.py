@@ -0,0 +1,128 @@
+"""StagingParquetWriter 暂存日志与 StagingMerger 合并的单元测试"""
+
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+
+from neo.database.schema_loader import SchemaLoader
+from neo.helpers.metadata_sync import MetadataSyncManager
+from neo.helpers.staging_merger import StagingMerger
+from neo.writers.parquet_writer import ParquetWriter
+from neo.writers.staging_parquet_writer import StagingParquetWriter
+
+
+def _daily_rows(symbol: str, dates: list, close: float = 10.0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ts_code": [symbol] * len(dates),
+            "trade_date": dates,
+            "close": [close] * len(dates),
+            "year": [int(d[:4]) for d in dates],
+        }
+    )
+
+
+def _setup(tmp_path: Path):
+    base, staging = tmp_path / "parquet", tmp_path / "staging"
+    merger = StagingMerger(str(base), str(staging), schema_loader=SchemaLoader())
+    writer = StagingParquetWriter(str(base), str(staging), merger=merger)
+    return base, staging, merger, writer
+
+
+def test_writes_append_segments_without_touching_base(tmp_path: Path):
+    """增量写入按分区追加为暂存段，基础层不产生文件"""
+    base, staging, merger, writer = _setup(tmp_path)
+
+    writer.write(
+        _daily_rows("000001.SZ", ["20231229", "20240102"]), "stock_daily", ["year"]
+    )
+    writer.write(_daily_rows("600519.SH", ["20240102"]), "stock_daily", ["year"])
+
+    assert not list(base.rglob("*.parquet"))
+    assert merger.pending() == {"stock_daily": 3}
+    staged = writer.log.read("stock_daily").to_pandas()
+    assert sorted(staged["year"].unique()) == [2023, 2024]
+    assert len(staged) == 3
+
+
+def test_merge_dedups_sorts_and_compacts_each_partition(tmp_path: Path):
+    """合并后每个分区一个文件，重复主键保留最后写入的行并按主键排序"""
+    base, staging, merger, writer = _setup(tmp_path)
+    ParquetWriter(str(base)).write(
+        _daily_rows("600519.SH", ["20240103"], close=1.0), "stock_daily", ["year"]
+    )
+    writer.write(
+        _daily_rows("600519.SH", ["20240102", "20240103"]), "stock_daily", ["year"]
+    )
+    writer.write(_daily_rows("000001.SZ", ["20240102"]), "stock_daily", ["year"])
+    writer.write(
+        _daily_rows("000001.SZ", ["20240102"], close=11.0), "stock_daily", ["year"]
+    )
+
+    results = merger.merge()
+
+    assert [(r.partition, r.segments, r.base_files) for r in results] == [
+        ("year=2024", 3, 1)
+    ]
+    assert results[0].rows == 3 and results[0].duplicates == 2
+    files = list((base / "stock_daily" / "year=2024").glob("*.parquet"))
+    assert len(files) == 1
+    merged = pq.read_table(files[0]).to_pandas()
+    assert list(zip(merged["ts_code"], merged["trade_date"], merged["close"])) == [
+        ("000001.SZ", "20240102", 11.0),
+        ("600519.SH", "20240102", 10.0),
+        ("600519.SH", "20240103", 10.0),
+    ]
+    assert merger.pending() == {}
+    assert merger.merge() == []
+
+
+def test_full_replace_by_symbol_merges_staging_first(tmp_path: Path):
+    """按 symbol 全量替换前先合并暂存段，替换的数据不会被更早的暂存数据覆盖"""
+    base, staging, merger, writer = _setup(tmp_path)
+    writer.write(_daily_rows("000001.SZ", ["20240102"]), "stock_daily", ["year"])
+
+    writer.write_full_replace_by_symbol(
+        _daily_rows("000001.SZ", ["20240102"], close=12.0),
+        "stock_daily",
+        ["year"],
+        "000001.SZ",
+    )
+
+    assert merger.pending() == {}
+    rows = pd.concat(
+        pq.read_table(path).to_pandas()
+        for path in (base / "stock_daily").rglob("*.parquet")
+    )
+    assert rows["close"].tolist() == [12.0]
+
+
+def test_metadata_views_include_staged_rows(tmp_path: Path):
+    """元数据视图同时包含基础层与尚未合并的暂存数据"""
+    base, staging, merger, writer = _setup(tmp_path)
+    ParquetWriter(str(base)).write(
+        _daily_rows("600519.SH", ["20240102"]), "stock_daily", ["year"]
+    )
+    writer.write(_daily_rows("000001.SZ", ["20240103"]), "stock_daily", ["year"])
+    metadata_db = tmp_path / "metadata.db"
+    sync = MetadataSyncManager(str(metadata_db), str(base), staging_path=str(staging))
+
+    sync.sync(force_full_scan=True)
+    with duckdb.connect(str(metadata_db)) as con:
+        before = con.execute(
+            "SELECT ts_code, year FROM stock_daily ORDER BY ts_code"
+        ).fetchall()
+
+    merger.merge()
+    sync.sync(force_full_scan=True)
+    with duckdb.connect(str(metadata_db)) as con:
+        after = con.execute("SELECT COUNT(*) FROM stock_daily").fetchone()[0]
+        staged_tables = con.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name LIKE '_staged_%'"
+        ).fetchone()[0]
+
+    assert before == [("000001.SZ", 2024), ("600519.SH", 2024)]
+    assert after == 2
+    assert staged_tables == 0